@@ -2,7 +2,7 @@
 
 import json
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any
 from datetime import datetime
 
 from PySide6.QtCore import QObject, Signal, Slot, Property, QAbstractListModel, QModelIndex, Qt
@@ -11,6 +11,8 @@ from PySide6.QtQml import QJSValue
 import pandas as pd
 
 from DataManage.services.database_service import DatabaseService
+from DataManage.services.performance_monitor import timed_slot
+from DataManage.services.async_database_service import AsyncDatabaseService
 from DataManage.models.device import DeviceType
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
@@ -147,12 +149,14 @@ class DeviceController(QObject):
     # 🔥 添加模板生成相关信号
     templateGenerated = Signal(str)        # 模板生成成功
     templateGenerationFailed = Signal(str) # 模板生成失败
+    importProgress = Signal(int, int)      # 批量导入进度: 已处理行数, 总行数
 
     def __init__(self, parent=None):
         super().__init__(parent)
 
         # 数据库服务
         self._db = DatabaseService()
+        self._async_db = AsyncDatabaseService(self._db)
 
         # 模型
         self._deviceListModel = DeviceListModel(self)
@@ -161,6 +165,7 @@ class DeviceController(QObject):
         self._loading = False
         self._currentPage = 1
         self._pageSize = 20
+        self._searchLimit = 500  # 搜索结果上限（边输入边搜索时控制结果规模）
         self._totalCount = 0
         self._totalPages = 1
         self._currentFilter = {
@@ -178,6 +183,7 @@ class DeviceController(QObject):
         # 连接数据库信号
         self._db.deviceListUpdated.connect(self._onDeviceListUpdated)
         self._db.databaseError.connect(self._onDatabaseError)
+        self._db.deviceImportProgress.connect(self.importProgress)
 
         # 初始加载
         self.loadDevices()
@@ -228,49 +234,54 @@ class DeviceController(QObject):
 
     # 设备列表操作
     @Slot()
+    @timed_slot()
     def loadDevices(self):
-        """加载设备列表"""
+        """加载设备列表（后台线程查询，筛选/翻页过快时只保留最后一次结果）"""
         self._setLoading(True)
 
-        try:
-            # 调试信息
-            # print(f"加载设备: 过滤条件={self._currentFilter}")
-        
-            # 如果有搜索关键词，使用搜索功能
-            if self._currentFilter.get('keyword'):
-                devices = self._db.search_devices(
-                    keyword=self._currentFilter['keyword'],
-                    device_type=self._currentFilter.get('device_type')
-                )
-                # 打印找到的设备
-                # print(f"这里是loaddevice，检索到 {len(devices)} 个设备")
-                # for device in devices[:3]:  # 只打印前三个
-                #     print(f"设备: ID={device.get('id')}, 型号={device.get('modelDevice')}")
-                
-                self._deviceListModel.setDevices(devices)
-                self._totalCount = len(devices)
-                self._totalPages = 1
-                self._currentPage = 1
-            else:
-                # 否则使用分页加载
-                result = self._db.get_devices(
-                    device_type=self._currentFilter.get('device_type'),
-                    status=self._currentFilter.get('status'),
-                    page=self._currentPage,
-                    page_size=self._pageSize
-                )
-
-                self._deviceListModel.setDevices(result['devices'])
-                self._totalCount = result['total_count']
-                self._totalPages = result['total_pages']
+        # 如果有搜索关键词，使用搜索功能；否则使用分页加载
+        if self._currentFilter.get('keyword'):
+            self._async_db.submit(
+                'search_devices',
+                keyword=self._currentFilter['keyword'],
+                device_type=self._currentFilter.get('device_type'),
+                limit=self._searchLimit,
+                channel='device.list',
+                on_success=self._onSearchResultLoaded,
+                on_error=self._onDeviceListLoadFailed
+            )
+        else:
+            self._async_db.submit(
+                'get_devices',
+                device_type=self._currentFilter.get('device_type'),
+                status=self._currentFilter.get('status'),
+                page=self._currentPage,
+                page_size=self._pageSize,
+                channel='device.list',
+                on_success=self._onDevicePageLoaded,
+                on_error=self._onDeviceListLoadFailed
+            )
 
-            self.deviceListChanged.emit()
+    def _onSearchResultLoaded(self, devices):
+        """搜索结果返回"""
+        self._deviceListModel.setDevices(devices)
+        self._totalCount = len(devices)
+        self._totalPages = 1
+        self._currentPage = 1
+        self.deviceListChanged.emit()
+        self._setLoading(False)
 
-        except Exception as e:
-            self.errorOccurred.emit(f"加载设备列表失败: {str(e)}")
+    def _onDevicePageLoaded(self, result):
+        """分页结果返回"""
+        self._deviceListModel.setDevices(result['devices'])
+        self._totalCount = result['total_count']
+        self._totalPages = result['total_pages']
+        self.deviceListChanged.emit()
+        self._setLoading(False)
 
-        finally:
-            self._setLoading(False)
+    def _onDeviceListLoadFailed(self, error):
+        self.errorOccurred.emit(f"加载设备列表失败: {error}")
+        self._setLoading(False)
 
     @Slot(str)
     def filterByType(self, device_type):
@@ -293,6 +304,7 @@ class DeviceController(QObject):
         self.loadDevices()
 
     @Slot(str)
+    @timed_slot()
     def searchDevices(self, keyword):
         """搜索设备"""
         self._currentFilter['keyword'] = keyword.strip()
@@ -463,9 +475,12 @@ class DeviceController(QObject):
                 # 使用原有的单Sheet结构处理
                 result = self._import_legacy_format(file_path, device_type, is_metric)
 
+            message = f"导入完成：成功{result['success_count']}条，失败{result['error_count']}条"
+            if result.get('updated_count'):
+                message += f"（其中更新已有设备{result['updated_count']}条）"
             self.importCompleted.emit(
                 True,
-                f"导入完成：成功{result['success_count']}条，失败{result['error_count']}条",
+                message,
                 result['success_count'],
                 result['error_count']
             )
@@ -553,12 +568,9 @@ class DeviceController(QObject):
         
             logger.info(f"性能数据分组: {list(performance_by_model.keys())}")
         
-            # 🔥 处理每个设备记录
-            result = {
-                'success_count': 0,
-                'error_count': 0,
-                'errors': []
-            }
+            # 🔥 先构建全部设备记录，再交给数据库服务分块批量写入
+            rows = []
+            build_errors = []
         
             for row_idx, basic_record in enumerate(basic_records, 2):  # 从第2行开始（第1行是表头）
                 try:
@@ -566,11 +578,10 @@ class DeviceController(QObject):
                     device_model = str(basic_record.get('型号', '')).strip()
                 
                     if not device_model:
-                        result['errors'].append({
+                        build_errors.append({
                             'row': row_idx,
                             'error': '设备型号不能为空'
                         })
-                        result['error_count'] += 1
                         continue
                 
                     # 🔥 构建设备数据（包含基本信息和性能数据）
@@ -580,28 +591,22 @@ class DeviceController(QObject):
                         device_type, 
                         is_metric
                     )
-                
-                    # 🔥 调用数据库保存
-                    device_id = self._save_device_to_database(device_data)
-                
-                    if device_id:
-                        result['success_count'] += 1
-                        logger.info(f"成功导入设备: {device_model} (ID: {device_id})")
-                    else:
-                        result['errors'].append({
-                            'row': row_idx,
-                            'error': f'保存设备失败: {device_model}'
-                        })
-                        result['error_count'] += 1
+                    rows.append({'row': row_idx, 'data': device_data})
                     
                 except Exception as e:
-                    result['errors'].append({
+                    build_errors.append({
                         'row': row_idx,
                         'error': f'处理第{row_idx}行时出错: {str(e)}'
                     })
-                    result['error_count'] += 1
                     logger.error(f"处理第{row_idx}行失败: {str(e)}")
         
+            # 双Sheet导入沿用原有行为：序列号已存在的设备按导入数据更新
+            result = self._db.bulk_import_devices(rows, update_existing=True)
+        
+            if build_errors:
+                result['errors'] = sorted(build_errors + result['errors'], key=lambda err: err['row'])
+                result['error_count'] = len(result['errors'])
+        
             return result
         
         except Exception as e:
@@ -616,7 +621,7 @@ class DeviceController(QObject):
             excel_data = df.to_dict('records')
 
             # 调用原有的数据库导入方法
-            result = self._db.import_devices_from_(excel_data, device_type, is_metric)
+            result = self._db.import_devices_from_excel(excel_data, device_type, is_metric)
         
             logger.info(f"单Sheet导入完成: 成功{result['success_count']}条")
             return result
@@ -715,55 +720,6 @@ class DeviceController(QObject):
     
         return curves
 
-    def _save_device_to_database(self, device_data: Dict[str, Any]) -> Optional[int]:
-        """保存设备到数据库"""
-        try:
-            # 🔥 检查是否为更新操作
-            existing_device = None
-            if device_data.get('serial_number'):
-                existing_device = self._db.get_device_by_serial_number(device_data['serial_number'])
-        
-            if existing_device:
-                # 更新现有设备
-                success = self._db.update_device(existing_device['id'], device_data)
-                return existing_device['id'] if success else None
-            else:
-                # 创建新设备
-                new_id = self._db.create_device(device_data)
-            
-                # 🔥 如果有性能曲线数据，单独保存
-                if device_data.get('pump_details', {}).get('performance_curves'):
-                    self._save_performance_curves(new_id, device_data['pump_details']['performance_curves'])
-            
-                return new_id
-    
-        except Exception as e:
-            logger.error(f"保存设备到数据库失败: {str(e)}")
-            return None
-
-    def _save_performance_curves(self, device_id: int, curves_data: List[Dict]):
-        """保存性能曲线数据到数据库"""
-        try:
-            if hasattr(self._db, 'save_pump_curves'):
-                # 🔥 如果数据库服务支持保存曲线数据
-                model = self._db.get_device_by_id(device_id).get('model', '')
-                curves_dict = {
-                    'flow': [c['flow_rate'] for c in curves_data],
-                    'head': [c['head'] for c in curves_data],
-                    'efficiency': [c['efficiency'] for c in curves_data],
-                    'power': [c['power'] for c in curves_data],
-                    'standard_frequency': curves_data[0]['frequency'] if curves_data else 60,
-                    'data_source': 'import_excel',
-                    'version': '1.0'
-                }
-                self._db.save_pump_curves(model, curves_dict)
-                logger.info(f"保存了设备 {device_id} 的性能曲线数据")
-            else:
-                logger.warning("数据库不支持保存性能曲线数据")
-            
-        except Exception as e:
-            logger.error(f"保存性能曲线数据失败: {str(e)}")
-
     # 🔥 辅助方法
     def _parse_float(self, value, default=None):
         """安全地解析浮点数"""
@@ -5,7 +5,9 @@ import os
 import json
 import logging
 from re import M
+import threading
 import traceback
+from functools import partial
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from docx.oxml import OxmlElement
@@ -19,6 +21,14 @@ from PySide6.QtQml import QmlElement
 # 导入数据服务
 from Controller import PumpCurvesController
 from DataManage.services.database_service import DatabaseService
+from DataManage.services.performance_monitor import timed_slot
+from DataManage.services.pump_sizing_service import affinity_scale
+from DataManage.services.empirical_formulas_service import (
+    combine_predictions, composite_ipr_curve, empirical_prediction, expert_inlet_glr, linear_ipr_curve
+)
+from DataManage.services.async_database_service import AsyncDatabaseService
+from DataManage.services.batch_selection_service import BatchSettings
+from DataManage.services.staged_pipeline import PipelineCancelled, Stage, StagedPipeline
 from DataManage.models.production_parameters import ProductionParameters, ProductionPrediction
 
 from PySide6.QtCore import QObject, Signal, Slot, QTimer, Property
@@ -75,6 +85,7 @@ class DeviceRecommendationController(QObject):
     predictionCompleted = Signal(dict)  # 预测完成
     predictionProgress = Signal(float)  # 预测进度 (0-1)
     predictionError = Signal(str)       # 预测错误
+    predictionStageFinished = Signal(str, float, float)  # 预测阶段完成：阶段名, 耗时ms, 总进度 (0-1)
     
     # IPR曲线相关信号
     iprCurveGenerated = Signal(list)   # IPR曲线生成完成
@@ -111,15 +122,24 @@ class DeviceRecommendationController(QObject):
     separatorsLoaded = Signal('QVariant')  # 分离器数据加载完成信号
 
     pumpCurvesDataReady = Signal('QVariant')  # 泵性能曲线数据准备就绪
+
+    # 项目批量选型信号
+    batchProgress = Signal(int, int)       # 已完成井数, 总井数
+    batchCompleted = Signal('QVariant')    # 批量选型完成（含取消），汇总表
+    batchError = Signal(str)               # 批量选型错误
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self._db_service = DatabaseService()
+        self._async_db = AsyncDatabaseService(self._db_service)
         self._current_project_id = -1
         self._current_well_id = -1
         self._current_parameters_id = -1
         self._current_session_id = -1
         self._busy = False
+        self._batch_cancel: Optional[threading.Event] = None
+        self._prediction_cancel: Optional[threading.Event] = None
+        self.calculation_result = None
          
          # 新增ML服务
         self.ml_service = MLPredictionService()
@@ -172,15 +192,33 @@ class DeviceRecommendationController(QObject):
         if self._current_project_id != value:
             self._current_project_id = value
             logger.info(f"设置设备推荐控制器当前项目ID: {value}")
+            if value > 0:
+                self._prewarm_catalog_views()
+
+    def _prewarm_catalog_views(self):
+        """打开项目时在后台线程预构建各步骤的设备列表视图，之后步骤切换直接命中缓存"""
+        def warm(db):
+            table, indices = db.device_catalog.select('pump', status='active')
+            lift_methods = sorted({method for method in table.decode('lift_method', indices) if method})
+            views = [('step4_pumps', 'pump', partial(self._build_pump_list, lift_method=method), method)
+                     for method in lift_methods]
+            views += [
+                ('step5_separators', 'separator', self._build_separator_list, None),
+                ('step6_protectors', 'protector', self._build_protector_list, None),
+                ('step7_motors', 'motor', self._build_motor_list, None),
+            ]
+            return db.catalog_views.warm(views)
+
+        self._async_db.submit(warm, channel='catalog_views_warmup')
 
     # ========== 井管理相关方法 ==========
     @Slot(int)
+    @timed_slot()
     def loadWellsWithParameters(self, project_id: int):
-        """加载项目下的井列表及其参数状态"""
-        try:
-            self._set_busy(True)
-            wells = self._db_service.get_wells_with_production_params(project_id)
-            print("这里是loadWellsWithParameters,正在加载井数据")
+        """加载项目下的井列表及其参数状态（后台线程查询）"""
+        self._set_busy(True)
+
+        def on_loaded(wells):
             # 转换为QML友好的格式
             wells_data = []
             for well in wells:
@@ -191,21 +229,123 @@ class DeviceRecommendationController(QObject):
                     'wellType': well.get('well_type', ''),
                     'status': well.get('well_status', '')
                 })
-            
+
             self.wellsListLoaded.emit(wells_data)
             logger.info(f"加载井列表成功: 项目ID {project_id}, 共{len(wells_data)}口井")
-            
-        except Exception as e:
-            error_msg = f"加载井列表失败: {str(e)}"
+            self._set_busy(False)
+
+        def on_failed(error):
+            error_msg = f"加载井列表失败: {error}"
             logger.error(error_msg)
             self.parametersError.emit(error_msg)
-        finally:
             self._set_busy(False)
+
+        self._async_db.submit(
+            'get_wells_with_production_params', project_id,
+            channel='recommendation.wells',
+            on_success=on_loaded, on_error=on_failed
+        )
     
+    # ========== 项目批量选型 ==========
+    @Slot(int, 'QVariant')
+    @timed_slot()
+    def runBatchSelection(self, project_id: int, options=None):
+        """
+        对项目内所有有活跃生产参数的井批量执行预测和管柱组合选型（后台运行）
+
+        Args:
+            project_id: 项目ID
+            options: 可选设置 {wellIds, casingId, clearance, maxResults, energyCostPerMwh, evaluationYears, useMl}
+        """
+        try:
+            if self._batch_cancel is not None:
+                raise RuntimeError("已有批量选型正在运行")
+
+            options = options.toVariant() if hasattr(options, 'toVariant') else (options or {})
+            settings = BatchSettings()
+            for key, field in (('casingId', 'casing_id'), ('clearance', 'clearance'),
+                               ('maxResults', 'max_results'), ('energyCostPerMwh', 'energy_cost_per_mwh'),
+                               ('evaluationYears', 'evaluation_years'), ('useMl', 'use_ml'),
+                               ('liftMethod', 'lift_method')):
+                if options.get(key) is not None:
+                    setattr(settings, field, options[key])
+            well_ids = options.get('wellIds') or None
+            cancel_event = threading.Event()
+            self._batch_cancel = cancel_event
+
+            def run(db):
+                return db.batch_selection.run(
+                    project_id, settings, well_ids=well_ids,
+                    progress=self.batchProgress.emit, cancel_event=cancel_event,
+                    ml_factory=MLPredictionService, model_version=self.ml_service.get_model_version(),
+                    ml_service=self.ml_service
+                )
+
+            def on_finished(summary):
+                self._batch_cancel = None
+                self.batchCompleted.emit(self._batch_summary_for_qml(summary))
+
+            def on_failed(error):
+                self._batch_cancel = None
+                error_msg = f"批量选型失败: {error}"
+                logger.error(error_msg)
+                self.batchError.emit(error_msg)
+
+            self._async_db.submit(run, channel='batch_selection', on_success=on_finished, on_error=on_failed,
+                                  dedicated=True)
+            logger.info(f"开始项目批量选型: 项目ID {project_id}")
+
+        except Exception as e:
+            error_msg = f"批量选型失败: {str(e)}"
+            logger.error(error_msg)
+            self.batchError.emit(error_msg)
+
+    @Slot()
+    def cancelBatchSelection(self):
+        """取消正在运行的批量选型（已完成的井结果保留）"""
+        if self._batch_cancel is not None:
+            self._batch_cancel.set()
+            logger.info("已请求取消批量选型")
+
+    def _batch_summary_for_qml(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        """批量选型汇总转换为QML格式"""
+        rows = [{
+            'id': row['id'],
+            'wellId': row['well_id'],
+            'wellName': row['well_name'] or '',
+            'status': row['status'],
+            'error': row['error'] or '',
+            'production': row['production'] or 0,
+            'totalHead': row['total_head'] or 0,
+            'gasRate': row['gas_rate'] or 0,
+            'pumpModel': row['pump_model'] or '',
+            'stages': row['stages'] or 0,
+            'frequency': row['frequency'] or 0,
+            'motorModel': row['motor_model'] or '',
+            'protectorModel': row['protector_model'] or '',
+            'separatorModel': row['separator_model'] or '',
+            'capex': row['capex'] or 0,
+            'energyKw': row['energy_kw'] or 0,
+            'lifecycleCost': row['lifecycle_cost'] or 0,
+            'paretoSize': row['pareto_size'] or 0
+        } for row in summary['rows']]
+        return {
+            'runId': summary['run_id'],
+            'status': summary['status'],
+            'error': summary.get('error') or '',
+            'total': summary['total'],
+            'completed': summary['completed'],
+            'failed': summary['failed'],
+            'elapsedSeconds': summary['elapsed_s'],
+            'rows': rows
+        }
+
     # ========== 生产参数管理 ==========
     @Slot(int)
     def loadActiveParameters(self, well_id: int):
         """加载井的活跃生产参数"""
+        # 切换井/参数后，进行中的预测已过期
+        self.cancelPrediction()
         try:
             self._set_busy(True)
             params_list = self._db_service.get_production_parameters(well_id, active_only=True)
@@ -262,6 +402,8 @@ class DeviceRecommendationController(QObject):
             params_data: 参数数据（来自QML）
             create_new_version: 是否创建新版本
         """
+        # 参数被修改，进行中的预测已过期
+        self.cancelPrediction()
         try:
             self._set_busy(True)
             
@@ -314,6 +456,7 @@ class DeviceRecommendationController(QObject):
     @Slot(int)
     def setActiveParameters(self, params_id: int):
         """设置活跃参数版本"""
+        self.cancelPrediction()
         try:
             self._set_busy(True)
             success = self._db_service.set_active_production_parameters(params_id)
@@ -335,6 +478,7 @@ class DeviceRecommendationController(QObject):
     @Slot(int)
     def deleteParameters(self, params_id: int):
         """删除参数版本"""
+        self.cancelPrediction()
         try:
             self._set_busy(True)
             success = self._db_service.delete_production_parameters(params_id)
@@ -353,39 +497,13 @@ class DeviceRecommendationController(QObject):
         finally:
             self._set_busy(False)
     
-    def _run_ml_prediction(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def _run_ml_prediction(self, params: Dict[str, Any], calculation: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         """运行ML预测 - 修复版本，使用真正的MLPredictionService"""
         try:
             logger.info("=== 开始真正的ML模型预测 ===")
             
-            # 创建PredictionInput对象
-            input_data = PredictionInput(
-                geopressure=float(params.get('geo_pressure', 0)),
-                produce_index=float(params.get('produce_index', 0)),
-                bht=float(params.get('bht', 0)),
-                expected_production=float(params.get('expected_production', 0)),
-                bsw=float(params.get('bsw', 0)),
-                api=float(params.get('api', 0)),
-                gas_oil_ratio=float(params.get('gas_oil_ratio', 0)),
-                saturation_pressure=float(params.get('saturation_pressure', 0)),
-                wellhead_pressure=float(params.get('well_head_pressure', 0)),
-                perforation_depth = self.calculation_result['perforation_depth'],
-                pump_hanging_depth = self.calculation_result['pump_hanging_depth']
-            )
-        
-            logger.info(f"ML预测输入数据: 地层压力={input_data.geopressure}, 产量={input_data.expected_production}")
-        
-            # 🔥 使用真正的ML服务进行预测
-            ml_results = self.ml_service.predict_all(input_data)
-        
-            # 转换为控制器期望的格式，确保字段名正确
-            return {
-                'production': ml_results.production,
-                'total_head': ml_results.total_head,  # 🔥 使用 total_head 而不是 pump_depth
-                'gas_rate': ml_results.gas_rate,
-                'confidence': ml_results.confidence,
-                'method': 'MLPredictionService'
-            }
+            # 🔥 使用真正的ML服务进行预测（字段名：total_head 而不是 pump_depth）
+            return self.ml_service.predict_parameters(params, calculation)
         
         except Exception as e:
             logger.error(f"ML预测失败，使用后备方案: {e}")
@@ -619,71 +737,14 @@ class DeviceRecommendationController(QObject):
 
     def _generate_ipr_curve(self, params: Dict[str, Any]) -> List[Dict[str, float]]:
         """
-        生成IPR曲线数据 - 修正版本，确保正确的趋势
+        生成IPR曲线数据 - 修正版本，确保正确的趋势（公式与项目批量选型共用）
         """
         try:
-            # 提取参数
-            pr = float(params['geo_pressure'])  # 地层压力
-            expected_prod = float(params['expected_production'])  # 期望产量
-            pb = float(params.get('saturation_pressure', pr * 0.6))  # 饱和压力
-            pwf_current = float(params.get('well_head_pressure', pr * 0.4))  # 当前井底流压
-    
-            logger.info(f"生成IPR曲线参数: Pr={pr}, Prod={expected_prod}, Pb={pb}, Pwf_current={pwf_current}")
-    
-            # 计算生产指数
-            if pwf_current >= pb:
-                # 线性段
-                pi = expected_prod / (pr - pwf_current) if (pr - pwf_current) > 0 else 0.1
-            else:
-                # Vogel段 - 反推生产指数
-                # 简化计算
-                pi = expected_prod / (pr - pb + pb/1.8 * (1 - 0.2*(pwf_current/pb) - 0.8*(pwf_current/pb)**2))
-    
-            logger.info(f"计算生产指数 PI = {pi:.4f}")
-    
-            # 生成IPR曲线数据点
-            curve_data = []
-            num_points = 36
-        
-            for i in range(num_points):
-                # 井底流压从地层压力线性递减到0
-                pwf = pr * (1 - i / (num_points - 1))
-            
-                # 根据压力计算产量
-                if pwf >= pb:
-                    # 线性段：q = PI * (Pr - Pwf)
-                    q = pi * (pr - pwf)
-                else:
-                    # Vogel段
-                    q_linear = pi * (pr - pb)  # 线性段贡献
-                
-                    # Vogel段贡献
-                    pb_ratio = pwf / pb if pb > 0 else 0
-                    vogel_factor = 1 - 0.2 * pb_ratio - 0.8 * (pb_ratio ** 2)
-                    q_vogel = pi * pb / 1.8 * vogel_factor
-                
-                    q = q_linear + q_vogel
-            
-                # 确保产量非负
-                q = max(0, q)
-            
-                curve_data.append({
-                    'production': float(q),
-                    'pressure': float(pwf)
-                })
-    
-            # 按压力从高到低排序
-            curve_data.sort(key=lambda point: point['pressure'], reverse=True)
-    
+            curve_data = composite_ipr_curve(params)
             logger.info(f"生成IPR曲线数据点: {len(curve_data)}个")
             if curve_data:
                 logger.info(f"压力范围: {curve_data[0]['pressure']:.1f} - {curve_data[-1]['pressure']:.1f} psi")
                 logger.info(f"产量范围: {curve_data[-1]['production']:.2f} - {curve_data[0]['production']:.2f} bbl/d")
-            
-                # 验证趋势：压力高产量低，压力低产量高
-                logger.info(f"验证趋势 - 高压点: P={curve_data[0]['pressure']:.1f}, Q={curve_data[0]['production']:.2f}")
-                logger.info(f"验证趋势 - 低压点: P={curve_data[-1]['pressure']:.1f}, Q={curve_data[-1]['production']:.2f}")
-    
             return curve_data
         
         except Exception as e:
@@ -695,26 +756,7 @@ class DeviceRecommendationController(QObject):
         """
         生成简单的线性IPR曲线作为后备 - 修正版本
         """
-        curve_data = []
-        pr = float(params['geo_pressure'])
-        expected_prod = float(params['expected_production'])
-    
-        # 简单的线性关系：假设在地层压力的一半时达到期望产量
-        pi = expected_prod / (pr * 0.5) if pr > 0 else 0.1
-
-        for i in range(21):
-            # 压力从地层压力递减到0
-            pwf = pr * (1 - i / 20.0)
-            # 产量随着压力降低而增加
-            q = pi * (pr - pwf)
-            q = max(0, q)  # 确保非负
-        
-            curve_data.append({
-                'pressure': float(pwf),
-                'production': float(q)
-            })
-
-        return curve_data
+        return linear_ipr_curve(params)
 
     # ========== 选型会话管理 ==========
     @Slot(dict)
@@ -804,39 +846,20 @@ class DeviceRecommendationController(QObject):
             self._set_busy(True)
             logger.info(f"根据举升方式获取泵列表: {lift_method}")
         
-            # 🔥 从数据库获取指定举升方式的泵数据
-            pumps = self._db_service.get_devices_by_lift_method(
-                device_type='pump', 
-                lift_method=lift_method.lower(),
-                status='active'
+            # 🔥 从设备目录视图缓存获取指定举升方式的泵卡片（快照不变时不重新筛选、转换）
+            pump_list = self._db_service.catalog_views.get(
+                'step4_pumps', 'pump', partial(self._build_pump_list, lift_method=lift_method),
+                lift_method=lift_method
             )
 
-            # 如果数据库中没有数据，使用模拟数据作为后备
-            if not pumps['devices']:
+            # 如果数据库中没有数据，使用模拟数据作为后备（不缓存）
+            if not pump_list:
                 logger.warning(f"数据库中没有 {lift_method} 泵数据，使用模拟数据")
                 pumps = self._generate_mock_pumps_by_lift_method(lift_method)
-
-            # 🔥 确保数据格式正确
-            pump_list = []
-            for device_data in pumps['devices']:
-                if device_data.get('pump_details'):
-                    pump_info = {
-                        'id': device_data['id'],
-                        'manufacturer': device_data['manufacturer'],
-                        'model': device_data['model'],
-                        'liftMethod': device_data.get('lift_method', lift_method),  # 🔥 确保liftMethod字段存在
-                        'series': self.extract_series(device_data['model']),
-                        'minFlow': device_data['pump_details']['displacement_min'] or 0,
-                        'maxFlow': device_data['pump_details']['displacement_max'] or 1000,
-                        'headPerStage': device_data['pump_details']['single_stage_head'] or 25,
-                        'powerPerStage': device_data['pump_details']['single_stage_power'] or 2.5,
-                        'efficiency': device_data['pump_details']['efficiency'] or 75,
-                        'outerDiameter': device_data['pump_details']['outside_diameter'] or 4.0,
-                        'shaftDiameter': device_data['pump_details']['shaft_diameter'] or 0.75,
-                        'maxStages': device_data['pump_details']['max_stages'] or 100,
-                        'displacement': device_data['pump_details']['displacement_max'] or 1000
-                    }
-                    pump_list.append(pump_info)
+                pump_list = [
+                    self._pump_info(device_data, lift_method)
+                    for device_data in pumps['devices'] if device_data.get('pump_details')
+                ]
 
             logger.info(f"找到 {len(pump_list)} 个 {lift_method.upper()} 泵")
         
@@ -855,6 +878,221 @@ class DeviceRecommendationController(QObject):
         finally:
             self._set_busy(False)
 
+    def _build_pump_list(self, table, indices: np.ndarray, lift_method: str) -> List[Dict[str, Any]]:
+        """泵快照转换为第4步泵卡片列表"""
+        return [
+            self._pump_info(device_data, lift_method)
+            for device_data in table.records(indices) if device_data.get('pump_details')
+        ]
+
+    def _pump_info(self, device_data: Dict[str, Any], lift_method: str) -> Dict[str, Any]:
+        """设备字典转换为第4步泵卡片使用的格式"""
+        details = device_data['pump_details']
+        return {
+            'id': device_data['id'],
+            'manufacturer': device_data['manufacturer'],
+            'model': device_data['model'],
+            'liftMethod': device_data.get('lift_method', lift_method),  # 🔥 确保liftMethod字段存在
+            'series': self.extract_series(device_data['model']),
+            'minFlow': details['displacement_min'] or 0,
+            'maxFlow': details['displacement_max'] or 1000,
+            'headPerStage': details['single_stage_head'] or 25,
+            'powerPerStage': details['single_stage_power'] or 2.5,
+            'efficiency': details['efficiency'] or 75,
+            'outerDiameter': details['outside_diameter'] or 4.0,
+            'shaftDiameter': details['shaft_diameter'] or 0.75,
+            'maxStages': details['max_stages'] or 100,
+            'displacement': details['displacement_max'] or 1000
+        }
+
+    @Slot(dict, result='QVariant')
+    @timed_slot()
+    def screenPumps(self, criteria):
+        """
+        全目录泵筛选排序（与知识图谱共用评分）
+
+        criteria: liftMethod, requiredFlow (m³/d), requiredHead, casingId (mm), clearance (mm),
+                  topK, minScore
+        返回按匹配度排序的泵卡片列表，附 matchScore (0-100)、scoreBreakdown、recommendedStages
+        """
+        try:
+            criteria = dict(criteria or {})
+            lift_method = criteria.get('liftMethod') or None
+            casing_id = criteria.get('casingId') or None
+
+            ranked = self._db_service.pump_screening.screen(
+                float(criteria.get('requiredFlow') or 0),
+                float(criteria.get('requiredHead') or 0),
+                lift_method=lift_method.lower() if lift_method else None,
+                casing_id=float(casing_id) if casing_id else None,
+                clearance=float(criteria.get('clearance') or 0),
+                top=int(criteria.get('topK') or 50),
+                min_score=float(criteria.get('minScore') or 0)
+            )
+
+            pump_list = []
+            for candidate in ranked:
+                pump_info = self._pump_info(candidate['pump'], lift_method or '')
+                pump_info['matchScore'] = round(candidate['match_score'] * 100)
+                pump_info['scoreBreakdown'] = candidate['breakdown']
+                pump_info['recommendedStages'] = candidate['required_stages']
+                pump_info['odMargin'] = candidate['od_margin']
+                pump_list.append(pump_info)
+            return pump_list
+
+        except Exception as e:
+            error_msg = f"泵筛选失败: {str(e)}"
+            logger.error(error_msg)
+            self.error.emit(error_msg)
+            return []
+
+    @Slot(str, float, str, result='QVariant')
+    @timed_slot()
+    def getPumpsCoveringRate(self, lift_method, rate, window):
+        """
+        区间索引查询：工况范围包含目标排量的泵ID（第4步产量滑块实时筛选）
+
+        Args:
+            lift_method: 举升方式，空字符串表示全部
+            rate: 目标排量 (m³/d)
+            window: 'operating' 排量范围 / 'bep' 最高效率点±25%
+        """
+        try:
+            return self._db_service.pump_ranges.pumps_covering(
+                rate, lift_method=lift_method or None, window=window or 'operating'
+            )
+        except Exception as e:
+            error_msg = f"按排量查询泵失败: {str(e)}"
+            logger.error(error_msg)
+            self.error.emit(error_msg)
+            return []
+
+    @Slot(str, 'QVariant', str, result='QVariant')
+    def getPumpCoverageCounts(self, lift_method, rates, window):
+        """多个目标排量 (m³/d) 各被多少台泵覆盖"""
+        try:
+            rates = rates.toVariant() if hasattr(rates, 'toVariant') else rates
+            return self._db_service.pump_ranges.coverage_counts(
+                [float(rate) for rate in rates or []], lift_method=lift_method or None, window=window or 'operating'
+            )
+        except Exception as e:
+            error_msg = f"统计排量覆盖失败: {str(e)}"
+            logger.error(error_msg)
+            self.error.emit(error_msg)
+            return []
+
+    @Slot(dict, result='QVariant')
+    @timed_slot()
+    def configureEspString(self, criteria):
+        """
+        电潜泵管柱组合选型：同时搜索泵、级数、频率、电机、保护器、分离器
+
+        criteria: requiredFlow (m³/d), requiredHead (m), bht (℃), casingId (mm), clearance (mm),
+                  gasRate (m³/d), liftMethod, maxResults
+        返回 {'solutions': [...], 'stats': {...}}，方案按投资升序，均为投资/耗电/效率余量上的非支配方案
+        """
+        try:
+            criteria = dict(criteria or {})
+            casing_id = criteria.get('casingId') or None
+            lift_method = criteria.get('liftMethod') or 'esp'
+
+            self._set_busy(True)
+            result = self._db_service.esp_configurator.configure(
+                float(criteria.get('requiredFlow') or 0),
+                float(criteria.get('requiredHead') or 0),
+                float(criteria.get('bht') or 0),
+                casing_id=float(casing_id) if casing_id else None,
+                clearance=float(criteria.get('clearance') or 0),
+                gas_rate=float(criteria.get('gasRate') or 0),
+                lift_method=lift_method.lower(),
+                max_results=int(criteria.get('maxResults') or 50)
+            )
+
+            def component(device):
+                if not device:
+                    return None
+                return {'id': device['id'], 'manufacturer': device.get('manufacturer') or '',
+                        'model': device.get('model') or ''}
+
+            solutions = []
+            for solution in result['pareto']:
+                solutions.append({
+                    'pump': self._pump_info(solution['pump'], lift_method),
+                    'stages': solution['stages'],
+                    'frequency': solution['frequency'],
+                    'motor': component(solution['motor']),
+                    'protector': component(solution['protector']),
+                    'separator': component(solution['separator']),
+                    'capex': round(solution['capex'], 2),
+                    'energyKw': round(solution['energy_kw'], 2),
+                    'annualEnergyMwh': round(solution['annual_energy_mwh'], 1),
+                    'efficiencyMargin': round(solution['efficiency_margin'], 4),
+                    'pumpBhp': round(solution['pump_bhp'], 2),
+                    'motorPower': round(solution['motor_power'], 2),
+                    'motorLoad': solution['motor_load'],
+                    'axialThrust': round(solution['axial_thrust'], 2),
+                    'thrustMargin': round(solution['thrust_margin'], 4),
+                    'developedHead': round(solution['developed_head'], 1),
+                    'maxOd': solution['max_od'],
+                })
+            return {'solutions': solutions, 'stats': result['stats']}
+
+        except Exception as e:
+            error_msg = f"管柱组合选型失败: {str(e)}"
+            logger.error(error_msg)
+            self.error.emit(error_msg)
+            return {'solutions': [], 'stats': {}}
+        finally:
+            self._set_busy(False)
+
+    @Slot(dict, result='QVariant')
+    @timed_slot()
+    def optimizeStagesAndFrequency(self, criteria):
+        """
+        候选泵的最小功率 级数 × 频率 配置（相似定律换算曲线，批量计算）
+
+        criteria: requiredFlow (m³/d), requiredHead (m), pumpIds（为空时按 liftMethod 取全部泵）,
+                  liftMethod, minFrequency, maxFrequency, frequencyStep (Hz), maxStages, topK
+        返回按轴功率升序的配置列表
+        """
+        try:
+            criteria = dict(criteria or {})
+            pump_ids = criteria.get('pumpIds')
+            pump_ids = pump_ids.toVariant() if hasattr(pump_ids, 'toVariant') else pump_ids
+            lift_method = criteria.get('liftMethod') or None
+            min_frequency = float(criteria.get('minFrequency') or 30)
+            max_frequency = float(criteria.get('maxFrequency') or 70)
+            step = float(criteria.get('frequencyStep') or 1)
+            frequencies = np.arange(min_frequency, max_frequency + step / 2, step)
+
+            ranked = self._db_service.pump_sizing.optimize(
+                float(criteria.get('requiredFlow') or 0),
+                float(criteria.get('requiredHead') or 0),
+                pump_ids=[int(i) for i in pump_ids] if pump_ids else None,
+                lift_method=lift_method.lower() if lift_method else None,
+                frequencies=frequencies,
+                max_stages=int(criteria['maxStages']) if criteria.get('maxStages') else None,
+                top=int(criteria['topK']) if criteria.get('topK') else None
+            )
+            return [{
+                'pumpId': item['pump_id'],
+                'model': item['model'],
+                'stages': item['stages'],
+                'frequency': item['frequency'],
+                'powerKw': round(item['power_kw'], 2),
+                'headM': round(item['head_m'], 1),
+                'efficiency': round(item['efficiency'], 1),
+                'baseFlow': round(item['base_flow'], 1),
+                'rangePosition': item['range_position'],
+                'curveSource': item['curve_source'],
+            } for item in ranked]
+
+        except Exception as e:
+            error_msg = f"级数×频率优化失败: {str(e)}"
+            logger.error(error_msg)
+            self.error.emit(error_msg)
+            return []
+
     def _generate_mock_pumps_by_lift_method(self, lift_method):
         """根据举升方式生成模拟泵数据"""
         mock_pumps = {
@@ -1149,93 +1387,15 @@ class DeviceRecommendationController(QObject):
 
     @Slot(result='QVariant')
     def getMotorsByType(self):
-        """获取电机列表"""
+        """获取电机列表（第7步；目录视图缓存，快照不变时不重新转换）"""
         try:
             self._set_busy(True)
         
-            # 从数据库获取电机数据
-            motors = self._db_service.get_devices(
-                device_type='MOTOR', 
-                status='active'
-            )
-            logger.info(f"这里是getMotorsByType查询电机数据返回: {len(motors.get('devices', []))}个设备")
-             # 添加调试信息
-            # 修复：确保 devices 列表存在
-            devices = motors.get('devices', [])
-            if not devices:
+            # 从设备目录快照及其电机频率索引获取电机数据（完整目录，不受分页限制）
+            motor_list = self._db_service.catalog_views.get('step7_motors', 'motor', self._build_motor_list)
+            logger.info(f"这里是getMotorsByType查询电机数据返回: {len(motor_list)}个设备")
+            if not motor_list:
                 logger.warning("数据库中没有找到电机数据")
-                return []
-
-            # for device in motors.get('devices', [])[:3]:  # 只打印前3个
-            #     logger.info(f"设备详情: ID={device.get('id')}, 类型={device.get('device_type')}, 型号={device.get('model')}")
-            #     logger.info(f"电机详情: {device.get('motor_details', {})}")
-        
-            # 转换为QML需要的格式
-            motor_list = []
-            for device_data in devices:
-                # logger.info(f"处理设备: {device_data.get('id')} - {device_data.get('model')}")
-                # print(f"处理设备: {device_data.get('id')} - {device_data.get('model')}")
-                motor_details = device_data.get('motor_details')
-                print("motor_details:", motor_details)
-           
-                if motor_details:
-                    # logger.info(f"找到电机详情: {motor_details}")
-                
-                    # 获取频率参数
-                    freq_params = motor_details.get('frequency_params', [])
-                    # logger.info(f"频率参数: {len(freq_params)}个")
-                    
-                    # 提取支持的电压和频率
-                    voltages = []
-                    frequencies = []
-                    for param in freq_params:
-                        if param.get('voltage') and param['voltage'] not in voltages:
-                            voltages.append(param['voltage'])
-                        if param.get('frequency') and param['frequency'] not in frequencies:
-                            frequencies.append(param['frequency'])
-                
-                    # 获取主要参数（默认使用60Hz数据）
-                    # main_params = next((p for p in freq_params if p.get('frequency') == 60), 
-                                     # freq_params[0] if freq_params else {})
-                    # 🔥 获取主要参数（优先使用60Hz数据，然后50Hz，最后使用基础数据）
-                    main_params = None
-                    for freq in [50, 60]:
-                        main_params = next((p for p in freq_params if p.get('frequency') == freq), None)
-                        if main_params:
-                            break
-                    if not main_params and freq_params:
-                        main_params = freq_params[0]
-
-                    # 打印main_params以调试
-                    # logger.info(f"主要参数 (频率优先): {main_params}")
-                    motor_info = {
-                        'id': device_data['id'],
-                        'manufacturer': device_data['manufacturer'],
-                        'model': device_data['model'],
-                        'series': self._extract_motor_series(device_data['model']),
-                        'power': main_params.get('power'),
-                        'voltage': sorted(voltages),
-                        'frequency': sorted(frequencies),
-                        'efficiency': main_params.get('efficiency', 0),
-                        'powerFactor': main_params.get('power_factor', 0.85),
-                        'insulationClass': motor_details.get('insulation_class', 'F'),
-                        'protectionClass': motor_details.get('protection_class', 'IP68'),
-                        'outerDiameter': motor_details.get('outside_diameter', 0),
-                        'length': motor_details.get('length', 0),
-                        'weight': motor_details.get('weight', 0),
-                        'speed_60hz': next((p.get('speed') for p in freq_params if p.get('frequency') == 60), 3600),
-                        'speed_50hz': next((p.get('speed') for p in freq_params if p.get('frequency') == 50), 3000),
-                        'temperatureRise': 80,  # 默认温升
-                        # 🔥 关键：确保包含frequency_params数组
-                        'frequency_params': freq_params
-                    }
-                    motor_list.append(motor_info)
-                    # logger.info(f"添加电机到列表: {motor_info['manufacturer']} {motor_info['model']}")
-                else:
-                    logger.warning(f"设备 {device_data.get('id')} 没有电机详情")
-
-
-            # logger.info(f"从数据库加载电机数据: {len(motor_list)}个")
             return motor_list
         
         except Exception as e:
@@ -1251,52 +1411,162 @@ class DeviceRecommendationController(QObject):
         finally:
             self._set_busy(False)
 
+    def _build_motor_list(self, table, indices: np.ndarray) -> List[Dict[str, Any]]:
+        """电机快照转换为第7步电机卡片（主参数、转速、电压/频率集合由电机频率索引按列取出）"""
+        index = self._db_service.motor_index.for_table(table)
+        rows = table.rows[indices]
+        missing = rows['detail_id'] < 0
+        if missing.any():
+            logger.warning(f"{int(missing.sum())}个设备没有电机详情: {rows['id'][missing].tolist()}")
+            indices = indices[~missing]
+
+        # 主参数功率（优先50Hz，然后60Hz，最后第一条参数）、50/60Hz转速、支持的电压和频率均按列一次取出
+        main_power = table.rows['power_main'][indices]
+        speed = {hz: index.exact('speed', hz, indices) for hz in (50, 60)}
+        voltages = index.distinct('voltage', indices)
+        frequencies = index.distinct('frequency', indices)
+
+        # 转换为QML需要的格式
+        motor_list = []
+        for position, device_data in enumerate(table.records(indices)):
+            motor_details = device_data['motor_details']
+            power = main_power[position]
+            speed_60hz, speed_50hz = speed[60][position], speed[50][position]
+            motor_info = {
+                'id': device_data['id'],
+                'manufacturer': device_data['manufacturer'],
+                'model': device_data['model'],
+                'series': self._extract_motor_series(device_data['model']),
+                'power': None if np.isnan(power) else float(power),
+                'voltage': voltages[position],
+                'frequency': [int(value) for value in frequencies[position]],
+                'efficiency': 0,
+                'powerFactor': 0.85,
+                'insulationClass': motor_details.get('insulation_class', 'F'),
+                'protectionClass': motor_details.get('protection_class', 'IP68'),
+                'outerDiameter': motor_details.get('outside_diameter', 0),
+                'length': motor_details.get('length', 0),
+                'weight': motor_details.get('weight', 0),
+                'speed_60hz': 3600 if np.isnan(speed_60hz) else int(speed_60hz),
+                'speed_50hz': 3000 if np.isnan(speed_50hz) else int(speed_50hz),
+                'temperatureRise': 80,  # 默认温升
+                # 🔥 关键：确保包含frequency_params数组
+                'frequency_params': motor_details['frequency_params']
+            }
+            motor_list.append(motor_info)
+
+        return motor_list
+
     @Slot()
+    @timed_slot()
     def runPrediction(self):
-        """运行包含经验公式的预测"""
+        """
+        运行包含经验公式的预测（后台分阶段执行）
+
+        读取参数与井身计算结果后，ML预测、经验公式和IPR曲线三个阶段并行，
+        再合并结果并保存。每个阶段完成时报告真实进度与耗时；
+        修改参数或再次运行时，进行中的预测被取消，其结果不会投递。
+        流水线调度在独立线程中运行，不占用共享的数据库工作线程。
+        """
         try:
-            self._set_busy(True)
-            self.predictionProgress.emit(0.1)
-            
-            logger.info(f"开始预测 - 当前井ID: {self._current_well_id}, 参数ID: {self._current_parameters_id}")
-            # 应该修改为从数据库 wells_new表中获取数据，而不是计算结果表
-            # self.calculation_result = self._db_service.get_well_by_id(self._current_well_id)
-            
-            self.calculation_result = self._db_service.get_latest_calculation_result(self._current_well_id)
-            # print("############",result)
-            # 获取当前参数
             if self._current_parameters_id <= 0:
                 raise ValueError("请先选择或创建生产参数")
-            
-            params = self._db_service.get_production_parameters_by_id(self._current_parameters_id)
+
+            self.cancelPrediction()
+            cancel_event = threading.Event()
+            self._prediction_cancel = cancel_event
+            parameters_id = self._current_parameters_id
+            well_id = self._current_well_id
+            logger.info(f"开始预测 - 当前井ID: {well_id}, 参数ID: {parameters_id}")
+
+            self._set_busy(True)
+            self.predictionProgress.emit(0.0)
+            pipeline = self._build_prediction_pipeline(parameters_id, well_id, cancel_event)
+
+            def on_stage_finished(progress, stage, elapsed_ms):
+                if not cancel_event.is_set():
+                    self.predictionStageFinished.emit(stage, elapsed_ms, progress)
+                    self.predictionProgress.emit(progress)
+
+            def run(db):
+                try:
+                    return pipeline.run(progress=on_stage_finished, cancel_event=cancel_event)
+                except PipelineCancelled:
+                    logger.info(f"预测已取消: 参数ID {parameters_id}")
+                    return None
+
+            def on_finished(outcome):
+                if outcome is None:
+                    return
+                self._finish_prediction(cancel_event)
+                results, timings = outcome
+                self.calculation_result = results['load_calculation']
+                ml_results, empirical_results = results['ml'], results['empirical']
+                ipr_data = results['ipr']
+
+                # 发送详细结果
+                self.predictionCompleted.emit({
+                    'id': results['save'],
+                    'mlResults': ml_results,
+                    'empiricalResults': empirical_results,
+                    'combinedResults': results['combine'],
+                    'comparisonData': self._generate_comparison_data(ml_results, empirical_results),
+                    'iprCurve': ipr_data,
+                    'stageTimings': timings
+                })
+                self.iprCurveGenerated.emit(ipr_data)
+                logger.info(f"混合预测完成: 参数ID {parameters_id}, 各阶段耗时 {timings}")
+
+            def on_failed(error):
+                self._finish_prediction(cancel_event)
+                error_msg = f"预测失败: {error}"
+                logger.error(error_msg)
+                self.predictionError.emit(error_msg)
+
+            self._async_db.submit(run, channel='prediction', on_success=on_finished, on_error=on_failed,
+                                  dedicated=True)
+
+        except Exception as e:
+            error_msg = f"预测失败: {str(e)}"
+            logger.error(error_msg)
+            self.predictionError.emit(error_msg)
+
+    @Slot()
+    def cancelPrediction(self):
+        """取消进行中的预测（正在执行的阶段会运行完，但结果被丢弃）"""
+        if self._prediction_cancel is None:
+            return
+        self._prediction_cancel.set()
+        self._async_db.cancel('prediction')
+        self._finish_prediction(self._prediction_cancel)
+        logger.info("已取消进行中的预测")
+
+    def _finish_prediction(self, cancel_event: threading.Event):
+        if self._prediction_cancel is cancel_event:
+            self._prediction_cancel = None
+            self._set_busy(False)
+            self.predictionProgress.emit(0.0)
+
+    def _build_prediction_pipeline(self, parameters_id: int, well_id: int,
+                                   cancel_event: threading.Event) -> StagedPipeline:
+        """
+        预测流水线：读取 -> (ML预测 | 经验公式 | IPR曲线) -> 合并 -> 保存
+
+        保存阶段在写入前再检查一次取消；写入开始后才取消的预测仍会保存，只是结果不再投递。
+        """
+        db = self._db_service
+
+        def load_parameters(_):
+            params = db.get_production_parameters_by_id(parameters_id)
             if not params:
                 raise ValueError("无法获取生产参数")
+            return params
 
-            logger.info(f"获取到参数: {params}")
-            
-            self.predictionProgress.emit(0.3)
-            
-            # 1. 运行ML预测
-            ml_results = self._run_ml_prediction(params)
-            
-            self.predictionProgress.emit(0.5)
-            
-            # 2. 运行经验公式计算
-            empirical_results = self._run_empirical_calculation_with_formulas(params)
-            
-            self.predictionProgress.emit(0.7)
-            
-            # 3. 智能选择最优结果
-            combined_results = self._combine_results_with_selection(ml_results, empirical_results)
-            
-            self.predictionProgress.emit(0.9)
-            
-            # 4. 生成IPR曲线数据
-            ipr_data = self._generate_ipr_curve(params)
-            
-            # 5. 保存预测结果
+        def save(results):
+            combined_results, empirical_results = results['combine'], results['empirical']
+            calculation = results['load_calculation'] or {}
             prediction_data = {
-                'parameters_id': self._current_parameters_id,
+                'parameters_id': parameters_id,
                 'predicted_production': combined_results.get('production'),
                 'predicted_pump_depth': combined_results.get('pump_depth'),
                 'predicted_gas_rate': combined_results.get('gas_rate'),
@@ -1304,59 +1574,45 @@ class DeviceRecommendationController(QObject):
                 'empirical_gas_rate': empirical_results.get('gas_rate'),
                 'prediction_method': 'Hybrid_ML_Empirical',
                 'confidence_score': combined_results.get('confidence', 0.85),
-                'ipr_curve_data': json.dumps(ipr_data)
+                'ipr_curve_data': results['ipr'],
+                'model_version': self.ml_service.get_model_version()
             }
-            
-            prediction_id = self._db_service.save_production_prediction(prediction_data)
-            
-            self.predictionProgress.emit(1.0)
-            
-            # 发送详细结果
-            results = {
-                'id': prediction_id,
-                'mlResults': ml_results,
-                'empiricalResults': empirical_results,
-                'combinedResults': combined_results,
-                'comparisonData': self._generate_comparison_data(ml_results, empirical_results),
-                'iprCurve': ipr_data
+            # 相同参数、深度和模型的重复预测只追加运行记录
+            prediction_inputs = {
+                'perforation_depth': calculation.get('perforation_depth'),
+                'pump_hanging_depth': calculation.get('pump_hanging_depth')
             }
-            
-            self.predictionCompleted.emit(results)
-            self.iprCurveGenerated.emit(ipr_data)
-            
-            logger.info(f"混合预测完成: 参数ID {self._current_parameters_id}")
-            
-        except Exception as e:
-            error_msg = f"预测失败: {str(e)}"
-            logger.error(error_msg)
-            self.predictionError.emit(error_msg)
-        finally:
-            self._set_busy(False)
-            self.predictionProgress.emit(0.0)
-    
-
-    def _run_empirical_calculation_with_formulas(self, params: Dict[str, Any]) -> Dict[str, Any]:
+            if cancel_event.is_set():
+                raise PipelineCancelled(f"预测已取消，未保存: 参数ID {parameters_id}")
+            return db.save_production_prediction(prediction_data, prediction_inputs)
+
+        inputs = ('load_parameters', 'load_calculation')
+        return StagedPipeline('prediction', [
+            Stage('load_parameters', load_parameters),
+            Stage('load_calculation', lambda _: db.get_latest_calculation_result(well_id)),
+            Stage('ml', lambda r: self._run_ml_prediction(r['load_parameters'], r['load_calculation']),
+                  depends=inputs, weight=4.0),
+            Stage('empirical', lambda r: self._run_empirical_calculation_with_formulas(
+                r['load_parameters'], r['load_calculation']), depends=inputs),
+            Stage('ipr', lambda r: self._generate_ipr_curve(r['load_parameters']), depends=('load_parameters',)),
+            Stage('combine', lambda r: self._combine_results_with_selection(r['ml'], r['empirical']),
+                  depends=('ml', 'empirical')),
+            Stage('save', save, depends=('combine', 'ipr')),
+        ])
+    
+
+    def _run_empirical_calculation_with_formulas(self, params: Dict[str, Any],
+                                                 calculation: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         """使用正确经验公式计算 - 修复版本"""
         try:
             logger.info("=== 使用正确的经验公式计算（修复版） ===")
         
-            # 1. 计算吸入口汽液比（使用修复的复杂公式）
-            gas_rate = self._calculate_inlet_glr_complex_formula(params)
-        
-            # 2. 计算扬程（使用正确的Excel公式）
-            total_head = self._calculate_total_head_excel_formula(params)
-            
-            # 3. 计算推荐产量（使用经验调整系数）
-            production = params['expected_production'] * 0.92
-        
-            logger.info(f"经验公式计算完成: 产量={production:.2f}, 扬程={total_head:.2f}, 气液比={gas_rate:.4f}")
+            # 吸入口汽液比（专家公式）、扬程（Excel公式）、推荐产量（经验调整系数），与项目批量选型共用
+            results = empirical_prediction(params, calculation)
         
-            return {
-                'production': production,
-                'total_head': total_head,
-                'gas_rate': gas_rate,  
-                'method': 'corrected_empirical_formulas'
-            }
+            logger.info(f"经验公式计算完成: 产量={results['production']:.2f}, "
+                        f"扬程={results['total_head']:.2f}, 气液比={results['gas_rate']:.4f}")
+            return results
         
         except Exception as e:
             logger.error(f"修正经验公式计算失败: {e}")
@@ -1368,64 +1624,6 @@ class DeviceRecommendationController(QObject):
                 'method': 'fallback_with_correct_glr'
             }
 
-    def _calculate_total_head_excel_formula(self, params: Dict[str, Any]) -> float:
-        """使用Temp.py中的Excel公式计算扬程"""
-        try:
-            Vertical_depth_of_perforation_top_boundary = self.calculation_result['perforation_depth']
-            Pump_hanging_depth = self.calculation_result['pump_hanging_depth']
-
-            Pwh = params.get('well_head_pressure', 0)  # 井口压力
-            Pperfs = params.get('geo_pressure', 0) * 0.6  # 井底流压（估算）
-            Pump_hanging_depth_measurement = Pump_hanging_depth * 1.1  # 泵挂测深（估算）
-            water_ratio = params.get('bsw', 0)  # 含水率
-            api = params.get('api', 18.5)  # API
-            Kf = 0.017  # 油管摩擦系数
-        
-            logger.info(f"扬程计算参数: 射孔深度={Vertical_depth_of_perforation_top_boundary}, 泵挂深度={Pump_hanging_depth}")
-            logger.info(f"压力参数: 井口压力={Pwh}, 井底流压={Pperfs}, 含水率={water_ratio}, API={api}")
-        
-            # 🔥 使用Temp.py中的Excel公式
-            result = self._excel_formula(
-                Vertical_depth_of_perforation_top_boundary,
-                Pump_hanging_depth,
-                Pwh,
-                Pperfs,
-                Pump_hanging_depth_measurement,
-                water_ratio,
-                Kf,
-                api
-            )
-            # 扬程计算结果取绝对值并确保非负
-            result = abs(result)  # 确保结果为非负数
-        
-            logger.info(f"Excel公式计算扬程结果: {result:.2f} ft")
-            return max(0, result)  # 确保非负
-        
-        except Exception as e:
-            logger.error(f"Excel扬程公式计算失败: {e}")
-            # 使用简化公式作为后备
-            return params.get('geo_pressure', 0) * 1.4
-
-    def _excel_formula(self, Vertical_depth_of_perforation_top_boundary, Pump_hanging_depth, 
-                  Pwh, Pperfs, Pump_hanging_depth_measurement, water_ratio, Kf=0.017, api=18.5):
-        """完整实现Temp.py中的Excel公式"""
-        try:
-            # 井液相对密度
-            pfi = water_ratio + (1 - water_ratio) * 141.5 / (131.5 + api)
-        
-            # 井底流压差
-            Pwf_Pi = 0.433 * (Vertical_depth_of_perforation_top_boundary - Pump_hanging_depth) * pfi
-        
-            # 扬程计算
-            result = Pump_hanging_depth + (Pwh - (Pperfs - Pwf_Pi)) * 2.31 / pfi + Kf * Pump_hanging_depth_measurement
-        
-            logger.info(f"Excel公式详细: pfi={pfi:.4f}, Pwf_Pi={Pwf_Pi:.2f}, 最终扬程={result:.2f}")
-            return result
-        
-        except Exception as e:
-            logger.error(f"Excel公式执行失败: {e}")
-            return 0.0
-
     def _pressure_change(self, pressure):
         """压力转换函数（如果需要单位转换）"""
         # 这里可以添加压力单位转换逻辑
@@ -1453,44 +1651,6 @@ class DeviceRecommendationController(QObject):
                 'method': 'default'
             }
 
-    def _calculate_inlet_glr_complex_formula(self, params: Dict[str, Any]) -> float:
-        """使用专家总结的经验公式计算吸入口气液比 - 最新版本"""
-        try:
-            # 🔥 从参数中提取值
-            # Pi_Mpa = params.get('produce_index', 0)  # 生产指数 (Mpa)
-            Pb_Mpa = self._pressure_change(params.get('saturation_pressure', 0))  # 饱和压力 (Mpa)
-            Pi_Mpa = Pb_Mpa *1.2 # 默认为饱和压力的1.2倍，后根据用户手动调整
-            temperature = params.get('bht', 114)  # 井底温度 (℃)，默认114℃
-            water_ratio = params.get('bsw', 0) / 100.0 if params.get('bsw', 0) > 1 else params.get('bsw', 0)  # 含水率
-            gas_oil_ratio = params.get('gas_oil_ratio', 0)  # 气油比
-            Production_gasoline_ratio = gas_oil_ratio * 0.1781  # 生产汽油比
-
-            logger.info(f"新版气液比计算参数:")
-            logger.info(f"  生产指数 Pi_Mpa: {Pi_Mpa}")
-            logger.info(f"  饱和压力 Pb_Mpa: {Pb_Mpa}")
-            logger.info(f"  井底温度: {temperature}℃")
-            logger.info(f"  含水率: {water_ratio}")
-            logger.info(f"  生产汽油比: {Production_gasoline_ratio}")
-
-            # 常数
-            Z_const = 0.8  # 用户可修改
-            Rg_const = 0.896  # 相对密度Rg，用户可修改
-            Ro_const = 0.849  # 相对密度Ro，用户可修改
-
-            # 🔥 使用专家公式重新计算
-            result = self._calculate_expert_glr_formula(
-                temperature, Production_gasoline_ratio, water_ratio, 
-                Pb_Mpa, Pi_Mpa, Z_const, Rg_const, Ro_const
-            )
-
-            logger.info(f"专家公式计算气液比结果: {result:.4f}")
-            result = abs(result)  # 确保结果为非负数
-            return max(0, result)
-
-        except Exception as e:
-            logger.error(f"专家公式计算失败: {e}")
-            return 97.0  # 使用默认值作为后备
-    
     def _calculate_expert_glr_formula_error(self, temperature, gas_oil_ratio, water_ratio, 
                                  Pb_Mpa, Pi_Mpa, Z_const=0.8, Rg_const=0.896, Ro_const=0.849):
         """修正的吸入口气液比计算公式"""
@@ -1578,45 +1738,8 @@ class DeviceRecommendationController(QObject):
                                 Pb_Mpa, Pi_Mpa, Z_const=0.8, Rg_const=0.896, Ro_const=0.849):
         """完整实现专家总结的吸入口气液比公式"""
         try:
-            # 5. F13 = POWER(10, 0.0125*(141.5/相对密度Ro-131.5))
-            F13 = pow(10, 0.0125 * (141.5 / Ro_const - 131.5))
-        
-            # 6. F14 = POWER(10, 0.00091*(1.8*温度+32))
-            F14 = pow(10, 0.00091 * (1.8 * temperature + 32))
-        
-            # 4. Rsp = 0.1342*相对密度Rg*POWER(10*Pb（Mpa）*F13/F14, 1/0.83)
-            Rsp = 0.1342 * Rg_const * pow((10 * Pb_Mpa * F13 / F14), 1/0.83)
-        
-            # 3. Bg（m^3/m^3） = 0.0003458*Z(常数）*(温度+273)/Pi(Mpa)
-            if Pi_Mpa > 0:
-                Bg = 0.0003458 * Z_const * (temperature + 273) / Pi_Mpa
-            else:
-                Bg = 0.0003458 * Z_const * (temperature + 273) / 0.1  # 防止除零
-        
-            # 2. Bo = 0.972+0.000147*POWER(5.61*Rsp*POWER(相对密度Rg/相对密度Ro,0.5)+1.25*(1.8*温度+32),1.175)
-            Bo_inner = 5.61 * Rsp * pow(Rg_const / Ro_const, 0.5) + 1.25 * (1.8 * temperature + 32)
-            Bo = 0.972 + 0.000147 * pow(Bo_inner, 1.175)
-        
-            # 1. 吸入口气液比=(1-含水率)*(生产汽油比-Rsp)*Bg/((1-含水率)*Bo+(1-含水率)*(生产汽油比-Rsp)*Bg+含水率)*100
-            # 分子
-            numerator = (1 - water_ratio) * (Production_gasoline_ratio - Rsp) * Bg
-        
-            # 分母
-            denominator = ((1 - water_ratio) * Bo + 
-                          (1 - water_ratio) * (Production_gasoline_ratio - Rsp) * Bg + 
-                          water_ratio)
-        
-            # 防止除零
-            if denominator == 0:
-                denominator = 1e-10
-            
-            # 最终结果
-            result = (numerator / denominator) * 100
-        
-            # logger.info(f"专家公式详细: F13={F13:.6f}, F14={F14:.6f}, Rsp={Rsp:.6f}")
-            # logger.info(f"Bo={Bo:.6f}, Bg={Bg:.6f}, 分子={numerator:.6f}, 分母={denominator:.6f}")
-            # logger.info(f"最终气液比={result:.4f}")
-            result = abs(result)  # 确保结果为非负数
+            result = expert_inlet_glr(temperature, Production_gasoline_ratio, water_ratio,
+                                      Pb_Mpa, Pi_Mpa, Z_const, Rg_const, Ro_const)
             return max(0, result)
         
         except Exception as e:
@@ -1759,47 +1882,7 @@ class DeviceRecommendationController(QObject):
     def _combine_results_with_selection(self, ml_results: Dict, empirical_results: Dict) -> Dict:
         """智能选择和合并结果"""
         try:
-            from DataManage.services.empirical_formulas_service import EmpiricalFormulasService
-            
-            empirical_service = EmpiricalFormulasService()
-            combined = {}
-            
-            # 处理每个预测指标
-            for key in ['production', 'pump_depth', 'gas_rate', 'total_head']:
-                if key in ml_results and key in empirical_results:
-                    ml_value = ml_results[key]
-                    empirical_value = empirical_results[key]
-                    
-                    # 使用智能选择
-                    selection_result = empirical_service.select_optimal_value(
-                        ml_value, empirical_value, max_error=15.0
-                    )
-                    
-                    combined[f'{key}_ml'] = ml_value
-                    combined[f'{key}_empirical'] = empirical_value
-                    combined[f'{key}_selected'] = selection_result['selected_value']
-                    combined[f'{key}_selection_method'] = selection_result['selection_method']
-                    combined[f'{key}_error_percent'] = selection_result['error_percent']
-                    combined[f'{key}_reliable'] = selection_result['is_reliable']
-                    
-                    # 最终使用的值
-                    combined[key] = selection_result['selected_value']
-                else:
-                    # 如果某个方法没有该指标，使用可用的值
-                    combined[key] = ml_results.get(key, empirical_results.get(key, 0))
-            
-            # 计算整体置信度
-            confidence_factors = []
-            for key in ['production', 'pump_depth', 'gas_rate']:
-                if combined.get(f'{key}_reliable', False):
-                    confidence_factors.append(0.9)
-                else:
-                    confidence_factors.append(0.7)
-            
-            combined['confidence'] = sum(confidence_factors) / len(confidence_factors)
-            combined['method'] = 'hybrid_intelligent_selection'
-            
-            return combined
+            return combine_predictions(ml_results, empirical_results)
             
         except Exception as e:
             logger.error(f"结果合并失败: {e}")
@@ -1984,6 +2067,7 @@ class DeviceRecommendationController(QObject):
                 logger.error(f"不支持的导出格式: {export_format}")
             
             if success:
+                self._db_service.record_report_generated()
                 self.reportExported.emit(export_path)
                 logger.info(f"报告导出成功: {export_path}")
             else:
@@ -5216,15 +5300,15 @@ class DeviceRecommendationController(QObject):
             if not base_data:
                 return None
         
-            # 应用频率换算和级数换算
+            # 应用频率换算和级数换算（相似定律，级数只放大扬程和功率）
             freq_ratio = frequency / 50.0  # 以50Hz为基准
-        
-            adjusted_flow = [q * freq_ratio * stages for q in base_data['flow']]
-            adjusted_head = [h * (freq_ratio ** 2) * stages for h in base_data['head']]
+            scaled = affinity_scale(base_data['flow'], base_data['head'],
+                                    base_data.get('power') or np.zeros(len(base_data['flow'])),
+                                    freq_ratio, stages or 1)
         
             return {
-                'flow': adjusted_flow,
-                'head': adjusted_head,
+                'flow': scaled['flow'].tolist(),
+                'head': scaled['head'].tolist(),
                 'frequency': frequency,
                 'stages': stages
             }
@@ -6279,51 +6363,20 @@ class DeviceRecommendationController(QObject):
             self._set_busy(True)
             logger.info("=== 开始加载分离器数据（仅从数据库）===")
             
-            # 🔥 只从数据库获取，不使用后备方案
-            separators = self._db_service.get_devices(
-                device_type='SEPARATOR', 
-                status='active'
+            # 🔥 只从数据库（设备目录视图缓存）获取，不使用后备方案
+            separator_list = self._db_service.catalog_views.get(
+                'step5_separators', 'separator', self._build_separator_list
             )
-            
-            logger.info(f"查询分离器数据返回: {len(separators.get('devices', []))}个设备")
-            
-            devices = separators.get('devices', [])
-            if not devices:
-                # 🔥 没有数据时发射错误信号，不提供后备数据
-                error_msg = "数据库中没有找到分离器数据，请联系管理员添加设备"
-                logger.warning(error_msg)
-                self.error.emit(error_msg)
-                return []
-            
-            # 转换为QML需要的格式
-            separator_list = []
-            for device_data in devices:
-                separator_details = device_data.get('separator_details')
-                
-                if separator_details:
-                    separator_info = {
-                        'id': device_data['id'],
-                        'manufacturer': device_data['manufacturer'],
-                        'model': device_data['model'],
-                        'series': self._extract_separator_series(device_data['model']),
-                        'separationEfficiency': separator_details.get('separation_efficiency', 0),
-                        'gasHandlingCapacity': separator_details.get('gas_handling_capacity', 0),
-                        'liquidHandlingCapacity': separator_details.get('liquid_handling_capacity', 0),
-                        'outerDiameter': separator_details.get('outer_diameter', 0),
-                        'length': separator_details.get('length', 0),
-                        'weight': separator_details.get('weight', 0),
-                        'maxPressure': separator_details.get('max_pressure', 5000),
-                        'description': device_data.get('description', ''),
-                        'isNoSeparator': False
-                    }
-                    separator_list.append(separator_info)
-                    logger.info(f"添加分离器到列表: {separator_info['manufacturer']} {separator_info['model']}")
-                else:
-                    logger.warning(f"设备 {device_data.get('id')} 没有分离器详情")
 
             if not separator_list:
-                error_msg = "数据库中的分离器数据不完整，请检查设备详情配置"
-                logger.error(error_msg)
+                _, indices = self._db_service.device_catalog.select('separator', status='active')
+                if not len(indices):
+                    # 🔥 没有数据时发射错误信号，不提供后备数据
+                    error_msg = "数据库中没有找到分离器数据，请联系管理员添加设备"
+                    logger.warning(error_msg)
+                else:
+                    error_msg = "数据库中的分离器数据不完整，请检查设备详情配置"
+                    logger.error(error_msg)
                 self.error.emit(error_msg)
                 return []
 
@@ -6342,6 +6395,31 @@ class DeviceRecommendationController(QObject):
         finally:
             self._set_busy(False)
 
+    def _build_separator_list(self, table, indices: np.ndarray) -> List[Dict[str, Any]]:
+        """分离器快照转换为QML需要的格式"""
+        separator_list = []
+        for device_data in table.records(indices):
+            separator_details = device_data.get('separator_details')
+            if not separator_details:
+                logger.warning(f"设备 {device_data.get('id')} 没有分离器详情")
+                continue
+            separator_list.append({
+                'id': device_data['id'],
+                'manufacturer': device_data['manufacturer'],
+                'model': device_data['model'],
+                'series': self._extract_separator_series(device_data['model']),
+                'separationEfficiency': separator_details.get('separation_efficiency', 0),
+                'gasHandlingCapacity': separator_details.get('gas_handling_capacity', 0),
+                'liquidHandlingCapacity': separator_details.get('liquid_handling_capacity', 0),
+                'outerDiameter': separator_details.get('outer_diameter', 0),
+                'length': separator_details.get('length', 0),
+                'weight': separator_details.get('weight', 0),
+                'maxPressure': separator_details.get('max_pressure', 5000),
+                'description': device_data.get('description', ''),
+                'isNoSeparator': False
+            })
+        return separator_list
+
     def _extract_separator_series(self, model: str) -> str:
         """从分离器型号中提取系列号"""
         try:
@@ -6686,44 +6764,14 @@ class DeviceRecommendationController(QObject):
             self._set_busy(True)
             logger.info("=== 开始加载保护器数据 ===")
         
-            # 从数据库获取保护器数据
-            protectors = self._db_service.get_devices(
-                device_type='PROTECTOR',
-                status='active'
+            # 从设备目录视图缓存获取保护器数据
+            protector_list = self._db_service.catalog_views.get(
+                'step6_protectors', 'protector', self._build_protector_list
             )
-        
-            logger.info(f"查询保护器数据返回: {len(protectors.get('devices', []))}个设备")
-        
-            devices = protectors.get('devices', [])
-            if not devices:
+            if not protector_list:
                 logger.warning("数据库中没有找到保护器数据")
                 # 返回空数组而不是模拟数据
                 return []
-        
-            # 转换为QML需要的格式
-            protector_list = []
-            for device_data in devices:
-                protector_details = device_data.get('protector_details')
-            
-                if protector_details:
-                    protector_info = {
-                        'id': device_data['id'],
-                        'manufacturer': device_data['manufacturer'],
-                        'model': device_data['model'],
-                        'type': self._extract_protector_type(device_data['model']),
-                        'thrustCapacity': protector_details.get('thrust_capacity', 0),
-                        'sealType': protector_details.get('seal_type', 'Standard'),
-                        'maxTemperature': protector_details.get('max_temperature', 300),
-                        'outerDiameter': protector_details.get('outer_diameter', 4.5),
-                        'length': protector_details.get('length', 15),
-                        'weight': protector_details.get('weight', 500),
-                        'features': device_data.get('description', ''),
-                        'series': self._extract_protector_series(device_data['model'])
-                    }
-                    protector_list.append(protector_info)
-                    logger.info(f"添加保护器到列表: {protector_info['manufacturer']} {protector_info['model']}")
-                else:
-                    logger.warning(f"设备 {device_data.get('id')} 没有保护器详情")
 
             logger.info(f"✅ 从数据库成功加载保护器数据: {len(protector_list)}个")
             return protector_list
@@ -6736,6 +6784,30 @@ class DeviceRecommendationController(QObject):
         finally:
             self._set_busy(False)
 
+    def _build_protector_list(self, table, indices: np.ndarray) -> List[Dict[str, Any]]:
+        """保护器快照转换为QML需要的格式"""
+        protector_list = []
+        for device_data in table.records(indices):
+            protector_details = device_data.get('protector_details')
+            if not protector_details:
+                logger.warning(f"设备 {device_data.get('id')} 没有保护器详情")
+                continue
+            protector_list.append({
+                'id': device_data['id'],
+                'manufacturer': device_data['manufacturer'],
+                'model': device_data['model'],
+                'type': self._extract_protector_type(device_data['model']),
+                'thrustCapacity': protector_details.get('thrust_capacity', 0),
+                'sealType': protector_details.get('seal_type', 'Standard'),
+                'maxTemperature': protector_details.get('max_temperature', 300),
+                'outerDiameter': protector_details.get('outer_diameter', 4.5),
+                'length': protector_details.get('length', 15),
+                'weight': protector_details.get('weight', 500),
+                'features': device_data.get('description', ''),
+                'series': self._extract_protector_series(device_data['model'])
+            })
+        return protector_list
+
     def _extract_protector_type(self, model: str) -> str:
         """从保护器型号中提取类型"""
         try:
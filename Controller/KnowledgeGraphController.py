@@ -2,6 +2,7 @@
 
 import logging
 import math
+import threading
 from typing import Dict, Any, List, Optional
 from PySide6.QtCore import QObject, Signal, Slot, Property
 from PySide6.QtQml import QmlElement, QJSValue
@@ -9,18 +10,39 @@ import json
 
 # 导入数据服务
 from DataManage.services.database_service import DatabaseService
+from DataManage.services.async_database_service import AsyncDatabaseService
+from DataManage.services.graph_layout_service import GraphLayoutService
+from DataManage.services.motor_index_service import DEFAULT_FREQUENCY
 
 QML_IMPORT_NAME = "KnowledgeGraph"
 QML_IMPORT_MAJOR_VERSION = 1
 
 logger = logging.getLogger(__name__)
 
+# 各步骤图谱依赖的约束条件（其他约束变化不影响该步骤的图谱）
+_STEP_CONSTRAINTS = {
+    'lift_method': ('minProduction', 'totalHead'),
+    'pump': ('minProduction', 'totalHead', 'maxOD'),
+    'separator': ('gasRate',),
+    'protector': ('totalPower',),
+    'motor': ('totalPower', 'frequency'),
+}
+
+# 各步骤图谱使用的设备目录（快照按写时复制替换，身份不变即设备未变）
+_STEP_DEVICE_TYPES = {'pump': 'pump', 'separator': 'separator', 'motor': 'motor'}
+
+# 力导向布局：节点间距（像素）与流式推送间隔（迭代次数）
+_FORCE_NODE_SPACING = 60.0
+_FORCE_STREAM_EVERY = 5
+
 @QmlElement
 class KnowledgeGraphController(QObject):
     """知识图谱控制器 - 修复QJSValue问题"""
     
     # 信号定义
-    knowledgeGraphDataReady = Signal('QVariant')  # 知识图谱数据准备完成
+    knowledgeGraphDataReady = Signal('QVariant')  # 知识图谱数据准备完成（完整图谱）
+    knowledgeGraphPatched = Signal('QVariant')    # 知识图谱增量更新（新增/删除/变化的节点和边）
+    layoutStreamed = Signal('QVariant')           # 力导向布局迭代中的节点坐标（final为True时为最终布局）
     relationshipsUpdated = Signal('QVariant')     # 关系数据更新
     recommendationsGenerated = Signal('QVariant') # 推荐生成完成
     error = Signal(str)                           # 错误信号
@@ -31,12 +53,30 @@ class KnowledgeGraphController(QObject):
         self._current_step_id = ""
         self._current_constraints = {}
         self._current_step_data = {}
+
+        # 增量生成：每个步骤最近一次构建的依赖输入与图谱，以及最近发送给QML的图谱
+        self._step_graphs: Dict[str, Dict[str, Any]] = {}
+        self._emitted_graph: Optional[Dict] = None
+        self._graph_version = 0
+
+        # 布局方式：force 为力导向布局（默认显示全部匹配设备），其他为各步骤的预设布局
+        self._layout_mode = 'force'
+        self._max_devices = 0
+        self._async_db = AsyncDatabaseService(self._db_service)
+        self._layout_engine = GraphLayoutService()
+        self._layout_cancel: Optional[threading.Event] = None
         
         logger.info("知识图谱控制器初始化完成")
     
     @Slot(str, 'QVariant', 'QVariant')
     def generateKnowledgeGraph(self, step_id: str, step_data, constraints):
-        """生成知识图谱数据 - 修复QJSValue处理"""
+        """
+        生成知识图谱数据（增量）
+
+        与该步骤上次构建时的依赖输入（相关约束、步骤数据、设备目录快照）比较：
+        未变化时直接复用，变化时重建该步骤图谱并沿用未变节点的坐标。
+        同一步骤发送增量补丁 knowledgeGraphPatched，切换步骤时发送完整图谱。
+        """
         try:
             logger.info(f"生成知识图谱: 步骤={step_id}")
             
@@ -48,26 +88,34 @@ class KnowledgeGraphController(QObject):
             
             logger.info(f"转换后的约束条件: {self._current_constraints}")
             logger.info(f"转换后的步骤数据: {self._current_step_data}")
-            
-            # 🔥 根据步骤生成不同的图谱
-            if step_id == "lift_method":
-                graph_data = self._generate_lift_method_graph()
-            elif step_id == "pump":
-                graph_data = self._generate_pump_selection_graph()
-            elif step_id == "separator":
-                graph_data = self._generate_separator_graph()
-            elif step_id == "protector":
-                graph_data = self._generate_protector_graph()
-            elif step_id == "motor":
-                graph_data = self._generate_motor_graph()
+
+            inputs = self._graph_inputs(step_id)
+            cached = self._step_graphs.get(step_id)
+            relayout = False
+            if cached is not None and cached['inputs'] == inputs:
+                graph_data = cached['graph']
+                logger.info(f"知识图谱依赖未变化，复用已有图谱: 步骤={step_id}")
             else:
-                graph_data = self._generate_default_graph()
-            
-            graph_data['stepId'] = step_id
-            graph_data['timestamp'] = self._get_timestamp()
-            
-            logger.info(f"知识图谱生成完成: {len(graph_data['nodes'])}个节点, {len(graph_data['edges'])}条边")
-            self.knowledgeGraphDataReady.emit(graph_data)
+                changed = sorted(inputs) if cached is None else \
+                    sorted(key for key in inputs if cached['inputs'].get(key) != inputs[key])
+                # 切换布局方式时已有节点也要移动，补丁只携带新增节点的坐标，因此发送完整图谱
+                relayout = cached is not None and 'layoutMode' in changed
+                graph_data = self._build_step_graph(step_id)
+                if cached is not None and not relayout:
+                    self._reuse_layout(graph_data, cached['graph'])
+
+                self._graph_version += 1
+                graph_data['stepId'] = step_id
+                graph_data['version'] = self._graph_version
+                graph_data['timestamp'] = self._get_timestamp()
+                graph_data['changedInputs'] = changed
+                self._step_graphs[step_id] = {'inputs': inputs, 'graph': graph_data}
+                logger.info(f"知识图谱生成完成: {len(graph_data['nodes'])}个节点, {len(graph_data['edges'])}条边, "
+                            f"变化的输入: {changed}")
+
+            self._emit_graph(graph_data, full=relayout)
+            if self._layout_mode == 'force' and not graph_data.get('forceLayout'):
+                self._start_force_layout(graph_data)
             
         except Exception as e:
             error_msg = f"生成知识图谱失败: {str(e)}"
@@ -76,6 +124,180 @@ class KnowledgeGraphController(QObject):
             logger.error(f"详细错误: {traceback.format_exc()}")
             self.error.emit(error_msg)
     
+    @Slot(str, int)
+    def setLayoutOptions(self, mode: str, max_devices: int):
+        """
+        设置布局方式与设备显示数量
+
+        Args:
+            mode: force 为力导向布局，其他（circle / grid / tree）使用各步骤的预设布局
+            max_devices: 每类设备最多显示的数量；0 表示力导向布局显示全部匹配设备、
+                预设布局使用各步骤的默认数量
+        """
+        mode = mode or 'force'
+        if mode != self._layout_mode or max_devices != self._max_devices:
+            logger.info(f"知识图谱布局设置: {self._layout_mode} -> {mode}, 设备数量上限 {max_devices}")
+        self._layout_mode = mode
+        self._max_devices = max_devices
+        if mode != 'force':
+            self._cancel_force_layout()
+
+    @Slot()
+    def requestFullGraph(self):
+        """重新发送当前完整图谱（QML图谱版本与补丁不一致时调用）"""
+        if self._emitted_graph is not None:
+            self.knowledgeGraphDataReady.emit(self._emitted_graph)
+
+    def _build_step_graph(self, step_id: str) -> Dict:
+        """🔥 根据步骤生成不同的图谱"""
+        if step_id == "lift_method":
+            return self._generate_lift_method_graph()
+        elif step_id == "pump":
+            return self._generate_pump_selection_graph()
+        elif step_id == "separator":
+            return self._generate_separator_graph()
+        elif step_id == "protector":
+            return self._generate_protector_graph()
+        elif step_id == "motor":
+            return self._generate_motor_graph()
+        else:
+            return self._generate_default_graph()
+
+    def _graph_inputs(self, step_id: str) -> Dict[str, Any]:
+        """步骤图谱依赖的输入：相关约束条件、已选举升方式和设备目录快照"""
+        inputs = {name: self._current_constraints.get(name) for name in _STEP_CONSTRAINTS.get(step_id, ())}
+        if step_id == 'lift_method':
+            lift_method_data = self._current_step_data.get('lift_method', {}) \
+                if isinstance(self._current_step_data, dict) else {}
+            inputs['selectedMethod'] = lift_method_data.get('selectedMethod', '') \
+                if isinstance(lift_method_data, dict) else ''
+        device_type = _STEP_DEVICE_TYPES.get(step_id)
+        if device_type:
+            inputs['catalog'] = self._db_service.device_catalog.table(device_type)
+        inputs['layoutMode'] = 'force' if self._layout_mode == 'force' else 'preset'
+        inputs['maxDevices'] = self._max_devices
+        return inputs
+
+    def _device_limit(self, default: int) -> Optional[int]:
+        """每类设备的显示数量：显式设置优先；力导向布局不设上限（None），预设布局使用默认值"""
+        if self._max_devices > 0:
+            return self._max_devices
+        return None if self._layout_mode == 'force' else default
+
+    @staticmethod
+    def _reuse_layout(graph_data: Dict, previous: Dict):
+        """沿用上次构建中已存在节点的坐标，只有新增节点使用新计算的布局"""
+        previous_layout = previous.get('layout', {})
+        layout = graph_data['layout']
+        for node in graph_data['nodes']:
+            if node['id'] in previous_layout:
+                layout[node['id']] = previous_layout[node['id']]
+
+    def _emit_graph(self, graph_data: Dict, full: bool = False):
+        """与上次发送的图谱比较：同一步骤发送增量补丁，否则（或 full 时）发送完整图谱"""
+        previous = self._emitted_graph
+        self._emitted_graph = graph_data
+        if previous is None or previous['stepId'] != graph_data['stepId']:
+            self._cancel_force_layout()
+        if full or previous is None or previous['stepId'] != graph_data['stepId']:
+            self.knowledgeGraphDataReady.emit(graph_data)
+            return
+
+        patch = self._diff_graphs(previous, graph_data)
+        logger.info(f"知识图谱增量更新: 版本 {patch['fromVersion']} -> {patch['version']}, "
+                    f"节点 +{len(patch['addedNodes'])} -{len(patch['removedNodes'])} ~{len(patch['changedNodes'])}, "
+                    f"边 +{len(patch['addedEdges'])} -{len(patch['removedEdges'])} ~{len(patch['changedEdges'])}")
+        self.knowledgeGraphPatched.emit(patch)
+
+    def _start_force_layout(self, graph_data: Dict):
+        """
+        后台计算力导向布局
+
+        已有节点从当前坐标热启动，新增节点从预设坐标或邻居中心出发；迭代过程中
+        通过 layoutStreamed 推送坐标，完成后写回图谱并推送最终布局。
+        图谱被新版本取代或切换步骤时，进行中的布局停止推送且结果被丢弃。
+        """
+        self._cancel_force_layout()
+        cancel_event = threading.Event()
+        self._layout_cancel = cancel_event
+
+        step_id, version = graph_data['stepId'], graph_data['version']
+        node_ids = [node['id'] for node in graph_data['nodes']]
+        edges = [(edge['source'], edge['target'], float(edge.get('strength') or 1.0))
+                 for edge in graph_data['edges']]
+        initial = dict(graph_data['layout'])
+
+        # 画布按节点数放大，保证节点间距；少量节点时与预设布局的 800×600 一致
+        settings = self._layout_engine.canvas_settings(len(node_ids), _FORCE_NODE_SPACING)
+        graph_data['canvas'] = {'width': settings.width, 'height': settings.height}
+
+        def frame(positions: Dict, final: bool) -> Dict:
+            return {'stepId': step_id, 'version': version, 'positions': positions,
+                    'canvas': graph_data['canvas'], 'final': final}
+
+        def stream(positions, iteration):
+            if cancel_event.is_set():
+                return False
+            self.layoutStreamed.emit(frame(positions, False))
+            return True
+
+        def run(db):
+            return self._layout_engine.layout(step_id, node_ids, edges, initial=initial, stream=stream,
+                                              stream_every=_FORCE_STREAM_EVERY, settings=settings)
+
+        def on_finished(layout):
+            if cancel_event.is_set():
+                return
+            self._layout_cancel = None
+            graph_data['layout'] = layout
+            graph_data['forceLayout'] = True
+            self.layoutStreamed.emit(frame(layout, True))
+
+        def on_failed(error):
+            self._layout_cancel = None
+            error_msg = f"力导向布局失败: {error}"
+            logger.error(error_msg)
+            self.error.emit(error_msg)
+
+        self._async_db.submit(run, channel='knowledge_graph_layout', on_success=on_finished, on_error=on_failed)
+
+    def _cancel_force_layout(self):
+        """停止进行中的力导向布局（不再推送坐标，结果被丢弃）"""
+        if self._layout_cancel is not None:
+            self._layout_cancel.set()
+            self._layout_cancel = None
+            self._async_db.cancel('knowledge_graph_layout')
+
+    @staticmethod
+    def _diff_items(old_items: List[Dict], new_items: List[Dict]):
+        """按ID比较节点或边：(新增, 删除的ID, 内容变化)"""
+        old_by_id = {item['id']: item for item in old_items}
+        new_ids = {item['id'] for item in new_items}
+        added = [item for item in new_items if item['id'] not in old_by_id]
+        changed = [item for item in new_items if item['id'] in old_by_id and old_by_id[item['id']] != item]
+        removed = [item_id for item_id in old_by_id if item_id not in new_ids]
+        return added, removed, changed
+
+    def _diff_graphs(self, old: Dict, new: Dict) -> Dict:
+        """图谱补丁；fromVersion 与QML当前图谱版本不一致时QML应请求完整图谱"""
+        added_nodes, removed_nodes, changed_nodes = self._diff_items(old['nodes'], new['nodes'])
+        added_edges, removed_edges, changed_edges = self._diff_items(old['edges'], new['edges'])
+        return {
+            'stepId': new['stepId'],
+            'fromVersion': old['version'],
+            'version': new['version'],
+            'timestamp': new['timestamp'],
+            'changedInputs': new.get('changedInputs', []) if old['version'] != new['version'] else [],
+            'addedNodes': added_nodes,
+            'removedNodes': removed_nodes,
+            'changedNodes': changed_nodes,
+            'addedEdges': added_edges,
+            'removedEdges': removed_edges,
+            'changedEdges': changed_edges,
+            # 新增节点的坐标；已有节点保持原位（含用户拖动后的位置）
+            'layout': {node['id']: new['layout'][node['id']] for node in added_nodes if node['id'] in new['layout']}
+        }
+
     @Slot(str, 'QVariant')
     def generateRecommendations(self, step_id: str, constraints):
         """生成智能推荐 - 修复QJSValue处理"""
@@ -394,7 +616,7 @@ class KnowledgeGraphController(QObject):
         pumps_data = self._get_suitable_pumps()
         pump_nodes = []
         
-        for i, pump_info in enumerate(pumps_data[:5]):  # 限制显示5个最适合的泵
+        for i, pump_info in enumerate(pumps_data[:self._device_limit(5)]):  # 预设布局默认显示5个最适合的泵
             pump = pump_info['pump']
             pump_details = pump.get('pump_details', {})
             
@@ -411,6 +633,7 @@ class KnowledgeGraphController(QObject):
                 'color': self._get_pump_color_by_score(pump_info['match_score']),
                 'deviceData': pump,
                 'matchScore': pump_info['match_score'],
+                'scoreBreakdown': pump_info['breakdown'],
                 'recommendedStages': recommended_stages,
                 'specs': {
                     'maxFlow': pump_details.get('displacement_max', 0),
@@ -553,7 +776,7 @@ class KnowledgeGraphController(QObject):
         # 如果需要分离器，显示分离器选项
         if gas_rate > 50:
             separators_data = self._get_suitable_separators()
-            for separator_info in separators_data[:3]:
+            for separator_info in separators_data[:self._device_limit(3)]:
                 separator = separator_info['separator']
                 separator_node = {
                     'id': f'separator_{separator["id"]}',
@@ -670,15 +893,14 @@ class KnowledgeGraphController(QObject):
         
         # 获取合适的电机
         motors_data = self._get_suitable_motors(recommended_power)
-        for motor_info in motors_data[:4]:
+        for motor_info in motors_data[:self._device_limit(4)]:
             motor = motor_info['motor']
-            motor_details = motor.get('motor_details', {})
-            freq_params = motor_details.get('frequency_params', [{}])
-            main_params = freq_params[0] if freq_params else {}
+            # 运行频率下插值得到的参数（而不是第一条频率参数）
+            main_params = motor.get('operating_params', {})
             
             motor_node = {
                 'id': f'motor_{motor["id"]}',
-                'label': f'{motor.get("manufacturer", "Unknown")}\n{motor.get("model", "Model")}\n{main_params.get("power", 0)} HP',
+                'label': f'{motor.get("manufacturer", "Unknown")}\n{motor.get("model", "Model")}\n{main_params.get("power") or 0:.0f} HP',
                 'type': 'motor_option',
                 'icon': '⚡',
                 'size': 30,
@@ -894,25 +1116,20 @@ class KnowledgeGraphController(QObject):
             return 0.2
     
     def _get_suitable_pumps(self) -> List[Dict]:
-        """获取合适的泵"""
+        """获取合适的泵（全目录向量化筛选，按匹配度排序；预设布局取前8个，力导向布局不设上限）"""
         try:
-            pumps = self._db_service.get_devices(device_type='PUMP', status='active')
-            suitable_pumps = []
-            
             required_flow = self._current_constraints.get('minProduction', 0)
             required_head = self._current_constraints.get('totalHead', 0)
+            max_od = self._current_constraints.get('maxOD')
             
-            for pump_data in pumps.get('devices', []):
-                match_score = self._calculate_pump_match_score(pump_data, self._current_constraints)
-                if match_score > 0.3:  # 只显示匹配度较高的
-                    suitable_pumps.append({
-                        'pump': pump_data,
-                        'match_score': match_score
-                    })
-            
-            # 按匹配度排序
-            suitable_pumps.sort(key=lambda x: x['match_score'], reverse=True)
-            return suitable_pumps[:8]  # 返回前8个
+            # 只显示匹配度较高的（>0.3），外径约束单位为英寸
+            top = self._device_limit(8)
+            return self._db_service.pump_screening.screen(
+                required_flow, required_head,
+                casing_id=max_od * 25.4 if max_od else None,
+                top=top if top is not None else len(self._db_service.device_catalog.table('pump')),
+                min_score=0.3
+            )
             
         except Exception as e:
             logger.error(f"获取合适泵失败: {e}")
@@ -921,28 +1138,20 @@ class KnowledgeGraphController(QObject):
     def _get_suitable_separators(self) -> List[Dict]:
         """获取合适的分离器"""
         try:
-            separators = self._db_service.get_devices(device_type='SEPARATOR', status='active')
-            return [{'separator': sep} for sep in separators.get('devices', [])[:5]]
+            separators = self._db_service.device_catalog.get_devices('SEPARATOR', status='active',
+                                                                     limit=self._device_limit(5))
+            return [{'separator': sep} for sep in separators]
         except Exception as e:
             logger.error(f"获取分离器失败: {e}")
             return []
     
     def _get_suitable_motors(self, required_power: float) -> List[Dict]:
-        """获取合适的电机"""
+        """获取合适的电机（运行频率下功率在需求的0.8-1.3倍内，按接近程度排序）"""
         try:
-            motors = self._db_service.get_devices(device_type='MOTOR', status='active')
-            suitable_motors = []
-            
-            for motor_data in motors.get('devices', []):
-                motor_details = motor_data.get('motor_details', {})
-                freq_params = motor_details.get('frequency_params', [{}])
-                motor_power = freq_params[0].get('power', 0) if freq_params else 0
-                
-                # 功率在合理范围内
-                if required_power * 0.8 <= motor_power <= required_power * 1.3:
-                    suitable_motors.append({'motor': motor_data})
-            
-            return suitable_motors[:6]
+            frequency = self._current_constraints.get("frequency") or DEFAULT_FREQUENCY
+            motors = self._db_service.motor_index.suitable_motors(required_power, frequency,
+                                                                 limit=self._device_limit(6))
+            return [{'motor': motor_data} for motor_data in motors]
             
         except Exception as e:
             logger.error(f"获取合适电机失败: {e}")
@@ -991,63 +1200,6 @@ class KnowledgeGraphController(QObject):
         else:
             return '#9E9E9E'  # 灰色 - 不推荐
     
-    def _calculate_pump_match_score(self, pump_data: Dict, constraints: Dict) -> float:
-        """计算泵匹配分数"""
-        try:
-            score = 0.0
-            
-            pump_details = pump_data.get('pump_details', {})
-            
-            # 流量匹配 (40%)
-            max_flow = pump_details.get('displacement_max', 0)
-            min_flow = pump_details.get('displacement_min', 0)
-            required_flow = constraints.get('minProduction', 0)
-            
-            if min_flow <= required_flow <= max_flow:
-                # 理想工况点在流量范围的60-80%
-                optimal_range_start = min_flow + (max_flow - min_flow) * 0.6
-                optimal_range_end = min_flow + (max_flow - min_flow) * 0.8
-                
-                if optimal_range_start <= required_flow <= optimal_range_end:
-                    score += 0.4
-                else:
-                    distance = min(abs(required_flow - optimal_range_start), 
-                                 abs(required_flow - optimal_range_end))
-                    score += 0.4 * max(0, 1 - distance / (max_flow - min_flow))
-            
-            # 效率匹配 (30%)
-            efficiency = pump_details.get('efficiency', 0)
-            if efficiency >= 75:
-                score += 0.3
-            elif efficiency >= 60:
-                score += 0.2
-            elif efficiency >= 45:
-                score += 0.1
-            
-            # 扬程匹配 (20%)
-            head_per_stage = pump_details.get('single_stage_head', 25)
-            required_head = constraints.get('totalHead', 0)
-            required_stages = int(required_head / head_per_stage) if head_per_stage > 0 else 0
-            max_stages = pump_details.get('max_stages', 100)
-            
-            if required_stages <= max_stages * 0.8:  # 不超过最大级数的80%
-                score += 0.2
-            elif required_stages <= max_stages:
-                score += 0.1
-            
-            # 制造商信誉 (10%)
-            manufacturer = pump_data.get('manufacturer', '').lower()
-            if manufacturer in ['schlumberger', 'baker hughes', 'halliburton']:
-                score += 0.1
-            elif manufacturer in ['weatherford', 'novomet']:
-                score += 0.05
-            
-            return min(score, 1.0)
-            
-        except Exception as e:
-            logger.error(f"计算泵匹配分数失败: {e}")
-            return 0.5
-    
     # 推荐生成方法
     def _generate_lift_method_recommendations(self, constraints: Dict) -> List[Dict]:
         """生成举升方式推荐"""
@@ -1,11 +1,12 @@
 ﻿# Controller/MLPredictionService.py
+import hashlib
 import os
 import sys
 import numpy as np
 import joblib
 import tensorflow as tf
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 import logging
 from sklearn.preprocessing import StandardScaler, PolynomialFeatures
@@ -132,6 +133,25 @@ class MLPredictionService:
         
         return None
     
+    def get_model_version(self) -> Optional[str]:
+        """
+        模型版本：由所有模型文件的文件名、大小和修改时间计算的短哈希
+
+        替换任一模型文件后版本随之变化，用于区分不同模型得到的预测结果。
+        模型文件都不存在时返回 None。
+        """
+        digest = hashlib.sha1()
+        found = False
+        for model_type in ('production', 'total_head', 'gas_rate'):
+            for file_type in ('model', 'scaler', 'Poly'):
+                path = self._get_model_path(model_type, file_type)
+                if not path or not os.path.exists(path):
+                    continue
+                stat = os.stat(path)
+                digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode('utf-8'))
+                found = True
+        return digest.hexdigest()[:16] if found else None
+
     def load_models(self):
         """加载所有ML模型"""
         try:
@@ -313,6 +333,37 @@ class MLPredictionService:
         logger.info(f"预测完成 - 产量: {production:.2f}, 扬程: {total_head:.2f}, 汽液比: {gas_rate:.4f}")
         return results
     
+    def predict_parameters(self, params: Dict[str, Any], calculation: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        由生产参数（数据库字段名）和井身计算结果执行所有预测
+
+        Returns:
+            {'production', 'total_head', 'gas_rate', 'confidence', 'method'}
+        """
+        input_data = PredictionInput(
+            geopressure=float(params.get('geo_pressure', 0)),
+            produce_index=float(params.get('produce_index', 0)),
+            bht=float(params.get('bht', 0)),
+            expected_production=float(params.get('expected_production', 0)),
+            bsw=float(params.get('bsw', 0)),
+            api=float(params.get('api', 0)),
+            gas_oil_ratio=float(params.get('gas_oil_ratio', 0)),
+            saturation_pressure=float(params.get('saturation_pressure', 0)),
+            wellhead_pressure=float(params.get('well_head_pressure', 0)),
+            perforation_depth=calculation['perforation_depth'],
+            pump_hanging_depth=calculation['pump_hanging_depth']
+        )
+        logger.info(f"ML预测输入数据: 地层压力={input_data.geopressure}, 产量={input_data.expected_production}")
+
+        results = self.predict_all(input_data)
+        return {
+            'production': results.production,
+            'total_head': results.total_head,
+            'gas_rate': results.gas_rate,
+            'confidence': results.confidence,
+            'method': 'MLPredictionService'
+        }
+
     def generate_ipr_curve(self, production: float) -> List[Dict[str, float]]:
         """生成IPR曲线数据 (使用正确的Vogel方程) - 修复版本"""
         logger.info(f"生成IPR曲线，基准产量: {production:.2f} bbl/d")
@@ -0,0 +1,164 @@
+# Controller/PerformanceMonitorController.py
+
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List
+
+from PySide6.QtCore import QObject, Signal, Slot, Property, QAbstractListModel, QModelIndex, Qt, QTimer, QUrl
+
+from DataManage.services.performance_monitor import get_performance_monitor
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceMetricsModel(QAbstractListModel):
+    """性能指标列表模型（每行一个SQL指纹或槽函数）"""
+
+    # 定义角色
+    CategoryRole = Qt.UserRole + 1
+    NameRole = Qt.UserRole + 2
+    CountRole = Qt.UserRole + 3
+    TotalRole = Qt.UserRole + 4
+    MeanRole = Qt.UserRole + 5
+    P50Role = Qt.UserRole + 6
+    P95Role = Qt.UserRole + 7
+    MaxRole = Qt.UserRole + 8
+    BucketsRole = Qt.UserRole + 9
+
+    _ROLE_KEYS = {
+        CategoryRole: 'category',
+        NameRole: 'name',
+        CountRole: 'count',
+        TotalRole: 'total_ms',
+        MeanRole: 'mean_ms',
+        P50Role: 'p50_ms',
+        P95Role: 'p95_ms',
+        MaxRole: 'max_ms',
+        BucketsRole: 'buckets',
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._metrics: List[Dict[str, Any]] = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return len(self._metrics)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._metrics):
+            return None
+        key = self._ROLE_KEYS.get(role)
+        if key is None:
+            return None
+        return self._metrics[index.row()].get(key)
+
+    def roleNames(self):
+        return {
+            self.CategoryRole: b'category',
+            self.NameRole: b'name',
+            self.CountRole: b'count',
+            self.TotalRole: b'totalMs',
+            self.MeanRole: b'meanMs',
+            self.P50Role: b'p50Ms',
+            self.P95Role: b'p95Ms',
+            self.MaxRole: b'maxMs',
+            self.BucketsRole: b'buckets',
+        }
+
+    def setMetrics(self, metrics: List[Dict[str, Any]]):
+        """设置指标列表"""
+        self.beginResetModel()
+        self._metrics = metrics
+        self.endResetModel()
+
+
+class PerformanceMonitorController(QObject):
+    """性能监控控制器 - 向QML提供SQL/槽函数耗时指标、慢查询日志和导出功能"""
+
+    # 信号定义
+    metricsUpdated = Signal()
+    slowQueriesChanged = Signal()
+    exportCompleted = Signal(str)   # 导出文件路径
+    error = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._monitor = get_performance_monitor()
+        self._model = PerformanceMetricsModel(self)
+        self._category = ''
+        self._slow_queries: List[Dict[str, Any]] = []
+
+        # 自动刷新（默认关闭，监控页面可见时开启）
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.timeout.connect(self.refresh)
+
+        logger.info("性能监控控制器初始化完成")
+
+    @Property(QObject, constant=True)
+    def metricsModel(self):
+        return self._model
+
+    @Property('QVariant', notify=slowQueriesChanged)
+    def slowQueries(self):
+        return self._slow_queries
+
+    @Property(str, notify=metricsUpdated)
+    def category(self):
+        return self._category
+
+    @category.setter
+    def category(self, value: str):
+        if self._category != value:
+            self._category = value
+            self.refresh()
+
+    @Slot()
+    def refresh(self):
+        """从监控器读取最新指标"""
+        self._model.setMetrics(self._monitor.get_metrics(self._category or None))
+        self.metricsUpdated.emit()
+
+        slow_queries = self._monitor.get_slow_queries()
+        if slow_queries != self._slow_queries:
+            self._slow_queries = slow_queries
+            self.slowQueriesChanged.emit()
+
+    @Slot(int)
+    def startAutoRefresh(self, interval_ms: int):
+        """开启定时刷新"""
+        self._refresh_timer.start(max(200, interval_ms))
+        self.refresh()
+
+    @Slot()
+    def stopAutoRefresh(self):
+        self._refresh_timer.stop()
+
+    @Slot()
+    def reset(self):
+        """清空指标"""
+        self._monitor.reset()
+        self.refresh()
+
+    @Slot(str)
+    def exportMetrics(self, path: str):
+        """导出聚合指标和慢查询日志（JSON）"""
+        self._export(path, 'metrics', self._monitor.export_json)
+
+    @Slot(str)
+    def exportTrace(self, path: str):
+        """导出Chrome trace文件"""
+        self._export(path, 'trace', self._monitor.export_chrome_trace)
+
+    def _export(self, path: str, kind: str, exporter):
+        try:
+            if path.startswith('file:'):
+                path = QUrl(path).toLocalFile()
+            if not path:
+                path = os.path.join('logs', f"performance_{kind}_{datetime.now():%Y%m%d_%H%M%S}.json")
+            exporter(path)
+            self.exportCompleted.emit(path)
+        except Exception as e:
+            error_msg = f"导出性能数据失败: {str(e)}"
+            logger.error(error_msg)
+            self.error.emit(error_msg)
@@ -6,6 +6,8 @@ import json
 import logging
 
 from DataManage.services.database_service import DatabaseService
+from DataManage.services.performance_monitor import timed_slot
+from DataManage.services.async_database_service import AsyncDatabaseService
 from DataManage.services.well_calculation_service import WellCalculationService
 from DataManage.services.well_visualization_service import WellVisualizationService
 
@@ -31,6 +33,7 @@ class WellStructureController(QObject):
     def __init__(self):
         super().__init__()
         self._db_service = DatabaseService()
+        self._async_db = AsyncDatabaseService(self._db_service)
         self._calc_service = WellCalculationService()
         self._viz_service = WellVisualizationService()
 
@@ -97,21 +100,30 @@ class WellStructureController(QObject):
     # ========== 轨迹数据管理 ==========
 
     @Slot(int)
+    @timed_slot()
     def loadTrajectoryData(self, well_id: int):
-        """加载井轨迹数据"""
+        """加载井轨迹数据（后台线程查询，快速切换井时只保留最后一次结果）"""
         self.operationStarted.emit()
-        try:
-            self._current_well_id = well_id
-            self._trajectory_data = self._db_service.get_well_trajectories(well_id)
+        self._current_well_id = well_id
+
+        def on_loaded(trajectories):
+            self._trajectory_data = trajectories
             self.trajectoryDataLoaded.emit(self._trajectory_data)
             logger.info(f"加载轨迹数据成功，共{len(self._trajectory_data)}条")
-        except Exception as e:
-            error_msg = f"加载轨迹数据失败: {str(e)}"
+            self.operationFinished.emit()
+
+        def on_failed(error):
+            error_msg = f"加载轨迹数据失败: {error}"
             logger.error(error_msg)
             self.error.emit(error_msg)
-        finally:
             self.operationFinished.emit()
 
+        self._async_db.submit(
+            'get_well_trajectories', well_id,
+            channel='well_structure.trajectory',
+            on_success=on_loaded, on_error=on_failed
+        )
+
     @Slot(int)
     def deleteTrajectoryData(self, well_id: int):
         """删除井轨迹数据"""
@@ -415,8 +427,8 @@ class WellStructureController(QObject):
                     trajectory_analysis = self._analyze_trajectory_data(self._trajectory_data)
                     result['trajectory_analysis'] = trajectory_analysis
                 else:
-                    # 如果没有轨迹数据，尝试加载
-                    self.loadTrajectoryData(well_id)
+                    # 如果没有轨迹数据，同步加载（后续分析需要立即使用）
+                    self._trajectory_data = self._db_service.get_well_trajectories(well_id)
                     if self._trajectory_data:
                         trajectory_analysis = self._analyze_trajectory_data(self._trajectory_data)
                         result['trajectory_analysis'] = trajectory_analysis
@@ -7,6 +7,8 @@ from contextlib import contextmanager
 from dataclasses import dataclass, asdict
 import threading
 
+from DataManage.services.engine_provider import get_engine, get_query_cache, get_invalidation_bus, get_write_queue
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -53,11 +55,14 @@ class ReservoirData:
     id: Optional[int] = None
 
 class DatabaseManager:
-    """数据库管理器 - 单例模式，带连接池和缓存"""
+    """数据库管理器 - 单例模式，使用共享引擎的连接池、查询缓存和失效总线"""
 
     _instance = None
     _lock = threading.Lock()
 
+    # 只读语句前缀，其余自定义SQL视为写入
+    _READ_ONLY_PREFIXES = ('SELECT', 'PRAGMA TABLE_INFO', 'PRAGMA INDEX_LIST', 'WITH', 'EXPLAIN')
+
     def __new__(cls, db_path: str = "oil_data.db"):
         if cls._instance is None:
             with cls._lock:
@@ -70,40 +75,23 @@ class DatabaseManager:
             return
 
         self.db_path = db_path
-        self.cache = {}
-        self.cache_timeout = 300  # 5分钟缓存
-        self.cache_timestamps = {}
-        self._local = threading.local()
+        # 与DatabaseService共用同一个引擎（同一文件只有一个连接池）
+        self.engine = get_engine(db_path)
+        self.cache = get_query_cache()
+        self.bus = get_invalidation_bus()
+        # 写入经单写线程队列组提交（DatabaseService的ORM写事务在同一队列中按租约排队），读取直接从连接池借连接
+        self.writer = get_write_queue(db_path)
         self.initialized = True
 
         # 初始化数据库
         self._init_database()
 
-    def _get_connection(self):
-        """获取线程本地连接"""
-        if not hasattr(self._local, 'connection'):
-            self._local.connection = sqlite3.connect(
-                self.db_path,
-                check_same_thread=False,
-                timeout=30
-            )
-            self._local.connection.row_factory = sqlite3.Row
-            # 启用外键约束
-            self._local.connection.execute("PRAGMA foreign_keys = ON")
-            # 优化设置
-            self._local.connection.execute("PRAGMA journal_mode = WAL")
-            self._local.connection.execute("PRAGMA synchronous = NORMAL")
-            self._local.connection.execute("PRAGMA cache_size = 10000")
-            # 设置编码支持中文
-            self._local.connection.execute("PRAGMA encoding = 'UTF-8'")
-
-        return self._local.connection
-
     @contextmanager
     def get_cursor(self):
-        """上下文管理器获取游标"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        """上下文管理器获取游标（从共享连接池借出连接，结束后归还）"""
+        conn = self.engine.raw_connection()
+        cursor = conn.driver_connection.cursor()
+        cursor.row_factory = sqlite3.Row
         try:
             yield cursor
             conn.commit()
@@ -113,6 +101,16 @@ class DatabaseManager:
             raise
         finally:
             cursor.close()
+            conn.close()
+
+    def _write(self, operation):
+        """
+        写操作交给写入队列，等待组提交完成后返回操作结果
+
+        Args:
+            operation: 接收游标的函数，在写线程的事务中执行
+        """
+        return self.writer.submit(operation).result()
 
     def _init_database(self):
         """初始化数据库表结构"""
@@ -175,33 +173,21 @@ class DatabaseManager:
         with self.get_cursor() as cursor:
             cursor.executescript(init_sql)
 
-    def _is_cache_valid(self, key: str) -> bool:
-        """检查缓存是否有效"""
-        if key not in self.cache_timestamps:
-            return False
-        return (datetime.now() - self.cache_timestamps[key]).seconds < self.cache_timeout
-
-    def _set_cache(self, key: str, value: Any):
-        """设置缓存"""
-        self.cache[key] = value
-        self.cache_timestamps[key] = datetime.now()
+    def _set_cache(self, key: str, value: Any, tables: Tuple[str, ...]):
+        """设置缓存，tables为结果依赖的表"""
+        self.cache.set(f"dm:{key}", value, tables)
 
     def _get_cache(self, key: str) -> Optional[Any]:
         """获取缓存"""
-        if self._is_cache_valid(key):
-            return self.cache[key]
-        else:
-            # 清理过期缓存
-            if key in self.cache:
-                del self.cache[key]
-            if key in self.cache_timestamps:
-                del self.cache_timestamps[key]
-            return None
+        return self.cache.get(f"dm:{key}")
+
+    def _invalidate(self, *tables: str):
+        """发布写入通知；不带表名表示范围未知，全部失效"""
+        self.bus.publish(tables or None)
 
     def clear_cache(self):
         """清空缓存"""
-        self.cache.clear()
-        self.cache_timestamps.clear()
+        self.cache.clear("dm:")
 
     # 项目相关操作
     def create_project(self, project: Project) -> int:
@@ -212,15 +198,13 @@ class DatabaseManager:
         columns = ', '.join(data.keys())
         placeholders = ', '.join(['?' for _ in data])
 
-        with self.get_cursor() as cursor:
-            cursor.execute(
-                f"INSERT INTO projects ({columns}) VALUES ({placeholders})",
-                list(data.values())
-            )
-            project_id = cursor.lastrowid
+        project_id = self.writer.execute(
+            f"INSERT INTO projects ({columns}) VALUES ({placeholders})",
+            list(data.values())
+        ).result().lastrowid
 
         # 清除相关缓存
-        self.cache.pop('all_projects', None)
+        self._invalidate('projects')
         logger.info(f"创建项目成功: {project.project_name}, ID: {project_id}")
         return project_id
 
@@ -240,7 +224,7 @@ class DatabaseManager:
 
         result = dict(row) if row else None
         if result:
-            self._set_cache(cache_key, result)
+            self._set_cache(cache_key, result, ('projects',))
 
         return result
 
@@ -256,7 +240,7 @@ class DatabaseManager:
             rows = cursor.fetchall()
 
         result = [dict(row) for row in rows]
-        self._set_cache(cache_key, result)
+        self._set_cache(cache_key, result, ('projects',))
         return result
 
     def update_project(self, project_id: int, updates: Dict) -> bool:
@@ -267,28 +251,26 @@ class DatabaseManager:
         updates['updated_at'] = datetime.now().isoformat()
         columns = ', '.join([f"{k} = ?" for k in updates.keys()])
 
-        with self.get_cursor() as cursor:
-            cursor.execute(
-                f"UPDATE projects SET {columns} WHERE id = ?",
-                list(updates.values()) + [project_id]
-            )
-            success = cursor.rowcount > 0
+        success = self.writer.execute(
+            f"UPDATE projects SET {columns} WHERE id = ?",
+            list(updates.values()) + [project_id]
+        ).result().rowcount > 0
 
         if success:
             # 清除相关缓存
-            self.clear_cache()
+            self._invalidate('projects')
             logger.info(f"更新项目成功: ID {project_id}")
 
         return success
 
     def delete_project(self, project_id: int) -> bool:
         """删除项目（级联删除相关数据）"""
-        with self.get_cursor() as cursor:
-            cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
-            success = cursor.rowcount > 0
+        success = self.writer.execute(
+            "DELETE FROM projects WHERE id = ?", (project_id,)
+        ).result().rowcount > 0
 
         if success:
-            self.clear_cache()
+            self._invalidate('projects', 'wells', 'reservoir_data')
             logger.info(f"删除项目成功: ID {project_id}")
 
         return success
@@ -299,36 +281,37 @@ class DatabaseManager:
         data = asdict(well_data)
         data.pop('id', None)
 
-        # 检查是否已存在
-        with self.get_cursor() as cursor:
+        def operation(cursor):
+            # 检查是否已存在（与更新/插入在同一事务内）
             cursor.execute(
                 "SELECT id FROM wells WHERE project_id = ?",
                 (well_data.project_id,)
             )
             existing = cursor.fetchone()
 
-        if existing:
-            # 更新
-            columns = ', '.join([f"{k} = ?" for k in data.keys() if k != 'project_id'])
-            values = [v for k, v in data.items() if k != 'project_id']
-
-            with self.get_cursor() as cursor:
+            if existing:
+                # 更新
+                columns = ', '.join([f"{k} = ?" for k in data.keys() if k != 'project_id'])
+                values = [v for k, v in data.items() if k != 'project_id']
                 cursor.execute(
                     f"UPDATE wells SET {columns} WHERE project_id = ?",
                     values + [well_data.project_id]
                 )
                 return existing['id']
-        else:
+
             # 插入
             columns = ', '.join(data.keys())
             placeholders = ', '.join(['?' for _ in data])
+            cursor.execute(
+                f"INSERT INTO wells ({columns}) VALUES ({placeholders})",
+                list(data.values())
+            )
+            return cursor.lastrowid
 
-            with self.get_cursor() as cursor:
-                cursor.execute(
-                    f"INSERT INTO wells ({columns}) VALUES ({placeholders})",
-                    list(data.values())
-                )
-                return cursor.lastrowid
+        record_id = self._write(operation)
+
+        self._invalidate('wells')
+        return record_id
 
     def get_well_data_by_project(self, project_id: int) -> Optional[Dict]:
         """根据项目ID获取井数据"""
@@ -346,7 +329,7 @@ class DatabaseManager:
 
         result = dict(row) if row else None
         if result:
-            self._set_cache(cache_key, result)
+            self._set_cache(cache_key, result, ('wells',))
 
         return result
 
@@ -356,36 +339,37 @@ class DatabaseManager:
         data = asdict(reservoir_data)
         data.pop('id', None)
 
-        # 检查是否已存在
-        with self.get_cursor() as cursor:
+        def operation(cursor):
+            # 检查是否已存在（与更新/插入在同一事务内）
             cursor.execute(
                 "SELECT id FROM reservoir_data WHERE project_id = ?",
                 (reservoir_data.project_id,)
             )
             existing = cursor.fetchone()
 
-        if existing:
-            # 更新
-            columns = ', '.join([f"{k} = ?" for k in data.keys() if k != 'project_id'])
-            values = [v for k, v in data.items() if k != 'project_id']
-
-            with self.get_cursor() as cursor:
+            if existing:
+                # 更新
+                columns = ', '.join([f"{k} = ?" for k in data.keys() if k != 'project_id'])
+                values = [v for k, v in data.items() if k != 'project_id']
                 cursor.execute(
                     f"UPDATE reservoir_data SET {columns} WHERE project_id = ?",
                     values + [reservoir_data.project_id]
                 )
                 return existing['id']
-        else:
+
             # 插入
             columns = ', '.join(data.keys())
             placeholders = ', '.join(['?' for _ in data])
+            cursor.execute(
+                f"INSERT INTO reservoir_data ({columns}) VALUES ({placeholders})",
+                list(data.values())
+            )
+            return cursor.lastrowid
 
-            with self.get_cursor() as cursor:
-                cursor.execute(
-                    f"INSERT INTO reservoir_data ({columns}) VALUES ({placeholders})",
-                    list(data.values())
-                )
-                return cursor.lastrowid
+        record_id = self._write(operation)
+
+        self._invalidate('reservoir_data')
+        return record_id
 
     def get_reservoir_data_by_project(self, project_id: int) -> Optional[Dict]:
         """根据项目ID获取油藏数据"""
@@ -403,7 +387,7 @@ class DatabaseManager:
 
         result = dict(row) if row else None
         if result:
-            self._set_cache(cache_key, result)
+            self._set_cache(cache_key, result, ('reservoir_data',))
 
         return result
 
@@ -418,12 +402,12 @@ class DatabaseManager:
         columns_str = ', '.join([f'"{col}"' for col in columns])  # 用双引号包围列名
         placeholders = ', '.join(['?' for _ in columns])
 
-        with self.get_cursor() as cursor:
-            cursor.executemany(
-                f'INSERT INTO "{table_name}" ({columns_str}) VALUES ({placeholders})',
-                [list(item.values()) for item in data_list]
-            )
+        self.writer.executemany(
+            f'INSERT INTO "{table_name}" ({columns_str}) VALUES ({placeholders})',
+            [list(item.values()) for item in data_list]
+        ).result()
 
+        self._invalidate(table_name)
         logger.info(f"批量插入 {len(data_list)} 条记录到 {table_name}")
         return True
 
@@ -450,22 +434,30 @@ class DatabaseManager:
 
         result = dict(row) if row else None
         if result:
-            self._set_cache(cache_key, result)
+            self._set_cache(cache_key, result, ('projects', 'wells', 'reservoir_data'))
 
         return result
 
     def execute_custom_query(self, query: str, params: Tuple = ()) -> List[Dict]:
         """执行自定义查询"""
-        with self.get_cursor() as cursor:
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
+        if query.lstrip().upper().startswith(self._READ_ONLY_PREFIXES):
+            with self.get_cursor() as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+        else:
+            def operation(cursor):
+                cursor.execute(query, params)
+                return cursor.fetchall()
+            rows = self._write(operation)
+
+            # 写入类语句无法可靠判断影响的表，全部失效
+            self._invalidate()
 
         return [dict(row) for row in rows]
 
     def close(self):
-        """关闭数据库连接"""
-        if hasattr(self._local, 'connection'):
-            self._local.connection.close()
+        """关闭数据库连接（连接由共享连接池统一管理，每次操作后已归还，无需单独关闭）"""
+        self.clear_cache()
 
 
 # 使用示例
@@ -32,17 +32,39 @@ class DatabaseConfig:
     max_connections: int = 10
     min_connections: int = 2
 
+    # 异步查询线程数（后台数据库工作线程池）
+    async_workers: int = 4
+
     # 批处理设置
     batch_size: int = 1000
 
+    # 写入队列设置（单写线程组提交；ORM会话的写事务按租约在同一队列中排队）
+    write_batch_size: int = 200         # 一次组提交最多包含的写操作数
+    write_group_delay_ms: float = 2.0   # 等待后续写操作加入同一批的时间 (毫秒)
+
     # 日志级别
     log_level: str = "INFO"
 
+    # 性能监控设置
+    instrumentation_enabled: bool = True
+    slow_query_ms: float = 100.0       # 慢查询阈值 (毫秒)
+    trace_buffer_size: int = 20000     # 保留的最近trace事件数
+
     # 备份设置
     backup_enabled: bool = True
     backup_interval: int = 3600  # 1小时
     backup_path: str = "backups/"
     max_backup_files: int = 10
+    backup_compress: bool = True      # 备份快照gzip压缩
+    backup_pages: int = 256           # 在线备份每步复制的页数
+    backup_step_sleep: float = 0.005  # 每步复制后暂停的时间 (秒)，期间其他连接可读写
+
+    # 维护设置（软删除归档 + 增量VACUUM）
+    maintenance_enabled: bool = True
+    maintenance_interval: int = 21600        # 6小时
+    soft_delete_retention_days: int = 30     # 软删除行保留天数，超过后移入归档表
+    vacuum_step_pages: int = 64              # 每步 incremental_vacuum 释放的页数
+    maintenance_idle_seconds: float = 5.0    # 无其他SQL活动多久视为空闲 (秒)
 
     def __post_init__(self):
         """配置初始化后的处理"""
@@ -128,5 +150,9 @@ def get_config_from_env() -> DatabaseConfig:
         backup_enabled=os.getenv("BACKUP_ENABLED", "true").lower() == "true",
         backup_interval=int(os.getenv("BACKUP_INTERVAL", DEFAULT_CONFIG.backup_interval)),
         backup_path=os.getenv("BACKUP_PATH", DEFAULT_CONFIG.backup_path),
-        max_backup_files=int(os.getenv("MAX_BACKUP_FILES", DEFAULT_CONFIG.max_backup_files))
+        max_backup_files=int(os.getenv("MAX_BACKUP_FILES", DEFAULT_CONFIG.max_backup_files)),
+        backup_compress=os.getenv("BACKUP_COMPRESS", "true").lower() == "true",
+        maintenance_enabled=os.getenv("MAINTENANCE_ENABLED", "true").lower() == "true",
+        soft_delete_retention_days=int(os.getenv("SOFT_DELETE_RETENTION_DAYS",
+                                                 DEFAULT_CONFIG.soft_delete_retention_days))
     )
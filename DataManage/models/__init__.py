@@ -7,12 +7,16 @@ from .device import (
     Device, DeviceType, DevicePump, DeviceMotor,
     DeviceProtector, DeviceSeparator, MotorFrequencyParam
 )
-from .production_parameters import ProductionParameters, ProductionPrediction
+from .production_parameters import ProductionParameters, ProductionPrediction, PredictionRun
+from .device_selection import BatchSelectionRun, BatchSelectionResult
+from .migration_log import MigrationLog
+from .packed_json import PackedJSON, payload_column, payload_hash
 
 # 🔥 阶段1: 基础泵性能模型
 from .pump_performance import (
     PumpCurveData, PumpEnhancedParameters, 
-    PumpOperatingPoint, PumpSystemCurve
+    PumpOperatingPoint, PumpSystemCurve,
+    PumpCurveBlob, PumpEnhancedParameterBlob
 )
 
 # 🔥 阶段2: 性能预测和磨损分析模型
@@ -31,11 +35,15 @@ __all__ = [
     'Casing', 'WellCalculationResult', 
     'Device', 'DeviceType', 'DevicePump', 'DeviceMotor',
     'DeviceProtector', 'DeviceSeparator', 'MotorFrequencyParam',
-    'ProductionParameters', 'ProductionPrediction',
+    'ProductionParameters', 'ProductionPrediction', 'PredictionRun',
+    'BatchSelectionRun', 'BatchSelectionResult',
+    'MigrationLog',
+    'PackedJSON', 'payload_column', 'payload_hash',
     
     # 阶段1: 泵性能模型
     'PumpCurveData', 'PumpEnhancedParameters',
     'PumpOperatingPoint', 'PumpSystemCurve',
+    'PumpCurveBlob', 'PumpEnhancedParameterBlob',
     
     # 阶段2: 预测和分析模型
     'DevicePerformancePrediction', 'PumpWearData', 'MaintenanceRecord',
@@ -1,6 +1,6 @@
 ﻿# DataManage/models/casing.py
 
-from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from typing import Dict, Any
@@ -45,6 +45,11 @@ class Casing(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     is_deleted = Column(Boolean, default=False)
 
+    # 创建索引
+    __table_args__ = (
+        Index('idx_casings_well_depth', 'well_id', 'is_deleted', 'top_depth'),
+    )
+
     # 关系
     well = relationship("WellModel", back_populates="casings")
 
@@ -99,6 +104,11 @@ class WellCalculationResult(Base):
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
+    # 创建索引
+    __table_args__ = (
+        Index('idx_calc_results_well_date', 'well_id', 'calculation_date'),
+    )
+
     # 关系
     well = relationship("WellModel", back_populates="calculation_results")
 
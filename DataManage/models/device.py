@@ -1,6 +1,6 @@
 # DataManage/models/device.py
 
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Text, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -45,6 +45,14 @@ class Device(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     is_deleted = Column(Boolean, default=False)
 
+    # 创建索引
+    __table_args__ = (
+        Index('idx_devices_type_status', 'device_type', 'status', 'is_deleted', 'created_at'),
+        Index('idx_devices_listing', 'is_deleted', 'created_at'),
+        Index('idx_devices_lift_method', 'lift_method', 'device_type', 'status', 'is_deleted'),
+        Index('idx_devices_model', 'model'),
+    )
+
     # 多态关系
     pump = relationship("DevicePump", back_populates="device", uselist=False, cascade="all, delete-orphan")
     motor = relationship("DeviceMotor", back_populates="device", uselist=False, cascade="all, delete-orphan")
@@ -117,6 +125,11 @@ class DevicePump(Base):
     max_stages = Column(Integer)  # 最大级数
     efficiency = Column(Float)  # 效率 (%)
 
+    # 创建索引
+    __table_args__ = (
+        Index('idx_device_pumps_device', 'device_id'),
+    )
+
     device = relationship("Device", back_populates="pump")
 
     def to_dict(self):
@@ -148,6 +161,11 @@ class DeviceMotor(Base):
     insulation_class = Column(String(10))  # 绝缘等级
     protection_class = Column(String(10))  # 防护等级
 
+    # 创建索引
+    __table_args__ = (
+        Index('idx_device_motors_device', 'device_id'),
+    )
+
     device = relationship("Device", back_populates="motor")
     frequency_params = relationship("MotorFrequencyParam", back_populates="motor", cascade="all, delete-orphan")
 
@@ -181,6 +199,11 @@ class MotorFrequencyParam(Base):
     current = Column(Float)  # 电流 (A)
     speed = Column(Integer)  # 转速 (rpm)
 
+    # 创建索引
+    __table_args__ = (
+        Index('idx_motor_freq_motor', 'motor_id', 'frequency'),
+    )
+
     motor = relationship("DeviceMotor", back_populates="frequency_params")
 
     def to_dict(self):
@@ -207,6 +230,11 @@ class DeviceProtector(Base):
     seal_type = Column(String(50))  # 密封类型
     max_temperature = Column(Float)  # 最高温度 (℃)
 
+    # 创建索引
+    __table_args__ = (
+        Index('idx_device_protectors_device', 'device_id'),
+    )
+
     device = relationship("Device", back_populates="protector")
 
     def to_dict(self):
@@ -234,6 +262,11 @@ class DeviceSeparator(Base):
     gas_handling_capacity = Column(Float)  # 气体处理能力 (m³/d)
     liquid_handling_capacity = Column(Float)  # 液体处理能力 (m³/d)
 
+    # 创建索引
+    __table_args__ = (
+        Index('idx_device_separators_device', 'device_id'),
+    )
+
     device = relationship("Device", back_populates="separator")
 
     def to_dict(self):
@@ -0,0 +1,145 @@
+# DataManage/models/device_selection.py
+
+from datetime import datetime
+from typing import Dict, Any
+
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Text, String, Index
+from sqlalchemy.orm import relationship
+
+from .base import Base
+from .packed_json import payload_column
+
+
+class BatchSelectionRun(Base):
+    """项目批量选型运行 - 对项目内所有有生产参数的井执行预测、IPR和管柱组合选型"""
+    __tablename__ = 'batch_selection_runs'
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, nullable=False)
+
+    status = Column(String(20), default='running', comment='running / completed / cancelled / failed')
+    total_wells = Column(Integer, default=0, comment='待处理井数')
+    completed_wells = Column(Integer, default=0, comment='已完成井数（含失败）')
+    failed_wells = Column(Integer, default=0, comment='失败井数')
+    settings = Column(Text, comment='JSON格式的运行设置')
+    error = Column(Text, comment='运行级错误信息')
+
+    started_at = Column(DateTime, default=datetime.now)
+    finished_at = Column(DateTime)
+    elapsed_seconds = Column(Float)
+
+    # 创建索引
+    __table_args__ = (
+        Index('idx_batch_selection_runs_project', 'project_id', 'started_at'),
+    )
+
+    # 关系定义
+    results = relationship("BatchSelectionResult", back_populates="run", cascade="all, delete-orphan")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'status': self.status,
+            'total_wells': self.total_wells,
+            'completed_wells': self.completed_wells,
+            'failed_wells': self.failed_wells,
+            'settings': self.settings,
+            'error': self.error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'elapsed_seconds': self.elapsed_seconds
+        }
+
+
+class BatchSelectionResult(Base):
+    """批量选型单井结果（汇总表一行，完整方案在 details 中延迟加载）"""
+    __tablename__ = 'batch_selection_results'
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey('batch_selection_runs.id', ondelete='CASCADE'), nullable=False)
+    well_id = Column(Integer, nullable=False)
+    well_name = Column(String(100))
+    parameters_id = Column(Integer)
+    prediction_id = Column(Integer, comment='保存的 ProductionPrediction')
+
+    status = Column(String(20), comment='ok / no_solution / failed')
+    error = Column(Text)
+
+    # 预测
+    production = Column(Float, comment='选定产量 (bbl/d)')
+    total_head = Column(Float, comment='选定扬程 (ft)')
+    gas_rate = Column(Float, comment='吸入口气液比 (%)')
+    prediction_method = Column(String(50))
+
+    # 推荐管柱（全寿命成本最低的 Pareto 方案）
+    pump_id = Column(Integer)
+    pump_model = Column(String(100))
+    stages = Column(Integer)
+    frequency = Column(Float, comment='运行频率 (Hz)')
+    motor_id = Column(Integer)
+    motor_model = Column(String(100))
+    protector_id = Column(Integer)
+    protector_model = Column(String(100))
+    separator_id = Column(Integer)
+    separator_model = Column(String(100))
+
+    # 成本
+    capex = Column(Float, comment='设备投资')
+    energy_kw = Column(Float, comment='输入电功率 (kW)')
+    annual_energy_mwh = Column(Float, comment='年耗电 (MWh)')
+    lifecycle_cost = Column(Float, comment='评价期全寿命成本（投资 + 电费）')
+    pareto_size = Column(Integer)
+
+    details = payload_column(comment='推荐方案、Pareto前沿和IPR曲线')
+    created_at = Column(DateTime, default=datetime.now)
+
+    # 创建索引
+    __table_args__ = (
+        Index('idx_batch_selection_results_run', 'run_id', 'well_id'),
+    )
+
+    # 关系定义
+    run = relationship("BatchSelectionRun", back_populates="results")
+
+    def to_dict(self, include_payload: bool = False) -> Dict[str, Any]:
+        """
+        转换为字典
+
+        Args:
+            include_payload: 是否包含 details（汇总表传False，不触发延迟加载）
+        """
+        result = {
+            'id': self.id,
+            'run_id': self.run_id,
+            'well_id': self.well_id,
+            'well_name': self.well_name,
+            'parameters_id': self.parameters_id,
+            'prediction_id': self.prediction_id,
+            'status': self.status,
+            'error': self.error,
+            'production': self.production,
+            'total_head': self.total_head,
+            'gas_rate': self.gas_rate,
+            'prediction_method': self.prediction_method,
+            'pump_id': self.pump_id,
+            'pump_model': self.pump_model,
+            'stages': self.stages,
+            'frequency': self.frequency,
+            'motor_id': self.motor_id,
+            'motor_model': self.motor_model,
+            'protector_id': self.protector_id,
+            'protector_model': self.protector_model,
+            'separator_id': self.separator_id,
+            'separator_model': self.separator_model,
+            'capex': self.capex,
+            'energy_kw': self.energy_kw,
+            'annual_energy_mwh': self.annual_energy_mwh,
+            'lifecycle_cost': self.lifecycle_cost,
+            'pareto_size': self.pareto_size,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+        if include_payload:
+            result['details'] = self.details
+        return result
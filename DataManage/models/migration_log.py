@@ -0,0 +1,29 @@
+# DataManage/models/migration_log.py
+
+from datetime import datetime
+from typing import Dict, Any
+
+from sqlalchemy import Column, Integer, DateTime, Text
+
+from .base import Base
+
+
+class MigrationLog(Base):
+    """数据迁移记录 - 一次性迁移完成后写入标记，启动时据此判断是否需要再次迁移"""
+    __tablename__ = 'migration_log'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    migration_name = Column(Text, nullable=False)
+    migration_date = Column(DateTime, default=datetime.now)
+    status = Column(Text, nullable=False, comment='completed / partial / failed')
+    description = Column(Text)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'migration_name': self.migration_name,
+            'migration_date': self.migration_date.isoformat() if self.migration_date else None,
+            'status': self.status,
+            'description': self.description
+        }
@@ -0,0 +1,173 @@
+# DataManage/models/packed_json.py
+
+import hashlib
+import json
+import struct
+import zlib
+from typing import Any, List, Optional
+
+import numpy as np
+from sqlalchemy import Column, LargeBinary
+from sqlalchemy.orm import deferred
+from sqlalchemy.types import TypeDecorator
+
+# 编码格式：魔数(1字节) + 类型标记(1字节) + zlib压缩的正文
+#   A  数值数组       dtype(3字节) + 原始数组字节
+#   R  同构记录列表   头部JSON长度(4字节) + 头部JSON{keys, dtypes, n} + 逐列数组字节
+#   J  其他结构       紧凑JSON（UTF-8）
+_MAGIC = b'\xa7'
+_TAG_ARRAY = b'A'
+_TAG_RECORDS = b'R'
+_TAG_JSON = b'J'
+
+# 不足该长度的正文不压缩（zlib头部开销大于收益）
+_COMPRESS_MIN_SIZE = 64
+
+# 延迟加载分组名：列表/历史查询不加载该组中的列
+PAYLOAD_GROUP = 'payload'
+
+
+def _numeric_dtype(values: List[Any]) -> Optional[str]:
+    """同类数值列表的存储类型：全为整数 '<i8'，全为浮点 '<f8'，否则None"""
+    if not values:
+        return None
+    if all(type(v) is float for v in values):
+        return '<f8'
+    if all(type(v) is int for v in values):
+        return '<i8'
+    return None
+
+
+def _encode_records(records: List[dict]) -> Optional[bytes]:
+    """字典列表按列打包；要求键顺序一致且每列为同类数值"""
+    keys = list(records[0].keys())
+    if not keys or any(list(record.keys()) != keys for record in records):
+        return None
+
+    dtypes = []
+    columns = []
+    for key in keys:
+        column = [record[key] for record in records]
+        dtype = _numeric_dtype(column)
+        if dtype is None:
+            return None
+        dtypes.append(dtype)
+        columns.append(np.asarray(column, dtype=dtype).tobytes())
+
+    header = json.dumps({'keys': keys, 'dtypes': dtypes, 'n': len(records)},
+                        ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return struct.pack('<I', len(header)) + header + b''.join(columns)
+
+
+def _decode_records(body: bytes) -> List[dict]:
+    header_size = struct.unpack_from('<I', body)[0]
+    header = json.loads(body[4:4 + header_size].decode('utf-8'))
+    count = header['n']
+
+    offset = 4 + header_size
+    columns = []
+    for dtype in header['dtypes']:
+        column = np.frombuffer(body, dtype=dtype, count=count, offset=offset)
+        offset += column.nbytes
+        columns.append(column.tolist())
+
+    keys = header['keys']
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+def encode_payload(value: Any) -> Optional[bytes]:
+    """将JSON兼容的值编码为紧凑二进制"""
+    if value is None:
+        return None
+
+    tag, body = _TAG_JSON, None
+    if isinstance(value, list) and value:
+        if all(isinstance(item, dict) for item in value):
+            body = _encode_records(value)
+            tag = _TAG_RECORDS
+        else:
+            dtype = _numeric_dtype(value)
+            if dtype is not None:
+                body = dtype[1:].encode('ascii').ljust(3) + np.asarray(value, dtype=dtype).tobytes()
+                tag = _TAG_ARRAY
+
+    if body is None:
+        tag = _TAG_JSON
+        body = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    if len(body) >= _COMPRESS_MIN_SIZE:
+        return _MAGIC + tag.lower() + zlib.compress(body, 6)
+    return _MAGIC + tag + body
+
+
+def decode_payload(data: Any) -> Any:
+    """解码 encode_payload 的结果；兼容旧版本存储的JSON文本，无法解析时返回None"""
+    if data is None:
+        return None
+
+    if isinstance(data, str):
+        # 旧数据：JSON文本列
+        try:
+            return json.loads(data) if data else None
+        except ValueError:
+            return None
+
+    data = bytes(data)
+    if not data.startswith(_MAGIC) or len(data) < 2:
+        try:
+            return json.loads(data.decode('utf-8'))
+        except ValueError:
+            return None
+
+    tag = data[1:2]
+    body = data[2:]
+    if tag.islower():
+        body = zlib.decompress(body)
+        tag = tag.upper()
+
+    if tag == _TAG_ARRAY:
+        dtype = '<' + body[:3].decode('ascii').strip()
+        return np.frombuffer(body, dtype=dtype, offset=3).tolist()
+    if tag == _TAG_RECORDS:
+        return _decode_records(body)
+    return json.loads(body.decode('utf-8'))
+
+
+def payload_hash(*values: Any) -> str:
+    """
+    内容哈希（SHA-256十六进制）：按键排序的紧凑JSON计算，字典键顺序不影响结果
+
+    用于预测结果/IPR曲线等载荷的内容寻址去重。
+    """
+    canonical = json.dumps(values, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class PackedJSON(TypeDecorator):
+    """
+    紧凑二进制JSON列类型
+
+    数值数组和同构数值记录列表（如IPR曲线点）按列打包为原始数组，其他结构存为紧凑JSON，
+    较大的正文再经zlib压缩。读取时兼容旧的JSON文本数据；写入字符串时视为已序列化的JSON。
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            # 兼容仍传入 json.dumps 结果的调用方
+            value = decode_payload(value)
+        return encode_payload(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_payload(value)
+
+
+def payload_column(*args, **kwargs):
+    """
+    大载荷列：PackedJSON类型，并延迟加载（首次访问属性时才读取和解码）
+
+    列表/历史查询不会加载这些列；详情查询使用 undefer_group(PAYLOAD_GROUP) 一次性加载。
+    """
+    return deferred(Column(PackedJSON, *args, **kwargs), group=PAYLOAD_GROUP)
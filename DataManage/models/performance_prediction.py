@@ -7,6 +7,7 @@ from typing import Dict, List, Any
 import json
 
 from .base import Base
+from .packed_json import payload_column
 
 
 class DevicePerformancePrediction(Base):
@@ -24,12 +25,12 @@ class DevicePerformancePrediction(Base):
     base_flow = Column(Float)       # 基础流量
     base_head = Column(Float)       # 基础扬程
     
-    # 预测结果（JSON存储）
-    annual_predictions = Column(Text)      # JSON: 年度性能预测数据
-    wear_progression = Column(Text)        # JSON: 磨损进程数据
-    maintenance_schedule = Column(Text)    # JSON: 维护计划
-    lifecycle_cost = Column(Text)          # JSON: 生命周期成本
-    performance_degradation = Column(Text) # JSON: 性能衰减分析
+    # 预测结果（紧凑二进制存储，延迟加载）
+    annual_predictions = payload_column()      # 年度性能预测数据
+    wear_progression = payload_column()        # 磨损进程数据
+    maintenance_schedule = payload_column()    # 维护计划
+    lifecycle_cost = payload_column()          # 生命周期成本
+    performance_degradation = payload_column() # 性能衰减分析
     
     # 预测配置
     wear_model = Column(String(50), default='exponential')  # 磨损模型类型
@@ -56,18 +57,14 @@ class DevicePerformancePrediction(Base):
         Index('idx_prediction_created', 'created_at'),
     )
 
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        # 解析JSON字段
-        def safe_json_loads(json_str):
-            if json_str:
-                try:
-                    return json.loads(json_str)
-                except:
-                    return None
-            return None
+    def to_dict(self, include_payload: bool = True) -> Dict[str, Any]:
+        """
+        转换为字典
 
-        return {
+        Args:
+            include_payload: 是否包含预测结果数据（列表视图传False，不触发延迟加载）
+        """
+        result = {
             'id': self.id,
             'device_id': self.device_id,
             'pump_id': self.pump_id,
@@ -76,11 +73,6 @@ class DevicePerformancePrediction(Base):
             'base_power': self.base_power,
             'base_flow': self.base_flow,
             'base_head': self.base_head,
-            'annual_predictions': safe_json_loads(self.annual_predictions),
-            'wear_progression': safe_json_loads(self.wear_progression),
-            'maintenance_schedule': safe_json_loads(self.maintenance_schedule),
-            'lifecycle_cost': safe_json_loads(self.lifecycle_cost),
-            'performance_degradation': safe_json_loads(self.performance_degradation),
             'wear_model': self.wear_model,
             'efficiency_degradation_rate': self.efficiency_degradation_rate,
             'maintenance_cost_base': self.maintenance_cost_base,
@@ -93,71 +85,55 @@ class DevicePerformancePrediction(Base):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        if include_payload:
+            result.update({
+                'annual_predictions': self.annual_predictions,
+                'wear_progression': self.wear_progression,
+                'maintenance_schedule': self.maintenance_schedule,
+                'lifecycle_cost': self.lifecycle_cost,
+                'performance_degradation': self.performance_degradation,
+            })
+        return result
 
     def set_annual_predictions(self, predictions: List[Dict]):
         """设置年度预测数据"""
-        self.annual_predictions = json.dumps(predictions)
+        self.annual_predictions = predictions
 
     def get_annual_predictions(self) -> List[Dict]:
         """获取年度预测数据"""
-        if self.annual_predictions:
-            try:
-                return json.loads(self.annual_predictions)
-            except:
-                return []
-        return []
+        return self.annual_predictions or []
 
     def set_wear_progression(self, progression: List[Dict]):
         """设置磨损进程数据"""
-        self.wear_progression = json.dumps(progression)
+        self.wear_progression = progression
 
     def get_wear_progression(self) -> List[Dict]:
         """获取磨损进程数据"""
-        if self.wear_progression:
-            try:
-                return json.loads(self.wear_progression)
-            except:
-                return []
-        return []
+        return self.wear_progression or []
 
     def set_maintenance_schedule(self, schedule: List[Dict]):
         """设置维护计划"""
-        self.maintenance_schedule = json.dumps(schedule)
+        self.maintenance_schedule = schedule
 
     def get_maintenance_schedule(self) -> List[Dict]:
         """获取维护计划"""
-        if self.maintenance_schedule:
-            try:
-                return json.loads(self.maintenance_schedule)
-            except:
-                return []
-        return []
+        return self.maintenance_schedule or []
 
     def set_lifecycle_cost(self, cost_data: Dict):
         """设置生命周期成本"""
-        self.lifecycle_cost = json.dumps(cost_data)
+        self.lifecycle_cost = cost_data
 
     def get_lifecycle_cost(self) -> Dict:
         """获取生命周期成本"""
-        if self.lifecycle_cost:
-            try:
-                return json.loads(self.lifecycle_cost)
-            except:
-                return {}
-        return {}
+        return self.lifecycle_cost or {}
 
     def set_performance_degradation(self, degradation: Dict):
         """设置性能衰减分析"""
-        self.performance_degradation = json.dumps(degradation)
+        self.performance_degradation = degradation
 
     def get_performance_degradation(self) -> Dict:
         """获取性能衰减分析"""
-        if self.performance_degradation:
-            try:
-                return json.loads(self.performance_degradation)
-            except:
-                return {}
-        return {}
+        return self.performance_degradation or {}
 
 
 class PumpWearData(Base):
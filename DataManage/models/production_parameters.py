@@ -3,10 +3,11 @@
 from datetime import datetime
 from typing import Dict, Any, Optional
 
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Text, String, Boolean
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Text, String, Boolean, Index
 from sqlalchemy.orm import relationship
 
 from .base import Base
+from .packed_json import payload_column
 
 
 class ProductionParameters(Base):
@@ -34,6 +35,11 @@ class ProductionParameters(Base):
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     created_by = Column(String(50), comment='创建人')
+
+    # 创建索引
+    __table_args__ = (
+        Index('idx_production_params_well_active', 'well_id', 'is_active', 'created_at'),
+    )
     
     # 关系定义
     well = relationship("WellModel", back_populates="production_parameters")
@@ -132,17 +138,34 @@ class ProductionPrediction(Base):
     prediction_method = Column(String(50), comment='预测方法 (ML/NN/Empirical)')
     confidence_score = Column(Float, comment='预测置信度 (0-1)')
     
-    # IPR曲线数据（JSON格式存储）
-    ipr_curve_data = Column(Text, comment='IPR曲线数据点')
+    # IPR曲线数据（紧凑二进制存储，延迟加载）
+    ipr_curve_data = payload_column(comment='IPR曲线数据点')
+    
+    # 内容寻址去重：相同参数、输入、模型版本和结果只保存一行，每次运行追加 PredictionRun
+    input_hash = Column(String(64), comment='预测输入哈希')
+    model_version = Column(String(64), comment='模型版本')
+    content_hash = Column(String(64), comment='预测结果内容哈希（含IPR曲线）')
     
     created_at = Column(DateTime, default=datetime.now)
+
+    # 创建索引
+    __table_args__ = (
+        Index('idx_production_predictions_params', 'parameters_id', 'created_at'),
+        Index('idx_production_predictions_dedup', 'parameters_id', 'input_hash', 'model_version', 'content_hash'),
+    )
     
     # 关系定义
     parameters = relationship("ProductionParameters", back_populates="predictions")
+    runs = relationship("PredictionRun", back_populates="prediction", cascade="all, delete-orphan")
     
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return {
+    def to_dict(self, include_payload: bool = True) -> Dict[str, Any]:
+        """
+        转换为字典
+
+        Args:
+            include_payload: 是否包含IPR曲线数据（列表视图传False，不触发延迟加载）
+        """
+        result = {
             'id': self.id,
             'parameters_id': self.parameters_id,
             'predicted_production': self.predicted_production,
@@ -152,6 +175,37 @@ class ProductionPrediction(Base):
             'empirical_gas_rate': self.empirical_gas_rate,
             'prediction_method': self.prediction_method,
             'confidence_score': self.confidence_score,
-            'ipr_curve_data': self.ipr_curve_data,
+            'model_version': self.model_version,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+        if include_payload:
+            result['ipr_curve_data'] = self.ipr_curve_data
+        return result
+
+
+class PredictionRun(Base):
+    """预测运行记录 - 每次运行预测追加一行，结果去重后指向同一条 ProductionPrediction"""
+    __tablename__ = 'prediction_runs'
+
+    id = Column(Integer, primary_key=True)
+    prediction_id = Column(Integer, ForeignKey('production_predictions.id', ondelete='CASCADE'), nullable=False)
+    parameters_id = Column(Integer, ForeignKey('production_parameters.id', ondelete='CASCADE'), nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+    # 创建索引
+    __table_args__ = (
+        Index('idx_prediction_runs_params', 'parameters_id', 'created_at'),
+        Index('idx_prediction_runs_prediction', 'prediction_id'),
+    )
+
+    # 关系定义
+    prediction = relationship("ProductionPrediction", back_populates="runs")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'prediction_id': self.prediction_id,
+            'parameters_id': self.parameters_id,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
\ No newline at end of file
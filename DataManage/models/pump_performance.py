@@ -1,11 +1,14 @@
 ﻿# DataManage/models/pump_performance.py
 
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Text, Index
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Optional
+
+import numpy as np
 
 from .base import Base
+from .packed_json import payload_column
 
 
 class PumpCurveData(Base):
@@ -115,6 +118,122 @@ class PumpEnhancedParameters(Base):
         }
 
 
+def pack_series(values: Iterable[Optional[float]], dtype: str) -> bytes:
+    """将数值序列打包为小端浮点二进制（None 存为 NaN）"""
+    return np.asarray(
+        [np.nan if v is None else v for v in values], dtype=np.float64
+    ).astype(dtype, copy=False).tobytes()
+
+
+def unpack_series(blob: Optional[bytes], dtype: str) -> np.ndarray:
+    """零拷贝解码二进制序列（返回只读数组）"""
+    if not blob:
+        return np.empty(0, dtype=dtype)
+    return np.frombuffer(blob, dtype=dtype)
+
+
+class PumpCurveBlob(Base):
+    """泵性能曲线打包存储表 - 每个曲线版本一行，各序列以小端浮点二进制存储"""
+    __tablename__ = 'pump_curve_blobs'
+
+    SERIES = ('flow', 'head', 'power', 'efficiency')
+
+    id = Column(Integer, primary_key=True)
+    pump_id = Column(String(50), nullable=False)  # 泵型号ID，关联到设备表的model字段
+    point_count = Column(Integer, nullable=False)  # 曲线点数
+    dtype = Column(String(8), nullable=False, default='<f8')  # 序列编码: <f4 / <f8
+    flow = Column(LargeBinary, nullable=False)        # 流量 (m³/d)
+    head = Column(LargeBinary, nullable=False)        # 扬程 (m)
+    power = Column(LargeBinary, nullable=False)       # 功率 (kW)
+    efficiency = Column(LargeBinary, nullable=False)  # 效率 (%)
+    standard_frequency = Column(Float, default=60.0)  # 标准频率 (Hz)
+
+    # 数据来源和版本控制
+    data_source = Column(String(100))            # 数据来源（厂商、测试等）
+    version = Column(String(20), default='1.0')  # 数据版本
+    is_active = Column(Boolean, default=True)    # 是否为活跃版本
+
+    # 时间戳
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        Index('idx_curve_blob_pump_active', 'pump_id', 'is_active'),
+    )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """解码为NumPy数组（只读视图）"""
+        return {name: unpack_series(getattr(self, name), self.dtype) for name in self.SERIES}
+
+    def to_curve_dict(self) -> Dict[str, Any]:
+        """转换为 get_pump_curves 的返回格式"""
+        result = {name: values.tolist() for name, values in self.to_arrays().items()}
+        result['standard_frequency'] = self.standard_frequency
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'pump_id': self.pump_id,
+            'point_count': self.point_count,
+            **self.to_curve_dict(),
+            'data_source': self.data_source,
+            'version': self.version,
+            'is_active': self.is_active,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class PumpEnhancedParameterBlob(Base):
+    """泵增强参数打包存储表 - 每台泵一行，按流量点排序的各参数序列打包为一个矩阵"""
+    __tablename__ = 'pump_enhanced_blobs'
+
+    # 矩阵行顺序：流量点 + 11个派生参数
+    SERIES = (
+        'flow_point', 'npsh_required', 'temperature_rise', 'vibration_level',
+        'noise_level', 'wear_rate', 'radial_load', 'axial_thrust',
+        'material_stress', 'energy_efficiency_ratio', 'cavitation_margin',
+        'stability_score'
+    )
+
+    id = Column(Integer, primary_key=True)
+    pump_id = Column(String(50), nullable=False, unique=True)  # 泵型号ID
+    point_count = Column(Integer, nullable=False)
+    dtype = Column(String(8), nullable=False, default='<f8')  # 序列编码: <f4 / <f8
+    data = Column(LargeBinary, nullable=False)   # len(SERIES) × point_count 矩阵，缺失值为NaN
+
+    # 数据质量和来源
+    data_quality = Column(String(20), default='estimated')  # measured, calculated, estimated
+    measurement_date = Column(DateTime)
+    notes = Column(Text)
+
+    # 时间戳
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    @classmethod
+    def pack_rows(cls, rows: List[Dict[str, Any]], dtype: str = '<f8') -> bytes:
+        """将逐点参数字典打包为矩阵二进制（按流量点排序）"""
+        ordered = sorted(rows, key=lambda r: r.get('flow_point') or 0.0)
+        return b''.join(pack_series((r.get(name) for r in ordered), dtype) for name in cls.SERIES)
+
+    def to_matrix(self) -> np.ndarray:
+        """解码为 len(SERIES) × point_count 的只读矩阵"""
+        return unpack_series(self.data, self.dtype).reshape(len(self.SERIES), self.point_count)
+
+    def to_series_dict(self) -> Dict[str, List[float]]:
+        """转换为 get_pump_enhanced_parameters 的返回格式：只包含有数据的参数，跳过缺失值"""
+        result = {}
+        matrix = self.to_matrix()
+        for name, values in zip(self.SERIES[1:], matrix[1:]):
+            present = values[~np.isnan(values)]
+            if present.size:
+                result[name] = present.astype(np.float64).tolist()
+        return result
+
+
 class PumpOperatingPoint(Base):
     """泵运行工况点表"""
     __tablename__ = 'pump_operating_points'
@@ -180,8 +299,8 @@ class PumpSystemCurve(Base):
     static_head = Column(Float, nullable=False)       # 静扬程 (m)
     friction_coefficient = Column(Float, nullable=False)  # 摩阻系数
     
-    # 系统曲线点数据（可以存储为JSON或单独表）
-    curve_points = Column(Text)                       # JSON格式存储曲线点
+    # 系统曲线点数据（紧凑二进制存储，延迟加载）
+    curve_points = payload_column()                   # 曲线点列表
     
     # 计算参数
     pipe_diameter = Column(Float)                     # 管径 (mm)
@@ -197,16 +316,20 @@ class PumpSystemCurve(Base):
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return {
+    def to_dict(self, include_payload: bool = True) -> Dict[str, Any]:
+        """
+        转换为字典
+
+        Args:
+            include_payload: 是否包含曲线点（列表视图传False，不触发延迟加载）
+        """
+        result = {
             'id': self.id,
             'curve_name': self.curve_name,
             'project_id': self.project_id,
             'well_id': self.well_id,
             'static_head': self.static_head,
             'friction_coefficient': self.friction_coefficient,
-            'curve_points': self.curve_points,
             'pipe_diameter': self.pipe_diameter,
             'pipe_length': self.pipe_length,
             'pipe_roughness': self.pipe_roughness,
@@ -215,4 +338,7 @@ class PumpSystemCurve(Base):
             'description': self.description,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+        }
+        if include_payload:
+            result['curve_points'] = self.curve_points
+        return result
\ No newline at end of file
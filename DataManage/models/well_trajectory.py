@@ -1,6 +1,6 @@
 # DataManage/models/well_trajectory.py
 
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Boolean, String
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Boolean, String, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from typing import Dict, Any
@@ -29,6 +29,11 @@ class WellTrajectory(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     is_deleted = Column(Boolean, default=False)
 
+    # 创建索引
+    __table_args__ = (
+        Index('idx_trajectory_well_seq', 'well_id', 'is_deleted', 'sequence_number'),
+    )
+
     # 关系
     well = relationship("WellModel", back_populates="trajectories")
 
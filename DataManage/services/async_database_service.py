@@ -0,0 +1,175 @@
+# DataManage/services/async_database_service.py
+
+import itertools
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from PySide6.QtCore import QObject, Signal, Slot, Qt
+
+from .database_service import DatabaseService
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabaseService(QObject):
+    """
+    异步数据库服务 - 在后台线程池中执行DatabaseService查询
+
+    每个工作线程通过DatabaseService的scoped_session获得各自独立的会话，
+    任务结束后调用Session.remove()释放，避免会话跨任务泄漏。
+    结果经由Qt信号回到GUI线程，同一通道(channel)内被新请求取代的旧结果会被丢弃。
+    """
+
+    _instance = None
+
+    # 定义信号
+    requestStarted = Signal(int, str)             # 请求ID, 通道
+    requestFinished = Signal(int, str, 'QVariant')  # 请求ID, 通道, 结果
+    requestFailed = Signal(int, str, str)         # 请求ID, 通道, 错误消息
+    requestDropped = Signal(int, str)             # 请求ID, 通道 - 结果已过期被丢弃
+
+    # 内部信号：工作线程 -> GUI线程（请求ID, 通道, 结果, 异常对象；成功时为None）
+    _taskCompleted = Signal(int, str, object, object)
+
+    def __new__(cls, db_service: Optional[DatabaseService] = None, max_workers: Optional[int] = None):
+        if cls._instance is None:
+            cls._instance = super(AsyncDatabaseService, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, db_service: Optional[DatabaseService] = None, max_workers: Optional[int] = None):
+        if self._initialized:
+            return
+
+        super().__init__()
+
+        self._db = db_service or DatabaseService()
+        workers = max_workers or self._db.config.async_workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db-worker')
+
+        self._request_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._latest: Dict[str, int] = {}         # 通道 -> 最新请求ID
+        self._callbacks: Dict[int, Tuple[Optional[Callable], Optional[Callable]]] = {}
+
+        # 队列连接保证完成处理总在本对象所在的GUI线程执行
+        self._taskCompleted.connect(self._on_task_completed, Qt.QueuedConnection)
+
+        self._initialized = True
+        logger.info(f"异步数据库服务初始化完成: {workers}个工作线程")
+
+    # ========== 提交请求 ==========
+
+    def submit(self, method: Union[str, Callable], *args,
+               channel: Optional[str] = None,
+               on_success: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[str], None]] = None,
+               dedicated: bool = False,
+               **kwargs) -> Tuple[int, Future]:
+        """
+        提交一个后台数据库请求
+
+        Args:
+            method: DatabaseService方法名，或接收DatabaseService作为首个参数的可调用对象
+            *args, **kwargs: 传给方法的参数
+            channel: 请求通道；同一通道中只有最新请求的结果会被投递
+            on_success: 成功回调（在GUI线程执行，过期结果不会回调）
+            on_error: 失败回调（在GUI线程执行）
+            dedicated: 在独立线程而不是共享工作线程池中执行，用于长时间运行、
+                自身只负责调度的任务（如分阶段流水线），避免占用查询线程
+
+        Returns:
+            (请求ID, Future)；已执行的请求，Future得到其结果（不受过期丢弃影响）；
+            排队期间被新请求取代而未执行的请求，Future结果为None
+        """
+        func = getattr(self._db, method) if isinstance(method, str) else method
+        bound_db = None if isinstance(method, str) else self._db
+        channel = channel or (method if isinstance(method, str) else getattr(method, '__name__', 'default'))
+
+        with self._lock:
+            request_id = next(self._request_ids)
+            self._latest[channel] = request_id
+            if on_success or on_error:
+                self._callbacks[request_id] = (on_success, on_error)
+
+        self.requestStarted.emit(request_id, channel)
+        task = (request_id, channel, func, bound_db, args, kwargs)
+        if dedicated:
+            future = Future()
+            threading.Thread(target=self._run_dedicated, args=(future, task),
+                             name=f'db-task-{channel}', daemon=True).start()
+        else:
+            future = self._executor.submit(self._run, *task)
+        return request_id, future
+
+    def cancel(self, channel: str):
+        """使通道内所有进行中的请求过期（已在执行的查询会完成，但结果被丢弃）"""
+        with self._lock:
+            self._latest[channel] = next(self._request_ids)
+
+    def is_current(self, request_id: int, channel: str) -> bool:
+        """请求是否仍是通道内的最新请求"""
+        with self._lock:
+            return self._latest.get(channel) == request_id
+
+    def shutdown(self, wait: bool = True):
+        """关闭线程池"""
+        self._executor.shutdown(wait=wait)
+        logger.info("异步数据库服务已关闭")
+
+    # ========== 执行与投递 ==========
+
+    def _run(self, request_id: int, channel: str, func: Callable, bound_db, args, kwargs):
+        """在工作线程中执行请求"""
+        if not self.is_current(request_id, channel):
+            # 排队期间已被新请求取代，无需执行
+            self._taskCompleted.emit(request_id, channel, None, None)
+            return None
+
+        try:
+            result = func(bound_db, *args, **kwargs) if bound_db is not None else func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"异步数据库请求失败 [{channel}#{request_id}]: {e}")
+            self._taskCompleted.emit(request_id, channel, None, e)
+            raise
+        finally:
+            # 释放本线程的scoped_session
+            self._db.Session.remove()
+
+        self._taskCompleted.emit(request_id, channel, result, None)
+        return result
+
+    def _run_dedicated(self, future: Future, task: tuple):
+        """在独立线程中执行请求并设置Future"""
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(self._run(*task))
+        except BaseException as e:
+            future.set_exception(e)
+
+    @Slot(int, str, object, object)
+    def _on_task_completed(self, request_id: int, channel: str, result: Any, error: Optional[BaseException]):
+        """GUI线程中分发结果，丢弃过期请求"""
+        with self._lock:
+            callbacks = self._callbacks.pop(request_id, (None, None))
+        on_success, on_error = callbacks
+
+        if not self.is_current(request_id, channel):
+            logger.debug(f"丢弃过期结果 [{channel}#{request_id}]")
+            self.requestDropped.emit(request_id, channel)
+            return
+
+        if error is not None:
+            # 异常消息可能为空（如 raise ValueError()），用异常类型名代替
+            message = str(error) or type(error).__name__
+            self.requestFailed.emit(request_id, channel, message)
+            if on_error:
+                on_error(message)
+            return
+
+        self.requestFinished.emit(request_id, channel, result)
+        if on_success:
+            on_success(result)
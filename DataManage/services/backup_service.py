@@ -0,0 +1,227 @@
+# DataManage/services/backup_service.py
+
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from PySide6.QtCore import QObject, Signal
+
+from ..config.database_config import DatabaseConfig
+
+logger = logging.getLogger(__name__)
+
+
+class BackupService(QObject):
+    """
+    在线备份服务 - 后台线程按配置间隔使用SQLite backup API备份数据库
+
+    备份按页分步复制，每步之间暂停 backup_step_sleep 秒，不会长时间占用数据库；
+    快照在工作线程中做完整性检查，可选gzip压缩，并按max_backup_files轮换。
+    """
+
+    # 定义信号（在工作线程中发射，接收方按队列连接处理）
+    backupStarted = Signal()
+    backupCompleted = Signal(str, float)     # 备份文件路径, 耗时(秒)
+    backupFailed = Signal(str)               # 错误消息
+
+    def __init__(self, engine, config: DatabaseConfig, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.config = config
+
+        self._stop_event = threading.Event()
+        self._backup_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self._status: Dict[str, Any] = {
+            'running': False,
+            'last_backup_at': None,
+            'last_backup_path': None,
+            'last_duration': None,
+            'last_size': None,
+            'last_result': None,
+            'last_error': None,
+            'backup_count': 0,
+            'pages_remaining': 0,
+            'pages_total': 0,
+        }
+
+    # ========== 调度 ==========
+
+    def start(self):
+        """启动定时备份线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='db-backup', daemon=True)
+        self._thread.start()
+        logger.info(f"数据库定时备份已启动: 间隔 {self.config.backup_interval} 秒, 目录 {self.config.backup_path}")
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止定时备份（正在进行的备份会完成当前步骤后结束）"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop_event.wait(self.config.backup_interval):
+            self.backup_now()
+
+    # ========== 备份 ==========
+
+    def backup_now(self) -> Optional[str]:
+        """
+        立即执行一次备份（阻塞当前线程，GUI中请通过定时线程或后台线程调用）
+
+        Returns:
+            备份文件路径，失败返回None
+        """
+        if not self._backup_lock.acquire(blocking=False):
+            logger.info("已有备份正在进行，跳过本次备份")
+            return None
+
+        start = time.perf_counter()
+        self._status['running'] = True
+        self.backupStarted.emit()
+
+        # 精确到微秒，同一秒内的多次备份不会互相覆盖
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        os.makedirs(self.config.backup_path, exist_ok=True)
+        snapshot_path = os.path.join(self.config.backup_path, f"{self._backup_prefix()}{timestamp}.db")
+        temp_path = snapshot_path + '.tmp'
+
+        try:
+            self._copy_database(temp_path)
+            self._verify_snapshot(temp_path)
+
+            if self.config.backup_compress:
+                final_path = snapshot_path + '.gz'
+                self._compress(temp_path, final_path + '.tmp')
+                os.remove(temp_path)
+                os.replace(final_path + '.tmp', final_path)
+            else:
+                final_path = snapshot_path
+                os.replace(temp_path, final_path)
+
+            self._rotate()
+
+            duration = time.perf_counter() - start
+            self._status.update({
+                'last_backup_at': datetime.now().isoformat(),
+                'last_backup_path': final_path,
+                'last_duration': duration,
+                'last_size': os.path.getsize(final_path),
+                'last_result': 'success',
+                'last_error': None,
+                'backup_count': self._status['backup_count'] + 1,
+            })
+            logger.info(f"数据库备份完成: {final_path}, 耗时 {duration:.2f} 秒")
+            self.backupCompleted.emit(final_path, duration)
+            return final_path
+
+        except Exception as e:
+            for path in (temp_path, snapshot_path + '.gz.tmp'):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._status.update({
+                'last_duration': time.perf_counter() - start,
+                'last_result': 'failed',
+                'last_error': str(e),
+            })
+            logger.error(f"数据库备份失败: {e}")
+            self.backupFailed.emit(str(e))
+            return None
+
+        finally:
+            self._status['running'] = False
+            self._backup_lock.release()
+
+    def _copy_database(self, target_path: str):
+        """使用backup API分步复制数据库（源连接从共享连接池借出）"""
+        pages = max(1, self.config.backup_pages)
+        step_sleep = self.config.backup_step_sleep
+
+        def progress(status, remaining, total):
+            # 回调在sqlite3内部调用，只记录进度，不在此发射Qt信号
+            self._status['pages_remaining'] = remaining
+            self._status['pages_total'] = total
+            # backup() 的 sleep 参数只在 BUSY/LOCKED 时生效，步与步之间在此显式暂停；
+            # 回调返回前源库上没有持有锁，其他连接的读写可以执行
+            if remaining and step_sleep > 0:
+                self._stop_event.wait(step_sleep)
+            if self._stop_event.is_set():
+                # 应用退出时中止备份
+                raise InterruptedError("备份已取消")
+
+        source = self.engine.raw_connection()
+        target = sqlite3.connect(target_path)
+        try:
+            source.driver_connection.backup(target, pages=pages, progress=progress, sleep=step_sleep)
+        finally:
+            target.close()
+            source.close()
+
+    @staticmethod
+    def _verify_snapshot(path: str):
+        """对快照做完整性检查"""
+        conn = sqlite3.connect(path)
+        try:
+            # 快照改为非WAL模式，单文件即可恢复
+            conn.execute("PRAGMA journal_mode = DELETE")
+            result = conn.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            conn.close()
+
+        if len(result) != 1 or result[0][0] != 'ok':
+            problems = '; '.join(row[0] for row in result[:5])
+            raise RuntimeError(f"备份完整性检查失败: {problems}")
+
+    @staticmethod
+    def _compress(source_path: str, target_path: str):
+        with open(source_path, 'rb') as src, gzip.open(target_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+    # ========== 轮换 ==========
+
+    def _backup_prefix(self) -> str:
+        db_name = os.path.splitext(os.path.basename(self.config.db_path))[0]
+        return f"{db_name}_"
+
+    def list_backups(self) -> List[str]:
+        """列出已有备份（按时间从新到旧）"""
+        if not os.path.isdir(self.config.backup_path):
+            return []
+        prefix = self._backup_prefix()
+        files = [
+            os.path.join(self.config.backup_path, name)
+            for name in os.listdir(self.config.backup_path)
+            if name.startswith(prefix) and (name.endswith('.db') or name.endswith('.db.gz'))
+        ]
+        # 文件名中的时间戳可直接按字典序排序
+        return sorted(files, reverse=True)
+
+    def _rotate(self):
+        """只保留最近的 max_backup_files 个备份"""
+        keep = max(1, self.config.max_backup_files)
+        for path in self.list_backups()[keep:]:
+            try:
+                os.remove(path)
+                logger.info(f"删除过期备份: {path}")
+            except OSError as e:
+                logger.warning(f"删除过期备份失败: {path}, {e}")
+
+    # ========== 状态 ==========
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取最近一次备份的状态"""
+        status = dict(self._status)
+        status['enabled'] = self._thread is not None and self._thread.is_alive()
+        status['interval'] = self.config.backup_interval
+        return status
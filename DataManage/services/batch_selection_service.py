@@ -0,0 +1,480 @@
+# DataManage/services/batch_selection_service.py
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, insert, select
+
+from DataManage.models.casing import Casing, WellCalculationResult
+from DataManage.models.device_selection import BatchSelectionResult, BatchSelectionRun
+from DataManage.models.production_parameters import ProductionParameters
+from .device_catalog_service import DeviceCatalogService
+from .empirical_formulas_service import (
+    combine_predictions, composite_ipr_curve, empirical_prediction, linear_ipr_curve
+)
+from .esp_configurator_service import ConfiguratorSettings, EspConfiguratorService
+from .motor_index_service import MotorIndexService
+from .performance_monitor import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+
+BBL_TO_M3 = 0.158987     # 1 bbl = 0.158987 m³
+FT_TO_M = 0.3048
+
+
+@dataclass
+class BatchSettings:
+    """批量选型设置"""
+    lift_method: Optional[str] = 'esp'
+    casing_id: Optional[float] = None   # 套管通径 (mm)；None 时取井内最小套管内径，无套管数据不检查外径
+    clearance: float = 6.0              # 管柱与套管的最小间隙 (mm)
+    max_results: int = 5                # 每口井保存的方案数（按全寿命成本升序）
+    energy_cost_per_mwh: float = 600.0  # 电价（与投资同一相对成本单位）
+    evaluation_years: float = 3.0       # 全寿命成本评价期 (年)
+    use_ml: bool = True
+    chunk_size: int = 4                 # 每个进程任务包含的井数
+    write_batch: int = 20               # 每累计多少口井写一次结果
+
+
+def _fahrenheit_to_celsius(value: Optional[float]) -> float:
+    return (float(value) - 32.0) / 1.8 if value is not None else 0.0
+
+
+def predict_well(params: Dict[str, Any], calculation: Optional[Dict[str, Any]],
+                 ml_service=None) -> Dict[str, Any]:
+    """
+    单井预测：模型预测（可用时）+ 经验公式，按误差选择；生成IPR曲线
+
+    与选型第2步 runPrediction 的计算一致。
+    """
+    ml_results = None
+    if ml_service is not None and calculation:
+        try:
+            ml_results = ml_service.predict_parameters(params, calculation)
+        except Exception as e:
+            logger.error(f"ML预测失败，使用经验公式: {e}")
+
+    empirical = empirical_prediction(params, calculation)
+    combined = combine_predictions(ml_results, empirical)
+    try:
+        ipr = composite_ipr_curve(params)
+    except Exception as e:
+        logger.error(f"IPR曲线生成失败，使用线性IPR: {e}")
+        ipr = linear_ipr_curve(params)
+    return {'ml': ml_results, 'empirical': empirical, 'combined': combined, 'ipr': ipr}
+
+
+def evaluate_well(job: Dict[str, Any], configurator: EspConfiguratorService, ml_service,
+                  settings: BatchSettings) -> Dict[str, Any]:
+    """
+    单井批量选型：预测 -> 管柱组合选型 -> 取全寿命成本最低的 Pareto 方案
+
+    单井失败不影响其他井，错误记录在结果的 status / error 中。
+    """
+    start = time.perf_counter()
+    result = {
+        'well_id': job['well_id'], 'well_name': job.get('well_name'),
+        'parameters_id': job['parameters']['id'], 'status': 'ok', 'error': None,
+        'prediction_inputs': {
+            'perforation_depth': (job.get('calculation') or {}).get('perforation_depth'),
+            'pump_hanging_depth': (job.get('calculation') or {}).get('pump_hanging_depth'),
+        },
+    }
+    try:
+        params = job['parameters']
+        prediction = predict_well(params, job.get('calculation'), ml_service)
+        combined = prediction['combined']
+        result['prediction'] = prediction
+        result.update(production=combined.get('production'), total_head=combined.get('total_head'),
+                      gas_rate=combined.get('gas_rate'), prediction_method=combined.get('method'))
+
+        # 预测单位为 bbl/d、ft、%；组合选型使用 m³/d、m、℃
+        flow = float(combined.get('production') or 0.0) * BBL_TO_M3
+        head = float(combined.get('total_head') or 0.0) * FT_TO_M
+        gas_rate = flow * float(combined.get('gas_rate') or 0.0) / 100.0
+        casing_id = settings.casing_id if settings.casing_id is not None else job.get('casing_id')
+        if flow <= 0 or head <= 0:
+            raise ValueError(f"预测产量或扬程无效: 产量 {combined.get('production')}, 扬程 {combined.get('total_head')}")
+
+        price = settings.energy_cost_per_mwh * settings.evaluation_years
+        configured = configurator.configure(
+            flow, head, _fahrenheit_to_celsius(params.get('bht')),
+            casing_id=casing_id, clearance=settings.clearance if casing_id is not None else 0.0,
+            gas_rate=gas_rate, lift_method=settings.lift_method, max_results=settings.max_results,
+            energy_weight=configurator.settings.operating_hours / 1000.0 * price
+        )
+        solutions = configured['pareto']
+        for solution in solutions:
+            solution['lifecycle_cost'] = solution['capex'] + solution['annual_energy_mwh'] * price
+        result['pareto_size'] = configured['stats']['pareto_size']
+        result['solutions'] = solutions
+        if not solutions:
+            result['status'] = 'no_solution'
+            result['error'] = '没有满足排量、扬程、外径和温度约束的管柱组合'
+    except Exception as e:
+        logger.error(f"井 {job.get('well_name') or job['well_id']} 批量选型失败: {e}")
+        result['status'] = 'failed'
+        result['error'] = str(e)
+
+    result['elapsed_ms'] = round((time.perf_counter() - start) * 1000.0, 1)
+    return result
+
+
+# 汇总表中来自推荐方案的列
+_SOLUTION_COLUMNS = ('pump_id', 'pump_model', 'stages', 'frequency', 'motor_id', 'motor_model',
+                     'protector_id', 'protector_model', 'separator_id', 'separator_model',
+                     'capex', 'energy_kw', 'annual_energy_mwh', 'lifecycle_cost')
+
+
+# ========== 进程池子进程 ==========
+
+# 子进程内的只读状态：目录快照在初始化时传入一次，之后每个任务只传井数据
+_worker_state: Dict[str, Any] = {}
+
+
+def _create_ml_service(ml_factory: Optional[Callable[[], Any]]):
+    if ml_factory is None:
+        return None
+    try:
+        return ml_factory()
+    except Exception as e:
+        logger.warning(f"ML预测服务不可用，批量选型仅使用经验公式: {e}")
+        return None
+
+
+def _init_worker(tables, configurator_settings: ConfiguratorSettings,
+                 ml_factory: Optional[Callable[[], Any]]):
+    catalog = DeviceCatalogService.frozen(tables)
+    _worker_state['configurator'] = EspConfiguratorService(
+        catalog, configurator_settings, workers=1, motor_index=MotorIndexService(catalog)
+    )
+    _worker_state['ml'] = _create_ml_service(ml_factory)
+
+
+def _run_jobs(jobs: List[Dict[str, Any]], settings: BatchSettings) -> List[Dict[str, Any]]:
+    return [evaluate_well(job, _worker_state['configurator'], _worker_state['ml'], settings) for job in jobs]
+
+
+class BatchSelectionService:
+    """
+    项目批量选型 - 对项目内所有有活跃生产参数的井执行预测、IPR和管柱组合选型
+
+    井数据一次批量读取；设备目录快照和模型在每个子进程初始化时构造一次（只读共享），
+    任务按井分块提交到进程池，结果完成即批量写入 batch_selection_results，
+    并保存各井的预测结果（与第2步相同的内容寻址去重）。支持进度回调与取消。
+    """
+
+    def __init__(self, db_service, workers: Optional[int] = None, parallel_threshold: int = 8):
+        """
+        Args:
+            db_service: DatabaseService
+            workers: 进程数，默认 CPU 数；1 表示在当前进程执行
+            parallel_threshold: 井数超过此值才使用进程池
+        """
+        self.db = db_service
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.parallel_threshold = parallel_threshold
+
+    # ========== 数据加载 ==========
+
+    def load_jobs(self, project_id: int, well_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """
+        批量读取项目内各井的活跃生产参数、最新井身计算结果和最小套管内径
+
+        Returns:
+            [{'well_id', 'well_name', 'parameters', 'calculation', 'casing_id'}]，按井ID排序
+        """
+        from .database_service import WellModel
+
+        session = self.db.get_session()
+        try:
+            wells = session.execute(
+                select(WellModel.id, WellModel.well_name)
+                .where(WellModel.project_id == project_id, WellModel.is_deleted == False)
+                .order_by(WellModel.id)
+            ).all()
+            if well_ids is not None:
+                wanted = set(well_ids)
+                wells = [well for well in wells if well.id in wanted]
+            ids = [well.id for well in wells]
+            if not ids:
+                return []
+
+            # 每口井最新的活跃参数
+            parameters = {}
+            for params in session.query(ProductionParameters).filter(
+                    ProductionParameters.well_id.in_(ids), ProductionParameters.is_active == True
+            ).order_by(ProductionParameters.well_id, ProductionParameters.created_at.desc()):
+                parameters.setdefault(params.well_id, params.to_dict())
+
+            latest = (select(WellCalculationResult.well_id,
+                             func.max(WellCalculationResult.calculation_date).label('calculation_date'))
+                      .where(WellCalculationResult.well_id.in_(ids))
+                      .group_by(WellCalculationResult.well_id).subquery())
+            calculations = {}
+            for result in session.query(WellCalculationResult).join(
+                    latest, (WellCalculationResult.well_id == latest.c.well_id)
+                    & (WellCalculationResult.calculation_date == latest.c.calculation_date)
+            ).order_by(WellCalculationResult.id.desc()):
+                calculations.setdefault(result.well_id, result.to_dict())
+
+            casings = dict(session.execute(
+                select(Casing.well_id, func.min(Casing.inner_diameter))
+                .where(Casing.well_id.in_(ids), Casing.is_deleted == False, Casing.inner_diameter > 0)
+                .group_by(Casing.well_id)
+            ).all())
+
+            return [{
+                'well_id': well.id, 'well_name': well.well_name,
+                'parameters': parameters[well.id],
+                'calculation': calculations.get(well.id),
+                'casing_id': casings.get(well.id),
+            } for well in wells if well.id in parameters]
+        finally:
+            self.db.close_session(session)
+
+    # ========== 运行 ==========
+
+    def run(self, project_id: int, settings: Optional[BatchSettings] = None,
+            well_ids: Optional[List[int]] = None,
+            progress: Optional[Callable[[int, int], None]] = None,
+            cancel_event: Optional[threading.Event] = None,
+            ml_factory: Optional[Callable[[], Any]] = None,
+            model_version: Optional[str] = None,
+            ml_service: Any = None) -> Dict[str, Any]:
+        """
+        执行批量选型
+
+        Args:
+            project_id: 项目ID
+            settings: 批量选型设置
+            well_ids: 只处理这些井（如 loadWellsWithParameters 中勾选的井），None 表示全部
+            progress: 进度回调 progress(已完成井数, 总井数)
+            cancel_event: 置位后停止提交与写入，运行状态记为 cancelled
+            ml_factory: 构造ML预测服务的可调用对象（可序列化，子进程各构造一次），None 表示只用经验公式
+            model_version: 保存预测结果时记录的模型版本
+            ml_service: 本进程已加载的ML预测服务，井数少在当前进程执行时直接复用，避免重复加载模型
+
+        Returns:
+            汇总 {'run_id', 'status', 'total', 'completed', 'failed', 'elapsed_s', 'rows'}
+        """
+        settings = settings or BatchSettings()
+        start = time.perf_counter()
+        jobs = self.load_jobs(project_id, well_ids)
+        run_id = self._create_run(project_id, len(jobs), settings)
+        logger.info(f"开始项目批量选型: 项目ID {project_id}, {len(jobs)}口井, 运行ID {run_id}")
+
+        state = {'completed': 0, 'failed': 0, 'pending': []}
+        use_ml = ml_factory if settings.use_ml else None
+
+        def consume(results: List[Dict[str, Any]]):
+            for result in results:
+                state['completed'] += 1
+                if result['status'] != 'ok':
+                    state['failed'] += 1
+                state['pending'].append(self._result_row(run_id, result, model_version))
+            if len(state['pending']) >= settings.write_batch:
+                self._write_results(run_id, state)
+            if progress is not None:
+                progress(state['completed'], len(jobs))
+
+        status, error = 'completed', None
+        try:
+            if self.workers <= 1 or len(jobs) <= self.parallel_threshold:
+                local_ml = None
+                if settings.use_ml:
+                    local_ml = ml_service if ml_service is not None else _create_ml_service(ml_factory)
+                self._run_local(jobs, settings, local_ml, consume, cancel_event)
+            else:
+                self._run_pool(jobs, settings, use_ml, consume, cancel_event)
+            if cancel_event is not None and cancel_event.is_set():
+                status = 'cancelled'
+        except Exception as e:
+            logger.error(f"项目批量选型失败: {e}")
+            status, error = 'failed', str(e)
+
+        try:
+            self._write_results(run_id, state)
+        except Exception as e:
+            status, error = 'failed', f"写入批量选型结果失败: {e}"
+        finally:
+            # 结果写入失败时同样结束运行记录，避免停留在 running 状态
+            elapsed = time.perf_counter() - start
+            self._finish_run(run_id, status, state, error, elapsed)
+
+        performance_monitor.record('batch_selection', 'run', start, elapsed,
+                                   {'wells': len(jobs), 'completed': state['completed'], 'status': status})
+        logger.info(f"项目批量选型{status}: 运行ID {run_id}, 完成 {state['completed']}/{len(jobs)}, "
+                    f"失败 {state['failed']}, 耗时 {elapsed:.1f}s")
+        return {
+            'run_id': run_id, 'status': status, 'error': error, 'total': len(jobs),
+            'completed': state['completed'], 'failed': state['failed'],
+            'elapsed_s': round(elapsed, 2), 'rows': self.get_run_results(run_id),
+        }
+
+    def _run_local(self, jobs, settings, ml_service, consume, cancel_event):
+        """井数少时在当前进程执行（复用本进程的目录快照、电机索引和ML预测服务）"""
+        configurator = self.db.esp_configurator
+        for job in jobs:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            consume([evaluate_well(job, configurator, ml_service, settings)])
+
+    def _run_pool(self, jobs, settings, ml_factory, consume, cancel_event):
+        """分块提交到进程池，按完成顺序消费结果"""
+        chunk_size = max(1, settings.chunk_size)
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        executor = ProcessPoolExecutor(
+            max_workers=min(self.workers, len(chunks)), initializer=_init_worker,
+            initargs=(self.db.device_catalog.snapshot(), self.db.esp_configurator.settings, ml_factory)
+        )
+        try:
+            pending = {executor.submit(_run_jobs, chunk, settings) for chunk in chunks}
+            while pending:
+                if cancel_event is not None and cancel_event.is_set():
+                    for future in pending:
+                        future.cancel()
+                    return
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    consume(future.result())
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # ========== 结果写入 ==========
+
+    def _result_row(self, run_id: int, result: Dict[str, Any], model_version: Optional[str]) -> Dict[str, Any]:
+        """单井结果 -> 汇总表行；同时保存该井的预测结果"""
+        # 批量插入要求各行键一致：未选出方案的井推荐管柱列为空
+        row = dict.fromkeys(_SOLUTION_COLUMNS)
+        row.update({
+            'run_id': run_id, 'well_id': result['well_id'], 'well_name': result.get('well_name'),
+            'parameters_id': result['parameters_id'], 'status': result['status'], 'error': result.get('error'),
+            'production': result.get('production'), 'total_head': result.get('total_head'),
+            'gas_rate': result.get('gas_rate'), 'prediction_method': result.get('prediction_method'),
+            'pareto_size': result.get('pareto_size'), 'created_at': datetime.now(),
+        })
+        prediction = result.get('prediction')
+        row['prediction_id'] = self._save_prediction(result, prediction, model_version) if prediction else None
+
+        solutions = result.get('solutions') or []
+        if solutions:
+            best = solutions[0]
+            separator = best.get('separator') or {}
+            row.update(
+                pump_id=best['pump']['id'], pump_model=best['pump'].get('model'),
+                stages=best['stages'], frequency=best['frequency'],
+                motor_id=best['motor']['id'], motor_model=best['motor'].get('model'),
+                protector_id=best['protector']['id'], protector_model=best['protector'].get('model'),
+                separator_id=separator.get('id'), separator_model=separator.get('model'),
+                capex=best['capex'], energy_kw=best['energy_kw'],
+                annual_energy_mwh=best['annual_energy_mwh'], lifecycle_cost=best['lifecycle_cost'],
+            )
+        row['details'] = {
+            'solutions': solutions,
+            'ipr_curve': prediction['ipr'] if prediction else None,
+            'elapsed_ms': result.get('elapsed_ms'),
+        }
+        return row
+
+    def _save_prediction(self, result, prediction, model_version) -> Optional[int]:
+        combined, empirical = prediction['combined'], prediction['empirical']
+        try:
+            return self.db.save_production_prediction({
+                'parameters_id': result['parameters_id'],
+                'predicted_production': combined.get('production'),
+                'predicted_pump_depth': combined.get('pump_depth'),
+                'predicted_gas_rate': combined.get('gas_rate'),
+                'empirical_pump_depth': empirical.get('pump_depth'),
+                'empirical_gas_rate': empirical.get('gas_rate'),
+                'prediction_method': 'Hybrid_ML_Empirical' if prediction['ml'] is not None else 'Empirical',
+                'confidence_score': combined.get('confidence', 0.85),
+                'ipr_curve_data': prediction['ipr'],
+                'model_version': model_version if prediction['ml'] is not None else None,
+            }, result['prediction_inputs'])
+        except Exception as e:
+            logger.error(f"保存井 {result['well_id']} 预测结果失败: {e}")
+            return None
+
+    def _create_run(self, project_id: int, total: int, settings: BatchSettings) -> int:
+        session = self.db.get_session()
+        try:
+            run = BatchSelectionRun(project_id=project_id, status='running', total_wells=total,
+                                    settings=json.dumps(asdict(settings), ensure_ascii=False))
+            session.add(run)
+            session.commit()
+            return run.id
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            self.db.close_session(session)
+
+    def _write_results(self, run_id: int, state: Dict[str, Any]):
+        """批量写入已完成的井并更新运行进度"""
+        rows, state['pending'] = state['pending'], []
+        session = self.db.get_session()
+        try:
+            if rows:
+                session.execute(insert(BatchSelectionResult), rows)
+            session.query(BatchSelectionRun).filter_by(id=run_id).update(
+                {'completed_wells': state['completed'], 'failed_wells': state['failed']}
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"写入批量选型结果失败: {e}")
+            raise
+        finally:
+            self.db.close_session(session)
+
+    def _finish_run(self, run_id: int, status: str, state: Dict[str, Any], error: Optional[str], elapsed: float):
+        session = self.db.get_session()
+        try:
+            session.query(BatchSelectionRun).filter_by(id=run_id).update({
+                'status': status, 'completed_wells': state['completed'], 'failed_wells': state['failed'],
+                'error': error, 'finished_at': datetime.now(), 'elapsed_seconds': elapsed,
+            })
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"更新批量选型运行状态失败: {e}")
+        finally:
+            self.db.close_session(session)
+
+    # ========== 查询 ==========
+
+    def get_run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        session = self.db.get_session()
+        try:
+            run = session.get(BatchSelectionRun, run_id)
+            return run.to_dict() if run else None
+        finally:
+            self.db.close_session(session)
+
+    def get_run_results(self, run_id: int) -> List[Dict[str, Any]]:
+        """运行的汇总表（不加载 details）"""
+        session = self.db.get_session()
+        try:
+            results = session.query(BatchSelectionResult).filter_by(run_id=run_id) \
+                .order_by(BatchSelectionResult.well_id).all()
+            return [result.to_dict() for result in results]
+        finally:
+            self.db.close_session(session)
+
+    def get_result_details(self, result_id: int) -> Optional[Dict[str, Any]]:
+        """单井完整结果（推荐方案、Pareto前沿、IPR曲线）"""
+        session = self.db.get_session()
+        try:
+            result = session.get(BatchSelectionResult, result_id)
+            return result.to_dict(include_payload=True) if result else None
+        finally:
+            self.db.close_session(session)
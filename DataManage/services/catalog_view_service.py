@@ -0,0 +1,109 @@
+# DataManage/services/catalog_view_service.py
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from DataManage.models.device import DeviceType
+from .device_catalog_service import CatalogTable, DeviceCatalogService, coerce_device_type
+from .performance_monitor import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+
+# 视图构建函数：(快照, 筛选后的行号) -> QML所需格式的结果
+ViewBuilder = Callable[[CatalogTable, np.ndarray], Any]
+
+
+class CatalogViewService:
+    """
+    设备目录视图缓存 - 按 (视图名, 设备类型, 举升方式, 状态) 记忆已转换为QML格式的设备列表
+
+    每个视图与构建它的目录快照绑定：快照按写时复制替换，身份不变即内容不变，
+    因此命中时无需任何查询或转换；设备增删改 / 列表更新信号刷新快照后，
+    对应设备类型的视图随快照变化通知立即释放，其他类型的视图不受影响。
+    视图结果由多个调用方共享，只读使用。
+    """
+
+    def __init__(self, catalog: DeviceCatalogService):
+        self.catalog = catalog
+        self._views: Dict[Tuple[str, DeviceType, Optional[str], Optional[str]], Tuple[CatalogTable, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        catalog.add_listener(self._on_catalog_changed)
+
+    def get(self, name: str, device_type, builder: ViewBuilder, lift_method: Optional[str] = None,
+            status: Optional[str] = 'active') -> Any:
+        """
+        获取视图，快照变化后首次访问时重新构建
+
+        Args:
+            name: 视图名（同一设备类型可有多种QML格式，如不同步骤的卡片）
+            device_type: 设备类型
+            builder: 视图构建函数 builder(快照, 行号)
+            lift_method: 举升方式筛选，None表示全部
+            status: 设备状态筛选
+        """
+        device_type = coerce_device_type(device_type)
+        lift_method = lift_method.lower() if lift_method else None
+        key = (name, device_type, lift_method, status)
+        table = self.catalog.table(device_type)
+        with self._lock:
+            cached = self._views.get(key)
+            if cached is not None and cached[0] is table:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        start = time.perf_counter()
+        value = builder(table, table.select(status, lift_method))
+        with self._lock:
+            # 构建期间快照可能已被替换；按快照身份比对，过期视图不会被命中
+            self._views[key] = (table, value)
+        performance_monitor.record('catalog_view', name, start, time.perf_counter() - start,
+                                   {'device_type': device_type.value, 'lift_method': lift_method})
+        return value
+
+    def warm(self, views: Iterable[Tuple[str, Any, ViewBuilder, Optional[str]]],
+             status: Optional[str] = 'active') -> int:
+        """
+        预先构建一组视图（通常在后台线程中，打开项目时调用）
+
+        Args:
+            views: [(视图名, 设备类型, 构建函数, 举升方式)]
+
+        Returns:
+            成功构建（或已命中）的视图数
+        """
+        start = time.perf_counter()
+        count = 0
+        for name, device_type, builder, lift_method in views:
+            try:
+                self.get(name, device_type, builder, lift_method=lift_method, status=status)
+                count += 1
+            except Exception as e:
+                logger.error(f"预构建设备视图失败 ({name}, {lift_method}): {e}")
+        logger.info(f"设备视图预构建完成: {count}个, 耗时{(time.perf_counter() - start) * 1000:.0f}ms")
+        return count
+
+    def invalidate(self, device_type=None):
+        """释放视图（None表示全部）"""
+        with self._lock:
+            if device_type is None:
+                self._views.clear()
+                return
+            device_type = coerce_device_type(device_type)
+            for key in [key for key in self._views if key[1] == device_type]:
+                del self._views[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'views': len(self._views), 'hits': self.hits, 'misses': self.misses}
+
+    def _on_catalog_changed(self, device_type: Optional[DeviceType], device_id: Optional[int]):
+        """目录快照变化：释放该设备类型的视图"""
+        self.invalidate(device_type)
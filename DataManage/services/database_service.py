@@ -7,8 +7,8 @@ import logging
 from datetime import datetime
 from typing import List, Dict, Optional, Any, Type
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Text
-from sqlalchemy.orm import sessionmaker, relationship, Session, scoped_session
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Text, Index, insert, inspect, text
+from sqlalchemy.orm import sessionmaker, relationship, Session, scoped_session, selectinload, undefer, undefer_group, Load
 from sqlalchemy.pool import QueuePool
 
 from PySide6.QtCore import QObject, Signal, Slot
@@ -27,11 +27,14 @@ from DataManage.models.device import (
     Device, DeviceType, DevicePump, DeviceMotor,
     DeviceProtector, DeviceSeparator, MotorFrequencyParam, LiftMethod
 )
-from DataManage.models.production_parameters import ProductionParameters, ProductionPrediction
+from DataManage.models.production_parameters import ProductionParameters, ProductionPrediction, PredictionRun
+from DataManage.models.packed_json import PAYLOAD_GROUP, payload_hash
+from DataManage.models.migration_log import MigrationLog
    # 在现有导入部分添加新模型
 from DataManage.models.pump_performance import (
         PumpCurveData, PumpEnhancedParameters, 
-        PumpOperatingPoint, PumpSystemCurve
+        PumpOperatingPoint, PumpSystemCurve,
+        PumpCurveBlob, PumpEnhancedParameterBlob, pack_series
 )
 # 在 database_service.py 的导入部分添加新模型
 from DataManage.models.performance_prediction import (
@@ -40,11 +43,27 @@ from DataManage.models.performance_prediction import (
 from DataManage.models.condition_comparison import (
     PumpConditionComparison, ConditionOptimization
 )
+from .search_index_service import SearchIndexService
+from .engine_provider import (get_engine, get_invalidation_bus, get_write_queue, install_session_invalidation,
+                              install_session_write_lease)
+from .backup_service import BackupService
+from .maintenance_service import MaintenanceService
+from .statistics_service import StatisticsService
+from .device_catalog_service import DeviceCatalogService
+from .catalog_view_service import CatalogViewService
+from .pump_screening_service import PumpScreeningService
+from .pump_range_index import PumpRangeIndexService
+from .esp_configurator_service import EspConfiguratorService
+from .motor_index_service import MotorIndexService
+from .pump_sizing_service import PumpSizingService
+from .batch_selection_service import BatchSelectionService
 
 # 创建日志记录器
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 泵曲线逐点存储 -> 打包存储迁移在 migration_log 中的名称
+PUMP_CURVE_MIGRATION = 'pump_curve_blob_migration'
 
 
 # 定义SQLAlchemy模型
@@ -109,6 +128,11 @@ class WellModel(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     is_deleted = Column(Boolean, default=False)  # 软删除标记
 
+    # 创建索引
+    __table_args__ = (
+        Index('idx_wells_project_listing', 'project_id', 'is_deleted', 'created_at'),
+    )
+
     # 关系定义 - 修改为多对一
     project = relationship("ProjectModel", back_populates="wells")
     # 第二个页面井身结构信息：在WellModel类的relationship部分添加：
@@ -208,6 +232,10 @@ class DatabaseService(QObject):
     deviceUpdated = Signal(int, str)     # 设备ID, 设备型号
     deviceDeleted = Signal(int)          # 设备ID
     deviceListUpdated = Signal()         # 设备列表更新
+    deviceImportProgress = Signal(int, int)  # 批量导入进度: 已处理行数, 总行数
+
+    # 缓存失效信号（来自共享失效总线，空列表表示全部失效）
+    tablesInvalidated = Signal(list)         # 被写入的表名列表
 
     def __new__(cls, config: Optional[DatabaseConfig] = None):
         if cls._instance is None:
@@ -229,26 +257,75 @@ class DatabaseService(QObject):
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
 
-        # 创建数据库引擎
-        self.engine = create_engine(
-            f"sqlite:///{self.config.db_path}",
-            echo=self.config.log_level == "DEBUG",
-            pool_size=self.config.max_connections,
-            max_overflow=self.config.max_connections * 2,
-            pool_timeout=self.config.connection_timeout,
-            pool_recycle=3600,  # 重连接周期
-            connect_args={"check_same_thread": False}  # 允许多线程访问
-        )
+        # 获取共享数据库引擎（与DatabaseManager共用连接池和PRAGMA配置）
+        self.engine = get_engine(self.config.db_path, self.config)
 
-        # 创建会话工厂
-        self.Session = scoped_session(sessionmaker(bind=self.engine))
+        # 创建会话工厂，提交后按写入的表发布缓存失效通知
+        session_factory = sessionmaker(bind=self.engine)
+        install_session_invalidation(session_factory)
+
+        # ORM写事务按租约经单写线程排队（与DatabaseManager的原生SQL写入共用同一个写线程）
+        self.write_queue = get_write_queue(self.config.db_path, self.config)
+        install_session_write_lease(session_factory, self.write_queue)
+        self.Session = scoped_session(session_factory)
+
+        # 转发失效总线上的通知（包括原生SQL写入）
+        get_invalidation_bus().subscribe(self._on_tables_invalidated)
 
         # 创建表
         Base.metadata.create_all(self.engine)
 
+        # 为已有数据库补建列和索引（create_all 不会修改已存在的表）
+        self.migrate_columns()
+        self.migrate_indexes()
+        self._backfill_prediction_runs()
+
+        # 全文检索索引（FTS5 trigram，触发器同步）
+        self.search_index = SearchIndexService(self.engine)
+        self.search_index.ensure_schema()
+
+        # 仪表盘统计计数器（触发器维护）
+        self.statistics = StatisticsService(self.engine, self.write_queue)
+        self.statistics.ensure_schema()
+
+        # 设备目录列式快照（选型查询使用，按设备信号增量刷新）
+        self.device_catalog = DeviceCatalogService(self.engine)
+        self.device_catalog.connect_signals(self)
+
+        # 设备列表视图缓存（各步骤QML格式的设备列表，随目录快照按设备类型失效）
+        self.catalog_views = CatalogViewService(self.device_catalog)
+
+        # 泵筛选（在目录快照上向量化打分，知识图谱与选型共用）
+        self.pump_screening = PumpScreeningService(self.device_catalog)
+
+        # 泵工况区间索引（"哪些泵覆盖排量Q"，随目录快照增量更新）
+        self.pump_ranges = PumpRangeIndexService(self.device_catalog, self.engine)
+
+        # 电机 × 频率 参数索引（插值、按运行频率功率向量化筛选，每个电机快照构建一次）
+        self.motor_index = MotorIndexService(self.device_catalog)
+
+        # 电潜泵管柱组合选型（泵×级数×频率×电机×保护器×分离器，分支定界 + 进程池）
+        self.esp_configurator = EspConfiguratorService(self.device_catalog, motor_index=self.motor_index)
+
+        # 级数 × 频率优化（候选泵曲线按相似定律批量换算，求最小功率配置）
+        self.pump_sizing = PumpSizingService(self.device_catalog, self.engine)
+
+        # 项目批量选型（所有井的预测 + 管柱组合选型，进程池并行，结果增量写入汇总表）
+        self.batch_selection = BatchSelectionService(self)
+
         # 🔥 新增：初始化示例泵数据
         self._initialize_sample_pump_data()
 
+        # 在线定时备份（后台线程）
+        self.backup_service = BackupService(self.engine, self.config)
+        if self.config.backup_enabled and self.config.db_path != ':memory:':
+            self.backup_service.start()
+
+        # 定时维护：归档过期软删除行，空闲时增量VACUUM（后台线程）
+        self.maintenance_service = MaintenanceService(self.engine, self.config, write_queue=self.write_queue)
+        if self.config.maintenance_enabled and self.config.db_path != ':memory:':
+            self.maintenance_service.start()
+
         # 设置初始化标志
         self._initialized = True
 
@@ -259,6 +336,104 @@ class DatabaseService(QObject):
         if hasattr(self, 'Session'):
             self.Session.remove()
 
+    def migrate_columns(self) -> List[str]:
+        """
+        列迁移：为已存在的表添加模型中新增的可空列（ALTER TABLE ADD COLUMN）
+
+        Returns:
+            本次新增的列（"表.列"）列表
+        """
+        added = []
+        inspector = inspect(self.engine)
+        existing_tables = set(inspector.get_table_names())
+
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                if table.name not in existing_tables:
+                    continue
+                existing = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing:
+                        continue
+                    if not column.nullable or column.primary_key:
+                        logger.warning(f"无法自动添加非空列: {table.name}.{column.name}")
+                        continue
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                    added.append(f"{table.name}.{column.name}")
+
+        if added:
+            logger.info(f"列迁移完成，新增 {len(added)} 列: {added}")
+        return added
+
+    def _backfill_prediction_runs(self):
+        """为去重改造前保存的预测结果补建运行记录（仅在运行记录表为空时执行一次）"""
+        with self.engine.begin() as conn:
+            has_runs = conn.execute(text("SELECT 1 FROM prediction_runs LIMIT 1")).first()
+            has_predictions = conn.execute(text("SELECT 1 FROM production_predictions LIMIT 1")).first()
+            if has_runs or not has_predictions:
+                return
+            result = conn.execute(text(
+                "INSERT INTO prediction_runs (prediction_id, parameters_id, created_at) "
+                "SELECT id, parameters_id, created_at FROM production_predictions ORDER BY id"
+            ))
+        logger.info(f"已为 {result.rowcount} 条历史预测结果补建运行记录")
+
+    def migrate_indexes(self) -> List[str]:
+        """
+        索引迁移：创建模型中声明但数据库中尚不存在的索引，新建后更新统计信息
+
+        Returns:
+            本次新建的索引名列表
+        """
+        created = []
+        inspector = inspect(self.engine)
+        existing_tables = set(inspector.get_table_names())
+        # SQLite 的索引名在整个库内唯一：旧表（如 pump_curve_data_error）可能已占用模型中的索引名
+        with self.engine.connect() as conn:
+            existing = dict(conn.execute(text(
+                "SELECT name, tbl_name FROM sqlite_master WHERE type = 'index'")).fetchall())
+
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables or not table.indexes:
+                continue
+            for index in table.indexes:
+                owner = existing.get(index.name)
+                if owner == table.name:
+                    continue
+                if owner is not None:
+                    logger.warning(f"索引名 {index.name} 已被表 {owner} 占用，跳过在 {table.name} 上创建")
+                    continue
+                try:
+                    index.create(self.engine)
+                    created.append(index.name)
+                except Exception as e:
+                    # 单个索引失败不影响服务启动
+                    logger.error(f"创建索引 {index.name} ({table.name}) 失败: {e}")
+
+        if created:
+            # 让查询规划器掌握新索引的选择性；统计信息只影响查询计划，失败不影响启动
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(text("ANALYZE"))
+            except Exception as e:
+                logger.warning(f"索引迁移后更新统计信息失败: {e}")
+            logger.info(f"索引迁移完成，新建 {len(created)} 个索引: {created}")
+
+        return created
+
+    def _on_tables_invalidated(self, tables):
+        """失效总线回调，可能在任意线程触发"""
+        self.tablesInvalidated.emit(sorted(tables) if tables else [])
+
+    def get_backup_status(self) -> Dict[str, Any]:
+        """获取数据库备份状态（最近一次备份时间、耗时、结果等）"""
+        return self.backup_service.get_status()
+
+    def get_maintenance_status(self) -> Dict[str, Any]:
+        """获取数据库维护状态（最近一次归档/回收报告）"""
+        return self.maintenance_service.get_status()
+
     def get_session(self) -> Session:
         """获取数据库会话"""
         return self.Session()
@@ -576,18 +751,30 @@ class DatabaseService(QObject):
         finally:
             self.close_session(session)
 
-    def search_wells(self, project_id: int, keyword: str) -> List[Dict[str, Any]]:
-        """搜索井"""
+    def search_wells(self, project_id: int, keyword: str,
+                     limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """搜索井（优先使用FTS5全文索引，按相关度排序）"""
+        keyword = (keyword or '').strip()
         session = self.get_session()
         try:
+            if self.search_index.can_search(keyword):
+                well_ids = self.search_index.search_well_ids(session, project_id, keyword, limit)
+                wells = session.query(WellModel).filter(WellModel.id.in_(well_ids)).all() if well_ids else []
+                rank = {well_id: i for i, well_id in enumerate(well_ids)}
+                wells.sort(key=lambda w: rank[w.id])
+                return [well.to_dict() for well in wells]
+
+            # 短关键词（不足3个字符）回退到LIKE查询
             query = session.query(WellModel).filter(
                         WellModel.project_id == project_id,
                         WellModel.is_deleted == False,
                         WellModel.well_name.like(f"%{keyword}%")
                     )
 
-            wells = query.order_by(WellModel.created_at.desc()).all()
-            return [well.to_dict() for well in wells]
+            query = query.order_by(WellModel.created_at.desc())
+            if limit:
+                query = query.limit(limit)
+            return [well.to_dict() for well in query.all()]
 
         except Exception as e:
             error_msg = f"搜索井失败: {str(e)}"
@@ -785,6 +972,37 @@ class DatabaseService(QObject):
         finally:
             self.close_session(session)
 
+    def _bulk_insert(self, session: Session, model: Type, rows: List[Dict[str, Any]]) -> int:
+        """
+        Core层批量插入（executemany），绕过ORM工作单元
+
+        按 config.batch_size 分块执行，不提交事务，由调用方在同一事务内统一提交。
+
+        Args:
+            session: 数据库会话
+            model: ORM模型类
+            rows: 行数据字典列表（键为列名）
+
+        Returns:
+            插入的行数
+        """
+        if not rows:
+            return 0
+
+        stmt = insert(model.__table__)
+        chunk_size = max(1, self.config.batch_size or 1000)
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            # executemany要求同一批次的参数键一致，按键集合分组
+            groups: Dict[tuple, List[Dict[str, Any]]] = {}
+            for row in chunk:
+                groups.setdefault(tuple(sorted(row)), []).append(row)
+            for group in groups.values():
+                session.execute(stmt, group)
+
+        return len(rows)
+
     # 在DatabaseService类中添加以下方法：
 
     # ========== 井轨迹数据相关方法 ==========
@@ -800,20 +1018,22 @@ class DatabaseService(QObject):
             # 删除旧的轨迹数据
             session.query(WellTrajectory).filter_by(well_id=well_id).delete()
 
-            # 批量插入新数据
-            for idx, traj_data in enumerate(trajectories):
-                trajectory = WellTrajectory(
-                        well_id=well_id,
-                            sequence_number=idx + 1,
-                            tvd=traj_data.get('tvd'),
-                            md=traj_data.get('md'),
-                            dls=traj_data.get('dls'),
-                            inclination=traj_data.get('inclination'),
-                            azimuth=traj_data.get('azimuth'),
-                            north_south=traj_data.get('north_south'),
-                            east_west=traj_data.get('east_west')
-                )
-                session.add(trajectory)
+            # 批量插入新数据（Core executemany，同一事务）
+            rows = [
+                {
+                    'well_id': well_id,
+                    'sequence_number': idx + 1,
+                    'tvd': traj_data.get('tvd'),
+                    'md': traj_data.get('md'),
+                    'dls': traj_data.get('dls'),
+                    'inclination': traj_data.get('inclination'),
+                    'azimuth': traj_data.get('azimuth'),
+                    'north_south': traj_data.get('north_south'),
+                    'east_west': traj_data.get('east_west')
+                }
+                for idx, traj_data in enumerate(trajectories)
+            ]
+            self._bulk_insert(session, WellTrajectory, rows)
 
             session.commit()
             logger.info(f"保存井轨迹数据成功: 井ID {well_id}, 共{len(trajectories)}条记录")
@@ -838,11 +1058,11 @@ class DatabaseService(QObject):
                         is_deleted=False
                     ).order_by(WellTrajectory.sequence_number).all()
 
-            logger.info(f"从数据库获取到 {len(trajectories)} 条轨迹记录")
+            logger.debug(f"从数据库获取到 {len(trajectories)} 条轨迹记录")
 
             # 转换为字典并确保所有QML需要的属性都存在
             result = []
-            for i, traj in enumerate(trajectories):
+            for traj in trajectories:
                 traj_dict = traj.to_dict()
                 
                 # 为QML添加缺失的属性（这些可能是套管相关的字段，但QML错误地期望它们）
@@ -879,9 +1099,8 @@ class DatabaseService(QObject):
                                 traj_dict[field] = 0.0
                 
                 result.append(traj_dict)
-                logger.debug(f"轨迹记录 {i}: TVD={traj_dict['tvd']}, MD={traj_dict['md']}")
 
-            logger.info(f"处理完成，返回 {len(result)} 条有效记录")
+            logger.debug(f"处理完成，返回 {len(result)} 条有效记录")
             return result
 
         except Exception as e:
@@ -1130,91 +1349,9 @@ class DatabaseService(QObject):
                 if existing:
                     raise ValueError(f"序列号已存在: {serial_number}")
 
-            # 创建基础设备记录
-            base_device_data = {
-                            'device_type': device_type,
-                            'manufacturer': device_data.get('manufacturer'),
-                            'model': device_data.get('model'),
-                            'serial_number': serial_number,
-                            'status': device_data.get('status', 'active'),
-                            'description': device_data.get('description'),
-                            'lift_method': device_data.get('lift_method')
-                }
-
-            new_device = Device(**base_device_data)
+            # 创建基础设备记录及详细信息
+            new_device = self._build_device_record(device_type, device_data)
             session.add(new_device)
-            session.flush()  # 获取设备ID
-
-            # 根据设备类型创建详细信息
-            if device_type == DeviceType.PUMP:
-                pump_data = device_data.get('pump_details', {})
-                pump = DevicePump(
-                                device_id=new_device.id,
-                                impeller_model=pump_data.get('impeller_model'),
-                                displacement_min=pump_data.get('displacement_min'),
-                                displacement_max=pump_data.get('displacement_max'),
-                                single_stage_head=pump_data.get('single_stage_head'),
-                                single_stage_power=pump_data.get('single_stage_power'),
-                                shaft_diameter=pump_data.get('shaft_diameter'),
-                                mounting_height=pump_data.get('mounting_height'),
-                                outside_diameter=pump_data.get('outside_diameter'),
-                                max_stages=pump_data.get('max_stages'),
-                                efficiency=pump_data.get('efficiency')
-                            )
-                session.add(pump)
-
-            elif device_type == DeviceType.MOTOR:
-                motor_data = device_data.get('motor_details', {})
-                motor = DeviceMotor(
-                                device_id=new_device.id,
-                                motor_type=motor_data.get('motor_type'),
-                                outside_diameter=motor_data.get('outside_diameter'),
-                                length=motor_data.get('length'),
-                                weight=motor_data.get('weight'),
-                                insulation_class=motor_data.get('insulation_class'),
-                                protection_class=motor_data.get('protection_class')
-                            )
-                session.add(motor)
-                session.flush()
-
-                # 添加频率参数
-                frequency_params = motor_data.get('frequency_params', [])
-                for freq_param in frequency_params:
-                    param = MotorFrequencyParam(
-                                    motor_id=motor.id,
-                                    frequency=freq_param.get('frequency'),
-                                    power=freq_param.get('power'),
-                                    voltage=freq_param.get('voltage'),
-                                    current=freq_param.get('current'),
-                                    speed=freq_param.get('speed')
-                                )
-                    session.add(param)
-
-            elif device_type == DeviceType.PROTECTOR:
-                protector_data = device_data.get('protector_details', {})
-                protector = DeviceProtector(
-                                device_id=new_device.id,
-                                outer_diameter=protector_data.get('outer_diameter'),
-                                length=protector_data.get('length'),
-                                weight=protector_data.get('weight'),
-                                thrust_capacity=protector_data.get('thrust_capacity'),
-                                seal_type=protector_data.get('seal_type'),
-                                max_temperature=protector_data.get('max_temperature')
-                            )
-                session.add(protector)
-
-            elif device_type == DeviceType.SEPARATOR:
-                separator_data = device_data.get('separator_details', {})
-                separator = DeviceSeparator(
-                    device_id=new_device.id,
-                        outer_diameter=separator_data.get('outer_diameter'),
-                                length=separator_data.get('length'),
-                                weight=separator_data.get('weight'),
-                                separation_efficiency=separator_data.get('separation_efficiency'),
-                                gas_handling_capacity=separator_data.get('gas_handling_capacity'),
-                                liquid_handling_capacity=separator_data.get('liquid_handling_capacity')
-                            )
-                session.add(separator)
 
             session.commit()
 
@@ -1235,6 +1372,263 @@ class DatabaseService(QObject):
         finally:
             self.close_session(session)
 
+    # 各设备类型的详细信息表及其在 device_data 中的键名
+    _DEVICE_DETAIL_MODELS = {
+        DeviceType.PUMP: ('pump', 'pump_details', DevicePump),
+        DeviceType.MOTOR: ('motor', 'motor_details', DeviceMotor),
+        DeviceType.PROTECTOR: ('protector', 'protector_details', DeviceProtector),
+        DeviceType.SEPARATOR: ('separator', 'separator_details', DeviceSeparator),
+    }
+
+    @staticmethod
+    def _coerce_lift_method(value) -> Optional[LiftMethod]:
+        """将举升方式（枚举、名称或值）转换为LiftMethod枚举，无法识别时返回None"""
+        if value is None or isinstance(value, LiftMethod):
+            return value
+        text_value = str(value).strip()
+        if not text_value or text_value.lower() == 'nan':
+            return None
+        try:
+            return LiftMethod(text_value.lower())
+        except ValueError:
+            return LiftMethod.__members__.get(text_value.upper())
+
+    def _build_device_record(self, device_type: DeviceType, device_data: Dict[str, Any]) -> Device:
+        """根据设备数据构建设备ORM对象（含详细信息及电机频率参数，未添加到会话）"""
+        device = Device(
+            device_type=device_type,
+            manufacturer=device_data.get('manufacturer'),
+            model=device_data.get('model'),
+            serial_number=device_data.get('serial_number'),
+            status=device_data.get('status', 'active'),
+            description=device_data.get('description'),
+            lift_method=self._coerce_lift_method(device_data.get('lift_method'))
+        )
+
+        attr_name, details_key, detail_model = self._DEVICE_DETAIL_MODELS[device_type]
+        details = device_data.get(details_key) or {}
+        detail_columns = set(detail_model.__table__.columns.keys()) - {'id', 'device_id'}
+        detail = detail_model(**{k: v for k, v in details.items() if k in detail_columns})
+
+        if device_type == DeviceType.MOTOR:
+            detail.frequency_params = [
+                MotorFrequencyParam(
+                    frequency=freq_param.get('frequency'),
+                    power=freq_param.get('power'),
+                    voltage=freq_param.get('voltage'),
+                    current=freq_param.get('current'),
+                    speed=freq_param.get('speed')
+                )
+                for freq_param in details.get('frequency_params', [])
+            ]
+
+        setattr(device, attr_name, detail)
+        return device
+
+    @staticmethod
+    def _normalize_curve_points(curves) -> List[Dict[str, Any]]:
+        """
+        统一性能曲线格式
+
+        支持两种输入：
+        - 点列表: [{'flow_rate', 'head', 'power', 'efficiency', 'frequency'}, ...]（双Sheet模板）
+        - 序列字典: {'flow_points', 'head_points', 'power_points', 'efficiency_points'}（单Sheet模板）
+        """
+        if not curves:
+            return []
+        if isinstance(curves, dict):
+            return [
+                {'flow_rate': q, 'head': h, 'power': p, 'efficiency': e, 'frequency': None}
+                for q, h, p, e in zip(
+                    curves.get('flow_points', []), curves.get('head_points', []),
+                    curves.get('power_points', []), curves.get('efficiency_points', [])
+                )
+            ]
+        return [point for point in curves
+                if all(point.get(k) is not None for k in ('flow_rate', 'head', 'power', 'efficiency'))]
+
+    def _validate_import_rows(self, session: Session, rows: List[Dict[str, Any]], update_existing: bool = False):
+        """
+        导入前统一校验所有行
+
+        Args:
+            update_existing: 序列号已存在时更新该设备；为False时该行作为错误拒绝
+
+        Returns:
+            (有效行列表, 错误列表)；有效行附带解析后的设备类型，序列号已存在的行标记为更新
+        """
+        valid_rows = []
+        errors = []
+        seen_serials = set()
+        timestamp = int(datetime.now().timestamp())
+
+        # 一次性查询已存在的序列号
+        incoming_serials = {
+            str(r['data'].get('serial_number')).strip()
+            for r in rows if r['data'].get('serial_number') not in (None, '')
+        }
+        existing = {}
+        serial_list = list(incoming_serials)
+        for start in range(0, len(serial_list), 500):
+            chunk = serial_list[start:start + 500]
+            for device_id, serial in session.query(Device.id, Device.serial_number).filter(
+                Device.serial_number.in_(chunk), Device.is_deleted == False
+            ):
+                existing[serial] = device_id
+
+        for item in rows:
+            row_number, device_data = item['row'], dict(item['data'])
+            try:
+                device_type_str = str(device_data.get('device_type') or '').lower()
+                try:
+                    device_type = DeviceType(device_type_str)
+                except ValueError:
+                    raise ValueError(f"无效的设备类型: {device_data.get('device_type')}")
+
+                model = str(device_data.get('model') or '').strip()
+                if not model or model.lower() == 'nan':
+                    raise ValueError("设备型号不能为空")
+                device_data['model'] = model
+
+                serial = str(device_data.get('serial_number') or '').strip()
+                if not serial or serial.lower() == 'nan':
+                    serial = f'IMP_{device_type.name}_{timestamp}_{row_number}'
+                if serial in seen_serials:
+                    raise ValueError(f"导入数据中序列号重复: {serial}")
+                seen_serials.add(serial)
+                if serial in existing and not update_existing:
+                    raise ValueError(f"序列号已存在: {serial}")
+                device_data['serial_number'] = serial
+
+                valid_rows.append({
+                    'row': row_number,
+                    'device_type': device_type,
+                    'data': device_data,
+                    'existing_id': existing.get(serial)
+                })
+
+            except Exception as e:
+                errors.append({'row': row_number, 'error': str(e)})
+
+        return valid_rows, errors
+
+    def _write_import_row(self, session: Session, item: Dict[str, Any]):
+        """在当前事务中写入一行导入数据（新建或按序列号更新），并写入泵性能曲线"""
+        device_data = item['data']
+        if item['existing_id']:
+            device = session.query(Device).filter_by(id=item['existing_id']).first()
+            self._apply_device_updates(session, device, device_data)
+        else:
+            session.add(self._build_device_record(item['device_type'], device_data))
+
+        curve_points = self._normalize_curve_points(
+            (device_data.get('pump_details') or {}).get('performance_curves')
+        )
+        if item['device_type'] == DeviceType.PUMP and curve_points:
+            self._write_curve_blob(
+                session, device_data['model'],
+                {
+                    'flow': [point['flow_rate'] for point in curve_points],
+                    'head': [point['head'] for point in curve_points],
+                    'power': [point['power'] for point in curve_points],
+                    'efficiency': [point['efficiency'] for point in curve_points],
+                },
+                standard_frequency=curve_points[0].get('frequency') or 60.0,
+                data_source='import_excel'
+            )
+
+    def bulk_import_devices(self, rows: List[Dict[str, Any]], chunk_size: Optional[int] = None,
+                            progress_interval: float = 0.2, update_existing: bool = False) -> Dict[str, Any]:
+        """
+        批量导入设备（分块事务）
+
+        先统一校验全部行，再按块在单个事务中写入设备、详细信息、电机频率参数和泵性能曲线。
+        导入过程中不逐条发射 deviceCreated，按时间节流发射 deviceImportProgress，
+        结束时只发射一次 deviceListUpdated。某一块提交失败时回滚该块并逐行重试以定位错误行。
+
+        Args:
+            rows: [{'row': Excel行号, 'data': device_data}, ...]，device_data 格式同 create_device
+            chunk_size: 每个事务写入的设备数，默认取 config.batch_size
+            progress_interval: 进度信号的最小发射间隔（秒）
+            update_existing: 序列号已存在的行更新原设备；默认拒绝并计入错误
+
+        Returns:
+            {'success_count', 'updated_count', 'error_count', 'errors': [{'row', 'error'}]}
+            success_count 包含新建和更新的行，updated_count 为其中更新的行数
+        """
+        import time
+
+        total = len(rows)
+        chunk_size = max(1, chunk_size or self.config.batch_size or 500)
+        success_count = 0
+        updated_count = 0
+        processed = 0
+        last_emit = 0.0
+
+        def report_progress(force: bool = False):
+            nonlocal last_emit
+            now = time.monotonic()
+            if force or now - last_emit >= progress_interval:
+                last_emit = now
+                self.deviceImportProgress.emit(processed, total)
+
+        session = self.get_session()
+        try:
+            valid_rows, errors = self._validate_import_rows(session, rows, update_existing)
+            processed = len(errors)
+            report_progress(force=True)
+
+            for start in range(0, len(valid_rows), chunk_size):
+                chunk = valid_rows[start:start + chunk_size]
+                try:
+                    for item in chunk:
+                        self._write_import_row(session, item)
+                    session.commit()
+                    success_count += len(chunk)
+                    updated_count += sum(1 for item in chunk if item['existing_id'])
+
+                except Exception as chunk_error:
+                    session.rollback()
+                    logger.warning(f"导入块提交失败，逐行重试: {chunk_error}")
+                    for item in chunk:
+                        try:
+                            self._write_import_row(session, item)
+                            session.commit()
+                            success_count += 1
+                            if item['existing_id']:
+                                updated_count += 1
+                        except Exception as row_error:
+                            session.rollback()
+                            errors.append({'row': item['row'], 'error': str(row_error)})
+
+                # 释放已提交对象，控制会话内存
+                session.expunge_all()
+                processed += len(chunk)
+                report_progress()
+
+            report_progress(force=True)
+            errors.sort(key=lambda err: err['row'])
+            logger.info(f"批量导入设备完成: 成功{success_count}条（其中更新{updated_count}条）, 失败{len(errors)}条")
+
+            return {
+                'success_count': success_count,
+                'updated_count': updated_count,
+                'error_count': len(errors),
+                'errors': errors
+            }
+
+        except Exception as e:
+            session.rollback()
+            error_msg = f"批量导入设备失败: {str(e)}"
+            logger.error(error_msg)
+            self.databaseError.emit(error_msg)
+            raise
+
+        finally:
+            self.close_session(session)
+            if success_count:
+                self.deviceListUpdated.emit()
+
     def get_devices(self, device_type: Optional[str] = None,
                             status: Optional[str] = None,
                             page: int = 1,
@@ -1504,71 +1898,7 @@ class DatabaseService(QObject):
             if not device:
                 raise ValueError(f"设备不存在: ID {device_id}")
 
-            # 检查序列号唯一性
-            if 'serial_number' in updates and updates['serial_number'] != device.serial_number:
-                existing = session.query(Device).filter_by(
-                                serial_number=updates['serial_number'],
-                                is_deleted=False
-                            ).first()
-                if existing:
-                    raise ValueError(f"序列号已存在: {updates['serial_number']}")
-
-            # 更新基础信息
-            base_fields = ['manufacturer', 'model', 'serial_number', 'status', 'description']
-            for field in base_fields:
-                if field in updates:
-                    setattr(device, field, updates[field])
-
-            # 更新特定设备信息
-            if device.device_type == DeviceType.PUMP and 'pump_details' in updates:
-                pump_data = updates['pump_details']
-                if device.pump:
-                    for key, value in pump_data.items():
-                        if hasattr(device.pump, key):
-                            setattr(device.pump, key, value)
-
-            elif device.device_type == DeviceType.MOTOR and 'motor_details' in updates:
-                motor_data = updates['motor_details']
-                if device.motor:
-                    # 更新电机基本信息
-                    motor_fields = ['motor_type', 'outside_diameter', 'length',
-                                               'weight', 'insulation_class', 'protection_class']
-                    for field in motor_fields:
-                        if field in motor_data:
-                            setattr(device.motor, field, motor_data[field])
-
-                    # 更新频率参数
-                    if 'frequency_params' in motor_data:
-                        # 删除旧的频率参数
-                        session.query(MotorFrequencyParam).filter_by(
-                                        motor_id=device.motor.id
-                                    ).delete()
-
-                        # 添加新的频率参数
-                        for freq_param in motor_data['frequency_params']:
-                            param = MotorFrequencyParam(
-                                            motor_id=device.motor.id,
-                                            frequency=freq_param.get('frequency'),
-                                            power=freq_param.get('power'),
-                                            voltage=freq_param.get('voltage'),
-                                            current=freq_param.get('current'),
-                                            speed=freq_param.get('speed')
-                                        )
-                            session.add(param)
-
-            elif device.device_type == DeviceType.PROTECTOR and 'protector_details' in updates:
-                protector_data = updates['protector_details']
-                if device.protector:
-                    for key, value in protector_data.items():
-                        if hasattr(device.protector, key):
-                            setattr(device.protector, key, value)
-
-            elif device.device_type == DeviceType.SEPARATOR and 'separator_details' in updates:
-                separator_data = updates['separator_details']
-                if device.separator:
-                    for key, value in separator_data.items():
-                        if hasattr(device.separator, key):
-                            setattr(device.separator, key, value)
+            self._apply_device_updates(session, device, updates)
 
             session.commit()
 
@@ -1589,6 +1919,74 @@ class DatabaseService(QObject):
         finally:
             self.close_session(session)
 
+    def _apply_device_updates(self, session: Session, device: Device, updates: Dict[str, Any]):
+        """将更新内容应用到设备对象（含序列号唯一性检查，不提交）"""
+        # 检查序列号唯一性
+        if 'serial_number' in updates and updates['serial_number'] != device.serial_number:
+            existing = session.query(Device).filter_by(
+                            serial_number=updates['serial_number'],
+                            is_deleted=False
+                        ).first()
+            if existing:
+                raise ValueError(f"序列号已存在: {updates['serial_number']}")
+
+        # 更新基础信息
+        base_fields = ['manufacturer', 'model', 'serial_number', 'status', 'description']
+        for field in base_fields:
+            if field in updates:
+                setattr(device, field, updates[field])
+
+        # 更新特定设备信息
+        if device.device_type == DeviceType.PUMP and 'pump_details' in updates:
+            pump_data = updates['pump_details']
+            if device.pump:
+                for key, value in pump_data.items():
+                    if hasattr(device.pump, key):
+                        setattr(device.pump, key, value)
+
+        elif device.device_type == DeviceType.MOTOR and 'motor_details' in updates:
+            motor_data = updates['motor_details']
+            if device.motor:
+                # 更新电机基本信息
+                motor_fields = ['motor_type', 'outside_diameter', 'length',
+                                           'weight', 'insulation_class', 'protection_class']
+                for field in motor_fields:
+                    if field in motor_data:
+                        setattr(device.motor, field, motor_data[field])
+
+                # 更新频率参数
+                if 'frequency_params' in motor_data:
+                    # 删除旧的频率参数
+                    session.query(MotorFrequencyParam).filter_by(
+                                    motor_id=device.motor.id
+                                ).delete()
+
+                    # 添加新的频率参数
+                    for freq_param in motor_data['frequency_params']:
+                        param = MotorFrequencyParam(
+                                        motor_id=device.motor.id,
+                                        frequency=freq_param.get('frequency'),
+                                        power=freq_param.get('power'),
+                                        voltage=freq_param.get('voltage'),
+                                        current=freq_param.get('current'),
+                                        speed=freq_param.get('speed')
+                                    )
+                        session.add(param)
+
+        elif device.device_type == DeviceType.PROTECTOR and 'protector_details' in updates:
+            protector_data = updates['protector_details']
+            if device.protector:
+                for key, value in protector_data.items():
+                    if hasattr(device.protector, key):
+                        setattr(device.protector, key, value)
+
+        elif device.device_type == DeviceType.SEPARATOR and 'separator_details' in updates:
+            separator_data = updates['separator_details']
+            if device.separator:
+                for key, value in separator_data.items():
+                    if hasattr(device.separator, key):
+                        setattr(device.separator, key, value)
+
     def delete_device(self, device_id: int) -> bool:
         """删除设备（软删除）"""
         session = self.get_session()
@@ -1622,11 +2020,41 @@ class DatabaseService(QObject):
         finally:
             self.close_session(session)
 
-    def search_devices(self, keyword: str, device_type: Optional[str] = None) -> List[Dict[str, Any]]:
-        """搜索设备"""
+    def search_devices(self, keyword: str, device_type: Optional[str] = None,
+                       limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """搜索设备（优先使用FTS5全文索引，按相关度排序）"""
+        keyword = (keyword or '').strip()
         session = self.get_session()
         try:
-            query = session.query(Device).filter(
+            dt = None
+            if device_type:
+                try:
+                    dt = DeviceType(device_type)
+                except ValueError:
+                    pass
+
+            # 预加载详情表，避免to_dict逐行懒加载
+            detail_options = (
+                selectinload(Device.pump),
+                selectinload(Device.motor).selectinload(DeviceMotor.frequency_params),
+                selectinload(Device.protector),
+                selectinload(Device.separator),
+            )
+
+            if self.search_index.can_search(keyword):
+                device_ids = self.search_index.search_device_ids(
+                    session, keyword, dt.name if dt else None, limit
+                )
+                if not device_ids:
+                    return []
+                devices = session.query(Device).options(*detail_options)\
+                                  .filter(Device.id.in_(device_ids)).all()
+                rank = {device_id: i for i, device_id in enumerate(device_ids)}
+                devices.sort(key=lambda d: rank[d.id])
+                return [device.to_dict() for device in devices]
+
+            # 短关键词（不足3个字符）回退到LIKE查询
+            query = session.query(Device).options(*detail_options).filter(
                 Device.is_deleted == False,
                             (Device.model.like(f"%{keyword}%") |
                              Device.manufacturer.like(f"%{keyword}%") |
@@ -1634,15 +2062,13 @@ class DatabaseService(QObject):
                              Device.description.like(f"%{keyword}%"))
                         )
 
-            if device_type:
-                try:
-                    dt = DeviceType(device_type)
-                    query = query.filter(Device.device_type == dt)
-                except ValueError:
-                    pass
+            if dt is not None:
+                query = query.filter(Device.device_type == dt)
 
-            devices = query.order_by(Device.created_at.desc()).all()
-            return [device.to_dict() for device in devices]
+            query = query.order_by(Device.created_at.desc())
+            if limit:
+                query = query.limit(limit)
+            return [device.to_dict() for device in query.all()]
 
         except Exception as e:
             error_msg = f"搜索设备失败: {str(e)}"
@@ -1684,29 +2110,22 @@ class DatabaseService(QObject):
             self.close_session(session)
 
     def get_device_statistics(self) -> Dict[str, Any]:
-        """获取设备统计信息"""
-        session = self.get_session()
+        """获取设备统计信息（读取触发器维护的计数器）"""
         try:
+            counts = self.statistics.get_device_counts()
+
             # 统计各类型设备数量
             type_stats = {}
             for device_type in DeviceType:
-                count = session.query(Device).filter_by(
-                                device_type=device_type,
-                                is_deleted=False
-                            ).count()
-                type_stats[device_type.value] = count
+                type_stats[device_type.value] = sum(counts.get(device_type.name, {}).values())
 
             # 统计各状态设备数量
             status_stats = {}
             for status in ['active', 'inactive', 'maintenance']:
-                count = session.query(Device).filter_by(
-                                status=status,
-                                is_deleted=False
-                            ).count()
-                status_stats[status] = count
+                status_stats[status] = sum(by_status.get(status, 0) for by_status in counts.values())
 
             # 获取总数
-            total_count = session.query(Device).filter_by(is_deleted=False).count()
+            total_count = sum(type_stats.values())
 
             return {
                             'total_count': total_count,
@@ -1724,74 +2143,65 @@ class DatabaseService(QObject):
                             'status_statistics': {}
                         }
 
-        finally:
-            self.close_session(session)
+    def get_dashboard_statistics(self, project_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        获取仪表盘统计（井数、设备数、选型准确率、本月报告数、预测次数）
+
+        Args:
+            project_id: 项目ID，None或<=0表示全部项目
+        """
+        try:
+            return self.statistics.get_statistics(project_id)
+        except Exception as e:
+            error_msg = f"获取仪表盘统计失败: {str(e)}"
+            logger.error(error_msg)
+            self.databaseError.emit(error_msg)
+            return {}
+
+    def record_report_generated(self):
+        """记录一次选型报告生成，用于仪表盘的本月报告统计"""
+        try:
+            self.statistics.record_report()
+        except Exception as e:
+            # 统计失败不影响报告导出本身
+            logger.warning(f"记录报告统计失败: {e}")
 
     def import_devices_from_excel(self, excel_data: List[Dict], device_type: str, is_metric: bool = False):
         """
-        从Excel数据导入设备（修复版本 - 支持所有表）
+        从Excel数据导入设备（先解析校验全部行，再分块事务批量写入）
     
         Args:
             excel_data: Excel数据列表
             device_type: 设备类型
             is_metric: 是否为公制单位
         """
-        session = self.get_session()
-        success_count = 0
-        error_list = []
-
-        try:
-            # 验证设备类型
-            # try:
-            #     dt = DeviceType(device_type.upper())
-            # except ValueError:
-            #     raise ValueError(f"无效的设备类型: {device_type}")
+        processors = {
+            'pump': self._process_pump_excel_data,
+            'motor': self._process_motor_excel_data,
+            'protector': self._process_protector_excel_data,
+            'separator': self._process_separator_excel_data,
+        }
+        processor = processors.get(device_type.lower())
+        if processor is None:
+            raise ValueError(f"不支持的设备类型: {device_type}")
 
-            for idx, row_data in enumerate(excel_data):
-                try:
-                    # 🔥 根据设备类型处理不同的数据格式
-                    if device_type.lower() == 'pump':
-                        device_data = self._process_pump_excel_data(row_data, is_metric, idx + 2)
-                    elif device_type.lower() == 'motor':
-                        device_data = self._process_motor_excel_data(row_data, is_metric, idx + 2)
-                    elif device_type.lower() == 'protector':
-                        device_data = self._process_protector_excel_data(row_data, is_metric, idx + 2)
-                    elif device_type.lower() == 'separator':
-                        device_data = self._process_separator_excel_data(row_data, is_metric, idx + 2)
-                    else:
-                        raise ValueError(f"不支持的设备类型: {device_type}")
+        rows = []
+        parse_errors = []
+        for idx, row_data in enumerate(excel_data):
+            try:
+                # 🔥 根据设备类型处理不同的数据格式
+                rows.append({'row': idx + 2, 'data': processor(row_data, is_metric, idx + 2)})
+            except Exception as e:
+                parse_errors.append({'row': idx + 2, 'error': str(e)})
+                logger.error(f"导入第{idx + 2}行失败: {e}")
 
-                    # 🔥 调用create_device创建设备（会自动创建相关详细表记录）
-                    device_id = self.create_device(device_data)
-                    if device_id:
-                        success_count += 1
-                        logger.info(f"导入设备成功: {device_data.get('model', '')} (ID: {device_id})")
-                    else:
-                        error_list.append({
-                            'row': idx + 2,
-                            'error': '设备创建失败'
-                        })
+        result = self.bulk_import_devices(rows)
 
-                except Exception as e:
-                    error_list.append({
-                        'row': idx + 2,
-                        'error': str(e)
-                    })
-                    logger.error(f"导入第{idx + 2}行失败: {e}")
+        if parse_errors:
+            result['errors'] = sorted(parse_errors + result['errors'], key=lambda err: err['row'])
+            result['error_count'] = len(result['errors'])
 
-            return {
-                'success_count': success_count,
-                'error_count': len(error_list),
-                'errors': error_list
-            }
-
-        except Exception as e:
-            session.rollback()
-            logger.error(f"批量导入失败: {e}")
-            raise
-
-        finally:
-            self.close_session(session)
+        return result
 
     def _parse_float(self, value: Any) -> Optional[float]:
         """安全地解析浮点数"""
@@ -2181,8 +2591,21 @@ class DatabaseService(QObject):
 
     # ========== 预测结果相关方法 ==========
 
-    def save_production_prediction(self, prediction_data: Dict[str, Any]) -> int:
-        """保存生产预测结果"""
+    def save_production_prediction(self, prediction_data: Dict[str, Any],
+                                   inputs: Optional[Dict[str, Any]] = None) -> int:
+        """
+        保存生产预测结果（内容寻址去重）
+
+        同一生产参数、相同输入、相同模型版本且结果（含IPR曲线）完全一致时，
+        不再重复保存结果行，只追加一条运行记录指向已有结果。
+
+        Args:
+            prediction_data: 预测结果字段（ProductionPrediction 列），可含 model_version
+            inputs: 生产参数以外的预测输入（如射孔/泵挂深度），参与输入哈希
+
+        Returns:
+            预测结果ID（命中去重时为已有结果的ID）
+        """
         session = self.get_session()
         try:
             # 检查参数是否存在
@@ -2190,46 +2613,137 @@ class DatabaseService(QObject):
             params = session.query(ProductionParameters).filter_by(id=params_id).first()
             if not params:
                 raise ValueError(f"生产参数不存在: ID {params_id}")
-        
-            # 创建预测记录
-            prediction = ProductionPrediction(**prediction_data)
-            session.add(prediction)
+
+            prediction_data = dict(prediction_data)
+            prediction_data.pop('created_at', None)
+            model_version = prediction_data.get('model_version')
+            input_hash = payload_hash(self._prediction_inputs(params), inputs or {})
+            content_hash = payload_hash(self._prediction_content(prediction_data))
+
+            existing_id = session.query(ProductionPrediction.id).filter(
+                ProductionPrediction.parameters_id == params_id,
+                ProductionPrediction.input_hash == input_hash,
+                ProductionPrediction.model_version == model_version,
+                ProductionPrediction.content_hash == content_hash
+            ).order_by(ProductionPrediction.id).limit(1).scalar()
+
+            if existing_id is None:
+                prediction = ProductionPrediction(
+                    **prediction_data, input_hash=input_hash, content_hash=content_hash
+                )
+                session.add(prediction)
+                session.flush()
+                prediction_id = prediction.id
+            else:
+                prediction_id = existing_id
+
+            session.add(PredictionRun(prediction_id=prediction_id, parameters_id=params_id))
             session.commit()
-        
-            logger.info(f"保存预测结果成功: ID {prediction.id}")
-            return prediction.id
-        
+
+            if existing_id is None:
+                logger.info(f"保存预测结果成功: ID {prediction_id}")
+            else:
+                logger.info(f"预测结果与已有结果相同，仅记录运行: ID {prediction_id}")
+            return prediction_id
+
         except Exception as e:
             session.rollback()
             error_msg = f"保存预测结果失败: {str(e)}"
             logger.error(error_msg)
             self.databaseError.emit(error_msg)
             raise
-        
+
         finally:
             self.close_session(session)
 
+    @staticmethod
+    def _prediction_inputs(params: ProductionParameters) -> Dict[str, Any]:
+        """参与输入哈希的生产参数字段（不含ID、版本和时间戳）"""
+        excluded = {'id', 'well_id', 'parameter_name', 'description', 'is_active', 'version',
+                    'created_at', 'updated_at', 'created_by'}
+        return {
+            column.name: getattr(params, column.key)
+            for column in ProductionParameters.__table__.columns
+            if column.name not in excluded
+        }
+
+    @staticmethod
+    def _prediction_content(prediction_data: Dict[str, Any]) -> Dict[str, Any]:
+        """参与内容哈希的预测结果字段（结果值和IPR曲线）"""
+        excluded = {'id', 'parameters_id', 'input_hash', 'model_version', 'content_hash', 'created_at'}
+        return {
+            column.name: prediction_data.get(column.key)
+            for column in ProductionPrediction.__table__.columns
+            if column.name not in excluded
+        }
+
     def get_latest_prediction(self, parameters_id: int) -> Optional[Dict[str, Any]]:
-        """获取最新的预测结果"""
+        """获取最新一次运行的预测结果"""
         session = self.get_session()
         try:
-            prediction = session.query(ProductionPrediction).filter_by(
-                parameters_id=parameters_id
-            ).order_by(ProductionPrediction.created_at.desc()).first()
-        
-            if prediction:
-                return prediction.to_dict()
+            row = session.query(PredictionRun, ProductionPrediction).join(
+                ProductionPrediction, PredictionRun.prediction_id == ProductionPrediction.id
+            ).options(
+                Load(ProductionPrediction).undefer_group(PAYLOAD_GROUP)
+            ).filter(
+                PredictionRun.parameters_id == parameters_id
+            ).order_by(PredictionRun.created_at.desc(), PredictionRun.id.desc()).first()
+
+            if row:
+                return self._prediction_run_dict(*row, include_payload=True)
             return None
-        
+
         except Exception as e:
             error_msg = f"获取预测结果失败: {str(e)}"
             logger.error(error_msg)
             self.databaseError.emit(error_msg)
             return None
-        
+
+        finally:
+            self.close_session(session)
+
+    def get_prediction_history(self, parameters_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        获取预测运行历史（不加载IPR曲线数据）
+
+        Args:
+            parameters_id: 生产参数ID
+            limit: 返回记录数限制
+
+        Returns:
+            预测结果列表（按运行时间倒序，去重后的结果可能在多次运行中重复出现）
+        """
+        session = self.get_session()
+        try:
+            rows = session.query(PredictionRun, ProductionPrediction).join(
+                ProductionPrediction, PredictionRun.prediction_id == ProductionPrediction.id
+            ).filter(
+                PredictionRun.parameters_id == parameters_id
+            ).order_by(
+                PredictionRun.created_at.desc(), PredictionRun.id.desc()
+            ).limit(limit).all()
+
+            return [self._prediction_run_dict(run, prediction, include_payload=False)
+                    for run, prediction in rows]
+
+        except Exception as e:
+            error_msg = f"获取预测历史失败: {str(e)}"
+            logger.error(error_msg)
+            self.databaseError.emit(error_msg)
+            return []
+
         finally:
             self.close_session(session)
 
+    @staticmethod
+    def _prediction_run_dict(run: PredictionRun, prediction: ProductionPrediction,
+                             include_payload: bool) -> Dict[str, Any]:
+        """预测结果字典，时间取运行时间"""
+        result = prediction.to_dict(include_payload=include_payload)
+        result['run_id'] = run.id
+        result['created_at'] = run.created_at.isoformat() if run.created_at else None
+        return result
+
     # ========== 扩展井查询方法 ==========
 
     def get_well_with_production_params(self, well_id: int) -> Optional[Dict[str, Any]]:
@@ -2315,51 +2829,43 @@ class DatabaseService(QObject):
 
     # ========== 泵性能曲线相关方法 ==========
 
+    def _query_curve_blob(self, session: Session, pump_id: str, active_only: bool = True) -> Optional[PumpCurveBlob]:
+        """按泵型号查询曲线版本（单次索引查找）：活跃版本优先，其次最新版本"""
+        query = session.query(PumpCurveBlob).filter_by(pump_id=pump_id)
+        if active_only:
+            query = query.filter_by(is_active=True)
+        return query.order_by(PumpCurveBlob.is_active.desc(), PumpCurveBlob.id.desc()).first()
+
     def get_pump_curves(self, pump_id: str, active_only: bool = True) -> Dict[str, List]:
         """
         获取泵性能曲线数据
     
         Args:
             pump_id: 泵型号ID
-            active_only: 是否只获取活跃版本数据
+            active_only: 是否只获取活跃版本数据；为False时活跃版本不存在则返回最新版本
     
         Returns:
             包含曲线数据的字典
         """
+        empty_result = {
+            'flow': [],
+            'head': [],
+            'power': [],
+            'efficiency': [],
+            'standard_frequency': 60.0
+        }
+
         session = self.get_session()
         try:
-            logger.info(f"{pump_id}")
-            query = session.query(PumpCurveData).filter_by(pump_id=pump_id)
-            if active_only:
-                query = query.filter_by(is_active=True)
-            
-            # 不需要orderby
-            # 因为我们会在后续处理时按流量排序
-            curves = query.all()
-            logger.info(f"获取泵 {pump_id} 的性能曲线数据，{curves}")
-            # curves = query.order_by(PumpCurveData.flow_rate).all()
+            curve = self._query_curve_blob(session, pump_id, active_only)
         
-            if not curves:
+            if curve is None:
                 # 如果没有找到数据，返回空结构，让控制器生成模拟数据
                 logger.warning(f"未找到泵 {pump_id} 的性能曲线数据")
-                return {
-                    'flow': [],
-                    'head': [],
-                    'power': [],
-                    'efficiency': [],
-                    'standard_frequency': 60.0
-                }
+                return empty_result
         
-            # 提取曲线数据
-            result = {
-                'flow': [curve.flow_rate for curve in curves],
-                'head': [curve.head for curve in curves],
-                'power': [curve.power for curve in curves],
-                'efficiency': [curve.efficiency for curve in curves],
-                'standard_frequency': curves[0].standard_frequency
-            }
-        
-            logger.info(f"获取泵曲线数据成功: {pump_id}, 共{len(curves)}个点")
+            result = curve.to_curve_dict()
+            logger.info(f"获取泵曲线数据成功: {pump_id}, 共{curve.point_count}个点")
             return result
         
         except Exception as e:
@@ -2367,17 +2873,49 @@ class DatabaseService(QObject):
             logger.error(error_msg)
             self.databaseError.emit(error_msg)
             # 返回空数据结构而不是抛出异常
-            return {
-                'flow': [],
-                'head': [],
-                'power': [],
-                'efficiency': [],
-                'standard_frequency': 60.0
-            }
+            return empty_result
     
         finally:
             self.close_session(session)
 
+    def get_pump_curve_arrays(self, pump_id: str, active_only: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        获取泵性能曲线的NumPy数组（零拷贝解码，供数值计算使用）
+    
+        Returns:
+            {'flow', 'head', 'power', 'efficiency': np.ndarray(只读), 'standard_frequency'}，无数据返回None
+        """
+        session = self.get_session()
+        try:
+            curve = self._query_curve_blob(session, pump_id, active_only)
+            if curve is None:
+                return None
+            result = curve.to_arrays()
+            result['standard_frequency'] = curve.standard_frequency
+            return result
+        finally:
+            self.close_session(session)
+
+    def _write_curve_blob(self, session: Session, pump_id: str, curve_data: Dict[str, Any],
+                          standard_frequency: float = 60.0, data_source: str = 'manual_input',
+                          version: str = '1.0', dtype: str = '<f8') -> PumpCurveBlob:
+        """在当前事务中写入新的曲线版本（旧版本标记为非活跃）"""
+        session.query(PumpCurveBlob).filter_by(pump_id=pump_id, is_active=True)\
+               .update({'is_active': False}, synchronize_session=False)
+
+        curve = PumpCurveBlob(
+            pump_id=pump_id,
+            point_count=len(curve_data['flow']),
+            dtype=dtype,
+            standard_frequency=standard_frequency,
+            data_source=data_source,
+            version=version,
+            is_active=True,
+            **{name: pack_series(curve_data[name], dtype) for name in PumpCurveBlob.SERIES}
+        )
+        session.add(curve)
+        return curve
+
     def save_pump_curves(self, pump_id: str, curve_data: Dict[str, Any]) -> bool:
         """
         保存泵性能曲线数据
@@ -2403,30 +2941,13 @@ class DatabaseService(QObject):
                 if len(curve_data[field]) != data_length:
                     raise ValueError(f"数据长度不一致: {field}")
         
-            # 将旧版本标记为非活跃
-            session.query(PumpCurveData).filter_by(
-                pump_id=pump_id,
-                is_active=True
-            ).update({'is_active': False})
-        
-            # 保存新数据
-            standard_frequency = curve_data.get('standard_frequency', 60.0)
-            data_source = curve_data.get('data_source', 'manual_input')
-            version = curve_data.get('version', '1.0')
-        
-            for i in range(data_length):
-                curve_point = PumpCurveData(
-                    pump_id=pump_id,
-                    flow_rate=curve_data['flow'][i],
-                    head=curve_data['head'][i],
-                    power=curve_data['power'][i],
-                    efficiency=curve_data['efficiency'][i],
-                    standard_frequency=standard_frequency,
-                    data_source=data_source,
-                    version=version,
-                    is_active=True
-                )
-                session.add(curve_point)
+            # 保存新版本（单行打包存储），旧版本标记为非活跃
+            self._write_curve_blob(
+                session, pump_id, curve_data,
+                standard_frequency=curve_data.get('standard_frequency', 60.0),
+                data_source=curve_data.get('data_source', 'manual_input'),
+                version=curve_data.get('version', '1.0')
+            )
         
             session.commit()
         
@@ -2455,32 +2976,14 @@ class DatabaseService(QObject):
         """
         session = self.get_session()
         try:
-            params = session.query(PumpEnhancedParameters).filter_by(
-                pump_id=pump_id
-            ).order_by(PumpEnhancedParameters.flow_point).all()
+            blob = session.query(PumpEnhancedParameterBlob).filter_by(pump_id=pump_id).first()
         
-            if not params:
+            if blob is None:
                 logger.warning(f"未找到泵 {pump_id} 的增强参数数据")
                 return {}
         
-            # 按参数类型组织数据
-            result = {}
-            param_fields = [
-                'npsh_required', 'temperature_rise', 'vibration_level',
-                'noise_level', 'wear_rate', 'radial_load', 'axial_thrust',
-                'material_stress', 'energy_efficiency_ratio', 'cavitation_margin',
-                'stability_score'
-            ]
-        
-            for field in param_fields:
-                values = []
-                for param in params:
-                    value = getattr(param, field)
-                    if value is not None:
-                        values.append(value)
-            
-                if values:  # 只添加有数据的字段
-                    result[field] = values
+            # 按参数类型组织数据（只包含有数据的字段）
+            result = blob.to_series_dict()
         
             logger.info(f"获取增强参数成功: {pump_id}, 共{len(result)}类参数")
             return result
@@ -2593,13 +3096,143 @@ class DatabaseService(QObject):
             self.databaseError.emit(error_msg)
             return False
 
+    def migrate_legacy_pump_curves(self) -> Dict[str, int]:
+        """
+        一次性迁移：将逐点存储的 pump_curve_data / pump_enhanced_parameters 转为打包存储
+
+        每台泵的曲线和增强参数分别在独立事务中迁移，单台泵失败只回滚该泵；
+        旧表数值列中混入的文本按缺失值处理（曲线点缺少数值时跳过该点）。
+        全部迁移成功后在 migration_log 中写入完成标记，之后启动直接跳过；
+        有失败时不写标记，下次启动只重试尚未迁移的泵。旧表数据保留不删除。
+
+        Returns:
+            {'curve_versions': 迁移的曲线版本数, 'enhanced_pumps': 迁移的增强参数泵数,
+             'skipped_points': 跳过的曲线点数, 'failed_pumps': 迁移失败的泵数}
+        """
+        migrated = {'curve_versions': 0, 'enhanced_pumps': 0, 'skipped_points': 0, 'failed_pumps': 0}
+        session = self.get_session()
+        try:
+            if session.query(MigrationLog.id).filter_by(
+                    migration_name=PUMP_CURVE_MIGRATION, status='completed').first():
+                return migrated
+
+            curve_pumps = [pump_id for (pump_id,) in session.query(PumpCurveData.pump_id).distinct()]
+            enhanced_pumps = [pump_id for (pump_id,) in session.query(PumpEnhancedParameters.pump_id).distinct()]
+            done_enhanced = {pump_id for (pump_id,) in session.query(PumpEnhancedParameterBlob.pump_id)}
+            # 只有示例曲线的泵仍需迁移（示例数据曾在迁移失败后被写入）
+            blob_sources: Dict[str, set] = {}
+            for pump_id, data_source in session.query(PumpCurveBlob.pump_id, PumpCurveBlob.data_source):
+                blob_sources.setdefault(pump_id, set()).add(data_source)
+
+            for pump_id in curve_pumps:
+                sources = blob_sources.get(pump_id)
+                if sources and sources != {'sample_data'}:
+                    continue
+                try:
+                    if sources:
+                        session.query(PumpCurveBlob).filter_by(pump_id=pump_id).delete()
+                    versions, skipped = self._migrate_pump_curve(session, pump_id)
+                    session.commit()
+                    migrated['curve_versions'] += versions
+                    migrated['skipped_points'] += skipped
+                except Exception as e:
+                    session.rollback()
+                    migrated['failed_pumps'] += 1
+                    logger.error(f"迁移泵曲线失败: {pump_id}: {e}")
+
+            for pump_id in enhanced_pumps:
+                if pump_id in done_enhanced:
+                    continue
+                try:
+                    self._migrate_pump_enhanced(session, pump_id)
+                    session.commit()
+                    migrated['enhanced_pumps'] += 1
+                except Exception as e:
+                    session.rollback()
+                    migrated['failed_pumps'] += 1
+                    logger.error(f"迁移泵增强参数失败: {pump_id}: {e}")
+
+            if migrated['failed_pumps']:
+                logger.warning(f"泵曲线打包存储迁移部分失败，下次启动重试: {migrated}")
+            else:
+                session.add(MigrationLog(migration_name=PUMP_CURVE_MIGRATION, status='completed',
+                                         description=f"泵曲线与增强参数转为打包存储: {migrated}"))
+                session.commit()
+                if migrated['curve_versions'] or migrated['enhanced_pumps']:
+                    logger.info(f"泵曲线打包存储迁移完成: {migrated}")
+            return migrated
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"泵曲线打包存储迁移失败: {str(e)}")
+            return migrated
+
+        finally:
+            self.close_session(session)
+
+    @staticmethod
+    def _legacy_float(value) -> Optional[float]:
+        """旧表数值列中可能混入文本：能转换的转为浮点数，否则视为缺失"""
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    def _migrate_pump_curve(self, session, pump_id: str):
+        """迁移一台泵的逐点曲线，返回 (曲线版本数, 跳过的点数)"""
+        # 同一版本、同一活跃状态、同一来源的点组成一个曲线版本，按写入顺序保持点序
+        versions: Dict[tuple, list] = {}
+        skipped = 0
+        for point in session.query(PumpCurveData).filter_by(pump_id=pump_id).order_by(PumpCurveData.id):
+            values = [self._legacy_float(getattr(point, name))
+                      for name in ('flow_rate', 'head', 'power', 'efficiency')]
+            if None in values:
+                skipped += 1
+                continue
+            key = (point.version, bool(point.is_active), point.data_source)
+            versions.setdefault(key, []).append((point, values))
+
+        # 非活跃版本先写入，保证活跃版本ID最大
+        for (version, is_active, data_source), points in sorted(
+                versions.items(), key=lambda item: (item[0][1], item[1][0][0].id)):
+            first = points[0][0]
+            session.add(PumpCurveBlob(
+                pump_id=pump_id,
+                point_count=len(points),
+                dtype='<f8',
+                **{name: pack_series((values[column] for _, values in points), '<f8')
+                   for column, name in enumerate(PumpCurveBlob.SERIES)},
+                standard_frequency=self._legacy_float(first.standard_frequency) or 60.0,
+                data_source=data_source,
+                version=version,
+                is_active=is_active,
+                created_at=first.created_at
+            ))
+        if skipped:
+            logger.warning(f"泵 {pump_id} 有 {skipped} 个曲线点含非数值，已跳过")
+        return len(versions), skipped
+
+    def _migrate_pump_enhanced(self, session, pump_id: str):
+        """迁移一台泵的逐点增强参数（非数值按缺失处理）"""
+        rows = []
+        for param in session.query(PumpEnhancedParameters).filter_by(pump_id=pump_id).order_by(
+                PumpEnhancedParameters.id):
+            row = {name: self._legacy_float(getattr(param, name)) for name in PumpEnhancedParameterBlob.SERIES}
+            row.update(data_quality=param.data_quality, measurement_date=param.measurement_date, notes=param.notes)
+            rows.append(row)
+        session.add(self._build_enhanced_blob(pump_id, rows))
+
     def _initialize_sample_pump_data(self):
-        """初始化示例泵数据"""
+        """初始化示例泵数据（只用于全新数据库：已有曲线或旧表数据时不写入）"""
+        # 先迁移旧版逐点存储的曲线
+        self.migrate_legacy_pump_curves()
+
         session = self.get_session()
         try:
-            # 检查是否已有数据
-            existing_count = session.query(PumpCurveData).count()
-            if existing_count > 0:
+            # 检查是否已有数据（旧表有数据但迁移未完成时也不写入示例，避免掩盖真实曲线）
+            if session.query(PumpCurveBlob.id).first() or session.query(PumpCurveData.id).first():
                 logger.info("泵曲线数据已存在，跳过初始化")
                 return
         
@@ -2633,32 +3266,29 @@ class DatabaseService(QObject):
         params = base_params.get(pump_id, {'max_flow': 4000, 'max_head': 400, 'efficiency_peak': 70})
     
         # 生成21个曲线点
-        for i in range(21):
-            flow_ratio = i / 20
-            flow = params['max_flow'] * flow_ratio
-        
-            # 扬程曲线
-            head = params['max_head'] * (1 - 0.8 * (flow_ratio ** 1.8))
-        
-            # 效率曲线
-            efficiency = params['efficiency_peak'] * np.exp(-((flow_ratio - 0.6) / 0.25) ** 2)
-        
-            # 功率曲线
-            power = flow * head * 1.2 / (3600 * max(efficiency, 10) / 100)
-        
-            # 创建数据记录
-            curve_point = PumpCurveData(
-                pump_id=pump_id,
-                flow_rate=flow,
-                head=max(head, 0),
-                power=max(power, 0),
-                efficiency=max(efficiency, 0),
-                standard_frequency=60.0,
-                data_source='sample_data',
-                version='1.0',
-                is_active=True
-            )
-            session.add(curve_point)
+        flow_ratio = np.linspace(0.0, 1.0, 21)
+        flow = params['max_flow'] * flow_ratio
+    
+        # 扬程曲线
+        head = params['max_head'] * (1 - 0.8 * (flow_ratio ** 1.8))
+    
+        # 效率曲线
+        efficiency = params['efficiency_peak'] * np.exp(-((flow_ratio - 0.6) / 0.25) ** 2)
+    
+        # 功率曲线
+        power = flow * head * 1.2 / (3600 * np.maximum(efficiency, 10) / 100)
+    
+        self._write_curve_blob(
+            session, pump_id,
+            {
+                'flow': flow,
+                'head': np.maximum(head, 0),
+                'power': np.maximum(power, 0),
+                'efficiency': np.maximum(efficiency, 0),
+            },
+            standard_frequency=60.0,
+            data_source='sample_data'
+        )
 
     # ========== 阶段2: 增强参数和预测相关方法 ==========
 
@@ -2675,16 +3305,16 @@ class DatabaseService(QObject):
         """
         session = self.get_session()
         try:
-            # 删除现有数据
-            session.query(PumpEnhancedParameters).filter_by(pump_id=pump_id).delete()
-        
-            # 保存新数据
+            # 校验字段（与ORM构造时的检查保持一致）
+            valid_columns = set(PumpEnhancedParameters.__table__.columns.keys())
             for data in enhanced_data:
-                enhanced_param = PumpEnhancedParameters(
-                    pump_id=pump_id,
-                    **data
-                )
-                session.add(enhanced_param)
+                invalid = set(data) - valid_columns
+                if invalid:
+                    raise ValueError(f"无效的增强参数字段: {sorted(invalid)}")
+
+            # 替换现有数据（单行打包存储）
+            session.query(PumpEnhancedParameterBlob).filter_by(pump_id=pump_id).delete()
+            session.add(self._build_enhanced_blob(pump_id, enhanced_data))
         
             session.commit()
             logger.info(f"保存增强参数成功: {pump_id}, 共{len(enhanced_data)}个点")
@@ -2700,6 +3330,20 @@ class DatabaseService(QObject):
         finally:
             self.close_session(session)
 
+    @staticmethod
+    def _build_enhanced_blob(pump_id: str, enhanced_data: List[Dict[str, Any]]) -> PumpEnhancedParameterBlob:
+        """由逐点参数构建增强参数打包记录"""
+        first = enhanced_data[0] if enhanced_data else {}
+        return PumpEnhancedParameterBlob(
+            pump_id=pump_id,
+            point_count=len(enhanced_data),
+            dtype='<f8',
+            data=PumpEnhancedParameterBlob.pack_rows(enhanced_data, '<f8'),
+            data_quality=first.get('data_quality', 'estimated'),
+            measurement_date=first.get('measurement_date'),
+            notes=first.get('notes')
+        )
+
     def save_performance_prediction(self, prediction_data: Dict) -> Dict:
         """保存性能预测数据"""
         try:
@@ -2713,12 +3357,12 @@ class DatabaseService(QObject):
                     base_power=prediction_data.get('base_power'),
                     base_flow=prediction_data.get('base_flow'),
                     base_head=prediction_data.get('base_head'),
-                    # 🔥 修复：使用json.dumps序列化复杂数据
-                    annual_predictions=json.dumps(prediction_data.get('annual_predictions', [])),
-                    wear_progression=json.dumps(prediction_data.get('wear_progression', [])),
-                    maintenance_schedule=json.dumps(prediction_data.get('maintenance_schedule', [])),
-                    lifecycle_cost=json.dumps(prediction_data.get('lifecycle_cost', {})),
-                    performance_degradation=json.dumps(prediction_data.get('performance_degradation', {})),
+                    # 复杂数据由PackedJSON列类型编码
+                    annual_predictions=prediction_data.get('annual_predictions', []),
+                    wear_progression=prediction_data.get('wear_progression', []),
+                    maintenance_schedule=prediction_data.get('maintenance_schedule', []),
+                    lifecycle_cost=prediction_data.get('lifecycle_cost', {}),
+                    performance_degradation=prediction_data.get('performance_degradation', {}),
                     wear_model=prediction_data.get('wear_model', 'exponential'),
                     efficiency_degradation_rate=prediction_data.get('efficiency_degradation_rate', 0.02),
                     maintenance_cost_base=prediction_data.get('maintenance_cost_base', 5000.0),
@@ -2754,7 +3398,7 @@ class DatabaseService(QObject):
         """
         session = self.get_session()
         try:
-            query = session.query(DevicePerformancePrediction)
+            query = session.query(DevicePerformancePrediction).options(undefer_group(PAYLOAD_GROUP))
         
             if device_id:
                 query = query.filter_by(device_id=device_id)
@@ -2920,16 +3564,7 @@ class DatabaseService(QObject):
         """
         session = self.get_session()
         try:
-            # 处理JSON字段
-            json_fields = ['base_condition', 'comparison_conditions', 'comparison_parameters',
-                          'performance_metrics', 'efficiency_comparison', 'power_comparison',
-                          'cost_comparison', 'reliability_analysis', 'recommendations',
-                          'optimal_condition', 'risk_assessment', 'weight_factors', 'evaluation_criteria']
-        
-            for field in json_fields:
-                if field in comparison_data and isinstance(comparison_data[field], (dict, list)):
-                    comparison_data[field] = json.dumps(comparison_data[field])
-        
+            # JSON字段（dict/list）由PackedJSON列类型直接编码
             comparison = PumpConditionComparison(**comparison_data)
             session.add(comparison)
             session.commit()
@@ -2947,13 +3582,15 @@ class DatabaseService(QObject):
         finally:
             self.close_session(session)
 
-    def get_condition_comparisons(self, pump_id: str = None, project_id: int = None) -> List[Dict[str, Any]]:
+    def get_condition_comparisons(self, pump_id: str = None, project_id: int = None,
+                                  include_payload: bool = False) -> List[Dict[str, Any]]:
         """
         获取工况对比记录
     
         Args:
             pump_id: 泵型号ID
             project_id: 项目ID
+            include_payload: 是否加载对比结果等JSON载荷（列表默认不加载）
     
         Returns:
             对比记录列表
@@ -2961,6 +3598,8 @@ class DatabaseService(QObject):
         session = self.get_session()
         try:
             query = session.query(PumpConditionComparison)
+            if include_payload:
+                query = query.options(undefer_group(PAYLOAD_GROUP))
         
             if pump_id:
                 query = query.filter_by(pump_id=pump_id)
@@ -2968,7 +3607,7 @@ class DatabaseService(QObject):
                 query = query.filter_by(project_id=project_id)
         
             comparisons = query.order_by(PumpConditionComparison.created_at.desc()).all()
-            return [comp.to_dict() for comp in comparisons]
+            return [comp.to_dict(include_payload=include_payload) for comp in comparisons]
         
         except Exception as e:
             error_msg = f"获取工况对比失败: {str(e)}"
@@ -3197,7 +3836,10 @@ class DatabaseService(QObject):
             start_date = end_date - timedelta(days=days)
         
             # 获取性能预测历史记录
-            predictions = session.query(DevicePerformancePrediction).filter(
+            # 只需要年度预测数据，其余载荷列不加载
+            predictions = session.query(DevicePerformancePrediction).options(
+                undefer(DevicePerformancePrediction.annual_predictions)
+            ).filter(
                 DevicePerformancePrediction.pump_id == pump_id,
                 DevicePerformancePrediction.created_at >= start_date
             ).order_by(DevicePerformancePrediction.created_at).all()
@@ -3257,13 +3899,13 @@ class DatabaseService(QObject):
             predictions = session.query(DevicePerformancePrediction).filter_by(
                 pump_id=pump_id
             ).order_by(DevicePerformancePrediction.created_at.desc()).limit(5).all()
-            analysis_data['performance_predictions'] = [pred.to_dict() for pred in predictions]
+            analysis_data['performance_predictions'] = [pred.to_dict(include_payload=False) for pred in predictions]
         
             # 工况对比
             comparisons = session.query(PumpConditionComparison).filter_by(
                 pump_id=pump_id
             ).order_by(PumpConditionComparison.created_at.desc()).limit(5).all()
-            analysis_data['condition_comparisons'] = [comp.to_dict() for comp in comparisons]
+            analysis_data['condition_comparisons'] = [comp.to_dict(include_payload=False) for comp in comparisons]
         
             # 维护记录
             analysis_data['maintenance_records'] = self.get_maintenance_records(pump_id=pump_id, limit=10)
@@ -3304,7 +3946,6 @@ class DatabaseService(QObject):
 
         try:
             query = session.query(Device).filter(Device.is_deleted == False)
-            devices_temp = query.all()
 
             if device_type:
                 try:
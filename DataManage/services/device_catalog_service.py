@@ -0,0 +1,507 @@
+# DataManage/services/device_catalog_service.py
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from DataManage.models.device import (
+    Device, DeviceType, LiftMethod, DevicePump, DeviceMotor, MotorFrequencyParam,
+    DeviceProtector, DeviceSeparator
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _DetailSpec(NamedTuple):
+    model: Any              # 详情表模型
+    key: str                # to_dict 中的详情键
+    numeric: Tuple[str, ...]
+    strings: Tuple[str, ...]
+
+
+# 设备基础表的字符串列（以字符串表编码存储）
+_BASE_STRING_FIELDS = ('manufacturer', 'model', 'serial_number', 'status', 'lift_method',
+                       'description', 'created_at', 'updated_at')
+
+# 每种设备类型的详情列
+_DETAIL_SPECS = {
+    DeviceType.PUMP: _DetailSpec(
+        DevicePump, 'pump_details',
+        ('displacement_min', 'displacement_max', 'single_stage_head', 'single_stage_power',
+         'shaft_diameter', 'mounting_height', 'outside_diameter', 'max_stages', 'efficiency'),
+        ('impeller_model',)),
+    DeviceType.MOTOR: _DetailSpec(
+        DeviceMotor, 'motor_details',
+        ('outside_diameter', 'length', 'weight'),
+        ('motor_type', 'insulation_class', 'protection_class')),
+    DeviceType.PROTECTOR: _DetailSpec(
+        DeviceProtector, 'protector_details',
+        ('outer_diameter', 'length', 'weight', 'thrust_capacity', 'max_temperature'),
+        ('seal_type',)),
+    DeviceType.SEPARATOR: _DetailSpec(
+        DeviceSeparator, 'separator_details',
+        ('outer_diameter', 'length', 'weight', 'separation_efficiency',
+         'gas_handling_capacity', 'liquid_handling_capacity'),
+        ()),
+}
+
+# to_dict 输出为整数的数值列
+_INTEGER_FIELDS = frozenset({'max_stages', 'frequency', 'speed'})
+
+# 电机派生列：主参数功率（50Hz优先，其次60Hz，再次第一条）和第一条频率参数功率
+_MOTOR_DERIVED_FIELDS = ('power_main', 'power_first')
+
+# 电机频率参数表（按 device_id, frequency, param_id 排序，与关系加载经 idx_motor_freq_motor 的顺序一致）
+_FREQUENCY_FIELDS = ('frequency', 'power', 'voltage', 'current', 'speed')
+_FREQUENCY_DTYPE = np.dtype([('device_id', '<i8'), ('param_id', '<i8')] +
+                            [(name, '<f8') for name in _FREQUENCY_FIELDS])
+
+# 制造商信誉加分（小写名称）
+MANUFACTURER_WEIGHTS = {
+    'schlumberger': 0.1,
+    'baker hughes': 0.1,
+    'halliburton': 0.1,
+    'weatherford': 0.05,
+    'novomet': 0.05,
+}
+
+
+def _row_dtype(device_type: DeviceType) -> np.dtype:
+    spec = _DETAIL_SPECS[device_type]
+    fields = [('id', '<i8'), ('created_ts', '<f8'), ('detail_id', '<i8')]
+    fields += [(name, '<i4') for name in _BASE_STRING_FIELDS + spec.strings]
+    fields += [(name, '<f8') for name in spec.numeric]
+    if device_type == DeviceType.MOTOR:
+        fields += [(name, '<f8') for name in _MOTOR_DERIVED_FIELDS]
+    return np.dtype(fields)
+
+
+def coerce_device_type(value) -> DeviceType:
+    """设备类型（枚举、名称或值）转换为DeviceType"""
+    if isinstance(value, DeviceType):
+        return value
+    text_value = str(value).strip()
+    try:
+        return DeviceType(text_value.lower())
+    except ValueError:
+        return DeviceType[text_value.upper()]
+
+
+def _plain(value: float, integer: bool = False):
+    """数组元素转换回Python值（NaN为None）"""
+    if value != value:
+        return None
+    return int(value) if integer else value
+
+
+class _StringTable:
+    """字符串表：编码0为None；只追加，读取方持有的编码始终有效"""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = [None]
+        self._codes: Dict[Optional[str], int] = {None: 0}
+
+    def encode(self, value: Optional[str]) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code_of(self, value: Optional[str]) -> Optional[int]:
+        return self._codes.get(value)
+
+
+class CatalogTable:
+    """
+    单一设备类型的列式快照
+
+    数值列为NumPy结构化数组（NULL为NaN），字符串列存为字符串表编码；
+    行顺序与 get_devices 一致（创建时间倒序）。快照不可变，刷新时整体替换，
+    读取方持有的引用不受并发刷新影响。
+    """
+
+    def __init__(self, device_type: DeviceType, rows: np.ndarray, strings: _StringTable,
+                 frequency: Optional[np.ndarray] = None):
+        self.device_type = device_type
+        self.spec = _DETAIL_SPECS[device_type]
+        self.rows = rows
+        self.strings = strings
+        self.frequency = frequency
+
+    def __len__(self):
+        return len(self.rows)
+
+    def column(self, name: str) -> np.ndarray:
+        """数值列（或字符串列的编码）"""
+        return self.rows[name]
+
+    def decode(self, name: str, indices=None) -> List[Optional[str]]:
+        """字符串列解码"""
+        codes = self.rows[name] if indices is None else self.rows[name][indices]
+        values = self.strings.values
+        return [values[code] for code in codes.tolist()]
+
+    def lookup(self, name: str, func: Callable[[Optional[str]], float], default: float = 0.0) -> np.ndarray:
+        """对字符串列逐个不同取值求值后展开为数值列（每个不同字符串只计算一次）"""
+        codes, inverse = np.unique(self.rows[name], return_inverse=True)
+        values = self.strings.values
+        table = np.array([default if values[code] is None else func(values[code]) for code in codes.tolist()],
+                         dtype=float)
+        return table[inverse.reshape(-1)]
+
+    def mask(self, status: Optional[str] = None, lift_method: Optional[str] = None) -> np.ndarray:
+        """按状态、举升方式筛选的布尔掩码"""
+        mask = np.ones(len(self.rows), dtype=bool)
+        if status:
+            mask &= self._equals('status', status)
+        if lift_method:
+            try:
+                value = LiftMethod(str(lift_method).lower()).value
+            except ValueError:
+                logger.warning(f"无效的举升方式: {lift_method}")
+            else:
+                mask &= self._equals('lift_method', value)
+        return mask
+
+    def _equals(self, name: str, value: str) -> np.ndarray:
+        code = self.strings.code_of(value)
+        if code is None:
+            return np.zeros(len(self.rows), dtype=bool)
+        return self.rows[name] == code
+
+    def select(self, status: Optional[str] = 'active', lift_method: Optional[str] = None) -> np.ndarray:
+        """筛选后的行号（保持列表顺序）"""
+        return np.flatnonzero(self.mask(status, lift_method))
+
+    def index_of(self, device_id: int) -> int:
+        """设备ID对应的行号，不存在返回-1"""
+        found = np.flatnonzero(self.rows['id'] == device_id)
+        return int(found[0]) if len(found) else -1
+
+    def frequency_params(self, device_id: int) -> List[Dict[str, Any]]:
+        """电机的频率参数（与 Device.to_dict 的 frequency_params 一致）"""
+        if self.frequency is None:
+            return []
+        ids = self.frequency['device_id']
+        start, end = np.searchsorted(ids, device_id, 'left'), np.searchsorted(ids, device_id, 'right')
+        return [
+            {name: _plain(value, name in _INTEGER_FIELDS) for name, value in zip(_FREQUENCY_FIELDS, row)}
+            for row in self.frequency[list(_FREQUENCY_FIELDS)][start:end].tolist()
+        ]
+
+    def records(self, indices: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """
+        将指定行转换为与 Device.to_dict() 相同结构的字典
+
+        只应对最终需要返回给QML的少量行调用；筛选和打分请直接使用列数组。
+        """
+        rows = self.rows if indices is None else self.rows[np.asarray(indices, dtype=np.intp)]
+        count = len(rows)
+        if not count:
+            return []
+
+        values = self.strings.values
+        columns = {
+            name: [values[code] for code in rows[name].tolist()]
+            for name in _BASE_STRING_FIELDS + self.spec.strings
+        }
+        for name in self.spec.numeric:
+            integer = name in _INTEGER_FIELDS
+            columns[name] = [_plain(value, integer) for value in rows[name].tolist()]
+        ids = rows['id'].tolist()
+        detail_ids = rows['detail_id'].tolist()
+        device_type = self.device_type.value
+
+        records = []
+        for i in range(count):
+            record = {
+                'id': ids[i],
+                'device_type': device_type,
+                'manufacturer': columns['manufacturer'][i],
+                'lift_method': columns['lift_method'][i],
+                'model': columns['model'][i],
+                'serial_number': columns['serial_number'][i],
+                'status': columns['status'][i],
+                'description': columns['description'][i],
+                'created_at': columns['created_at'][i],
+                'updated_at': columns['updated_at'][i],
+            }
+            if detail_ids[i] >= 0:
+                if self.device_type == DeviceType.MOTOR:
+                    details = {name: columns[name][i] for name in
+                               ('motor_type', 'outside_diameter', 'length', 'weight',
+                                'insulation_class', 'protection_class')}
+                    details['frequency_params'] = self.frequency_params(ids[i])
+                else:
+                    details = {'id': detail_ids[i]}
+                    for name in self.spec.strings + self.spec.numeric:
+                        details[name] = columns[name][i]
+                record[self.spec.key] = details
+            records.append(record)
+        return records
+
+
+def _first_row_per_device(ids: np.ndarray, frequency: np.ndarray, selector: Optional[np.ndarray]) -> np.ndarray:
+    """每台电机在频率参数表中第一条（满足selector的）记录的行号，没有则为-1"""
+    result = np.full(len(ids), -1, dtype=np.intp)
+    candidates = np.arange(len(frequency)) if selector is None else np.flatnonzero(selector)
+    if not len(candidates) or not len(ids):
+        return result
+
+    device_ids, first = np.unique(frequency['device_id'][candidates], return_index=True)
+    order = np.argsort(ids)
+    positions = np.searchsorted(ids, device_ids, sorter=order)
+    in_range = positions < len(ids)
+    positions, device_ids, first = positions[in_range], device_ids[in_range], first[in_range]
+    matched = ids[order[positions]] == device_ids
+    result[order[positions[matched]]] = candidates[first[matched]]
+    return result
+
+
+def _derive_motor_columns(rows: np.ndarray, frequency: np.ndarray):
+    """计算电机派生列（与 getMotorsByType / 知识图谱的主参数选择规则一致）"""
+    ids = rows['id']
+    first = _first_row_per_device(ids, frequency, None)
+    at_50 = _first_row_per_device(ids, frequency, frequency['frequency'] == 50)
+    at_60 = _first_row_per_device(ids, frequency, frequency['frequency'] == 60)
+    main = np.where(at_50 >= 0, at_50, np.where(at_60 >= 0, at_60, first))
+
+    power = np.append(frequency['power'], np.nan)   # 行号-1 取到末尾的NaN
+    rows['power_main'] = power[main]
+    rows['power_first'] = power[first]
+
+
+def _ordered(rows: np.ndarray) -> np.ndarray:
+    """按创建时间倒序、ID倒序排列（与 get_devices 的排序一致）"""
+    return rows[np.lexsort((-rows['id'], -rows['created_ts']))]
+
+
+class DeviceCatalogService:
+    """
+    设备目录快照服务 - 选型查询使用的内存列式设备目录
+
+    每种设备类型首次访问时整体加载一次，之后按设备增删改信号逐条刷新；
+    批量导入等没有逐条信号的写入使对应快照失效，下次访问时重新加载。
+    选型步骤和知识图谱的筛选、打分直接在列数组上做向量化计算，
+    只对最终结果构造字典。
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._tables: Dict[DeviceType, CatalogTable] = {}
+        self._lock = threading.RLock()
+        self._covered_by_device_signal = False
+        self._listeners: List[Callable[[Optional[DeviceType], Optional[int]], None]] = []
+
+    def connect_signals(self, db_service):
+        """连接 DatabaseService 的设备信号"""
+        db_service.deviceCreated.connect(self._on_device_changed)
+        db_service.deviceUpdated.connect(self._on_device_changed)
+        db_service.deviceDeleted.connect(self._on_device_changed)
+        db_service.deviceListUpdated.connect(self._on_device_list_updated)
+
+    def add_listener(self, callback: Callable[[Optional[DeviceType], Optional[int]], None]):
+        """
+        订阅快照变化：callback(设备类型, 设备ID)
+
+        单台设备刷新后以其类型和ID调用；快照整体失效时设备ID为None（类型为None表示全部类型）。
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, device_type: Optional[DeviceType], device_id: Optional[int]):
+        for callback in list(self._listeners):
+            try:
+                callback(device_type, device_id)
+            except Exception as e:
+                logger.error(f"设备目录快照监听器执行失败: {e}")
+
+    # ========== 读取 ==========
+
+    def table(self, device_type) -> CatalogTable:
+        """设备类型的当前快照（首次访问时加载）"""
+        device_type = coerce_device_type(device_type)
+        table = self._tables.get(device_type)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(device_type)
+                if table is None:
+                    table = self._tables[device_type] = self._load_table(device_type)
+        return table
+
+    def select(self, device_type, status: Optional[str] = 'active',
+               lift_method: Optional[str] = None) -> Tuple[CatalogTable, np.ndarray]:
+        """筛选设备，返回 (快照, 行号)；同一快照上的行号始终有效"""
+        table = self.table(device_type)
+        return table, table.select(status, lift_method)
+
+    def get_devices(self, device_type, status: Optional[str] = 'active',
+                    lift_method: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """筛选设备并转换为 to_dict 结构的列表（不分页，覆盖完整目录）"""
+        table, indices = self.select(device_type, status, lift_method)
+        return table.records(indices[:limit] if limit else indices)
+
+    def snapshot(self) -> Dict[DeviceType, CatalogTable]:
+        """全部设备类型的当前快照（可序列化，供进程池子进程构造只读目录）"""
+        return {device_type: self.table(device_type) for device_type in DeviceType}
+
+    @classmethod
+    def frozen(cls, tables: Dict[DeviceType, CatalogTable]) -> 'DeviceCatalogService':
+        """由 snapshot() 的结果构造只读目录（不连接数据库，不接收设备信号）"""
+        catalog = cls(None)
+        catalog._tables = dict(tables)
+        return catalog
+
+    def invalidate(self, device_type=None):
+        """使快照失效，下次访问时重新加载"""
+        with self._lock:
+            if device_type is None:
+                self._tables.clear()
+            else:
+                device_type = coerce_device_type(device_type)
+                self._tables.pop(device_type, None)
+            self._notify(device_type, None)
+
+    # ========== 加载 ==========
+
+    def _select_rows(self, conn, device_type: DeviceType, *conditions) -> List[tuple]:
+        spec = _DETAIL_SPECS[device_type]
+        detail = spec.model
+        statement = (
+            select(Device.id, Device.is_deleted,
+                   *[getattr(Device, name) for name in _BASE_STRING_FIELDS],
+                   detail.id, *[getattr(detail, name) for name in spec.strings + spec.numeric])
+            .select_from(Device)
+            .outerjoin(detail, detail.device_id == Device.id)
+            .where(Device.device_type == device_type, *conditions)
+        )
+        return conn.execute(statement).all()
+
+    def _select_frequency(self, conn, *conditions) -> np.ndarray:
+        statement = (
+            select(DeviceMotor.device_id, MotorFrequencyParam.id,
+                   *[getattr(MotorFrequencyParam, name) for name in _FREQUENCY_FIELDS])
+            .join(DeviceMotor, MotorFrequencyParam.motor_id == DeviceMotor.id)
+            .where(*conditions)
+            .order_by(DeviceMotor.device_id, MotorFrequencyParam.frequency, MotorFrequencyParam.id)
+        )
+        rows = conn.execute(statement).all()
+        frequency = np.zeros(len(rows), dtype=_FREQUENCY_DTYPE)
+        if rows:
+            for name, column in zip(_FREQUENCY_DTYPE.names, zip(*rows)):
+                frequency[name] = np.array(column, dtype=float)
+        return frequency
+
+    @staticmethod
+    def _build_rows(device_type: DeviceType, rows: List[tuple], strings: _StringTable) -> np.ndarray:
+        spec = _DETAIL_SPECS[device_type]
+        array = np.zeros(len(rows), dtype=_row_dtype(device_type))
+        if not rows:
+            return array
+
+        columns = list(zip(*rows))
+        array['id'] = columns[0]
+        base = dict(zip(_BASE_STRING_FIELDS, columns[2:2 + len(_BASE_STRING_FIELDS)]))
+        offset = 2 + len(_BASE_STRING_FIELDS)
+        array['detail_id'] = [-1 if value is None else value for value in columns[offset]]
+        details = dict(zip(spec.strings + spec.numeric, columns[offset + 1:]))
+
+        created = base['created_at']
+        array['created_ts'] = [value.timestamp() if value else -np.inf for value in created]
+        base['created_at'] = [value.isoformat() if value else None for value in created]
+        base['updated_at'] = [value.isoformat() if value else None for value in base['updated_at']]
+        base['lift_method'] = [value.value if value else None for value in base['lift_method']]
+
+        for name in _BASE_STRING_FIELDS:
+            array[name] = [strings.encode(value) for value in base[name]]
+        for name in spec.strings:
+            array[name] = [strings.encode(value) for value in details[name]]
+        for name in spec.numeric:
+            array[name] = np.array(details[name], dtype=float)
+        return array
+
+    def _load_table(self, device_type: DeviceType) -> CatalogTable:
+        strings = _StringTable()
+        frequency = None
+        with self.engine.connect() as conn:
+            rows = self._select_rows(conn, device_type, Device.is_deleted == False)
+            if device_type == DeviceType.MOTOR:
+                frequency = self._select_frequency(conn)
+
+        array = _ordered(self._build_rows(device_type, rows, strings))
+        if frequency is not None:
+            _derive_motor_columns(array, frequency)
+
+        logger.info(f"设备目录快照已加载: {device_type.value} {len(array)} 台")
+        return CatalogTable(device_type, array, strings, frequency)
+
+    # ========== 增量刷新 ==========
+
+    def refresh_device(self, device_id: int):
+        """重新读取单台设备并替换其所在快照中的行（已删除则移除）"""
+        with self._lock:
+            if not self._tables:
+                return
+
+            with self.engine.connect() as conn:
+                device_type = conn.execute(
+                    select(Device.device_type).where(Device.id == device_id)
+                ).scalar_one_or_none()
+                current = self._tables.get(device_type) if device_type is not None else None
+                rows = []
+                frequency = None
+                if current is not None:
+                    rows = [row for row in self._select_rows(conn, device_type, Device.id == device_id)
+                            if not row[1]]
+                    if device_type == DeviceType.MOTOR:
+                        frequency = self._select_frequency(conn, DeviceMotor.device_id == device_id)
+
+            # 设备类型可能被修改，先从其他快照中移除
+            for other_type, table in list(self._tables.items()):
+                if other_type != device_type and table.index_of(device_id) >= 0:
+                    self._tables[other_type] = self._replace(table, device_id, [], None)
+                    self._notify(other_type, device_id)
+
+            if current is not None:
+                self._tables[device_type] = self._replace(current, device_id, rows, frequency)
+                self._notify(device_type, device_id)
+
+    def _replace(self, table: CatalogTable, device_id: int, rows: List[tuple],
+                 frequency: Optional[np.ndarray]) -> CatalogTable:
+        """生成替换了一台设备的新快照（写时复制）"""
+        kept = table.rows[table.rows['id'] != device_id]
+        array = _ordered(np.concatenate([kept, self._build_rows(table.device_type, rows, table.strings)]))
+
+        new_frequency = table.frequency
+        if table.frequency is not None:
+            new_frequency = table.frequency[table.frequency['device_id'] != device_id]
+            if frequency is not None and len(frequency):
+                new_frequency = np.concatenate([new_frequency, frequency])
+                new_frequency = new_frequency[np.lexsort(
+                    (new_frequency['param_id'], new_frequency['frequency'], new_frequency['device_id'])
+                )]
+            _derive_motor_columns(array, new_frequency)
+
+        return CatalogTable(table.device_type, array, table.strings, new_frequency)
+
+    def _on_device_changed(self, device_id: int, *args):
+        """deviceCreated / deviceUpdated / deviceDeleted 信号处理（可能在工作线程中调用）"""
+        try:
+            with self._lock:
+                self._covered_by_device_signal = True
+                self.refresh_device(device_id)
+        except Exception as e:
+            logger.error(f"刷新设备目录快照失败 (设备 {device_id}): {e}")
+            self.invalidate()
+
+    def _on_device_list_updated(self):
+        """deviceListUpdated：紧随逐条设备信号时已增量处理，否则（批量导入）整体失效"""
+        with self._lock:
+            if self._covered_by_device_signal:
+                self._covered_by_device_signal = False
+                return
+            self.invalidate()
+
@@ -3,7 +3,7 @@
 import logging
 import math
 import numpy as np
-from typing import Dict, Any, Tuple, Union, List
+from typing import Dict, Any, Tuple, Union, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -291,4 +291,165 @@ class EmpiricalFormulasService:
     
     def get_last_error(self) -> str:
         """获取最后的错误信息"""
-        return self.last_error
\ No newline at end of file
+        return self.last_error
+
+
+# ========== 单井预测公式（界面单井预测与项目批量选型共用） ==========
+
+def expert_inlet_glr(temperature: float, production_gasoline_ratio: float, water_ratio: float,
+                     pb_mpa: float, pi_mpa: float, z_const: float = 0.8, rg_const: float = 0.896,
+                     ro_const: float = 0.849) -> float:
+    """专家总结的吸入口气液比公式（%，结果取绝对值）"""
+    # F13 = POWER(10, 0.0125*(141.5/相对密度Ro-131.5))，F14 = POWER(10, 0.00091*(1.8*温度+32))
+    f13 = pow(10, 0.0125 * (141.5 / ro_const - 131.5))
+    f14 = pow(10, 0.00091 * (1.8 * temperature + 32))
+
+    # Rsp = 0.1342*相对密度Rg*POWER(10*Pb（Mpa）*F13/F14, 1/0.83)
+    rsp = 0.1342 * rg_const * pow((10 * pb_mpa * f13 / f14), 1 / 0.83)
+
+    # Bg（m^3/m^3） = 0.0003458*Z(常数）*(温度+273)/Pi(Mpa)，Pi为0时按0.1防止除零
+    bg = 0.0003458 * z_const * (temperature + 273) / (pi_mpa if pi_mpa > 0 else 0.1)
+
+    # Bo = 0.972+0.000147*POWER(5.61*Rsp*POWER(相对密度Rg/相对密度Ro,0.5)+1.25*(1.8*温度+32),1.175)
+    bo_inner = 5.61 * rsp * pow(rg_const / ro_const, 0.5) + 1.25 * (1.8 * temperature + 32)
+    bo = 0.972 + 0.000147 * pow(bo_inner, 1.175)
+
+    # 吸入口气液比=(1-含水率)*(生产汽油比-Rsp)*Bg/((1-含水率)*Bo+(1-含水率)*(生产汽油比-Rsp)*Bg+含水率)*100
+    numerator = (1 - water_ratio) * (production_gasoline_ratio - rsp) * bg
+    denominator = ((1 - water_ratio) * bo
+                   + (1 - water_ratio) * (production_gasoline_ratio - rsp) * bg
+                   + water_ratio)
+    if denominator == 0:
+        denominator = 1e-10
+    return abs((numerator / denominator) * 100)
+
+
+def excel_total_head(perforation_depth: float, pump_hanging_depth: float, pwh: float, pperfs: float,
+                     pump_measured_depth: float, water_ratio: float, kf: float = 0.017,
+                     api: float = 18.5) -> float:
+    """Temp.py 中的 Excel 扬程公式"""
+    # 井液相对密度、井底流压差
+    pfi = water_ratio + (1 - water_ratio) * 141.5 / (131.5 + api)
+    pwf_pi = 0.433 * (perforation_depth - pump_hanging_depth) * pfi
+    return pump_hanging_depth + (pwh - (pperfs - pwf_pi)) * 2.31 / pfi + kf * pump_measured_depth
+
+
+def composite_ipr_curve(params: Dict[str, Any], num_points: int = 36) -> List[Dict[str, float]]:
+    """
+    IPR曲线：饱和压力以上为直线段，以下为 Vogel 段（压力从高到低排列）
+
+    生产指数按当前井底流压（井口压力）处达到期望产量反推。
+    """
+    pr = float(params['geo_pressure'])
+    expected_prod = float(params['expected_production'])
+    pb = float(params.get('saturation_pressure', pr * 0.6))
+    pwf_current = float(params.get('well_head_pressure', pr * 0.4))
+
+    if pwf_current >= pb:
+        pi = expected_prod / (pr - pwf_current) if (pr - pwf_current) > 0 else 0.1
+    else:
+        pi = expected_prod / (pr - pb + pb / 1.8 * (1 - 0.2 * (pwf_current / pb) - 0.8 * (pwf_current / pb) ** 2))
+
+    curve_data = []
+    for i in range(num_points):
+        pwf = pr * (1 - i / (num_points - 1))
+        if pwf >= pb:
+            q = pi * (pr - pwf)
+        else:
+            pb_ratio = pwf / pb if pb > 0 else 0
+            q = pi * (pr - pb) + pi * pb / 1.8 * (1 - 0.2 * pb_ratio - 0.8 * (pb_ratio ** 2))
+        curve_data.append({'production': float(max(0, q)), 'pressure': float(pwf)})
+
+    curve_data.sort(key=lambda point: point['pressure'], reverse=True)
+    return curve_data
+
+
+def linear_ipr_curve(params: Dict[str, Any]) -> List[Dict[str, float]]:
+    """简单线性IPR曲线（假设地层压力一半处达到期望产量），用作后备"""
+    pr = float(params['geo_pressure'])
+    expected_prod = float(params['expected_production'])
+    pi = expected_prod / (pr * 0.5) if pr > 0 else 0.1
+    curve_data = []
+    for i in range(21):
+        pwf = pr * (1 - i / 20.0)
+        curve_data.append({'pressure': float(pwf), 'production': float(max(0, pi * (pr - pwf)))})
+    return curve_data
+
+
+def empirical_prediction(params: Dict[str, Any], calculation: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    经验公式预测：产量（期望产量×0.92）、Excel公式扬程、专家公式吸入口气液比
+
+    calculation 为井身计算结果（射孔垂深、泵挂垂深）；缺失时扬程按地层压力×1.4 估算，
+    气液比计算失败时按97%。
+    """
+    try:
+        # 饱和压力 (Mpa)，生产指数默认为饱和压力的1.2倍；含水率可为百分数
+        pb_mpa = params.get('saturation_pressure', 0)
+        bsw = params.get('bsw', 0)
+        water_ratio = bsw / 100.0 if bsw > 1 else bsw
+        try:
+            gas_rate = max(0, expert_inlet_glr(params.get('bht', 114), params.get('gas_oil_ratio', 0) * 0.1781,
+                                               water_ratio, pb_mpa, pb_mpa * 1.2))
+        except Exception as e:
+            logger.error(f"专家公式执行失败: {e}")
+            gas_rate = 0.0
+    except Exception as e:
+        logger.error(f"专家公式计算失败: {e}")
+        gas_rate = 97.0
+
+    try:
+        pump_hanging_depth = calculation['pump_hanging_depth']
+        total_head = max(0, abs(excel_total_head(
+            calculation['perforation_depth'], pump_hanging_depth,
+            params.get('well_head_pressure', 0), params.get('geo_pressure', 0) * 0.6,
+            pump_hanging_depth * 1.1, params.get('bsw', 0), 0.017, params.get('api', 18.5)
+        )))
+    except Exception as e:
+        logger.error(f"Excel扬程公式计算失败: {e}")
+        total_head = params.get('geo_pressure', 0) * 1.4
+
+    return {
+        'production': params['expected_production'] * 0.92,
+        'total_head': total_head,
+        'gas_rate': gas_rate,
+        'method': 'corrected_empirical_formulas'
+    }
+
+
+def combine_predictions(ml_results: Optional[Dict[str, Any]], empirical_results: Dict[str, Any],
+                        max_error: float = 15.0) -> Dict[str, Any]:
+    """
+    合并模型预测与经验公式结果：两者都有的指标按误差选择，否则取已有的值
+
+    ml_results 为 None（模型不可用）时直接采用经验公式结果。
+    """
+    if ml_results is None:
+        combined = dict(empirical_results)
+        combined.setdefault('confidence', 0.7)
+        return combined
+
+    selector = EmpiricalFormulasService()
+    combined = {}
+    for key in ['production', 'pump_depth', 'gas_rate', 'total_head']:
+        if key in ml_results and key in empirical_results:
+            ml_value = ml_results[key]
+            empirical_value = empirical_results[key]
+            selection_result = selector.select_optimal_value(ml_value, empirical_value, max_error=max_error)
+
+            combined[f'{key}_ml'] = ml_value
+            combined[f'{key}_empirical'] = empirical_value
+            combined[f'{key}_selected'] = selection_result['selected_value']
+            combined[f'{key}_selection_method'] = selection_result['selection_method']
+            combined[f'{key}_error_percent'] = selection_result['error_percent']
+            combined[f'{key}_reliable'] = selection_result['is_reliable']
+            combined[key] = selection_result['selected_value']
+        else:
+            combined[key] = ml_results.get(key, empirical_results.get(key, 0))
+
+    # 整体置信度：可靠指标0.9，否则0.7
+    confidence_factors = [0.9 if combined.get(f'{key}_reliable', False) else 0.7
+                          for key in ['production', 'pump_depth', 'gas_rate']]
+    combined['confidence'] = sum(confidence_factors) / len(confidence_factors)
+    combined['method'] = 'hybrid_intelligent_selection'
+    return combined
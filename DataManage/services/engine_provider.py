@@ -0,0 +1,355 @@
+# DataManage/services/engine_provider.py
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.pool import StaticPool
+
+from ..config.database_config import DatabaseConfig, get_config
+from .performance_monitor import performance_monitor
+from .write_queue import WriteQueue
+
+logger = logging.getLogger(__name__)
+
+
+# 只能在建库前生效的PRAGMA，对已有数据库逐连接设置没有意义
+_CREATE_ONLY_PRAGMAS = ('page_size', 'auto_vacuum')
+
+
+class InvalidationBus:
+    """
+    缓存失效总线 - 数据写入方按表名发布失效通知，缓存和界面订阅
+
+    tables 为 None 表示范围未知（如任意自定义SQL），订阅方应全部失效。
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[Optional[Set[str]]], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Optional[Set[str]]], None]):
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Optional[Set[str]]], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, tables: Optional[Iterable[str]] = None):
+        """发布失效通知"""
+        table_set = set(tables) if tables is not None else None
+        if table_set is not None and not table_set:
+            return
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(table_set)
+            except Exception as e:
+                logger.error(f"缓存失效回调执行失败: {e}")
+
+
+class QueryCache:
+    """
+    共享查询缓存 - 带TTL和容量上限，每个条目标记其依赖的表
+
+    任一依赖表被写入（经由失效总线）时条目立即失效。
+    """
+
+    def __init__(self, timeout: int = 300, max_size: int = 1000, enabled: bool = True):
+        self.timeout = timeout
+        self.max_size = max_size
+        self.enabled = enabled
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()  # key -> (value, 过期时间, 依赖表)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, tables: Iterable[str]):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.timeout, frozenset(tables))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tables: Optional[Set[str]] = None):
+        """按表失效；tables为None时清空"""
+        with self._lock:
+            if tables is None:
+                self._entries.clear()
+                return
+            stale = [key for key, (_, _, deps) in self._entries.items() if deps & tables]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self, prefix: Optional[str] = None):
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class EngineProvider:
+    """
+    数据库引擎提供者 - 同一数据库文件只创建一个引擎（一个连接池、一套PRAGMA）
+
+    SQLAlchemy服务与原生sqlite3的DatabaseManager都从这里取连接，
+    并共享同一个查询缓存和失效总线。
+    """
+
+    def __init__(self):
+        self._engines: Dict[str, Engine] = {}
+        self._write_queues: Dict[str, WriteQueue] = {}
+        self._lock = threading.Lock()
+        self.bus = InvalidationBus()
+        self.cache: Optional[QueryCache] = None
+
+    @staticmethod
+    def _engine_key(db_path: str) -> str:
+        return db_path if db_path == ':memory:' else os.path.abspath(db_path)
+
+    def get_engine(self, db_path: Optional[str] = None, config: Optional[DatabaseConfig] = None) -> Engine:
+        """
+        获取数据库引擎（按文件路径复用）
+
+        Args:
+            db_path: 数据库路径，默认取配置中的路径
+            config: 数据库配置；仅在首次创建引擎/缓存时生效
+        """
+        config = config or get_config()
+        db_path = db_path or config.db_path
+        key = self._engine_key(db_path)
+
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = self._create_engine(db_path, config)
+                self._engines[key] = engine
+                logger.info(f"创建共享数据库引擎: {key}")
+
+            if self.cache is None:
+                self.cache = QueryCache(
+                    timeout=config.cache_timeout,
+                    max_size=config.max_cache_size,
+                    enabled=config.cache_enabled
+                )
+                self.bus.subscribe(self.cache.invalidate)
+
+        return engine
+
+    def _create_engine(self, db_path: str, config: DatabaseConfig) -> Engine:
+        db_dir = os.path.dirname(db_path)
+        if db_dir and db_path != ':memory:' and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+
+        if db_path == ':memory:':
+            # 内存数据库只能共享同一个连接
+            engine = create_engine(
+                "sqlite://",
+                echo=config.log_level == "DEBUG",
+                poolclass=StaticPool,
+                connect_args={"check_same_thread": False}
+            )
+        else:
+            engine = create_engine(
+                f"sqlite:///{db_path}",
+                echo=config.log_level == "DEBUG",
+                pool_size=config.max_connections,
+                max_overflow=config.max_connections * 2,
+                pool_timeout=config.connection_timeout,
+                pool_recycle=3600,  # 重连接周期
+                connect_args={
+                    "check_same_thread": False,  # 允许多线程访问
+                    "timeout": config.connection_timeout
+                }
+            )
+
+        pragmas = config.get_sqlite_pragmas()
+
+        @event.listens_for(engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                # 新建数据库时先设置只能建库前生效的参数（必须早于journal_mode写入文件头）
+                if not cursor.execute("PRAGMA page_count").fetchone()[0]:
+                    for name in _CREATE_ONLY_PRAGMAS:
+                        if name in pragmas:
+                            cursor.execute(f"PRAGMA {name} = {pragmas[name]}")
+                for name, value in pragmas.items():
+                    if name not in _CREATE_ONLY_PRAGMAS:
+                        cursor.execute(f"PRAGMA {name} = {value}")
+            finally:
+                cursor.close()
+
+        # SQL执行计时与慢查询日志
+        if config.instrumentation_enabled:
+            performance_monitor.configure(
+                slow_query_ms=config.slow_query_ms,
+                trace_buffer_size=config.trace_buffer_size
+            )
+            performance_monitor.instrument_engine(engine)
+
+        return engine
+
+    def get_write_queue(self, db_path: Optional[str] = None, config: Optional[DatabaseConfig] = None) -> WriteQueue:
+        """获取数据库文件的单写线程写入队列（按文件路径复用）"""
+        config = config or get_config()
+        db_path = db_path or config.db_path
+        engine = self.get_engine(db_path, config)
+        key = self._engine_key(db_path)
+
+        with self._lock:
+            write_queue = self._write_queues.get(key)
+            if write_queue is None:
+                write_queue = self._write_queues[key] = WriteQueue(
+                    engine, self.bus,
+                    max_batch=config.write_batch_size,
+                    group_delay_ms=config.write_group_delay_ms,
+                    lease_timeout=config.connection_timeout
+                )
+        return write_queue
+
+    def dispose(self):
+        """释放所有连接池（测试或切换数据库时使用）"""
+        with self._lock:
+            for write_queue in self._write_queues.values():
+                write_queue.stop()
+            self._write_queues.clear()
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+
+
+# 全局共享实例
+engine_provider = EngineProvider()
+
+
+def get_engine(db_path: Optional[str] = None, config: Optional[DatabaseConfig] = None) -> Engine:
+    """获取共享数据库引擎"""
+    return engine_provider.get_engine(db_path, config)
+
+
+def get_query_cache() -> QueryCache:
+    """获取共享查询缓存（需先创建过引擎）"""
+    if engine_provider.cache is None:
+        engine_provider.get_engine()
+    return engine_provider.cache
+
+
+def get_write_queue(db_path: Optional[str] = None, config: Optional[DatabaseConfig] = None) -> WriteQueue:
+    """获取共享写入队列（原生SQL写入组提交，ORM写事务按租约排队）"""
+    return engine_provider.get_write_queue(db_path, config)
+
+
+def get_invalidation_bus() -> InvalidationBus:
+    """获取缓存失效总线"""
+    return engine_provider.bus
+
+
+def install_session_invalidation(session_factory):
+    """
+    为ORM会话工厂挂接失效通知：flush时收集写入的表名，commit后统一发布，rollback则丢弃
+
+    Args:
+        session_factory: sessionmaker 实例
+    """
+    bus = engine_provider.bus
+
+    @event.listens_for(session_factory, "after_flush")
+    def _collect_tables(session: Session, flush_context):
+        tables = session.info.setdefault('written_tables', set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            table = getattr(obj, '__tablename__', None)
+            if table:
+                tables.add(table)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _collect_core_dml(orm_execute_state):
+        # Query.update()/delete() 以及 session.execute(insert(...)) 等批量写入路径
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, 'table', None)
+            if table is not None:
+                orm_execute_state.session.info.setdefault('written_tables', set()).add(table.name)
+
+    @event.listens_for(session_factory, "after_commit")
+    def _publish(session: Session):
+        tables = session.info.pop('written_tables', None)
+        if tables:
+            bus.publish(tables)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _discard(session: Session):
+        session.info.pop('written_tables', None)
+
+
+# 以这些关键字开头的文本SQL不写数据库
+_READ_ONLY_SQL = ('SELECT', 'WITH', 'EXPLAIN', 'PRAGMA')
+
+
+def install_session_write_lease(session_factory, write_queue: WriteQueue):
+    """
+    ORM会话的写事务经写入队列串行化
+
+    会话第一次写入（flush 或 Query.update()/insert() 等批量DML、写类文本SQL）前
+    申请写入租约，写线程在批次之间暂停，会话在自己的连接上写入并提交；
+    事务结束（提交、回滚或关闭会话）时释放租约，写线程继续处理队列。
+
+    Args:
+        session_factory: sessionmaker 实例
+        write_queue: 数据库文件的写入队列
+    """
+
+    def acquire(session: Session):
+        if 'write_lease' not in session.info:
+            session.info['write_lease'] = write_queue.acquire_lease()
+
+    @event.listens_for(session_factory, "before_flush")
+    def _lease_for_flush(session: Session, flush_context, instances):
+        acquire(session)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _lease_for_dml(orm_execute_state):
+        statement = orm_execute_state.statement
+        if isinstance(statement, TextClause):
+            words = statement.text.split(None, 1)
+            writes = bool(words) and words[0].upper() not in _READ_ONLY_SQL
+        else:
+            writes = orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+        if writes:
+            acquire(orm_execute_state.session)
+
+    @event.listens_for(session_factory, "after_transaction_end")
+    def _release(session: Session, transaction):
+        if transaction.parent is None and 'write_lease' in session.info:
+            write_queue.release_lease(session.info.pop('write_lease'))
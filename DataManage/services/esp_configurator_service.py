@@ -0,0 +1,545 @@
+# DataManage/services/esp_configurator_service.py
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .device_catalog_service import CatalogTable, DeviceCatalogService
+from .motor_index_service import MotorFrequencyIndex, MotorIndexService
+from .performance_monitor import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+
+# 默认搜索的运行频率 (Hz)
+DEFAULT_FREQUENCIES = tuple(np.arange(40.0, 70.01, 2.5).tolist())
+
+# 电机绝缘等级对应的允许温度 (℃)，未知等级按F级处理
+INSULATION_TEMPERATURES = {'A': 105.0, 'E': 120.0, 'B': 130.0, 'F': 155.0, 'H': 180.0, 'N': 200.0, 'R': 220.0}
+
+# Pareto 目标（均按越小越好比较，效率余量取负）
+OBJECTIVES = ('capex', 'energy_kw', 'efficiency_margin')
+
+GRAVITY = 9.81
+
+# 搜索统计中各进程累加的计数
+_SEARCH_COUNTERS = ('pruned', 'pruned_motors', 'leaves')
+
+
+@dataclass
+class ConfiguratorSettings:
+    """
+    组合选型的物理假设与投资估算系数
+
+    设备表没有价格列，投资(capex)按部件规格估算：泵按级数、电机按主参数功率、
+    保护器按推力承载能力、分离器按液体处理能力计价，单位为相对成本。
+    """
+    base_frequency: float = 60.0        # 泵单级扬程/功率对应的额定频率 (Hz)
+    fluid_gravity: float = 1.0          # 井液相对密度
+    default_pump_efficiency: float = 60.0   # 缺少单级功率时按此效率 (%) 估算轴功率
+    default_shaft_diameter: float = 22.0    # 轴径未知时使用 (mm)
+    thrust_area_factor: float = 4.0     # 轴向推力的等效受压面积 = 轴截面积 × 系数（计入叶轮推力）
+    motor_service_factor: float = 1.0   # 电机在该频率下的功率需不低于轴功率 × 系数
+    motor_efficiency: float = 0.85      # 电机满载效率
+    motor_part_load_loss: float = 0.25  # 部分负载效率下降系数：η = η满载 × (1 - k·(1-负载率)²)
+    motor_temperature_rise: float = 40.0    # 电机温升 (℃)，绝缘允许温度需不低于 BHT + 温升
+    operating_hours: float = 8760.0     # 年运行小时数（年耗电量）
+
+    # Pareto 集的 ε-支配分辨率：投资、耗电为相对值，效率余量为绝对值；0 表示精确比较
+    capex_resolution: float = 0.01
+    energy_resolution: float = 0.01
+    margin_resolution: float = 0.01
+
+    pump_base_cost: float = 5000.0
+    pump_stage_cost: float = 300.0
+    motor_base_cost: float = 8000.0
+    motor_cost_per_kw: float = 120.0
+    protector_base_cost: float = 6000.0
+    protector_cost_per_kn: float = 40.0
+    separator_base_cost: float = 5000.0
+    separator_cost_per_m3d: float = 2.0
+
+    def motor_temperature(self, insulation_class: Optional[str]) -> float:
+        key = (insulation_class or '').strip().upper()[:1]
+        return INSULATION_TEMPERATURES.get(key, INSULATION_TEMPERATURES['F'])
+
+
+def _compare(front: np.ndarray, points: np.ndarray, strict: bool) -> np.ndarray:
+    """[len(front), len(points)]：front[i] 是否（弱）支配 points[j]；逐列比较，避免在长度为3的轴上归约"""
+    no_worse = front[:, None, 0] <= points[None, :, 0]
+    for column in range(1, points.shape[1]):
+        no_worse &= front[:, None, column] <= points[None, :, column]
+    if not strict:
+        return no_worse
+    better = front[:, None, 0] < points[None, :, 0]
+    for column in range(1, points.shape[1]):
+        better |= front[:, None, column] < points[None, :, column]
+    return no_worse & better
+
+
+def pareto_mask(points: np.ndarray) -> np.ndarray:
+    """
+    非支配点掩码（各列越小越好；完全相同的点只保留第一个）
+
+    成对比较按块进行，控制临时数组大小。
+    """
+    count = len(points)
+    keep = np.ones(count, dtype=bool)
+    if count < 2:
+        return keep
+    positions = np.arange(count)
+    block = max(1, 4_000_000 // count)
+    for start in range(0, count, block):
+        others = points[start:start + block]
+        no_worse = _compare(others, points, strict=False)
+        equal = no_worse & _compare(points, others, strict=False).T
+        earlier = positions[start:start + block, None] < positions[None, :]
+        keep &= ~(no_worse & (~equal | earlier)).any(axis=0)
+    return keep
+
+
+def motor_power_matrix(table: CatalogTable, indices: np.ndarray, frequencies: np.ndarray,
+                       index: Optional[MotorFrequencyIndex] = None) -> np.ndarray:
+    """
+    电机在各频率下的输出功率 (kW)，形状 [电机, 频率]
+
+    在电机自身的频率参数之间线性插值，参数范围以外按功率与频率成正比外推；
+    没有频率参数的电机为NaN。index 为该快照已构建的电机频率索引。
+    """
+    index = index if index is not None else MotorFrequencyIndex(table)
+    return index.values('power', frequencies, indices)
+
+
+def epsilon_boxes(points: np.ndarray, resolution: Sequence[float]) -> np.ndarray:
+    """
+    ε-支配网格坐标：投资、耗电按相对分辨率取对数网格，效率余量按绝对分辨率取网格
+
+    同一网格内只保留一个方案，Pareto 集的规模随分辨率而不是叶子数增长；
+    分辨率为0的目标保持原值（精确比较）。
+    """
+    boxes = np.array(points, dtype=float, copy=True)
+    for column, step in enumerate(resolution):
+        if step <= 0:
+            continue
+        if column < 2:
+            boxes[:, column] = np.floor(np.log(np.maximum(boxes[:, column], 1e-9)) / np.log1p(step))
+        else:
+            boxes[:, column] = np.floor(boxes[:, column] / step)
+    return boxes
+
+
+def _dominated_by(front: np.ndarray, points: np.ndarray, strict: bool) -> np.ndarray:
+    """points 中被 front 任一点支配（strict=False 时为弱支配：各目标不差即可）的掩码"""
+    dominated = np.zeros(len(points), dtype=bool)
+    step = max(1, 4_000_000 // max(1, len(points)))
+    for start in range(0, len(front), step):
+        dominated |= _compare(front[start:start + step], points, strict).any(axis=0)
+    return dominated
+
+
+def _unique_front(points: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """按投资升序，每个网格取最便宜的一个后求非支配集，返回保留的行号"""
+    order = np.argsort(points[:, 0], kind='stable')
+    _, first = np.unique(boxes[order], axis=0, return_index=True)
+    rows = order[np.sort(first)]
+    return rows[pareto_mask(boxes[rows])]
+
+
+def _search_nodes(problem: Dict[str, Any], order: np.ndarray) -> Tuple[np.ndarray, np.ndarray, Dict[str, int]]:
+    """
+    分支定界搜索一组(泵, 频率)节点（可在子进程中执行）
+
+    节点按乐观下界（最低投资、满载效率下的耗电、最大余量）判断：若下界所在网格
+    已被当前 Pareto 集弱支配则整枝剪掉；否则对 电机 × 保护器 的全部叶子向量化计算目标。
+
+    Returns:
+        (目标 [K, 3], 键 [K, 3]: 节点号/电机号/保护器号, 统计)
+    """
+    motor_power = problem['motor_power']
+    motor_cost = problem['motor_cost']
+    protector_capacity = problem['protector_capacity']
+    protector_cost = problem['protector_cost']
+    resolution = problem['resolution']
+    settings = problem['settings']
+    eta, loss, service = settings['motor_efficiency'], settings['motor_part_load_loss'], settings['motor_service_factor']
+
+    front = np.empty((0, 3))
+    boxes = np.empty((0, 3))
+    keys = np.empty((0, 3), dtype=np.int64)
+    stats = {'nodes': len(order), 'pruned': 0, 'pruned_motors': 0, 'leaves': 0}
+
+    for node in order.tolist():
+        bhp = problem['bhp'][node]
+        thrust = problem['thrust'][node]
+        bound = np.array([[problem['capex_bound'][node], bhp / eta, -problem['margin_bound'][node]]])
+        if len(front) and _dominated_by(boxes, epsilon_boxes(bound, resolution), strict=False)[0]:
+            stats['pruned'] += 1
+            continue
+
+        powers = motor_power[:, problem['frequency_index'][node]]
+        motors = np.flatnonzero(powers >= bhp * service)
+        protectors = np.flatnonzero(protector_capacity >= thrust)
+        if not len(motors) or not len(protectors):
+            continue
+
+        load = bhp / powers[motors]
+        energy = bhp / (eta * (1.0 - loss * (1.0 - load) ** 2))
+        motor_margin = 1.0 - load
+        protector_margin = 1.0 - thrust / protector_capacity[protectors]
+
+        # 电机分支的下界：最便宜的可用保护器、最大的保护器余量
+        if len(front):
+            motor_bound = np.column_stack([
+                problem['capex_fixed'][node] + motor_cost[motors] + protector_cost[protectors[0]],
+                energy,
+                -np.minimum(motor_margin, protector_margin[-1]),
+            ])
+            alive = ~_dominated_by(boxes, epsilon_boxes(motor_bound, resolution), strict=False)
+            stats['pruned_motors'] += int(len(alive) - alive.sum())
+            if not alive.any():
+                continue
+            motors, energy, motor_margin = motors[alive], energy[alive], motor_margin[alive]
+
+        # 保护器按成本升序、承载能力递增（已预先取成本-能力前沿）：
+        # 对每台电机，余量达到电机余量的保护器只需保留最便宜的一个
+        limit = np.searchsorted(protector_margin, motor_margin, side='left')
+        usable = np.arange(len(protectors))[None, :] <= limit[:, None]
+        m_pos, p_pos = np.nonzero(usable)
+
+        candidates = np.column_stack([
+            problem['capex_fixed'][node] + motor_cost[motors[m_pos]] + protector_cost[protectors[p_pos]],
+            energy[m_pos],
+            -np.minimum(motor_margin[m_pos], protector_margin[p_pos]),
+        ])
+        candidate_boxes = epsilon_boxes(candidates, resolution)
+        stats['leaves'] += len(candidates)
+
+        # 先去掉被现有前沿弱支配的叶子，叶子之间求非支配集，再剔除被新叶子支配的前沿点
+        if len(front):
+            survivors = ~_dominated_by(boxes, candidate_boxes, strict=False)
+            if not survivors.any():
+                continue
+            candidates, candidate_boxes = candidates[survivors], candidate_boxes[survivors]
+            m_pos, p_pos = m_pos[survivors], p_pos[survivors]
+
+        rows = _unique_front(candidates, candidate_boxes)
+        candidates, candidate_boxes, m_pos, p_pos = candidates[rows], candidate_boxes[rows], m_pos[rows], p_pos[rows]
+        if len(front):
+            kept = ~_dominated_by(candidate_boxes, boxes, strict=True)
+            front, boxes, keys = front[kept], boxes[kept], keys[kept]
+
+        new_keys = np.column_stack([np.full(len(candidates), node), motors[m_pos], protectors[p_pos]])
+        front = np.concatenate([front, candidates])
+        boxes = np.concatenate([boxes, candidate_boxes])
+        keys = np.concatenate([keys, new_keys])
+
+    return front, keys, stats
+
+
+class EspConfiguratorService:
+    """
+    电潜泵管柱组合选型服务 - 泵 × 级数 × 频率 × 电机 × 保护器 × 分离器 全局搜索
+
+    向导各步骤分别选泵、分离器、保护器、电机，只能得到局部最优；本服务在设备
+    目录快照上同时搜索全部组合，硬约束包括：各部件外径不超过套管通径、电机在
+    运行频率下的功率不低于泵轴功率、保护器推力承载能力不低于轴向推力、
+    电机绝缘与保护器温度等级不低于井底温度。返回投资、耗电、效率余量三个
+    目标上的 Pareto 集（按 ε-支配分辨率，每个网格保留一个代表方案）。
+
+    与运行点无关的约束（外径、温度、分离器处理能力）先按部件静态过滤；泵与频率
+    组成分支节点，按下界剪枝；叶子（电机 × 保护器）向量化计算。节点多时分块
+    交给进程池并行搜索，再合并各块的前沿。
+    """
+
+    def __init__(self, catalog: DeviceCatalogService, settings: Optional[ConfiguratorSettings] = None,
+                 workers: Optional[int] = None, parallel_threshold: int = 20000,
+                 motor_index: Optional[MotorIndexService] = None):
+        """
+        Args:
+            catalog: 设备目录快照服务
+            settings: 物理假设与投资系数
+            workers: 进程池大小，默认 min(4, CPU数)；1 表示不使用进程池
+            parallel_threshold: 分支节点数超过此值才使用进程池（进程启动与传输有固定开销）
+            motor_index: 电机频率参数索引服务，默认每次按快照临时构建
+        """
+        self.catalog = catalog
+        self.motor_index = motor_index
+        self.settings = settings or ConfiguratorSettings()
+        self.workers = workers if workers is not None else min(4, os.cpu_count() or 1)
+        self.parallel_threshold = parallel_threshold
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def shutdown(self):
+        """关闭进程池"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    # ========== 部件静态过滤 ==========
+
+    @staticmethod
+    def _fits(diameter: np.ndarray, max_od: Optional[float]) -> np.ndarray:
+        """外径未知视为可下井（与泵筛选一致）"""
+        if max_od is None:
+            return np.ones(len(diameter), dtype=bool)
+        return np.isnan(diameter) | (diameter <= max_od)
+
+    def _pump_nodes(self, table: CatalogTable, indices: np.ndarray, required_flow: float, required_head: float,
+                    frequencies: np.ndarray, max_od: Optional[float]) -> Dict[str, np.ndarray]:
+        """(泵, 频率) 分支节点：流量窗口按频率比缩放，单级扬程按平方、轴功率按立方缩放"""
+        s = self.settings
+        rows = table.rows[indices]
+        head = rows['single_stage_head']
+        usable = self._fits(rows['outside_diameter'], max_od) & (head > 0)
+        rows, indices = rows[usable], indices[usable]
+
+        ratio = frequencies / s.base_frequency
+        min_flow = np.nan_to_num(rows['displacement_min'], nan=0.0)[:, None] * ratio
+        max_flow = np.nan_to_num(rows['displacement_max'], nan=0.0)[:, None] * ratio
+        stage_head = rows['single_stage_head'][:, None] * ratio ** 2
+        stages = np.ceil(required_head / stage_head)
+        max_stages = np.nan_to_num(rows['max_stages'], nan=100.0)[:, None]
+        feasible = (min_flow <= required_flow) & (required_flow <= max_flow) & (stages >= 1) & (stages <= max_stages)
+
+        # 轴功率：优先用单级功率，缺失时按水力功率/效率估算
+        hydraulic_kw = s.fluid_gravity * 1000.0 * GRAVITY * (required_flow / 86400.0) * stages * stage_head / 1000.0
+        efficiency = np.nan_to_num(rows['efficiency'], nan=s.default_pump_efficiency)[:, None]
+        efficiency = np.where(efficiency > 0, efficiency, s.default_pump_efficiency) / 100.0
+        stage_power = rows['single_stage_power'][:, None] * ratio ** 3
+        bhp = np.where(np.isnan(stage_power), hydraulic_kw / efficiency, stages * stage_power)
+
+        # 轴向推力 (kN) = 泵出口压力 × 等效受压面积
+        shaft = np.nan_to_num(rows['shaft_diameter'], nan=s.default_shaft_diameter)[:, None] / 1000.0
+        area = np.pi / 4.0 * shaft ** 2 * s.thrust_area_factor
+        thrust = s.fluid_gravity * 1000.0 * GRAVITY * stages * stage_head * area / 1000.0
+
+        pump, frequency = np.nonzero(feasible & (bhp > 0))
+        return {
+            'catalog_index': indices[pump],
+            'frequency_index': frequency,
+            'stages': stages[pump, frequency].astype(np.int64),
+            'head': (stages * stage_head)[pump, frequency],
+            'bhp': bhp[pump, frequency],
+            'thrust': thrust[pump, frequency],
+        }
+
+    # ========== 搜索 ==========
+
+    def configure(self, required_flow: float, required_head: float, bht: float,
+                  casing_id: Optional[float] = None, clearance: float = 0.0, gas_rate: float = 0.0,
+                  lift_method: Optional[str] = 'esp', frequencies: Optional[Sequence[float]] = None,
+                  max_results: int = 50, status: Optional[str] = 'active',
+                  energy_weight: float = 0.0) -> Dict[str, Any]:
+        """
+        组合选型
+
+        Args:
+            required_flow: 目标排量 (m³/d)
+            required_head: 所需扬程 (m)
+            bht: 井底温度 (℃)
+            casing_id: 套管通径 (mm)，None表示不检查外径
+            clearance: 管柱外径与套管通径之间的最小间隙 (mm)
+            gas_rate: 泵入口自由气量 (m³/d)，大于0时必须配分离器
+            lift_method: 泵的举升方式
+            frequencies: 搜索的运行频率 (Hz)
+            max_results: 返回的 Pareto 方案数上限（按 投资 + energy_weight × 输入电功率 升序）
+            status: 设备状态
+            energy_weight: 每kW输入电功率折算的投资，0表示仅按投资排序（如评价期电费：年运行小时/1000 × 电价 × 年数）
+
+        Returns:
+            {'pareto': [方案, ...], 'stats': {...}}
+        """
+        start = time.perf_counter()
+        s = self.settings
+        frequencies = np.asarray(DEFAULT_FREQUENCIES if frequencies is None else frequencies, dtype=float)
+        max_od = None if casing_id is None else casing_id - clearance
+        stats = {'pareto_size': 0, 'nodes': 0, 'pruned': 0, 'pruned_motors': 0, 'leaves': 0, 'workers': 1}
+        empty = {'pareto': [], 'stats': stats}
+
+        pump_table, pump_indices = self.catalog.select('pump', status=status, lift_method=lift_method)
+        motor_table, motor_indices = self.catalog.select('motor', status=status)
+        protector_table, protector_indices = self.catalog.select('protector', status=status)
+        separator_table, separator_indices = self.catalog.select('separator', status=status)
+        stats.update(pumps=len(pump_indices), motors=len(motor_indices),
+                     protectors=len(protector_indices), separators=len(separator_indices))
+
+        # 电机：外径、绝缘温度
+        motor_rows = motor_table.rows[motor_indices]
+        rating = motor_table.lookup('insulation_class', s.motor_temperature,
+                                    default=s.motor_temperature(None))[motor_indices]
+        usable = self._fits(motor_rows['outside_diameter'], max_od) & (rating >= bht + s.motor_temperature_rise)
+        motor_indices = motor_indices[usable]
+        index = self.motor_index.for_table(motor_table) if self.motor_index else None
+        motor_power = motor_power_matrix(motor_table, motor_indices, frequencies, index)
+        motor_power = np.nan_to_num(motor_power, nan=0.0)
+        motor_cost = s.motor_base_cost + s.motor_cost_per_kw * np.nan_to_num(
+            motor_table.rows['power_main'][motor_indices], nan=0.0)
+
+        # 保护器：外径、温度；只保留成本-承载能力前沿（更贵却不更强的保护器不会出现在 Pareto 集中）
+        protector_rows = protector_table.rows[protector_indices]
+        capacity = protector_rows['thrust_capacity']
+        usable = (self._fits(protector_rows['outer_diameter'], max_od) & (capacity > 0)
+                  & (np.isnan(protector_rows['max_temperature']) | (protector_rows['max_temperature'] >= bht)))
+        protector_indices, capacity = protector_indices[usable], capacity[usable]
+        protector_cost = s.protector_base_cost + s.protector_cost_per_kn * capacity
+        order = np.lexsort((-capacity, protector_cost))
+        protector_indices, capacity, protector_cost = protector_indices[order], capacity[order], protector_cost[order]
+        stronger = capacity > np.maximum.accumulate(np.concatenate([[-np.inf], capacity[:-1]]))
+        protector_indices, capacity, protector_cost = (
+            protector_indices[stronger], capacity[stronger], protector_cost[stronger])
+
+        # 分离器：只影响投资，取满足处理能力的最便宜一台；无自由气时不配
+        separator_index, separator_cost = None, 0.0
+        if gas_rate > 0:
+            separator_rows = separator_table.rows[separator_indices]
+            usable = (self._fits(separator_rows['outer_diameter'], max_od)
+                      & (np.nan_to_num(separator_rows['gas_handling_capacity'], nan=0.0) >= gas_rate)
+                      & (np.nan_to_num(separator_rows['liquid_handling_capacity'], nan=np.inf) >= required_flow))
+            if not usable.any():
+                return empty
+            costs = s.separator_base_cost + s.separator_cost_per_m3d * np.nan_to_num(
+                separator_rows['liquid_handling_capacity'], nan=0.0)
+            best = np.flatnonzero(usable)[np.argmin(costs[usable])]
+            separator_index, separator_cost = int(separator_indices[best]), float(costs[best])
+
+        if not len(motor_indices) or not len(protector_indices):
+            return empty
+
+        nodes = self._pump_nodes(pump_table, pump_indices, required_flow, required_head, frequencies, max_od)
+        bhp, thrust, freq_index = nodes['bhp'], nodes['thrust'], nodes['frequency_index']
+
+        # 节点下界：满足功率的最便宜电机、满足推力的最便宜保护器；最大可达余量
+        motor_bound = np.full(len(bhp), np.inf)
+        best_motor = np.zeros(len(bhp))
+        for f in range(len(frequencies)):
+            at = np.flatnonzero(freq_index == f)
+            if not len(at):
+                continue
+            powers = motor_power[:, f]
+            order = np.argsort(powers)
+            suffix_min = np.minimum.accumulate(motor_cost[order][::-1])[::-1]
+            first = np.searchsorted(powers[order], bhp[at] * s.motor_service_factor, side='left')
+            motor_bound[at] = np.append(suffix_min, np.inf)[first]
+            best_motor[at] = powers.max()
+        first = np.searchsorted(capacity, thrust, side='left')   # 前沿上承载能力随成本递增
+        protector_bound = np.append(protector_cost, np.inf)[first]
+
+        capex_fixed = s.pump_base_cost + s.pump_stage_cost * nodes['stages'] + separator_cost
+        capex_bound = capex_fixed + motor_bound + protector_bound
+        with np.errstate(divide='ignore'):
+            margin_bound = np.minimum(1.0 - bhp / best_motor, 1.0 - thrust / capacity[-1])
+        reachable = np.isfinite(capex_bound)
+
+        problem = {
+            'bhp': bhp, 'thrust': thrust, 'frequency_index': freq_index,
+            'capex_fixed': capex_fixed, 'capex_bound': capex_bound, 'margin_bound': margin_bound,
+            'motor_power': motor_power, 'motor_cost': motor_cost,
+            'protector_capacity': capacity, 'protector_cost': protector_cost,
+            'resolution': (s.capex_resolution, s.energy_resolution, s.margin_resolution),
+            'settings': {'motor_efficiency': s.motor_efficiency, 'motor_part_load_loss': s.motor_part_load_loss,
+                         'motor_service_factor': s.motor_service_factor},
+        }
+        # 按投资下界升序展开，尽早得到紧的前沿以剪掉更多节点
+        order = np.flatnonzero(reachable)
+        order = order[np.argsort(capex_bound[order], kind='stable')]
+        stats['nodes'] = len(order)
+
+        front, keys = self._run(problem, order, stats)
+        ranked = np.argsort(front[:, 0] + energy_weight * front[:, 1], kind='stable')[:max_results] if len(front) else []
+        stats['pareto_size'] = len(front)
+
+        pareto = []
+        for position in ranked:
+            node, motor, protector = (int(v) for v in keys[position])
+            pareto.append(self._solution(
+                nodes, node, frequencies, front[position],
+                pump_table, motor_table, protector_table, separator_table,
+                int(motor_indices[motor]), float(motor_power[motor, freq_index[node]]),
+                int(protector_indices[protector]), float(capacity[protector]), separator_index
+            ))
+
+        elapsed = time.perf_counter() - start
+        stats['elapsed_ms'] = round(elapsed * 1000.0, 1)
+        performance_monitor.record('screening', 'esp_configure', start, elapsed,
+                                   {key: stats[key] for key in ('nodes', 'pareto_size') + _SEARCH_COUNTERS})
+        logger.info(f"组合选型完成: 节点 {stats['nodes']}（剪枝 {stats['pruned']}，电机分支剪枝 {stats['pruned_motors']}）, "
+                    f"叶子 {stats['leaves']}, Pareto {stats['pareto_size']} 个方案, 耗时 {stats['elapsed_ms']} ms")
+        return {'pareto': pareto, 'stats': stats}
+
+    def _run(self, problem: Dict[str, Any], order: np.ndarray,
+             stats: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """节点少时在当前进程搜索；多时交错分块（每块都含低投资节点）交给进程池并合并前沿"""
+        if self.workers <= 1 or len(order) <= self.parallel_threshold:
+            front, keys, local = _search_nodes(problem, order)
+            for key in _SEARCH_COUNTERS:
+                stats[key] += local[key]
+            return front, keys
+
+        chunks = [order[i::self.workers] for i in range(self.workers)]
+        try:
+            futures = [self._get_executor().submit(_search_nodes, problem, chunk) for chunk in chunks]
+            results = [future.result() for future in futures]
+        except Exception as e:
+            logger.warning(f"进程池搜索失败，改为在当前进程搜索: {e}")
+            self.shutdown()
+            results = [_search_nodes(problem, order)]
+        stats['workers'] = len(results)
+
+        for _, _, local in results:
+            for key in _SEARCH_COUNTERS:
+                stats[key] += local[key]
+        front = np.concatenate([result[0] for result in results])
+        keys = np.concatenate([result[1] for result in results])
+        rows = _unique_front(front, epsilon_boxes(front, problem['resolution']))
+        return front[rows], keys[rows]
+
+    def _solution(self, nodes, node, frequencies, objectives, pump_table, motor_table, protector_table,
+                  separator_table, motor_index, motor_power, protector_index, protector_capacity,
+                  separator_index) -> Dict[str, Any]:
+        pump_index = int(nodes['catalog_index'][node])
+        bhp = float(nodes['bhp'][node])
+        thrust = float(nodes['thrust'][node])
+        energy = float(objectives[1])
+
+        diameters = [pump_table.rows['outside_diameter'][pump_index],
+                     motor_table.rows['outside_diameter'][motor_index],
+                     protector_table.rows['outer_diameter'][protector_index]]
+        separator = None
+        if separator_index is not None:
+            separator = separator_table.records([separator_index])[0]
+            diameters.append(separator_table.rows['outer_diameter'][separator_index])
+        diameters = [d for d in diameters if not np.isnan(d)]
+
+        return {
+            'pump': pump_table.records([pump_index])[0],
+            'stages': int(nodes['stages'][node]),
+            'frequency': float(frequencies[nodes['frequency_index'][node]]),
+            'motor': motor_table.records([motor_index])[0],
+            'protector': protector_table.records([protector_index])[0],
+            'separator': separator,
+            'capex': float(objectives[0]),
+            'energy_kw': energy,
+            'annual_energy_mwh': energy * self.settings.operating_hours / 1000.0,
+            'efficiency_margin': float(-objectives[2]),
+            'pump_bhp': bhp,
+            'developed_head': float(nodes['head'][node]),
+            'motor_power': motor_power,
+            'motor_load': bhp / motor_power if motor_power > 0 else None,
+            'axial_thrust': thrust,
+            'thrust_margin': 1.0 - thrust / protector_capacity,
+            'max_od': float(max(diameters)) if diameters else None,
+        }
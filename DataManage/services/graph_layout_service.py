@@ -0,0 +1,352 @@
+# DataManage/services/graph_layout_service.py
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .performance_monitor import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LayoutSettings:
+    """力导向布局参数（Fruchterman-Reingold，近邻斥力按网格分箱精确计算，远场斥力按粗网格近似）"""
+    width: float = 800.0
+    height: float = 600.0
+    iterations: int = 80            # 冷启动迭代次数
+    warm_iterations: int = 30       # 热启动（沿用上次布局）迭代次数
+    cutoff: float = 1.5             # 近邻斥力截断距离 = cutoff × 理想边长，同时是网格单元边长（远场由粗网格负责）
+    gravity: float = 1.0            # 指向画布中心的约束强度（倍数，见 confinement）
+    fill: float = 0.6               # 斥力与约束平衡时节点所占椭圆面积 / 画布面积
+    margin: float = 0.04            # 最终布局缩放进画布时四周的留白（占画布尺寸的比例）
+    rebuild_every: int = 5          # 近邻列表重建间隔（迭代次数），期间按略大的半径容纳节点移动
+    far_grid: int = 16              # 远场斥力粗网格边长（单元数），0表示只计算近邻斥力
+    min_distance: float = 0.01      # 重合节点的最小距离
+    seed: int = 0
+
+
+def neighbor_pairs(positions: np.ndarray, cell: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    网格分箱：返回相邻（同一或相邻网格单元内）的节点对 (i, j)，i < j，每对只出现一次
+
+    节点按单元编号排序后，对半个 3×3 邻域的每个偏移用 searchsorted 找到邻居单元的区间并展开，
+    不构造 N×N 矩阵；节点分布均匀时节点对数量约为 N × 每单元节点数 × 4.5。
+    """
+    n = len(positions)
+    if n < 2:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+
+    keys = np.floor(positions / cell).astype(np.int64)
+    keys -= keys.min(axis=0) - 1                 # 留出邻域偏移的空间，编号不会越界
+    stride = int(keys[:, 1].max()) + 2
+    cells = keys[:, 0] * stride + keys[:, 1]
+    order = np.argsort(cells, kind='stable')
+    sorted_cells = cells[order]
+
+    # 半邻域：本单元 + 4个方向的相邻单元，每对相邻单元只展开一次
+    first_list, second_list = [], []
+    nodes = np.arange(n)
+    for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        neighbor = cells + dx * stride + dy
+        start = np.searchsorted(sorted_cells, neighbor, side='left')
+        counts = np.searchsorted(sorted_cells, neighbor, side='right') - start
+        total = int(counts.sum())
+        if not total:
+            continue
+        first = np.repeat(nodes, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = order[np.repeat(start, counts) + offsets]
+        if dx == 0 and dy == 0:
+            keep = first < second
+            first, second = first[keep], second[keep]
+        first_list.append(first)
+        second_list.append(second)
+
+    if not first_list:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+    first, second = np.concatenate(first_list), np.concatenate(second_list)
+    return np.minimum(first, second), np.maximum(first, second)
+
+
+def far_field(positions: np.ndarray, ideal: float, grid: int) -> np.ndarray:
+    """
+    远场斥力近似：节点按粗网格聚合为带质量的质心，单元之间按质心计算斥力，
+    单元内节点共享所在单元受到的力（单层 Barnes-Hut 近似，复杂度 O(N + grid⁴)）。
+
+    只计算截断距离内的斥力时，弹簧会把各分量越拉越紧，节点密度和近邻对数随之暴涨；
+    远场项维持整体展开，近邻列表保持稀疏。
+    """
+    if not len(positions):
+        return np.zeros((0, 2))
+    low = positions.min(axis=0)
+    span = np.maximum(positions.max(axis=0) - low, 1e-9)
+    keys = np.minimum((positions - low) / span * grid, grid - 1).astype(np.intp)
+    cells = keys[:, 0] * grid + keys[:, 1]
+    _, inverse, mass = np.unique(cells, return_inverse=True, return_counts=True)
+    centroid = np.column_stack([np.bincount(inverse, positions[:, axis]) for axis in range(2)]) / mass[:, None]
+
+    delta = centroid[:, None, :] - centroid[None, :, :]
+    distance_sq = np.einsum('ijk,ijk->ij', delta, delta)
+    np.fill_diagonal(distance_sq, np.inf)          # 同一单元内由近邻斥力负责
+    force = np.einsum('ijk,ij->ik', delta, ideal * ideal * mass[None, :] / distance_sq)
+    return force[inverse]
+
+
+def confinement(settings: LayoutSettings) -> Tuple[float, float]:
+    """
+    指向画布中心的线性约束系数 (gx, gy)
+
+    斥力 k²/d 与二维库仑力同形式：在线性约束下平衡时节点均匀分布在椭圆内，
+    半轴 a、b 满足 gx = 2WH / (a(a+b))、gy = 2WH / (b(a+b))。按画布长宽比取椭圆、
+    面积为 fill × 画布面积，布局自然落在画布内，不需要在迭代中裁剪坐标
+    （裁剪会把远场斥力推出的节点堆在边框上）。
+    """
+    width, height = settings.width, settings.height
+    ratio = np.sqrt(4.0 * settings.fill / np.pi)
+    a, b = ratio * width / 2.0, ratio * height / 2.0
+    return (settings.gravity * 2.0 * width * height / (a * (a + b)),
+            settings.gravity * 2.0 * width * height / (b * (a + b)))
+
+
+def fit_to_canvas(positions: np.ndarray, settings: LayoutSettings) -> np.ndarray:
+    """把布局居中到画布，超出留白后的可用区域时等比缩小（不放大，保持节点间距）"""
+    if not len(positions):
+        return positions
+    low, high = positions.min(axis=0), positions.max(axis=0)
+    size = np.array([settings.width, settings.height])
+    available = size * (1.0 - 2.0 * settings.margin)
+    scale = min(1.0, float(np.min(available / np.maximum(high - low, 1e-9))))
+    return (positions - (low + high) / 2.0) * scale + size / 2.0
+
+
+def force_layout(positions: np.ndarray, edges: np.ndarray, weights: Optional[np.ndarray] = None,
+                 fixed: Optional[np.ndarray] = None, settings: Optional[LayoutSettings] = None,
+                 iterations: Optional[int] = None, temperature: Optional[float] = None,
+                 callback: Optional[Callable[[np.ndarray, int], bool]] = None,
+                 callback_every: int = 5) -> np.ndarray:
+    """
+    向量化力导向布局
+
+    Args:
+        positions: 初始坐标 [N, 2]（热启动时为上次布局）
+        edges: 边 [E, 2]（节点行号）
+        weights: 边权重 [E]（弹簧强度，再按两端度数归一化），默认1
+        fixed: 固定不动的节点 [N] 布尔数组
+        settings: 布局参数
+        iterations: 迭代次数，默认 settings.iterations
+        temperature: 初始最大位移，默认画布尺寸的1/10（热启动时应更小）
+        callback: 每 callback_every 次迭代回调 callback(坐标, 迭代次数)，返回 False 时提前停止
+        callback_every: 回调间隔
+
+    Returns:
+        坐标 [N, 2]；没有固定节点时居中并缩放进画布（回调中的坐标同样处理），
+        有固定节点时保持原坐标系
+    """
+    s = settings or LayoutSettings()
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    n = len(positions)
+    if n == 0:
+        return positions.copy()
+    edges = np.asarray(edges, dtype=np.intp).reshape(-1, 2)
+    weights = np.ones(len(edges)) if weights is None else np.asarray(weights, dtype=float)
+    if len(edges):
+        # 弹簧强度按两端度数归一化：连接大量设备的需求/约束中心节点不会把邻居压成一团
+        degree = np.bincount(edges.ravel(), minlength=n).astype(float)
+        weights = weights / np.sqrt(degree[edges[:, 0]] * degree[edges[:, 1]])
+    movable = np.ones(n, dtype=bool) if fixed is None else ~np.asarray(fixed, dtype=bool)
+
+    ideal = np.sqrt(s.width * s.height / n)       # 理想边长
+    cutoff = s.cutoff * ideal
+    skin = cutoff * 1.25 if s.rebuild_every > 1 else cutoff
+    center = np.array([s.width / 2.0, s.height / 2.0])
+    gravity_x, gravity_y = confinement(s)
+    fit = fit_to_canvas if movable.all() else (lambda coordinates, settings: coordinates)
+    iterations = s.iterations if iterations is None else iterations
+    temperature = max(s.width, s.height) / 10.0 if temperature is None else temperature
+    cooling = temperature / max(iterations, 1)
+    source, target = (edges[:, 0], edges[:, 1]) if len(edges) else (np.zeros(0, np.intp),) * 2
+    edge_ends = np.concatenate([target, source])     # 一次 bincount 同时累加两端（符号相反）
+    x, y = positions[:, 0].copy(), positions[:, 1].copy()
+    first = second = pair_ends = np.zeros(0, dtype=np.intp)
+
+    for iteration in range(iterations):
+        # 斥力 k²/d，只计算截断距离内的邻近节点对（近邻列表每 rebuild_every 次迭代重建）
+        if iteration % max(s.rebuild_every, 1) == 0:
+            first, second = neighbor_pairs(np.column_stack([x, y]), skin)
+            pair_ends = np.concatenate([first, second])
+        dx = np.zeros(n)
+        dy = np.zeros(n)
+        if len(first):
+            delta_x = x[first] - x[second]
+            delta_y = y[first] - y[second]
+            distance_sq = np.maximum(delta_x * delta_x + delta_y * delta_y, s.min_distance ** 2)
+            strength = (ideal * ideal) / distance_sq
+            strength[distance_sq >= cutoff * cutoff] = 0.0
+            fx, fy = strength * delta_x, strength * delta_y
+            dx += np.bincount(pair_ends, np.concatenate([fx, -fx]), minlength=n)
+            dy += np.bincount(pair_ends, np.concatenate([fy, -fy]), minlength=n)
+
+        if s.far_grid > 1:
+            far = far_field(np.column_stack([x, y]), ideal, s.far_grid)
+            dx += far[:, 0]
+            dy += far[:, 1]
+
+        # 引力 d²/k（沿边）
+        if len(source):
+            delta_x = x[source] - x[target]
+            delta_y = y[source] - y[target]
+            strength = np.sqrt(delta_x * delta_x + delta_y * delta_y) * weights / ideal
+            fx, fy = strength * delta_x, strength * delta_y
+            dx += np.bincount(edge_ends, np.concatenate([fx, -fx]), minlength=n)
+            dy += np.bincount(edge_ends, np.concatenate([fy, -fy]), minlength=n)
+
+        dx -= gravity_x * (x - center[0])
+        dy -= gravity_y * (y - center[1])
+
+        # 位移不超过当前温度
+        length = np.sqrt(dx * dx + dy * dy)
+        scale = np.minimum(length, temperature) / np.maximum(length, 1e-9)
+        scale[~movable] = 0.0
+        x += dx * scale
+        y += dy * scale
+        temperature = max(temperature - cooling, 1e-3)
+
+        if callback is not None and (iteration + 1) % callback_every == 0 and iteration + 1 < iterations:
+            if callback(fit(np.column_stack([x, y]), s), iteration + 1) is False:
+                break
+
+    return fit(np.column_stack([x, y]), s)
+
+
+class GraphLayoutService:
+    """
+    知识图谱力导向布局 - 按图谱键记住上次布局，之后的布局从上次坐标热启动
+
+    已有节点从原位置出发、以较低温度迭代较少次数，新增节点放在已定位邻居的中心附近
+    （没有已定位邻居时使用预设坐标或随机位置），图谱小幅变化时整体布局保持稳定。
+    """
+
+    def __init__(self, settings: Optional[LayoutSettings] = None):
+        self.settings = settings or LayoutSettings()
+        self._layouts: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+
+    def layout(self, key: str, node_ids: Sequence[str], edges: Sequence[Tuple[str, str, float]],
+               initial: Optional[Dict[str, Dict[str, float]]] = None,
+               fixed: Optional[Sequence[str]] = None,
+               stream: Optional[Callable[[Dict[str, Dict[str, float]], int], bool]] = None,
+               stream_every: int = 5,
+               settings: Optional[LayoutSettings] = None) -> Dict[str, Dict[str, float]]:
+        """
+        计算布局
+
+        Args:
+            key: 图谱键（如步骤ID），同一键的下一次布局从本次结果热启动
+            node_ids: 节点ID
+            edges: [(源节点ID, 目标节点ID, 权重)]，端点不在 node_ids 中的边被忽略
+            initial: 预设坐标 {节点ID: {'x', 'y'}}，用于没有上次坐标的节点
+            fixed: 固定不动的节点ID
+            stream: 迭代过程中的坐标回调 stream(坐标字典, 迭代次数)，返回 False 时提前停止
+            stream_every: 回调间隔（迭代次数）
+            settings: 本次使用的布局参数（如按节点数放大的画布），默认使用服务配置
+
+        Returns:
+            {节点ID: {'x', 'y'}}
+        """
+        start = time.perf_counter()
+        s = settings or self.settings
+        node_ids = list(node_ids)
+        index = {node_id: row for row, node_id in enumerate(node_ids)}
+        n = len(node_ids)
+        with self._lock:
+            previous = dict(self._layouts.get(key, {}))
+
+        pairs = [(index[a], index[b], float(w)) for a, b, w in edges if a in index and b in index and a != b]
+        edge_array = np.array([(a, b) for a, b, _ in pairs], dtype=np.intp).reshape(-1, 2)
+        weights = np.array([w for _, _, w in pairs], dtype=float)
+
+        positions, placed = self._initial_positions(node_ids, previous, initial or {}, edge_array, s)
+        warm = bool(placed.any())
+        fixed_ids = set(fixed or ())
+        fixed_mask = np.array([node_id in fixed_ids for node_id in node_ids], dtype=bool)
+
+        def to_dict(coordinates: np.ndarray) -> Dict[str, Dict[str, float]]:
+            return {node_id: {'x': float(x), 'y': float(y)}
+                    for node_id, (x, y) in zip(node_ids, coordinates.tolist())}
+
+        callback = None
+        if stream is not None:
+            callback = lambda coordinates, iteration: stream(to_dict(coordinates), iteration)
+
+        ideal = np.sqrt(s.width * s.height / max(n, 1))
+        result = force_layout(
+            positions, edge_array, weights, fixed_mask, s,
+            iterations=s.warm_iterations if warm else s.iterations,
+            temperature=ideal * 0.5 if warm else None,
+            callback=callback, callback_every=stream_every
+        )
+
+        layout = to_dict(result)
+        with self._lock:
+            self._layouts[key] = {node_id: (point['x'], point['y']) for node_id, point in layout.items()}
+        elapsed = time.perf_counter() - start
+        performance_monitor.record('graph_layout', key, start, elapsed,
+                                   {'nodes': n, 'edges': len(edge_array), 'warm': bool(warm)})
+        logger.info(f"力导向布局完成: {key}, {n}个节点, {len(edge_array)}条边, "
+                    f"{'热启动' if warm else '冷启动'}, 耗时 {elapsed * 1000:.0f}ms")
+        return layout
+
+    def canvas_settings(self, node_count: int, spacing: float = 60.0) -> LayoutSettings:
+        """按节点数放大画布（保持长宽比）使理想节点间距不小于 spacing 像素；节点少时即默认画布"""
+        base = self.settings
+        width = max(base.width, np.sqrt(node_count * base.width / base.height) * spacing)
+        return replace(base, width=float(width), height=float(width * base.height / base.width))
+
+    def forget(self, key: Optional[str] = None):
+        """丢弃记住的布局（None表示全部），下次冷启动"""
+        with self._lock:
+            if key is None:
+                self._layouts.clear()
+            else:
+                self._layouts.pop(key, None)
+
+    def _initial_positions(self, node_ids: List[str], previous: Dict[str, Tuple[float, float]],
+                           initial: Dict[str, Dict[str, float]], edges: np.ndarray, s: LayoutSettings):
+        """上次坐标优先；新增节点放在已定位邻居的中心附近，否则用预设坐标，再否则随机"""
+        n = len(node_ids)
+        rng = np.random.default_rng(s.seed)
+        positions = np.column_stack([rng.uniform(0, s.width, n), rng.uniform(0, s.height, n)]) \
+            if n else np.zeros((0, 2))
+        placed = np.zeros(n, dtype=bool)
+        for row, node_id in enumerate(node_ids):
+            if node_id in previous:
+                positions[row] = previous[node_id]
+                placed[row] = True
+
+        if placed.any() and not placed.all() and len(edges):
+            # 新节点取已定位邻居的平均坐标，加少量抖动避免重合
+            both = np.concatenate([edges, edges[:, ::-1]])
+            anchored = placed[both[:, 1]] & ~placed[both[:, 0]]
+            rows, neighbors = both[anchored, 0], both[anchored, 1]
+            counts = np.bincount(rows, minlength=n)
+            has_neighbor = counts > 0
+            for axis in range(2):
+                sums = np.bincount(rows, positions[neighbors, axis], minlength=n)
+                positions[has_neighbor, axis] = sums[has_neighbor] / counts[has_neighbor]
+            jitter = np.sqrt(s.width * s.height / max(n, 1)) * 0.3
+            positions[has_neighbor] += rng.uniform(-jitter, jitter, (int(has_neighbor.sum()), 2))
+            placed_new = has_neighbor
+        else:
+            placed_new = np.zeros(n, dtype=bool)
+
+        for row, node_id in enumerate(node_ids):
+            if not placed[row] and not placed_new[row] and node_id in initial:
+                positions[row] = (initial[node_id]['x'], initial[node_id]['y'])
+        return positions, placed
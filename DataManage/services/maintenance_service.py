@@ -0,0 +1,412 @@
+# DataManage/services/maintenance_service.py
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QObject, Signal
+from sqlalchemy import event, text
+
+from ..config.database_config import DatabaseConfig
+from DataManage.models.base import Base
+from .engine_provider import get_invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+
+ARCHIVE_PREFIX = 'archive_'
+
+# 带 is_deleted 软删除标记的表（按此顺序清理：先清井，其轨迹和套管随井一起归档）
+SOFT_DELETE_TABLES = ('wells_new', 'devices', 'well_trajectories', 'casings')
+
+# 清理前后各执行一次的探测查询，用于报告清理带来的查询耗时变化
+_PROBE_QUERIES = {
+    'devices': "SELECT COUNT(*) FROM devices WHERE is_deleted = 0",
+    'wells_new': "SELECT COUNT(*) FROM wells_new WHERE is_deleted = 0",
+    'well_trajectories': "SELECT COUNT(*) FROM well_trajectories WHERE is_deleted = 0",
+    'casings': "SELECT COUNT(*) FROM casings WHERE is_deleted = 0",
+}
+_PROBE_REPEAT = 5
+
+# SQLAlchemy DateTime 在SQLite中的存储格式
+_SQLITE_DATETIME = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def _dependents(table_name: str) -> List[Tuple[str, str, str]]:
+    """
+    外键依赖表（递归，父表在前）
+
+    Returns:
+        [(子表, 外键列, 父表)]
+    """
+    result = []
+    pending = [table_name]
+    while pending:
+        parent = pending.pop(0)
+        for table in Base.metadata.sorted_tables:
+            for fk in table.foreign_keys:
+                if fk.column.table.name == parent and table.name != parent:
+                    result.append((table.name, fk.parent.name, parent))
+                    pending.append(table.name)
+    return result
+
+
+class MaintenanceService(QObject):
+    """
+    数据库维护服务 - 归档过期的软删除行，空闲时分步执行增量VACUUM
+
+    超过保留期的软删除行（及依赖它们的子表行）在一个事务内分批移入 archive_* 表，
+    热表只保留有效数据；释放出的页面在数据库空闲时以 PRAGMA incremental_vacuum
+    小步归还给文件系统。每次维护报告归档行数、回收空间和探测查询的耗时变化。
+    """
+
+    # 定义信号（在工作线程中发射，接收方按队列连接处理）
+    maintenanceStarted = Signal()
+    maintenanceCompleted = Signal('QVariant')    # 维护报告
+    maintenanceFailed = Signal(str)              # 错误消息
+
+    def __init__(self, engine, config: DatabaseConfig, parent=None, write_queue=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.config = config
+        # 归档批次经写入租约排队，与其他写事务串行
+        self.write_queue = write_queue
+
+        self._stop_event = threading.Event()
+        self._run_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._worker_ident: Optional[int] = None
+        self._last_activity = time.monotonic()
+        self._reports: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self._conversion_failed = False
+
+        # 记录其他线程最近一次执行SQL的时间，用于判断空闲
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() != self._worker_ident:
+            self._last_activity = time.monotonic()
+
+    # ========== 调度 ==========
+
+    def start(self):
+        """启动定时维护线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='db-maintenance', daemon=True)
+        self._thread.start()
+        logger.info(f"数据库定时维护已启动: 间隔 {self.config.maintenance_interval} 秒, "
+                    f"软删除保留 {self.config.soft_delete_retention_days} 天")
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止定时维护（正在进行的维护在当前批次/步骤后结束）"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop_event.wait(self.config.maintenance_interval):
+            self.run_now()
+
+    def is_idle(self) -> bool:
+        """最近 maintenance_idle_seconds 秒内没有其他线程执行SQL"""
+        return time.monotonic() - self._last_activity >= self.config.maintenance_idle_seconds
+
+    # ========== 维护 ==========
+
+    def run_now(self, retention_days: Optional[int] = None, wait_for_idle: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        立即执行一次维护：归档过期软删除行，然后增量VACUUM
+
+        Args:
+            retention_days: 软删除保留天数，默认使用配置
+            wait_for_idle: VACUUM步骤是否只在数据库空闲时执行
+
+        Returns:
+            维护报告，已有维护在进行或失败时返回None
+        """
+        if not self._run_lock.acquire(blocking=False):
+            logger.info("已有维护任务正在进行，跳过本次维护")
+            return None
+
+        self._worker_ident = threading.get_ident()
+        self.maintenanceStarted.emit()
+        start = time.perf_counter()
+        try:
+            retention = self.config.soft_delete_retention_days if retention_days is None else retention_days
+            cutoff = datetime.now() - timedelta(days=retention)
+
+            size_before = self._file_size()
+            probes_before = self._probe()
+            archived = self.purge_soft_deleted(cutoff)
+            vacuum = self.incremental_vacuum(wait_for_idle=wait_for_idle)
+            probes_after = self._probe()
+            size_after = self._file_size()
+
+            report = {
+                'finished_at': datetime.now().isoformat(),
+                'duration': round(time.perf_counter() - start, 3),
+                'cutoff': cutoff.isoformat(),
+                'archived': archived,
+                'archived_total': sum(archived.values()),
+                'vacuum': vacuum,
+                'file_size_before': size_before,
+                'file_size_after': size_after,
+                'reclaimed_bytes': vacuum['pages_freed'] * vacuum['page_size'],
+                'queries': {
+                    name: {
+                        'before_ms': probes_before[name],
+                        'after_ms': probes_after[name],
+                        'speedup': round(probes_before[name] / probes_after[name], 2) if probes_after[name] else None,
+                    }
+                    for name in probes_before
+                },
+            }
+            self._reports.append(report)
+            logger.info(
+                f"数据库维护完成: 归档 {report['archived_total']} 行 {archived}, "
+                f"增量VACUUM回收 {vacuum['pages_freed']} 页 ({report['reclaimed_bytes'] / 1024:.1f} KB), "
+                f"耗时 {report['duration']:.2f} 秒"
+            )
+            self.maintenanceCompleted.emit(report)
+            return report
+
+        except Exception as e:
+            logger.error(f"数据库维护失败: {e}")
+            self.maintenanceFailed.emit(str(e))
+            return None
+
+        finally:
+            self._worker_ident = None
+            self._run_lock.release()
+
+    def purge_soft_deleted(self, cutoff: datetime) -> Dict[str, int]:
+        """
+        将删除时间（updated_at）早于cutoff的软删除行移入归档表
+
+        每批 batch_size 个根行在一个事务内完成：依赖表行先归档，再自底向上删除。
+
+        Returns:
+            {表名: 归档行数}
+        """
+        archived: Dict[str, int] = {}
+        cutoff_text = cutoff.strftime(_SQLITE_DATETIME)
+        batch_size = max(1, self.config.batch_size)
+
+        for root in SOFT_DELETE_TABLES:
+            tree = [(root, None, None)] + _dependents(root)
+            while not self._stop_event.is_set():
+                with self._exclusive(), self.engine.begin() as conn:
+                    moved = self._purge_batch(conn, tree, cutoff_text, batch_size)
+                for table_name, count in moved.items():
+                    if count:
+                        archived[table_name] = archived.get(table_name, 0) + count
+                if moved:
+                    get_invalidation_bus().publish(name for name, count in moved.items() if count)
+                if moved.get(root, 0) < batch_size:
+                    break
+                # 批次之间让出写锁
+                time.sleep(0.01)
+
+        return archived
+
+    def _exclusive(self):
+        return self.write_queue.exclusive() if self.write_queue is not None else nullcontext()
+
+    def _purge_batch(self, conn, tree: List[Tuple[str, Optional[str], Optional[str]]],
+                     cutoff_text: str, batch_size: int) -> Dict[str, int]:
+        root = tree[0][0]
+        existing = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+        tree = [entry for entry in tree if entry[0] in existing]
+
+        # 本批待清理的行ID，逐层展开到依赖表
+        for table_name in dict.fromkeys(table_name for table_name, _, _ in tree):
+            conn.execute(text(f"DROP TABLE IF EXISTS temp.purge_{table_name}"))
+            conn.execute(text(f"CREATE TEMP TABLE purge_{table_name} (id INTEGER PRIMARY KEY)"))
+        conn.execute(text(
+            f"INSERT INTO temp.purge_{root}(id) SELECT id FROM {root} "
+            f"WHERE is_deleted = 1 AND COALESCE(updated_at, created_at) < :cutoff "
+            f"ORDER BY id LIMIT :limit"
+        ), {'cutoff': cutoff_text, 'limit': batch_size})
+        for table_name, column, parent in tree[1:]:
+            conn.execute(text(
+                f"INSERT OR IGNORE INTO temp.purge_{table_name}(id) SELECT id FROM {table_name} "
+                f"WHERE {column} IN (SELECT id FROM temp.purge_{parent})"
+            ))
+
+        # 同一张表可能经多条外键路径出现（如 prediction_runs），归档和删除各只做一次
+        tables = list(dict.fromkeys(table_name for table_name, _, _ in tree))
+
+        moved: Dict[str, int] = {}
+        try:
+            if not conn.execute(text(f"SELECT COUNT(*) FROM temp.purge_{root}")).scalar():
+                return moved
+
+            archived_at = datetime.now().strftime(_SQLITE_DATETIME)
+            for table_name in tables:
+                columns = self._ensure_archive_table(conn, table_name)
+                column_list = ', '.join(f'"{name}"' for name in columns)
+                moved[table_name] = conn.execute(text(
+                    f"INSERT INTO {ARCHIVE_PREFIX}{table_name}({column_list}, archived_at) "
+                    f"SELECT {column_list}, :archived_at FROM {table_name} "
+                    f"WHERE id IN (SELECT id FROM temp.purge_{table_name})"
+                ), {'archived_at': archived_at}).rowcount
+
+            # 子表先删，避免无级联的外键阻止删除
+            for table_name in reversed(tables):
+                conn.execute(text(
+                    f"DELETE FROM {table_name} WHERE id IN (SELECT id FROM temp.purge_{table_name})"
+                ))
+            return moved
+        finally:
+            for table_name, _, _ in tree:
+                conn.execute(text(f"DROP TABLE IF EXISTS temp.purge_{table_name}"))
+
+    @staticmethod
+    def _ensure_archive_table(conn, table_name: str) -> List[str]:
+        """创建归档表并补齐源表新增的列，返回源表列名"""
+        archive = f"{ARCHIVE_PREFIX}{table_name}"
+        columns = [row[1] for row in conn.execute(text(f"PRAGMA table_info({table_name})"))]
+        archive_columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({archive})"))}
+
+        if not archive_columns:
+            conn.execute(text(f"CREATE TABLE {archive} AS SELECT * FROM {table_name} WHERE 0"))
+            conn.execute(text(f"ALTER TABLE {archive} ADD COLUMN archived_at DATETIME"))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{archive}_archived_at ON {archive}(archived_at)"))
+            logger.info(f"创建归档表: {archive}")
+        else:
+            for name in columns:
+                if name not in archive_columns:
+                    conn.execute(text(f'ALTER TABLE {archive} ADD COLUMN "{name}"'))
+        return columns
+
+    def incremental_vacuum(self, wait_for_idle: bool = True) -> Dict[str, Any]:
+        """
+        分步执行 PRAGMA incremental_vacuum，每步释放 vacuum_step_pages 页
+
+        数据库有其他活动时暂停（最多等待一个维护间隔），应用退出时中止。
+        auto_vacuum 不是 INCREMENTAL 的已有数据库（建库后无法再通过连接参数修改）
+        先在空闲时执行一次 PRAGMA auto_vacuum=INCREMENTAL + VACUUM 转换，之后按步回收。
+        """
+        step_pages = max(1, self.config.vacuum_step_pages)
+        deadline = time.monotonic() + self.config.maintenance_interval
+        auto_vacuum, page_size, free_before = self._vacuum_state()
+
+        result = {
+            'auto_vacuum': {0: 'NONE', 1: 'FULL', 2: 'INCREMENTAL'}.get(auto_vacuum, str(auto_vacuum)),
+            'page_size': page_size,
+            'free_pages_before': free_before,
+            'free_pages_after': free_before,
+            'pages_freed': 0,
+            'steps': 0,
+            'converted': False,
+            'completed': True,
+        }
+        if auto_vacuum != 2:
+            if self._conversion_failed or not self._wait_for_idle(wait_for_idle, deadline):
+                result['completed'] = False
+                return result
+            if not self._convert_to_incremental(result['auto_vacuum'], free_before):
+                result['completed'] = False
+                return result
+            auto_vacuum, page_size, free_pages = self._vacuum_state()
+            result.update(auto_vacuum='INCREMENTAL', converted=True, steps=1)
+        else:
+            free_pages = free_before
+
+        while free_pages > 0:
+            if not self._wait_for_idle(wait_for_idle, deadline):
+                result['completed'] = False
+                break
+
+            # sqlite3 的 execute 只单步执行语句（每次只释放一页），executescript 执行到结束
+            with self._exclusive():
+                raw = self.engine.raw_connection()
+                try:
+                    raw.driver_connection.executescript(f"PRAGMA incremental_vacuum({step_pages});")
+                    free_pages = raw.driver_connection.execute("PRAGMA freelist_count").fetchone()[0]
+                finally:
+                    raw.close()
+            result['steps'] += 1
+
+        result['free_pages_after'] = free_pages
+        result['pages_freed'] = free_before - free_pages
+        return result
+
+    def _vacuum_state(self) -> Tuple[int, int, int]:
+        """(auto_vacuum, page_size, freelist_count)"""
+        with self.engine.connect() as conn:
+            return (conn.execute(text("PRAGMA auto_vacuum")).scalar(),
+                    conn.execute(text("PRAGMA page_size")).scalar(),
+                    conn.execute(text("PRAGMA freelist_count")).scalar())
+
+    def _wait_for_idle(self, wait_for_idle: bool, deadline: float) -> bool:
+        """等待数据库空闲；应用退出或超过deadline时返回False"""
+        while not self._stop_event.is_set():
+            if not wait_for_idle or self.is_idle():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            self._stop_event.wait(min(1.0, self.config.maintenance_idle_seconds))
+        return False
+
+    def _convert_to_incremental(self, mode: str, free_pages: int) -> bool:
+        """一次性将已有数据库转换为 auto_vacuum=INCREMENTAL（完整VACUUM，同时回收全部空闲页）"""
+        logger.info(f"数据库 auto_vacuum={mode}，空闲时转换为 INCREMENTAL（完整VACUUM，当前空闲页 {free_pages}）")
+        start = time.perf_counter()
+        try:
+            with self._exclusive():
+                raw = self.engine.raw_connection()
+                try:
+                    raw.driver_connection.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+                finally:
+                    raw.close()
+        except Exception as e:
+            # 损坏的页、磁盘空间不足等：本进程内不再重试，下次启动再尝试
+            self._conversion_failed = True
+            logger.warning(f"转换 auto_vacuum=INCREMENTAL 失败，本次运行不再尝试: {e}")
+            return False
+        logger.info(f"数据库已转换为 auto_vacuum=INCREMENTAL，耗时 {time.perf_counter() - start:.2f} 秒")
+        return True
+
+    # ========== 报告 ==========
+
+    def _probe(self) -> Dict[str, float]:
+        """探测查询耗时（毫秒，取多次执行的最小值）"""
+        timings = {}
+        with self.engine.connect() as conn:
+            for name, sql in _PROBE_QUERIES.items():
+                best = float('inf')
+                for _ in range(_PROBE_REPEAT):
+                    start = time.perf_counter()
+                    conn.execute(text(sql)).scalar()
+                    best = min(best, time.perf_counter() - start)
+                timings[name] = round(best * 1000, 3)
+        return timings
+
+    def _file_size(self) -> int:
+        path = self.config.db_path
+        if path == ':memory:' or not os.path.exists(path):
+            return 0
+        return os.path.getsize(path)
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取维护状态和最近一次维护报告"""
+        return {
+            'enabled': self._thread is not None and self._thread.is_alive(),
+            'running': self._run_lock.locked(),
+            'interval': self.config.maintenance_interval,
+            'retention_days': self.config.soft_delete_retention_days,
+            'last_report': self._reports[-1] if self._reports else None,
+        }
+
+    def get_reports(self) -> List[Dict[str, Any]]:
+        """最近的维护报告（从新到旧）"""
+        return list(reversed(self._reports))
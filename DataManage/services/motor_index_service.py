@@ -0,0 +1,206 @@
+# DataManage/services/motor_index_service.py
+
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .device_catalog_service import CatalogTable, DeviceCatalogService
+
+logger = logging.getLogger(__name__)
+
+
+# 索引的电机参数，以及超出电机自身频率范围时按 (f/f端点)^指数 外推的指数：
+# 恒压频比下功率、电压、转速与频率成正比，电流近似不变
+MOTOR_QUANTITIES = {'power': 1.0, 'voltage': 1.0, 'current': 0.0, 'speed': 1.0}
+
+# 默认运行频率（与目录快照派生列 power_main 的首选频率一致）
+DEFAULT_FREQUENCY = 50
+
+
+class MotorFrequencyIndex:
+    """
+    电机 × 频率 参数表（单个目录快照）
+
+    频率轴为目录中出现过的全部频率；每台电机在同一频率有多条参数（不同电压）时
+    各项取第一条非空值，没有参数的格子为NaN。任意频率下的参数在电机自身
+    的参数点之间线性插值，超出范围时按 MOTOR_QUANTITIES 的指数外推。
+    行号与 CatalogTable.rows 一致。
+    """
+
+    def __init__(self, table: CatalogTable):
+        self.table = table
+        rows = table.rows
+        params = table.frequency
+        if params is None:
+            params = np.zeros(0, dtype=[('device_id', '<i8'), ('frequency', '<f8')]
+                              + [(name, '<f8') for name in MOTOR_QUANTITIES])
+
+        # 参数行 -> 电机行号（快照按创建时间排序，需经ID排序映射）
+        ids = rows['id']
+        order = np.argsort(ids)
+        if len(ids):
+            positions = np.minimum(np.searchsorted(ids, params['device_id'], sorter=order), len(ids) - 1)
+            matched = (ids[order[positions]] == params['device_id']) & (params['frequency'] > 0)
+        else:
+            positions = np.zeros(len(params), dtype=np.intp)
+            matched = np.zeros(len(params), dtype=bool)
+        params = params[matched]
+        motor_rows = order[positions[matched]]
+
+        self.frequencies = np.unique(params['frequency']).astype(float)
+        columns = np.searchsorted(self.frequencies, params['frequency'])
+        self._param_rows = motor_rows
+        self._params = params
+
+        # 每个 (电机, 频率) 第一条该项非空的参数（参数表已按 device_id, frequency, param_id 排序）
+        cell = motor_rows * len(self.frequencies) + columns
+        shape = (len(rows), len(self.frequencies))
+        self.grid: Dict[str, np.ndarray] = {}
+        for name in MOTOR_QUANTITIES:
+            values = np.full(shape, np.nan)
+            present = np.flatnonzero(~np.isnan(params[name]))
+            _, first = np.unique(cell[present], return_index=True)
+            first = present[first]
+            values[motor_rows[first], columns[first]] = params[name][first]
+            self.grid[name] = values
+
+    def __len__(self):
+        return len(self.table.rows)
+
+    def values(self, name: str, frequencies, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        参数在各频率下的值，形状 [电机, 频率]；rows 为 None 时返回全部电机
+
+        没有该参数的电机为NaN。
+        """
+        frequencies = np.atleast_1d(np.asarray(frequencies, dtype=float))
+        grid = self.grid[name] if rows is None else self.grid[name][np.asarray(rows, dtype=np.intp)]
+        exponent = MOTOR_QUANTITIES[name]
+        result = np.full((len(grid), len(frequencies)), np.nan)
+        if not grid.size:
+            return result
+
+        grid_freq = self.frequencies
+        columns = np.arange(len(grid_freq))
+        valid = ~np.isnan(grid)
+        # 每台电机有效参数点的最低、最高列
+        first = np.where(valid, columns, len(columns)).min(axis=1)
+        last = np.where(valid, columns, -1).max(axis=1)
+        has_any = last >= 0
+        motors = np.arange(len(grid))
+
+        def clamp(column):
+            return np.clip(column, 0, len(columns) - 1)
+
+        for position, frequency in enumerate(frequencies.tolist()):
+            # 左右最近的有效参数点
+            lower = np.where(valid & (grid_freq <= frequency), columns, -1).max(axis=1)
+            upper = np.where(valid & (grid_freq >= frequency), columns, len(columns)).min(axis=1)
+            inside = (lower >= 0) & (upper < len(columns))
+
+            lo_f, hi_f = grid_freq[clamp(lower)], grid_freq[clamp(upper)]
+            lo_v, hi_v = grid[motors, clamp(lower)], grid[motors, clamp(upper)]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                weight = np.where(hi_f > lo_f, (frequency - lo_f) / (hi_f - lo_f), 0.0)
+                interpolated = lo_v + (hi_v - lo_v) * weight
+                below = grid[motors, clamp(first)] * (frequency / grid_freq[clamp(first)]) ** exponent
+                above = grid[motors, clamp(last)] * (frequency / grid_freq[clamp(last)]) ** exponent
+
+            column = np.where(inside, interpolated, np.where(lower < 0, below, above))
+            result[:, position] = np.where(has_any, column, np.nan)
+        return result
+
+    def at(self, frequency: float, rows: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """单一频率下各参数的值（每项与 rows 等长）"""
+        return {name: self.values(name, [frequency], rows)[:, 0] for name in MOTOR_QUANTITIES}
+
+    def exact(self, name: str, frequency: float, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """电机在该频率的参数记录值（不插值；没有该频率的记录为NaN）"""
+        rows = slice(None) if rows is None else np.asarray(rows, dtype=np.intp)
+        column = np.searchsorted(self.frequencies, frequency)
+        if column == len(self.frequencies) or self.frequencies[column] != frequency:
+            return np.full(len(self.grid[name][rows]), np.nan)
+        return self.grid[name][rows, column]
+
+    def distinct(self, name: str, rows: Sequence[int]) -> List[List[float]]:
+        """各电机参数中出现过的不同取值（升序，忽略空值和0），如支持的电压、频率"""
+        rows = np.asarray(rows, dtype=np.intp)
+        values = self._params[name]
+        keep = ~np.isnan(values) & (values != 0)
+        motor_rows, values = self._param_rows[keep], values[keep]
+
+        pairs = np.unique(np.stack([motor_rows.astype(float), values], axis=1), axis=0) \
+            if len(values) else np.zeros((0, 2))
+        starts = np.searchsorted(pairs[:, 0], rows, side='left')
+        ends = np.searchsorted(pairs[:, 0], rows, side='right')
+        column = pairs[:, 1].tolist()
+        return [column[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+    def filter_by_power(self, rows: np.ndarray, required_power: float, frequency: float,
+                        lower: float = 0.8, upper: float = 1.3) -> np.ndarray:
+        """
+        在给定运行频率下功率落在 [lower, upper] × required_power 内的电机
+
+        Returns:
+            满足条件的 rows 子集，按功率与需求的接近程度排序
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        power = self.values('power', [frequency], rows)[:, 0]
+        with np.errstate(invalid='ignore'):
+            in_range = (required_power * lower <= power) & (power <= required_power * upper)
+        matched = rows[in_range]
+        return matched[np.argsort(np.abs(power[in_range] - required_power), kind='stable')]
+
+
+class MotorIndexService:
+    """
+    电机频率参数索引服务 - 每个电机目录快照构建一次 MotorFrequencyIndex
+
+    快照按写时复制替换，身份不变即内容不变；选型第7步、知识图谱和管柱组合选型共用。
+    """
+
+    def __init__(self, catalog: DeviceCatalogService):
+        self.catalog = catalog
+        self._cache = (None, None)
+        self._lock = threading.Lock()
+
+    def for_table(self, table: CatalogTable) -> MotorFrequencyIndex:
+        """指定电机快照的索引（与缓存的快照相同时直接复用）"""
+        with self._lock:
+            cached_table, index = self._cache
+            if cached_table is not table:
+                index = MotorFrequencyIndex(table)
+                self._cache = (table, index)
+            return index
+
+    def select(self, status: Optional[str] = 'active', lift_method: Optional[str] = None):
+        """
+        当前电机快照、符合条件的行号及其索引
+
+        Returns:
+            (CatalogTable, indices, MotorFrequencyIndex)
+        """
+        table, indices = self.catalog.select('motor', status=status, lift_method=lift_method)
+        return table, indices, self.for_table(table)
+
+    def suitable_motors(self, required_power: float, frequency: float = DEFAULT_FREQUENCY,
+                        lower: float = 0.8, upper: float = 1.3, limit: Optional[int] = None,
+                        status: Optional[str] = 'active') -> List[Dict]:
+        """
+        运行频率下功率满足需求的电机（按功率接近程度排序）
+
+        Returns:
+            [设备字典]，附加 'operating_params'：该频率下插值得到的功率、电压、电流、转速
+        """
+        table, indices, index = self.select(status=status)
+        matched = index.filter_by_power(indices, required_power, frequency, lower, upper)[:limit]
+        values = index.at(frequency, matched)
+        records = table.records(matched)
+        for position, record in enumerate(records):
+            record['operating_params'] = {'frequency': frequency, **{
+                name: None if np.isnan(values[name][position]) else float(values[name][position])
+                for name in MOTOR_QUANTITIES
+            }}
+        return records
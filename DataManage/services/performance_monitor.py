@@ -0,0 +1,301 @@
+# DataManage/services/performance_monitor.py
+
+import bisect
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+# 延迟直方图桶上界（毫秒），最后一个桶收纳更慢的调用
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """
+    语句指纹：去掉字面量、合并 IN (?, ?, ...) 列表和空白，
+    同一条查询的不同参数归为一类
+    """
+    text = _STRING_LITERAL.sub('?', statement)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _PLACEHOLDER_LIST.sub('(?...)', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+class LatencyHistogram:
+    """调用次数与延迟分布（固定对数桶，可估算分位数）"""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+    def add(self, duration_ms: float):
+        self.count += 1
+        self.total += duration_ms
+        self.min = min(self.min, duration_ms)
+        self.max = max(self.max, duration_ms)
+        self.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, duration_ms)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """按桶上界估算分位数（毫秒）"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                return HISTOGRAM_BOUNDS_MS[index] if index < len(HISTOGRAM_BOUNDS_MS) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total_ms': round(self.total, 3),
+            'mean_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'min_ms': round(self.min, 3) if self.count else 0.0,
+            'max_ms': round(self.max, 3),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': dict(zip([str(b) for b in HISTOGRAM_BOUNDS_MS] + ['inf'], self.buckets)),
+        }
+
+
+class PerformanceMonitor:
+    """
+    性能监控 - 汇总SQL语句和Qt槽函数的耗时
+
+    指标按 (类别, 名称) 聚合为延迟直方图；慢查询单独记录；
+    最近的调用以Chrome trace事件保存在环形缓冲区中，可导出后用 chrome://tracing 查看。
+    """
+
+    def __init__(self, slow_query_ms: float = 100.0, trace_buffer_size: int = 20000,
+                 slow_log_size: int = 200, enabled: bool = True):
+        self.slow_query_ms = slow_query_ms
+        self.enabled = enabled
+        self._metrics: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._slow_queries: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        self._trace: Deque[tuple] = deque(maxlen=trace_buffer_size)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._instrumented_engines = set()
+
+    def configure(self, slow_query_ms: Optional[float] = None, trace_buffer_size: Optional[int] = None,
+                  enabled: Optional[bool] = None):
+        """按配置调整阈值和缓冲区大小"""
+        with self._lock:
+            if slow_query_ms is not None:
+                self.slow_query_ms = slow_query_ms
+            if enabled is not None:
+                self.enabled = enabled
+            if trace_buffer_size is not None and trace_buffer_size != self._trace.maxlen:
+                self._trace = deque(self._trace, maxlen=trace_buffer_size)
+
+    # ========== 记录 ==========
+
+    def record(self, category: str, name: str, start: float, duration: float,
+               args: Optional[Dict[str, Any]] = None):
+        """
+        记录一次调用
+
+        Args:
+            category: 类别（'sql' / 'slot' / 自定义）
+            name: 名称（语句指纹或槽函数名）
+            start: 开始时间（time.perf_counter()）
+            duration: 耗时（秒）
+            args: 附加到trace事件的参数
+        """
+        if not self.enabled:
+            return
+        duration_ms = duration * 1000.0
+        with self._lock:
+            histogram = self._metrics.get((category, name))
+            if histogram is None:
+                histogram = self._metrics[(category, name)] = LatencyHistogram()
+            histogram.add(duration_ms)
+            self._trace.append((category, name, start, duration, threading.get_ident(), args))
+
+    def record_query(self, statement: str, parameters: Any, start: float, duration: float):
+        """记录SQL执行，超过阈值的写入慢查询日志"""
+        if not self.enabled:
+            return
+        key = fingerprint(statement)
+        self.record('sql', key, start, duration)
+
+        duration_ms = duration * 1000.0
+        if duration_ms >= self.slow_query_ms:
+            entry = {
+                'time': datetime.now().isoformat(timespec='milliseconds'),
+                'duration_ms': round(duration_ms, 3),
+                'fingerprint': key,
+                'statement': statement,
+                'parameters': repr(parameters)[:500],
+                'thread': threading.current_thread().name,
+            }
+            with self._lock:
+                self._slow_queries.append(entry)
+            logger.warning(f"慢查询 {duration_ms:.1f} ms: {key[:300]}")
+
+    # ========== 读取 ==========
+
+    def get_metrics(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """聚合指标列表（按总耗时倒序）"""
+        with self._lock:
+            items = [
+                dict(category=cat, name=name, **histogram.to_dict())
+                for (cat, name), histogram in self._metrics.items()
+                if category is None or cat == category
+            ]
+        items.sort(key=lambda item: item['total_ms'], reverse=True)
+        return items
+
+    def get_slow_queries(self) -> List[Dict[str, Any]]:
+        """慢查询日志（从新到旧）"""
+        with self._lock:
+            return list(reversed(self._slow_queries))
+
+    def reset(self):
+        """清空所有指标、慢查询和trace"""
+        with self._lock:
+            self._metrics.clear()
+            self._slow_queries.clear()
+            self._trace.clear()
+
+    # ========== 导出 ==========
+
+    def export_json(self, path: str) -> str:
+        """导出聚合指标和慢查询日志（JSON）"""
+        data = {
+            'exported_at': datetime.now().isoformat(),
+            'slow_query_ms': self.slow_query_ms,
+            'histogram_bounds_ms': list(HISTOGRAM_BOUNDS_MS),
+            'metrics': self.get_metrics(),
+            'slow_queries': self.get_slow_queries(),
+        }
+        self._write_json(path, data)
+        logger.info(f"性能指标已导出: {path}")
+        return path
+
+    def export_chrome_trace(self, path: str) -> str:
+        """导出Chrome trace事件文件（chrome://tracing 或 Perfetto 打开）"""
+        with self._lock:
+            trace = list(self._trace)
+
+        pid = os.getpid()
+        events = []
+        for category, name, start, duration, thread_id, args in trace:
+            event_data = {
+                'name': name if category != 'sql' else name[:120],
+                'cat': category,
+                'ph': 'X',
+                'ts': round((start - self._origin) * 1e6, 3),
+                'dur': round(duration * 1e6, 3),
+                'pid': pid,
+                'tid': thread_id,
+            }
+            if args:
+                event_data['args'] = args
+            elif category == 'sql':
+                event_data['args'] = {'statement': name}
+            events.append(event_data)
+
+        self._write_json(path, {'traceEvents': events, 'displayTimeUnit': 'ms'})
+        logger.info(f"性能trace已导出: {path} ({len(events)} 个事件)")
+        return path
+
+    @staticmethod
+    def _write_json(path: str, data: Dict[str, Any]):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+
+    # ========== SQL 计时 ==========
+
+    def instrument_engine(self, engine):
+        """为引擎挂接 before/after_cursor_execute 计时（幂等）"""
+        if id(engine) in self._instrumented_engines:
+            return
+        self._instrumented_engines.add(id(engine))
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            starts = conn.info.get('query_start')
+            if starts:
+                start = starts.pop()
+                self.record_query(statement, parameters, start, time.perf_counter() - start)
+
+        @event.listens_for(engine, 'handle_error')
+        def _error(exception_context):
+            conn = exception_context.connection
+            if conn is not None and conn.info.get('query_start'):
+                conn.info['query_start'].pop()
+
+
+# 全局共享实例
+performance_monitor = PerformanceMonitor()
+
+
+def get_performance_monitor() -> PerformanceMonitor:
+    """获取全局性能监控实例"""
+    return performance_monitor
+
+
+def timed_slot(name: Optional[str] = None, category: str = 'slot') -> Callable:
+    """
+    槽函数计时装饰器：记录调用次数和延迟分布
+
+    放在 @Slot 之下，例如::
+
+        @Slot(int)
+        @timed_slot()
+        def loadDevices(self, page): ...
+
+    Args:
+        name: 指标名，默认为 "类名.方法名"
+        category: 指标类别
+    """
+    def decorator(func: Callable) -> Callable:
+        qualified = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            monitor = performance_monitor
+            if not monitor.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                monitor.record(category, qualified, start, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
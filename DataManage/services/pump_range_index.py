@@ -0,0 +1,332 @@
+# DataManage/services/pump_range_index.py
+
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from DataManage.models.device import DeviceType, LiftMethod
+from DataManage.models.pump_performance import PumpCurveBlob, unpack_series
+from .device_catalog_service import CatalogTable, DeviceCatalogService
+from .engine_provider import get_invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+
+# 区间类型：泵的排量范围，以及由性能曲线最高效率点导出的 BEP ±25% 范围
+WINDOW_OPERATING = 'operating'
+WINDOW_BEP = 'bep'
+WINDOWS = (WINDOW_OPERATING, WINDOW_BEP)
+
+BEP_WINDOW_FRACTION = 0.25
+
+_EMPTY_IDS = np.empty(0, dtype=np.int64)
+
+
+class _Node:
+    __slots__ = ('center', 'left', 'right', 'lo', 'lo_ids', 'hi', 'hi_ids')
+
+    def __init__(self, center, left, right, lo, lo_ids, hi, hi_ids):
+        self.center = center
+        self.left = left
+        self.right = right
+        self.lo = lo            # 跨越中心点的区间左端点（升序）
+        self.lo_ids = lo_ids
+        self.hi = hi            # 同一批区间的右端点（升序）
+        self.hi_ids = hi_ids
+
+
+def _build(ids: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> Optional[_Node]:
+    """居中区间树：中心取端点中位数，跨越中心的区间存于本节点，其余递归到左右子树"""
+    if not len(ids):
+        return None
+    center = float(np.median(np.concatenate([lo, hi])))
+    left = hi < center
+    right = lo > center
+    here = ~(left | right)
+
+    by_lo = np.argsort(lo[here], kind='stable')
+    by_hi = np.argsort(hi[here], kind='stable')
+    here_ids, here_lo, here_hi = ids[here], lo[here], hi[here]
+    return _Node(
+        center,
+        _build(ids[left], lo[left], hi[left]),
+        _build(ids[right], lo[right], hi[right]),
+        here_lo[by_lo], here_ids[by_lo], here_hi[by_hi], here_ids[by_hi],
+    )
+
+
+class IntervalIndex:
+    """
+    闭区间 [lo, hi] 索引 - 居中区间树 + 少量增量修改的覆盖层
+
+    点查询（哪些区间包含 q）沿树走 O(log n) 个节点，每个节点用二分取出连续的一段结果；
+    区间查询在点查询之外再对按左端点排序的数组二分。
+    修改不改动已建好的树：新值放入覆盖层、旧值记为删除，覆盖层超过阈值时整体重建。
+    实例不可变，修改返回新实例（读取无需加锁）。
+    """
+
+    def __init__(self, ids: Sequence[int], lo: Sequence[float], hi: Sequence[float]):
+        ids = np.asarray(ids, dtype=np.int64)
+        lo = np.asarray(lo, dtype=float)
+        hi = np.asarray(hi, dtype=float)
+        self._ids = ids
+        self._lo = lo
+        self._hi = hi
+        self._root = _build(ids, lo, hi)
+        order = np.argsort(lo, kind='stable')
+        self._sorted_lo = lo[order]
+        self._sorted_lo_ids = ids[order]
+        # 覆盖层
+        self._removed = _EMPTY_IDS
+        self._extra_ids = _EMPTY_IDS
+        self._extra_lo = np.empty(0)
+        self._extra_hi = np.empty(0)
+
+    def __len__(self) -> int:
+        return len(self._ids) - len(self._removed) + len(self._extra_ids)
+
+    # ========== 查询 ==========
+
+    def stab(self, q: float) -> np.ndarray:
+        """包含 q 的区间ID（lo <= q <= hi），顺序不保证"""
+        parts = []
+        node = self._root
+        while node is not None:
+            if q < node.center:
+                parts.append(node.lo_ids[:np.searchsorted(node.lo, q, side='right')])
+                node = node.left
+            elif q > node.center:
+                parts.append(node.hi_ids[np.searchsorted(node.hi, q, side='left'):])
+                node = node.right
+            else:
+                parts.append(node.lo_ids)
+                break
+        found = np.concatenate(parts) if parts else _EMPTY_IDS
+        extra = self._extra_ids[(self._extra_lo <= q) & (q <= self._extra_hi)]
+        return self._merge(found, extra)
+
+    def overlap(self, a: float, b: float) -> np.ndarray:
+        """与 [a, b] 相交的区间ID（lo <= b 且 hi >= a）"""
+        if a > b:
+            a, b = b, a
+        # 包含 a 的区间，加上左端点落在 (a, b] 内的区间，两者不重叠
+        start = np.searchsorted(self._sorted_lo, a, side='right')
+        end = np.searchsorted(self._sorted_lo, b, side='right')
+        found = self.stab(a)
+        inside = self._sorted_lo_ids[start:end]
+        if len(self._removed):
+            inside = inside[~np.isin(inside, self._removed)]
+        extra = self._extra_ids[(self._extra_lo > a) & (self._extra_lo <= b)]
+        return np.concatenate([found, inside, extra])
+
+    def stab_many(self, rates: Iterable[float]) -> List[np.ndarray]:
+        """多个目标值的点查询"""
+        return [self.stab(float(q)) for q in rates]
+
+    def count_many(self, rates: Iterable[float]) -> np.ndarray:
+        """多个目标值各被多少区间包含（左端点不大于q的数量减去右端点小于q的数量）"""
+        rates = np.asarray(list(rates), dtype=float)
+        lo, hi = self._live_endpoints()
+        lo.sort()
+        hi.sort()
+        return np.searchsorted(lo, rates, side='right') - np.searchsorted(hi, rates, side='left')
+
+    def _merge(self, found: np.ndarray, extra: np.ndarray) -> np.ndarray:
+        if len(self._removed):
+            found = found[~np.isin(found, self._removed)]
+        return np.concatenate([found, extra]) if len(extra) else found
+
+    def _live_endpoints(self) -> Tuple[np.ndarray, np.ndarray]:
+        keep = ~np.isin(self._ids, self._removed) if len(self._removed) else slice(None)
+        return (np.concatenate([self._lo[keep], self._extra_lo]),
+                np.concatenate([self._hi[keep], self._extra_hi]))
+
+    # ========== 修改 ==========
+
+    def with_interval(self, interval_id: int, interval: Optional[Tuple[float, float]]) -> 'IntervalIndex':
+        """返回替换（interval 为 None 时删除）一个区间后的新索引"""
+        clone = object.__new__(IntervalIndex)
+        clone.__dict__.update(self.__dict__)
+
+        keep = clone._extra_ids != interval_id
+        clone._extra_ids = clone._extra_ids[keep]
+        clone._extra_lo = clone._extra_lo[keep]
+        clone._extra_hi = clone._extra_hi[keep]
+        if interval_id in self._ids and interval_id not in clone._removed:
+            clone._removed = np.append(clone._removed, interval_id)
+        if interval is not None:
+            clone._extra_ids = np.append(clone._extra_ids, interval_id)
+            clone._extra_lo = np.append(clone._extra_lo, interval[0])
+            clone._extra_hi = np.append(clone._extra_hi, interval[1])
+
+        # 覆盖层过大时合并重建，保持查询为对数复杂度
+        if len(clone._removed) + len(clone._extra_ids) > max(64, int(np.sqrt(len(clone._ids)))):
+            return clone.compacted()
+        return clone
+
+    def compacted(self) -> 'IntervalIndex':
+        """把覆盖层合并进树，重建索引"""
+        keep = ~np.isin(self._ids, self._removed) if len(self._removed) else np.ones(len(self._ids), dtype=bool)
+        return IntervalIndex(
+            np.concatenate([self._ids[keep], self._extra_ids]),
+            np.concatenate([self._lo[keep], self._extra_lo]),
+            np.concatenate([self._hi[keep], self._extra_hi]),
+        )
+
+
+def _operating_windows(table: CatalogTable, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """排量范围；最小排量为空按0处理，最大排量为空或小于最小排量的泵不进入索引"""
+    rows = table.rows[indices]
+    lo = np.nan_to_num(rows['displacement_min'], nan=0.0)
+    hi = rows['displacement_max']
+    valid = ~np.isnan(hi) & (lo <= hi)
+    return rows['id'][valid], lo[valid], hi[valid]
+
+
+class PumpRangeIndexService:
+    """
+    泵工况区间索引服务 - 回答"哪些泵覆盖目标排量Q"
+
+    按 (区间类型, 举升方式) 懒建索引，只收录状态为 active 的泵；
+    设备目录快照逐台刷新时增量更新已建好的索引，整体失效（批量导入）时丢弃重建。
+    BEP 区间来自各泵活跃版本曲线的最高效率点，曲线表写入后重新读取。
+    """
+
+    def __init__(self, catalog: DeviceCatalogService, engine):
+        self.catalog = catalog
+        self.engine = engine
+        self._indexes: Dict[Tuple[str, Optional[str]], IntervalIndex] = {}
+        self._bep_flow: Optional[Dict[str, float]] = None
+        self._lock = threading.RLock()
+
+        catalog.add_listener(self._on_catalog_changed)
+        get_invalidation_bus().subscribe(self._on_tables_invalidated)
+
+    # ========== 查询 ==========
+
+    def pumps_covering(self, rate: float, lift_method: Optional[str] = None,
+                       window: str = WINDOW_OPERATING) -> List[int]:
+        """区间包含目标排量的泵ID（按ID升序）"""
+        return np.sort(self.index(window, lift_method).stab(rate)).tolist()
+
+    def pumps_covering_many(self, rates: Sequence[float], lift_method: Optional[str] = None,
+                            window: str = WINDOW_OPERATING) -> List[List[int]]:
+        """多个目标排量各自覆盖的泵ID"""
+        return [np.sort(ids).tolist() for ids in self.index(window, lift_method).stab_many(rates)]
+
+    def pumps_overlapping(self, low: float, high: float, lift_method: Optional[str] = None,
+                          window: str = WINDOW_OPERATING) -> List[int]:
+        """区间与 [low, high] 相交的泵ID（按ID升序）"""
+        return np.sort(self.index(window, lift_method).overlap(low, high)).tolist()
+
+    def coverage_counts(self, rates: Sequence[float], lift_method: Optional[str] = None,
+                        window: str = WINDOW_OPERATING) -> List[int]:
+        """多个目标排量各被多少台泵覆盖（用于滑块刻度提示）"""
+        return self.index(window, lift_method).count_many(rates).tolist()
+
+    def index(self, window: str = WINDOW_OPERATING, lift_method: Optional[str] = None) -> IntervalIndex:
+        """(区间类型, 举升方式) 的索引，首次使用时构建"""
+        if window not in WINDOWS:
+            raise ValueError(f"未知的区间类型: {window}")
+        key = (window, lift_method.lower() if lift_method else None)
+        index = self._indexes.get(key)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(key)
+                if index is None:
+                    index = self._indexes[key] = self._build_index(*key)
+        return index
+
+    # ========== 构建 ==========
+
+    def _build_index(self, window: str, lift_method: Optional[str]) -> IntervalIndex:
+        table, indices = self.catalog.select('pump', status='active', lift_method=lift_method)
+        ids, lo, hi = self._windows(window, table, indices)
+        logger.info(f"泵区间索引已构建: {window}/{lift_method or 'all'} {len(ids)} 台")
+        return IntervalIndex(ids, lo, hi)
+
+    def _windows(self, window: str, table: CatalogTable, indices: np.ndarray):
+        if window == WINDOW_OPERATING:
+            return _operating_windows(table, indices)
+
+        bep_flow = self._bep_flows()
+        models = table.decode('model', indices)
+        flows = np.array([bep_flow.get(model, np.nan) if model else np.nan for model in models], dtype=float)
+        valid = ~np.isnan(flows) & (flows > 0)
+        flows = flows[valid]
+        return (table.rows['id'][indices][valid],
+                flows * (1 - BEP_WINDOW_FRACTION), flows * (1 + BEP_WINDOW_FRACTION))
+
+    def _bep_flows(self) -> Dict[str, float]:
+        """各泵型号活跃曲线的最高效率点流量"""
+        bep_flow = self._bep_flow
+        if bep_flow is not None:
+            return bep_flow
+
+        bep_flow = {}
+        statement = (
+            select(PumpCurveBlob.pump_id, PumpCurveBlob.dtype, PumpCurveBlob.flow, PumpCurveBlob.efficiency)
+            .where(PumpCurveBlob.is_active == True)
+            .order_by(PumpCurveBlob.id)
+        )
+        with self.engine.connect() as conn:
+            for pump_id, dtype, flow, efficiency in conn.execute(statement):
+                flow = unpack_series(flow, dtype)
+                efficiency = unpack_series(efficiency, dtype)
+                if len(flow) and len(flow) == len(efficiency) and not np.all(np.isnan(efficiency)):
+                    bep_flow[pump_id] = float(flow[np.nanargmax(efficiency)])
+        self._bep_flow = bep_flow
+        return bep_flow
+
+    @staticmethod
+    def _row_matches(table: CatalogTable, row: int, lift_method: Optional[str]) -> bool:
+        status, method = (table.decode(name, [row])[0] for name in ('status', 'lift_method'))
+        if status != 'active':
+            return False
+        if lift_method:
+            try:
+                return method == LiftMethod(lift_method).value
+            except ValueError:
+                return False
+        return True
+
+    def _device_window(self, window: str, table: CatalogTable, row: int) -> Optional[Tuple[float, float]]:
+        ids, lo, hi = self._windows(window, table, np.array([row], dtype=np.intp))
+        return (float(lo[0]), float(hi[0])) if len(ids) else None
+
+    # ========== 增量更新 ==========
+
+    def invalidate(self):
+        """丢弃所有索引，下次查询时重建"""
+        with self._lock:
+            self._indexes.clear()
+
+    def _on_catalog_changed(self, device_type: Optional[DeviceType], device_id: Optional[int]):
+        """设备目录快照变化：逐台刷新时增量更新，整体失效时丢弃"""
+        if device_type not in (None, DeviceType.PUMP):
+            return
+        with self._lock:
+            if not self._indexes:
+                return
+            if device_id is None:
+                self._indexes.clear()
+                return
+
+            table = self.catalog.table('pump')
+            row = table.index_of(device_id)
+            for key, index in list(self._indexes.items()):
+                window, lift_method = key
+                interval = None
+                if row >= 0 and self._row_matches(table, row, lift_method):
+                    interval = self._device_window(window, table, row)
+                self._indexes[key] = index.with_interval(device_id, interval)
+
+    def _on_tables_invalidated(self, tables):
+        if tables is None or 'pump_curve_blobs' in tables:
+            with self._lock:
+                self._bep_flow = None
+                for key in [key for key in self._indexes if key[0] == WINDOW_BEP]:
+                    del self._indexes[key]
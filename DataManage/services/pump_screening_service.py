@@ -0,0 +1,203 @@
+# DataManage/services/pump_screening_service.py
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .device_catalog_service import CatalogTable, DeviceCatalogService, MANUFACTURER_WEIGHTS
+from .performance_monitor import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+
+# 评分明细中的各项（与 score_pumps 返回的数组同名）
+SCORE_COMPONENTS = ('flow', 'efficiency', 'stages', 'manufacturer')
+
+
+@dataclass
+class ScreeningWeights:
+    """
+    各评分项的满分，默认值与原知识图谱评分一致（合计1.0）
+
+    manufacturers 为制造商相对信誉（按最大值归一化后乘以 manufacturer 满分），
+    键为小写制造商名。
+    """
+    flow: float = 0.4
+    efficiency: float = 0.3
+    stages: float = 0.2
+    manufacturer: float = 0.1
+    manufacturers: Dict[str, float] = field(default_factory=lambda: dict(MANUFACTURER_WEIGHTS))
+
+    def manufacturer_factor(self, name: Optional[str]) -> float:
+        top = max(self.manufacturers.values(), default=0.0)
+        if not name or top <= 0:
+            return 0.0
+        return self.manufacturers.get(name.lower(), 0.0) / top
+
+
+def score_pumps(table: CatalogTable, indices: np.ndarray, required_flow: float, required_head: float,
+                weights: Optional[ScreeningWeights] = None,
+                manufacturer_factor: Optional[np.ndarray] = None,
+                max_od: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """
+    泵筛选评分（向量化，一次处理整个目录）
+
+    流量窗口（理想工况在流量范围的60-80%）、效率分档、所需级数与最大级数、
+    制造商信誉各自按满分计分；外径超过 max_od 的泵不可下井（feasible=False）。
+    空值按 0 排量 / 0 效率 / 25m单级扬程 / 100最大级数处理，外径未知视为可下井。
+
+    Returns:
+        {'flow', 'efficiency', 'stages', 'manufacturer', 'total', 'required_stages',
+         'od_margin', 'feasible'}，每项与 indices 等长
+    """
+    weights = weights or ScreeningWeights()
+    rows = table.rows[indices]
+    min_flow = np.nan_to_num(rows['displacement_min'], nan=0.0)
+    max_flow = np.nan_to_num(rows['displacement_max'], nan=0.0)
+    efficiency = np.nan_to_num(rows['efficiency'], nan=0.0)
+    head_per_stage = np.nan_to_num(rows['single_stage_head'], nan=25.0)
+    max_stages = np.nan_to_num(rows['max_stages'], nan=100.0)
+    outside_diameter = rows['outside_diameter']
+
+    # 流量匹配
+    span = max_flow - min_flow
+    optimal_start = min_flow + span * 0.6
+    optimal_end = min_flow + span * 0.8
+    in_window = (min_flow <= required_flow) & (required_flow <= max_flow)
+    in_optimal = in_window & (optimal_start <= required_flow) & (required_flow <= optimal_end)
+    distance = np.minimum(np.abs(required_flow - optimal_start), np.abs(required_flow - optimal_end))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        partial = np.clip(1 - distance / span, 0, None)
+    flow = weights.flow * np.where(in_optimal, 1.0, np.where(in_window & (span > 0), partial, 0.0))
+
+    # 效率分档
+    efficiency_score = weights.efficiency * np.select(
+        [efficiency >= 75, efficiency >= 60, efficiency >= 45], [1.0, 2 / 3, 1 / 3], 0.0
+    )
+
+    # 扬程（所需级数）
+    with np.errstate(divide='ignore', invalid='ignore'):
+        required_stages = np.where(head_per_stage > 0, np.trunc(required_head / head_per_stage), 0)
+    stages = weights.stages * np.where(required_stages <= max_stages * 0.8, 1.0,
+                                       np.where(required_stages <= max_stages, 0.5, 0.0))
+
+    # 制造商信誉
+    if manufacturer_factor is None:
+        manufacturer_factor = table.lookup('manufacturer', weights.manufacturer_factor)[indices]
+    manufacturer = weights.manufacturer * manufacturer_factor
+
+    # 外径与套管内径
+    if max_od is None:
+        od_margin = np.full(len(indices), np.nan)
+        feasible = np.ones(len(indices), dtype=bool)
+    else:
+        od_margin = max_od - outside_diameter
+        feasible = np.isnan(outside_diameter) | (od_margin >= 0)
+
+    total = np.minimum(flow + efficiency_score + stages + manufacturer, 1.0)
+    return {
+        'flow': flow,
+        'efficiency': efficiency_score,
+        'stages': stages,
+        'manufacturer': manufacturer,
+        'total': np.where(feasible, total, 0.0),
+        'required_stages': required_stages,
+        'od_margin': od_margin,
+        'feasible': feasible,
+    }
+
+
+def top_k(scores: np.ndarray, k: int, min_score: float = 0.0) -> np.ndarray:
+    """
+    分数最高的 k 个位置（降序；同分按原顺序，结果确定）
+
+    先用 argpartition 找出第 k 大的分数，只对不低于它的少量候选排序。
+    """
+    candidates = np.flatnonzero(scores > min_score)
+    if k <= 0 or not len(candidates):
+        return candidates[:0]
+    if len(candidates) > k:
+        kth = np.partition(scores[candidates], len(candidates) - k)[len(candidates) - k]
+        candidates = candidates[scores[candidates] >= kth]
+    return candidates[np.argsort(-scores[candidates], kind='stable')][:k]
+
+
+class PumpScreeningService:
+    """
+    泵筛选服务 - 在设备目录快照上对全部泵一次性向量化打分并取前K个
+
+    知识图谱和选型第4步共用同一套评分；返回的每个候选附带各评分项明细、
+    推荐级数和外径余量，便于界面解释排名。
+    """
+
+    def __init__(self, catalog: DeviceCatalogService, weights: Optional[ScreeningWeights] = None):
+        self.catalog = catalog
+        self.weights = weights or ScreeningWeights()
+        # (快照, 制造商权重) -> 每行制造商系数；快照按写时复制替换，身份不变即内容不变
+        self._manufacturer_cache = (None, None, None)
+
+    def set_manufacturer_weights(self, manufacturers: Dict[str, float], weight: Optional[float] = None):
+        """调整制造商信誉表（小写名 -> 相对信誉）及其满分"""
+        self.weights.manufacturers = {name.lower(): value for name, value in manufacturers.items()}
+        if weight is not None:
+            self.weights.manufacturer = weight
+        self._manufacturer_cache = (None, None, None)
+
+    def _manufacturer_factor(self, table: CatalogTable, weights: ScreeningWeights) -> np.ndarray:
+        key = tuple(sorted(weights.manufacturers.items()))
+        cached_table, cached_key, factor = self._manufacturer_cache
+        if cached_table is not table or cached_key != key:
+            factor = table.lookup('manufacturer', weights.manufacturer_factor)
+            self._manufacturer_cache = (table, key, factor)
+        return factor
+
+    def screen(self, required_flow: float, required_head: float, lift_method: Optional[str] = None,
+               casing_id: Optional[float] = None, clearance: float = 0.0, top: int = 10,
+               min_score: float = 0.0, status: Optional[str] = 'active',
+               weights: Optional[ScreeningWeights] = None) -> List[Dict[str, Any]]:
+        """
+        筛选并排序泵
+
+        Args:
+            required_flow: 目标排量（与泵排量同单位，m³/d）
+            required_head: 所需扬程（与单级扬程同单位）
+            lift_method: 举升方式，None表示全部
+            casing_id: 套管内径（mm），None表示不检查外径
+            clearance: 泵外径与套管内径之间的最小间隙（mm）
+            top: 返回的候选数
+            min_score: 只返回总分高于此值的泵
+            status: 设备状态
+            weights: 本次使用的评分权重，默认使用服务配置
+
+        Returns:
+            [{'pump': 设备字典, 'match_score', 'breakdown': {...}, 'required_stages', 'od_margin'}]
+        """
+        start = time.perf_counter()
+        weights = weights or self.weights
+        table, indices = self.catalog.select('pump', status=status, lift_method=lift_method)
+        if not len(indices):
+            return []
+
+        max_od = None if casing_id is None else casing_id - clearance
+        factor = self._manufacturer_factor(table, weights)[indices]
+        scores = score_pumps(table, indices, required_flow, required_head,
+                             weights=weights, manufacturer_factor=factor, max_od=max_od)
+        best = top_k(scores['total'], top, min_score)
+
+        results = []
+        for position, pump in zip(best.tolist(), table.records(indices[best])):
+            od_margin = scores['od_margin'][position]
+            results.append({
+                'pump': pump,
+                'match_score': float(scores['total'][position]),
+                'breakdown': {name: float(scores[name][position]) for name in SCORE_COMPONENTS},
+                'required_stages': int(scores['required_stages'][position]),
+                'od_margin': None if np.isnan(od_margin) else float(od_margin),
+            })
+
+        performance_monitor.record('screening', 'pump_screen', start, time.perf_counter() - start,
+                                   {'catalog': len(indices), 'top': len(results)})
+        return results
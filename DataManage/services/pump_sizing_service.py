@@ -0,0 +1,298 @@
+# DataManage/services/pump_sizing_service.py
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from DataManage.models.pump_performance import PumpCurveBlob, unpack_series
+from .device_catalog_service import CatalogTable, DeviceCatalogService
+from .engine_provider import get_invalidation_bus
+from .performance_monitor import performance_monitor
+from .pump_range_index import BEP_WINDOW_FRACTION
+
+logger = logging.getLogger(__name__)
+
+
+# 单级曲线重采样点数（0 到最大流量等距）
+CURVE_POINTS = 64
+
+# 默认频率网格 (Hz)
+DEFAULT_FREQUENCIES = tuple(float(f) for f in range(30, 71))
+
+# 目录参数（单级扬程/功率、排量范围）对应的额定频率 (Hz)
+CATALOG_FREQUENCY = 60.0
+
+# 单个张量 (泵 × 级数 × 频率) 的元素上限，超过时按泵分块
+MAX_TENSOR_SIZE = 2_000_000
+
+GRAVITY = 9.81
+
+
+def affinity_scale(flow, head, power, frequency_ratio, stages: int = 1) -> Dict[str, np.ndarray]:
+    """
+    相似定律换算：流量 ∝ N，单级扬程 ∝ N²，单级功率 ∝ N³，效率不变；扬程和功率再乘以级数
+
+    frequency_ratio 为数组时按其形状在最前面广播，一次得到多个频率下的曲线。
+    """
+    ratio = np.asarray(frequency_ratio, dtype=float)[..., None]
+    return {
+        'flow': np.asarray(flow, dtype=float) * ratio,
+        'head': np.asarray(head, dtype=float) * ratio ** 2 * stages,
+        'power': np.asarray(power, dtype=float) * ratio ** 3 * stages,
+    }
+
+
+def _resample(flow: np.ndarray, values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    order = np.argsort(flow, kind='stable')
+    return np.interp(grid, flow[order], values[order])
+
+
+def _gather(table: np.ndarray, position: np.ndarray) -> np.ndarray:
+    """按每台泵各自的小数网格位置线性插值：table [P, K]，position [P, F]（越界为NaN）"""
+    points = table.shape[1]
+    valid = (position >= 0) & (position <= points - 1)
+    clipped = np.clip(np.nan_to_num(position, nan=0.0), 0, points - 1)
+    low = np.minimum(clipped.astype(np.intp), points - 2)
+    fraction = clipped - low
+    rows = np.arange(table.shape[0])[:, None]
+    values = table[rows, low] * (1 - fraction) + table[rows, low + 1] * fraction
+    return np.where(valid, values, np.nan)
+
+
+class PumpSizingService:
+    """
+    级数 × 频率优化服务 - 对候选泵批量求满足目标工况 (Q, TDH) 的最小功率配置
+
+    每台泵的单级曲线（活跃版本性能曲线；没有曲线时按目录参数生成典型曲线）
+    重采样到统一点数后组成矩阵，所有候选泵在 (泵 × 级数 × 频率) 张量上一次
+    计算相似定律换算后的扬程和功率：换算回标准频率的流量需落在推荐工况范围内、
+    扬程不低于 TDH、级数不超过最大级数，取其中功率最小的组合。
+
+    推荐工况范围优先取目录排量范围，没有时取曲线最高效率点 ±25%。
+    曲线矩阵按泵型号缓存，曲线表写入后重新读取。
+    """
+
+    def __init__(self, catalog: DeviceCatalogService, engine, fluid_gravity: float = 1.0):
+        self.catalog = catalog
+        self.engine = engine
+        self.fluid_gravity = fluid_gravity
+        # 型号 -> (最大流量, 扬程[K], 功率[K], 效率[K], 标准频率)
+        self._curves: Optional[Dict[str, Tuple[float, np.ndarray, np.ndarray, np.ndarray, float]]] = None
+        self._lock = threading.Lock()
+
+        get_invalidation_bus().subscribe(self._on_tables_invalidated)
+
+    # ========== 曲线矩阵 ==========
+
+    def _load_curves(self) -> Dict[str, Tuple[float, np.ndarray, np.ndarray, np.ndarray, float]]:
+        curves = self._curves
+        if curves is not None:
+            return curves
+
+        with self._lock:
+            if self._curves is not None:
+                return self._curves
+            curves = {}
+            statement = (
+                select(PumpCurveBlob.pump_id, PumpCurveBlob.dtype, PumpCurveBlob.flow, PumpCurveBlob.head,
+                       PumpCurveBlob.power, PumpCurveBlob.efficiency, PumpCurveBlob.standard_frequency)
+                .where(PumpCurveBlob.is_active == True)
+                .order_by(PumpCurveBlob.id)
+            )
+            with self.engine.connect() as conn:
+                for pump_id, dtype, *series, frequency in conn.execute(statement):
+                    flow, head, power, efficiency = (unpack_series(blob, dtype).astype(float) for blob in series)
+                    if len(flow) < 2 or not len(flow) == len(head) == len(power) == len(efficiency):
+                        continue
+                    q_max = float(np.nanmax(flow))
+                    if not q_max > 0:
+                        continue
+                    grid = np.linspace(0.0, q_max, CURVE_POINTS)
+                    curves[pump_id] = (q_max, _resample(flow, head, grid), _resample(flow, power, grid),
+                                       _resample(flow, efficiency, grid), float(frequency or CATALOG_FREQUENCY))
+            self._curves = curves
+            logger.info(f"级数×频率优化曲线矩阵已加载: {len(curves)} 个型号")
+            return curves
+
+    def _catalog_curve(self, row) -> Optional[Tuple[float, np.ndarray, np.ndarray, np.ndarray, float]]:
+        """
+        没有性能曲线的泵按目录参数生成典型单级曲线：最高效率点取排量范围中点，
+        扬程 h = h额定·(1.25 - 0.25·(q/q_bep)²)，效率为以 q_bep 为顶点的抛物线，
+        功率优先按单级功率线性上升，否则由水力功率/效率估算
+        """
+        head = row['single_stage_head']
+        q_high = row['displacement_max']
+        if not head > 0 or not q_high > 0:
+            return None
+        q_low = row['displacement_min'] if row['displacement_min'] >= 0 else 0.0
+        q_bep = (q_low + q_high) / 2.0 if q_high > q_low else q_high
+        q_max = q_bep * np.sqrt(5.0)   # 扬程降为0的流量
+        grid = np.linspace(0.0, q_max, CURVE_POINTS)
+
+        ratio = grid / q_bep
+        heads = head * (1.25 - 0.25 * ratio ** 2)
+        peak = row['efficiency'] if row['efficiency'] > 0 else 60.0
+        efficiency = np.clip(peak * (1.0 - (ratio - 1.0) ** 2), 0.0, None)
+        if row['single_stage_power'] > 0:
+            power = row['single_stage_power'] * (0.55 + 0.45 * ratio)
+        else:
+            hydraulic = self.fluid_gravity * 1000.0 * GRAVITY * (grid / 86400.0) * heads / 1000.0
+            power = hydraulic / np.maximum(efficiency, 5.0) * 100.0
+        return float(q_max), heads, power, efficiency, CATALOG_FREQUENCY
+
+    def _curve_matrix(self, table: CatalogTable, indices: np.ndarray) -> Dict[str, np.ndarray]:
+        """候选泵的曲线矩阵与推荐工况范围（换算到各自的标准频率）"""
+        curves = self._load_curves()
+        rows = table.rows[indices]
+        models = table.decode('model', indices)
+        count = len(indices)
+
+        q_max = np.full(count, np.nan)
+        base_frequency = np.full(count, CATALOG_FREQUENCY)
+        heads = np.zeros((count, CURVE_POINTS))
+        powers = np.zeros((count, CURVE_POINTS))
+        efficiencies = np.zeros((count, CURVE_POINTS))
+        from_curve = np.zeros(count, dtype=bool)
+
+        for i, model in enumerate(models):
+            curve = curves.get(model) if model else None
+            from_curve[i] = curve is not None
+            if curve is None:
+                curve = self._catalog_curve(rows[i])
+            if curve is None:
+                continue
+            q_max[i], heads[i], powers[i], efficiencies[i], base_frequency[i] = curve
+
+        # 推荐工况范围（标准频率下）：目录排量范围，否则最高效率点 ±25%
+        low = np.nan_to_num(rows['displacement_min'], nan=0.0)
+        high = rows['displacement_max']
+        catalog_range = ~np.isnan(high) & (high > low)
+        bep = q_max * np.argmax(efficiencies, axis=1) / (CURVE_POINTS - 1)
+        low = np.where(catalog_range, low, bep * (1 - BEP_WINDOW_FRACTION))
+        high = np.where(catalog_range, high, bep * (1 + BEP_WINDOW_FRACTION))
+
+        return {
+            'q_max': q_max, 'base_frequency': base_frequency, 'head': heads, 'power': powers,
+            'efficiency': efficiencies, 'range_low': low, 'range_high': high, 'from_curve': from_curve,
+            'max_stages': np.nan_to_num(rows['max_stages'], nan=100.0).astype(np.int64),
+        }
+
+    # ========== 优化 ==========
+
+    def optimize(self, required_flow: float, required_head: float, pump_ids: Optional[Sequence[int]] = None,
+                 lift_method: Optional[str] = None, frequencies: Optional[Sequence[float]] = None,
+                 max_stages: Optional[int] = None, top: Optional[int] = None,
+                 status: Optional[str] = 'active') -> List[Dict[str, Any]]:
+        """
+        批量求各候选泵的最小功率 级数 × 频率 配置
+
+        Args:
+            required_flow: 目标排量 (m³/d)
+            required_head: 目标总扬程 TDH (m)
+            pump_ids: 候选泵ID，None表示按 lift_method/status 选出的全部泵
+            lift_method: 举升方式（pump_ids 为空时使用）
+            frequencies: 频率网格 (Hz)，默认 30-70Hz 每1Hz
+            max_stages: 级数上限（与各泵最大级数取小）
+            top: 只返回功率最小的前若干台
+            status: 设备状态（pump_ids 为空时使用）
+
+        Returns:
+            按轴功率升序的可行配置 [{'pump_id', 'model', 'stages', 'frequency', 'power_kw', 'head_m',
+            'efficiency', 'base_flow', 'range_position', 'curve_source'}]
+        """
+        start = time.perf_counter()
+        table = self.catalog.table('pump')
+        if pump_ids is None:
+            indices = table.select(status=status, lift_method=lift_method)
+        else:
+            indices = np.flatnonzero(np.isin(table.rows['id'], np.asarray(list(pump_ids), dtype=np.int64)))
+        frequencies = np.asarray(DEFAULT_FREQUENCIES if frequencies is None else frequencies, dtype=float)
+        if not len(indices) or not len(frequencies) or required_flow <= 0 or required_head <= 0:
+            return []
+
+        curves = self._curve_matrix(table, indices)
+        limit = curves['max_stages'] if max_stages is None else np.minimum(curves['max_stages'], max_stages)
+
+        results = []
+        stage_count = max(1, int(limit.max()))
+        chunk = max(1, MAX_TENSOR_SIZE // (stage_count * len(frequencies)))
+        for begin in range(0, len(indices), chunk):
+            part = slice(begin, begin + chunk)
+            best = self._best_configurations(
+                {name: values[part] for name, values in curves.items()}, limit[part],
+                required_flow, required_head, frequencies
+            )
+            for offset, (stages, frequency, power, head, efficiency, base_flow, position) in best:
+                i = begin + offset
+                results.append({
+                    'pump_id': int(table.rows['id'][indices[i]]),
+                    'model': table.decode('model', [indices[i]])[0],
+                    'stages': stages,
+                    'frequency': frequency,
+                    'power_kw': power,
+                    'head_m': head,
+                    'efficiency': efficiency,
+                    'base_flow': base_flow,
+                    'range_position': position,
+                    'curve_source': 'curve' if curves['from_curve'][i] else 'catalog',
+                })
+
+        results.sort(key=lambda item: (item['power_kw'], item['pump_id']))
+        if top is not None:
+            results = results[:top]
+
+        performance_monitor.record('screening', 'stage_frequency_optimize', start, time.perf_counter() - start,
+                                   {'pumps': len(indices), 'frequencies': len(frequencies),
+                                    'stages': stage_count, 'feasible': len(results)})
+        return results
+
+    @staticmethod
+    def _best_configurations(curves: Dict[str, np.ndarray], limit: np.ndarray, required_flow: float,
+                             required_head: float, frequencies: np.ndarray) -> List[Tuple[int, tuple]]:
+        """一块候选泵在 (泵 × 级数 × 频率) 张量上的最小功率可行点"""
+        ratio = frequencies[None, :] / curves['base_frequency'][:, None]          # [P, F]
+        base_flow = required_flow / ratio                                           # 换算回标准频率的流量
+        position = base_flow / curves['q_max'][:, None] * (CURVE_POINTS - 1)
+        stage_head = _gather(curves['head'], position) * ratio ** 2                 # 单级扬程 [P, F]
+        stage_power = _gather(curves['power'], position) * ratio ** 3
+        efficiency = _gather(curves['efficiency'], position)
+        in_range = ((curves['range_low'][:, None] <= base_flow) & (base_flow <= curves['range_high'][:, None])
+                    & (stage_head > 0) & (stage_power > 0))
+
+        stages = np.arange(1, int(limit.max()) + 1, dtype=float)[None, :, None]    # [1, S, 1]
+        head = stages * stage_head[:, None, :]                                      # [P, S, F]
+        power = stages * stage_power[:, None, :]
+        feasible = ((head >= required_head) & in_range[:, None, :]
+                    & (stages <= limit[:, None, None]))
+        power = np.where(feasible, power, np.inf)
+
+        flat = power.reshape(len(limit), -1)
+        best = np.argmin(flat, axis=1)
+        found = np.isfinite(flat[np.arange(len(limit)), best])
+        stage_index, frequency_index = np.unravel_index(best, power.shape[1:])
+
+        span = curves['range_high'] - curves['range_low']
+        results = []
+        for i in np.flatnonzero(found).tolist():
+            s, f = int(stage_index[i]), int(frequency_index[i])
+            flow = float(base_flow[i, f])
+            results.append((i, (
+                s + 1, float(frequencies[f]), float(power[i, s, f]), float(head[i, s, f]),
+                float(efficiency[i, f]), flow,
+                float((flow - curves['range_low'][i]) / span[i]) if span[i] > 0 else None,
+            )))
+        return results
+
+    # ========== 失效 ==========
+
+    def invalidate(self):
+        """丢弃曲线矩阵，下次优化时重新读取"""
+        self._curves = None
+
+    def _on_tables_invalidated(self, tables):
+        if tables is None or 'pump_curve_blobs' in tables:
+            self._curves = None
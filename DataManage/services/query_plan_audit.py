@@ -0,0 +1,124 @@
+# DataManage/services/query_plan_audit.py
+
+import logging
+import re
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+# EXPLAIN QUERY PLAN 中的全表扫描，例如 "SCAN devices" / "SCAN d USING INDEX ..."
+_SCAN_PATTERN = re.compile(r'^SCAN (\w+)')
+
+
+class QueryPlanAuditor:
+    """
+    查询计划审计 - 捕获服务方法实际执行的SELECT语句，
+    用 EXPLAIN QUERY PLAN 检查是否在大表上出现全表扫描
+    """
+
+    def __init__(self, engine, min_rows: int = 1000, allowed: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            engine: 数据库引擎
+            min_rows: 表行数达到该阈值时，SCAN 视为违规
+            allowed: {标签: [表名, ...]} 允许全表扫描的例外（如LIKE模糊查询回退路径）
+        """
+        self.engine = engine
+        self.min_rows = min_rows
+        self.allowed = allowed or {}
+        self.statements: List[Tuple[str, str, Any]] = []  # (标签, SQL, 参数)
+        self._row_counts: Dict[str, int] = {}
+
+    @contextmanager
+    def capture(self, label: str):
+        """在上下文中捕获执行的SELECT语句"""
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            if not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                self.statements.append((label, statement, parameters))
+
+        event.listen(self.engine, 'before_cursor_execute', before_execute)
+        try:
+            yield
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', before_execute)
+
+    def explain(self, statement: str, parameters: Any = ()) -> List[str]:
+        """返回查询计划的detail列"""
+        conn = self.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+            return [row[3] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def _row_count(self, table: str) -> int:
+        if table not in self._row_counts:
+            conn = self.engine.raw_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f'SELECT count(*) FROM "{table}"')
+                self._row_counts[table] = cursor.fetchone()[0]
+            finally:
+                conn.close()
+        return self._row_counts[table]
+
+    @staticmethod
+    def _resolve_table(name: str, statement: str) -> str:
+        """计划中可能是别名，回查 SQL 中的 "表名 AS 别名" """
+        match = re.search(rf'(\w+)\s+(?:AS\s+)?{re.escape(name)}\b', statement, re.IGNORECASE)
+        if match and match.group(1).upper() not in ('FROM', 'JOIN', 'ON', 'AS', 'SELECT'):
+            return match.group(1)
+        return name
+
+    def audit(self) -> List[Dict[str, Any]]:
+        """
+        检查已捕获的语句
+
+        Returns:
+            违规列表：[{'label', 'table', 'rows', 'detail', 'sql'}]
+        """
+        violations = []
+        seen = set()
+        for label, statement, parameters in self.statements:
+            if (label, statement) in seen:
+                continue
+            seen.add((label, statement))
+
+            for detail in self.explain(statement, parameters):
+                match = _SCAN_PATTERN.match(detail)
+                if not match or 'VIRTUAL TABLE' in detail or 'CONSTANT ROW' in detail:
+                    continue
+                table = self._resolve_table(match.group(1), statement)
+                if table in self.allowed.get(label, []):
+                    continue
+                try:
+                    rows = self._row_count(table)
+                except Exception:
+                    # 子查询/CTE 等不是实体表
+                    continue
+                if rows >= self.min_rows:
+                    violations.append({
+                        'label': label,
+                        'table': table,
+                        'rows': rows,
+                        'detail': detail,
+                        'sql': ' '.join(statement.split()),
+                    })
+        return violations
+
+    def report(self) -> str:
+        """生成文本报告：每个标签下的语句及其查询计划"""
+        lines = []
+        seen = set()
+        for label, statement, parameters in self.statements:
+            if (label, statement) in seen:
+                continue
+            seen.add((label, statement))
+            lines.append(f"[{label}] {' '.join(statement.split())[:160]}")
+            lines.extend(f"    {detail}" for detail in self.explain(statement, parameters))
+        return '\n'.join(lines)
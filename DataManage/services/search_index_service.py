@@ -0,0 +1,215 @@
+# DataManage/services/search_index_service.py
+
+import logging
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+
+# FTS5 外部内容表定义：索引内容直接引用源表，触发器负责增量同步
+# 索引列与原LIKE查询的列保持一致（井只按井名搜索，不匹配备注）
+_FTS_TABLES = {
+    'devices_fts': {
+        'source': 'devices',
+        'columns': ['model', 'manufacturer', 'serial_number', 'description'],
+    },
+    'wells_fts': {
+        'source': 'wells_new',
+        'columns': ['well_name'],
+    },
+}
+
+# bm25 列权重（顺序与columns一致）：型号命中的权重最高
+_DEVICE_BM25_WEIGHTS = (10.0, 3.0, 5.0, 1.0)
+_WELL_BM25_WEIGHTS = (10.0,)
+
+# trigram 分词器要求查询词至少3个字符
+MIN_TRIGRAM_LENGTH = 3
+
+
+class SearchIndexService:
+    """全文检索服务 - 基于SQLite FTS5 (trigram分词) 的设备和井搜索索引"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.available = False
+
+    def ensure_schema(self) -> bool:
+        """
+        创建FTS5虚拟表和同步触发器（幂等）
+
+        Returns:
+            FTS5索引是否可用；不可用时调用方应回退到LIKE查询
+        """
+        try:
+            with self.engine.begin() as conn:
+                for fts_name, spec in _FTS_TABLES.items():
+                    created = self._create_fts_table(conn, fts_name, spec)
+                    self._create_triggers(conn, fts_name, spec)
+                    if created:
+                        # 首次创建时从源表重建索引
+                        conn.execute(text(f"INSERT INTO {fts_name}({fts_name}) VALUES('rebuild')"))
+                        logger.info(f"全文索引 {fts_name} 已重建")
+
+            self.available = True
+
+        except OperationalError as e:
+            # SQLite 版本过低（<3.34）或未编译FTS5时回退
+            logger.warning(f"FTS5全文索引不可用，搜索将回退到LIKE查询: {e}")
+            self.available = False
+
+        return self.available
+
+    def rebuild(self):
+        """手动重建所有全文索引"""
+        if not self.available:
+            return
+        with self.engine.begin() as conn:
+            for fts_name in _FTS_TABLES:
+                conn.execute(text(f"INSERT INTO {fts_name}({fts_name}) VALUES('rebuild')"))
+        logger.info("全文索引重建完成")
+
+    def _create_fts_table(self, conn, fts_name: str, spec: dict) -> bool:
+        """创建FTS5虚拟表，返回是否为新建；已有表的列与定义不一致时删除重建"""
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': fts_name}
+        ).first()
+        if exists:
+            columns = [row[1] for row in conn.execute(text(f"PRAGMA table_info({fts_name})"))]
+            if columns == spec['columns']:
+                return False
+            logger.info(f"全文索引 {fts_name} 的列已变更 {columns} -> {spec['columns']}，重建")
+            for suffix in ('ai', 'ad', 'au'):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {fts_name}_{suffix}"))
+            conn.execute(text(f"DROP TABLE {fts_name}"))
+
+        columns = ', '.join(spec['columns'])
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {fts_name} USING fts5("
+            f"{columns}, content='{spec['source']}', content_rowid='id', "
+            f"tokenize='trigram case_sensitive 0')"
+        ))
+        return True
+
+    def _create_triggers(self, conn, fts_name: str, spec: dict):
+        """创建插入/删除/更新同步触发器"""
+        source = spec['source']
+        columns = spec['columns']
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f"new.{c}" for c in columns)
+        old_values = ', '.join(f"old.{c}" for c in columns)
+
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_name}_ai AFTER INSERT ON {source} BEGIN "
+            f"INSERT INTO {fts_name}(rowid, {column_list}) VALUES (new.id, {new_values}); "
+            f"END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_name}_ad AFTER DELETE ON {source} BEGIN "
+            f"INSERT INTO {fts_name}({fts_name}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+            f"END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_name}_au AFTER UPDATE OF {column_list} ON {source} BEGIN "
+            f"INSERT INTO {fts_name}({fts_name}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts_name}(rowid, {column_list}) VALUES (new.id, {new_values}); "
+            f"END"
+        ))
+
+    # ========== 查询 ==========
+
+    def can_search(self, keyword: str) -> bool:
+        """关键词是否可以走FTS索引（每个词都不短于trigram长度）"""
+        if not self.available:
+            return False
+        terms = keyword.split()
+        return bool(terms) and all(len(term) >= MIN_TRIGRAM_LENGTH for term in terms)
+
+    @staticmethod
+    def build_match_query(keyword: str) -> str:
+        """将用户输入转换为FTS5 MATCH表达式：各词作为短语并以AND连接"""
+        terms = keyword.split()
+        return ' AND '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    @staticmethod
+    def _prefix_pattern(keyword: str) -> str:
+        """前缀匹配模式，用于将型号/井名前缀命中的结果排在前面"""
+        first_term = keyword.split()[0]
+        escaped = first_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return escaped + '%'
+
+    def search_device_ids(self, session, keyword: str,
+                          device_type_name: Optional[str] = None,
+                          limit: Optional[int] = None) -> List[int]:
+        """
+        检索设备ID（按相关度排序）
+
+        Args:
+            session: 数据库会话
+            keyword: 搜索关键词
+            device_type_name: 设备类型枚举名（如 'PUMP'），None表示不过滤
+            limit: 最大返回数量
+
+        Returns:
+            排序后的设备ID列表
+        """
+        weights = ', '.join(str(w) for w in _DEVICE_BM25_WEIGHTS)
+        sql = (
+            "SELECT d.id FROM devices_fts "
+            "JOIN devices d ON d.id = devices_fts.rowid "
+            "WHERE devices_fts MATCH :query AND d.is_deleted = 0"
+        )
+        params = {
+            'query': self.build_match_query(keyword),
+            'prefix': self._prefix_pattern(keyword),
+        }
+        if device_type_name:
+            sql += " AND d.device_type = :device_type"
+            params['device_type'] = device_type_name
+
+        sql += (
+            " ORDER BY (d.model LIKE :prefix ESCAPE '\\') DESC, "
+            f"bm25(devices_fts, {weights}), d.created_at DESC"
+        )
+        if limit:
+            sql += " LIMIT :limit"
+            params['limit'] = int(limit)
+
+        return [row[0] for row in session.execute(text(sql), params)]
+
+    def search_well_ids(self, session, project_id: int, keyword: str,
+                        limit: Optional[int] = None) -> List[int]:
+        """
+        检索项目下的井ID（按相关度排序）
+
+        Args:
+            session: 数据库会话
+            project_id: 项目ID
+            keyword: 搜索关键词
+            limit: 最大返回数量
+
+        Returns:
+            排序后的井ID列表
+        """
+        weights = ', '.join(str(w) for w in _WELL_BM25_WEIGHTS)
+        sql = (
+            "SELECT w.id FROM wells_fts "
+            "JOIN wells_new w ON w.id = wells_fts.rowid "
+            "WHERE wells_fts MATCH :query AND w.project_id = :project_id AND w.is_deleted = 0 "
+            "ORDER BY (w.well_name LIKE :prefix ESCAPE '\\') DESC, "
+            f"bm25(wells_fts, {weights}), w.created_at DESC"
+        )
+        params = {
+            'query': self.build_match_query(keyword),
+            'prefix': self._prefix_pattern(keyword),
+            'project_id': project_id,
+        }
+        if limit:
+            sql += " LIMIT :limit"
+            params['limit'] = int(limit)
+
+        return [row[0] for row in session.execute(text(sql), params)]
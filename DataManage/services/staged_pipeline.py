@@ -0,0 +1,130 @@
+# DataManage/services/staged_pipeline.py
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .performance_monitor import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineCancelled(Exception):
+    """流水线在完成前被取消"""
+
+
+@dataclass
+class Stage:
+    """
+    流水线阶段
+
+    func 接收已完成阶段的结果字典 {阶段名: 结果}，返回本阶段结果；
+    depends 中的阶段全部完成后才开始，互不依赖的阶段并行执行。
+    weight 为本阶段在总进度中的权重。
+    """
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    depends: Tuple[str, ...] = ()
+    weight: float = 1.0
+
+
+# 各流水线共用的阶段线程池（阶段多为数据库读写和模型推理，线程足够）
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='pipeline-stage')
+        return _executor
+
+
+class StagedPipeline:
+    """
+    分阶段流水线 - 按依赖关系调度阶段，报告真实进度与各阶段耗时，支持取消
+
+    取消只在阶段边界生效：正在执行的阶段会运行完，但其结果被丢弃，
+    后续阶段不再开始。
+    """
+
+    def __init__(self, name: str, stages: Sequence[Stage]):
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f"流水线阶段重名: {names}")
+        for stage in stages:
+            missing = [depend for depend in stage.depends if depend not in names]
+            if missing:
+                raise ValueError(f"阶段 {stage.name} 依赖的阶段不存在: {missing}")
+        self.name = name
+        self.stages = list(stages)
+
+    def run(self, progress: Optional[Callable[[float, str, float], None]] = None,
+            cancel_event: Optional[threading.Event] = None) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        执行流水线（阻塞，通常在后台线程中调用）
+
+        Args:
+            progress: 每个阶段完成后回调 progress(总进度0-1, 阶段名, 阶段耗时ms)
+            cancel_event: 置位后抛出 PipelineCancelled
+
+        Returns:
+            (各阶段结果, 各阶段耗时ms)
+
+        Raises:
+            PipelineCancelled: 被取消
+            Exception: 任一阶段失败时抛出该阶段的异常（未开始的阶段不再执行）
+        """
+        start = time.perf_counter()
+        total_weight = sum(stage.weight for stage in self.stages) or 1.0
+        results: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        waiting: List[Stage] = list(self.stages)
+        running: Dict[Future, Stage] = {}
+        done_weight = 0.0
+
+        def cancelled() -> bool:
+            return cancel_event is not None and cancel_event.is_set()
+
+        def timed(stage: Stage, inputs: Dict[str, Any]):
+            stage_start = time.perf_counter()
+            value = stage.func(inputs)
+            return value, stage_start, time.perf_counter() - stage_start
+
+        try:
+            while waiting or running:
+                if cancelled():
+                    raise PipelineCancelled(f"流水线 {self.name} 已取消")
+
+                # 提交依赖已满足的阶段（传入结果的快照，阶段之间不共享可变状态）
+                for stage in [stage for stage in waiting if all(depend in results for depend in stage.depends)]:
+                    waiting.remove(stage)
+                    running[_get_executor().submit(timed, stage, dict(results))] = stage
+                if not running:
+                    raise RuntimeError(f"流水线 {self.name} 存在循环依赖: {[stage.name for stage in waiting]}")
+
+                finished, _ = wait(list(running), timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    value, stage_start, elapsed = future.result()
+                    if cancelled():
+                        raise PipelineCancelled(f"流水线 {self.name} 已取消")
+                    results[stage.name] = value
+                    timings[stage.name] = round(elapsed * 1000.0, 1)
+                    done_weight += stage.weight
+                    performance_monitor.record('pipeline', f'{self.name}.{stage.name}', stage_start, elapsed)
+                    if progress is not None:
+                        progress(min(done_weight / total_weight, 1.0), stage.name, timings[stage.name])
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+
+        elapsed = time.perf_counter() - start
+        performance_monitor.record('pipeline', self.name, start, elapsed, {'stages': timings})
+        logger.info(f"流水线 {self.name} 完成: 耗时 {elapsed * 1000:.0f}ms, 各阶段 {timings}")
+        return results, timings
@@ -0,0 +1,273 @@
+# DataManage/services/statistics_service.py
+
+import logging
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+from .engine_provider import get_invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+
+STATISTICS_TABLE = 'dashboard_statistics'
+
+# 计数器依赖的源表：这些表被写入时仪表盘需要刷新
+STATISTICS_SOURCE_TABLES = frozenset({'wells_new', 'devices', 'production_predictions', 'prediction_runs',
+                                      STATISTICS_TABLE})
+
+# 计数器维度：
+#   wells                 项目ID              未删除的井数
+#   devices               设备类型:状态        未删除的设备数
+#   predictions           count               产量预测次数（运行记录数，结果去重不影响计数）
+#   prediction_confidence sum / count         按运行记录加权的预测置信度之和 / 有置信度的运行记录数
+#                                             （去重后一条预测被多次运行时按运行次数计入）
+#   reports               YYYY-MM             当月生成的选型报告数（无源表，由 record_report 写入）
+_ALIVE = "COALESCE({row}.is_deleted, 0) = 0"
+_WELL_DIM = "CAST({row}.project_id AS TEXT)"
+_DEVICE_DIM = "{row}.device_type || ':' || COALESCE({row}.status, '')"
+
+
+def _bump(metric: str, dimension: str, delta: str, condition: str = '1') -> str:
+    """生成一条计数器增量语句（UPSERT，SELECT 带 WHERE 以避免 ON CONFLICT 的解析歧义）"""
+    return (
+        f"INSERT INTO {STATISTICS_TABLE}(metric, dimension, value) "
+        f"SELECT '{metric}', {dimension}, {delta} WHERE {condition} "
+        f"ON CONFLICT(metric, dimension) DO UPDATE SET value = value + excluded.value; "
+    )
+
+
+def _trigger_definitions() -> Dict[str, str]:
+    """触发器名 -> CREATE TRIGGER 语句"""
+    old_alive = _ALIVE.format(row='old')
+    new_alive = _ALIVE.format(row='new')
+    well_old, well_new = _WELL_DIM.format(row='old'), _WELL_DIM.format(row='new')
+    device_old, device_new = _DEVICE_DIM.format(row='old'), _DEVICE_DIM.format(row='new')
+
+    def run_count(delta: str) -> str:
+        return _bump('predictions', "'count'", delta)
+
+    def run_confidence(row: str, sign: str) -> str:
+        """运行记录增删：计入/扣除其指向预测的置信度（预测已删除时不变）"""
+        score = f"(SELECT confidence_score FROM production_predictions WHERE id = {row}.prediction_id)"
+        return (
+            _bump('prediction_confidence', "'sum'", f"{sign}{score}", f"{score} IS NOT NULL")
+            + _bump('prediction_confidence', "'count'", f"{sign}1", f"{score} IS NOT NULL")
+        )
+
+    def prediction_confidence(row: str, sign: str) -> str:
+        """预测置信度变化或删除：按其运行记录数计入/扣除"""
+        runs = f"(SELECT COUNT(*) FROM prediction_runs WHERE prediction_id = {row}.id)"
+        condition = f"{row}.confidence_score IS NOT NULL"
+        return (
+            _bump('prediction_confidence', "'sum'", f"{sign}{row}.confidence_score * {runs}", condition)
+            + _bump('prediction_confidence', "'count'", f"{sign}{runs}", condition)
+        )
+
+    return {
+        'stats_wells_ai': (
+            f"CREATE TRIGGER IF NOT EXISTS stats_wells_ai AFTER INSERT ON wells_new BEGIN "
+            f"{_bump('wells', well_new, '1', new_alive)}END"
+        ),
+        'stats_wells_ad': (
+            f"CREATE TRIGGER IF NOT EXISTS stats_wells_ad AFTER DELETE ON wells_new BEGIN "
+            f"{_bump('wells', well_old, '-1', old_alive)}END"
+        ),
+        'stats_wells_au': (
+            f"CREATE TRIGGER IF NOT EXISTS stats_wells_au AFTER UPDATE OF project_id, is_deleted ON wells_new BEGIN "
+            f"{_bump('wells', well_old, '-1', old_alive)}"
+            f"{_bump('wells', well_new, '1', new_alive)}END"
+        ),
+        'stats_devices_ai': (
+            f"CREATE TRIGGER IF NOT EXISTS stats_devices_ai AFTER INSERT ON devices BEGIN "
+            f"{_bump('devices', device_new, '1', new_alive)}END"
+        ),
+        'stats_devices_ad': (
+            f"CREATE TRIGGER IF NOT EXISTS stats_devices_ad AFTER DELETE ON devices BEGIN "
+            f"{_bump('devices', device_old, '-1', old_alive)}END"
+        ),
+        'stats_devices_au': (
+            f"CREATE TRIGGER IF NOT EXISTS stats_devices_au AFTER UPDATE OF device_type, status, is_deleted ON devices BEGIN "
+            f"{_bump('devices', device_old, '-1', old_alive)}"
+            f"{_bump('devices', device_new, '1', new_alive)}END"
+        ),
+        # 删除预测时其运行记录被级联删除，级联先于 AFTER 触发器执行，
+        # 因此在 BEFORE DELETE 中按仍存在的运行记录扣除
+        'stats_predictions_bd': (
+            f"CREATE TRIGGER IF NOT EXISTS stats_predictions_bd BEFORE DELETE ON production_predictions BEGIN "
+            f"{prediction_confidence('old', '-')}END"
+        ),
+        'stats_predictions_au': (
+            f"CREATE TRIGGER IF NOT EXISTS stats_predictions_au AFTER UPDATE OF confidence_score ON production_predictions BEGIN "
+            f"{prediction_confidence('old', '-')}{prediction_confidence('new', '')}END"
+        ),
+        'stats_runs_ai': (
+            f"CREATE TRIGGER IF NOT EXISTS stats_runs_ai AFTER INSERT ON prediction_runs BEGIN "
+            f"{run_count('1')}{run_confidence('new', '')}END"
+        ),
+        'stats_runs_ad': (
+            f"CREATE TRIGGER IF NOT EXISTS stats_runs_ad AFTER DELETE ON prediction_runs BEGIN "
+            f"{run_count('-1')}{run_confidence('old', '-')}END"
+        ),
+    }
+
+
+def _normalize_trigger_sql(sql: str) -> str:
+    """比较触发器定义时忽略 IF NOT EXISTS 和空白差异"""
+    return ' '.join(sql.replace('IF NOT EXISTS ', '').split())
+
+
+class StatisticsService:
+    """
+    仪表盘统计服务 - 由SQLite触发器维护的物化计数器
+
+    井、设备、预测的增删改在同一事务内由触发器更新计数器，
+    原生SQL写入（DatabaseManager）同样生效；读取统计只需查询一张很小的计数器表，
+    与井和设备的数据量无关。
+    """
+
+    def __init__(self, engine, write_queue=None):
+        self.engine = engine
+        # 运行期的计数器写入经写入租约排队（启动时的建表/重建不需要）
+        self.write_queue = write_queue
+
+    def ensure_schema(self):
+        """创建计数器表和触发器（幂等）；首次安装触发器时从源表重建计数"""
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {STATISTICS_TABLE} ("
+                f"metric VARCHAR(50) NOT NULL, "
+                f"dimension VARCHAR(100) NOT NULL, "
+                f"value FLOAT NOT NULL DEFAULT 0, "
+                f"PRIMARY KEY (metric, dimension)) WITHOUT ROWID"
+            ))
+
+            existing = {
+                row[0]: row[1] for row in conn.execute(text(
+                    "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'stats_%'"
+                ))
+            }
+            definitions = _trigger_definitions()
+            missing = []
+            for name, definition in definitions.items():
+                if name in existing:
+                    if _normalize_trigger_sql(existing[name]) == _normalize_trigger_sql(definition):
+                        continue
+                    # 定义已变化（升级），替换旧触发器
+                    conn.execute(text(f"DROP TRIGGER {name}"))
+                conn.execute(text(definition))
+                missing.append(name)
+            for name in existing.keys() - definitions.keys():
+                # 已不再使用的旧触发器
+                conn.execute(text(f"DROP TRIGGER {name}"))
+                missing.append(name)
+
+            if missing:
+                # 触发器缺失或变化期间的计数不可靠，整体重建
+                self._rebuild(conn)
+                logger.info(f"仪表盘统计触发器已安装: {missing}")
+
+    def rebuild(self):
+        """从源表重新计算所有可推导的计数器（报告计数没有源表，予以保留）"""
+        with self._exclusive(), self.engine.begin() as conn:
+            self._rebuild(conn)
+        get_invalidation_bus().publish({STATISTICS_TABLE})
+        logger.info("仪表盘统计已重建")
+
+    def _exclusive(self):
+        return self.write_queue.exclusive() if self.write_queue is not None else nullcontext()
+
+    @staticmethod
+    def _rebuild(conn):
+        conn.execute(text(f"DELETE FROM {STATISTICS_TABLE} WHERE metric != 'reports'"))
+        conn.execute(text(
+            f"INSERT INTO {STATISTICS_TABLE}(metric, dimension, value) "
+            f"SELECT 'wells', {_WELL_DIM.format(row='w')}, COUNT(*) FROM wells_new w "
+            f"WHERE {_ALIVE.format(row='w')} GROUP BY w.project_id"
+        ))
+        conn.execute(text(
+            f"INSERT INTO {STATISTICS_TABLE}(metric, dimension, value) "
+            f"SELECT 'devices', {_DEVICE_DIM.format(row='d')}, COUNT(*) FROM devices d "
+            f"WHERE {_ALIVE.format(row='d')} GROUP BY 2"
+        ))
+        conn.execute(text(
+            f"INSERT INTO {STATISTICS_TABLE}(metric, dimension, value) "
+            f"SELECT 'predictions', 'count', COUNT(*) FROM prediction_runs "
+            f"UNION ALL "
+            f"SELECT 'prediction_confidence', 'sum', COALESCE(SUM(p.confidence_score), 0) "
+            f"FROM prediction_runs r JOIN production_predictions p ON p.id = r.prediction_id "
+            f"UNION ALL "
+            f"SELECT 'prediction_confidence', 'count', COUNT(p.confidence_score) "
+            f"FROM prediction_runs r JOIN production_predictions p ON p.id = r.prediction_id"
+        ))
+
+    # ========== 写入钩子 ==========
+
+    def record_report(self, generated_at: Optional[datetime] = None):
+        """记录一次选型报告生成（按月累计）"""
+        month = (generated_at or datetime.now()).strftime('%Y-%m')
+        with self._exclusive(), self.engine.begin() as conn:
+            conn.execute(text(_bump('reports', ':month', '1').rstrip('; ')), {'month': month})
+        get_invalidation_bus().publish({STATISTICS_TABLE})
+
+    # ========== 读取 ==========
+
+    def get_statistics(self, project_id: Optional[int] = None,
+                       month: Optional[str] = None) -> Dict[str, Any]:
+        """
+        读取仪表盘统计（一条聚合查询，扫描的是计数器表而非业务表）
+
+        Args:
+            project_id: 项目ID，None或<=0表示全部项目
+            month: 报告统计月份 'YYYY-MM'，默认当月
+
+        Returns:
+            {'activeWells', 'equipmentModels', 'selectionAccuracy', 'monthlyReports', 'predictionsRun'}
+        """
+        project_dim = str(project_id) if project_id and project_id > 0 else None
+        month = month or datetime.now().strftime('%Y-%m')
+
+        with self.engine.connect() as conn:
+            row = conn.execute(text(
+                f"SELECT "
+                f"SUM(CASE WHEN metric = 'wells' AND (:project IS NULL OR dimension = :project) THEN value END), "
+                f"SUM(CASE WHEN metric = 'devices' THEN value END), "
+                f"SUM(CASE WHEN metric = 'prediction_confidence' AND dimension = 'sum' THEN value END), "
+                f"SUM(CASE WHEN metric = 'prediction_confidence' AND dimension = 'count' THEN value END), "
+                f"SUM(CASE WHEN metric = 'reports' AND dimension = :month THEN value END), "
+                f"SUM(CASE WHEN metric = 'predictions' THEN value END) "
+                f"FROM {STATISTICS_TABLE}"
+            ), {'project': project_dim, 'month': month}).one()
+
+        wells, devices, confidence_sum, confidence_count, reports, predictions = (value or 0 for value in row)
+
+        # 选型准确率取每次预测运行的置信度均值（百分比）
+        accuracy = round(confidence_sum / confidence_count * 100, 1) if confidence_count else 0.0
+
+        return {
+            'activeWells': int(wells),
+            'equipmentModels': int(devices),
+            'selectionAccuracy': accuracy,
+            'monthlyReports': int(reports),
+            'predictionsRun': int(predictions),
+        }
+
+    def get_device_counts(self) -> Dict[str, Dict[str, int]]:
+        """
+        按设备类型和状态读取设备计数
+
+        Returns:
+            {设备类型枚举名: {状态: 数量}}
+        """
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                f"SELECT dimension, value FROM {STATISTICS_TABLE} WHERE metric = 'devices' AND value != 0"
+            )).all()
+
+        counts: Dict[str, Dict[str, int]] = {}
+        for dimension, value in rows:
+            device_type, _, status = dimension.partition(':')
+            counts.setdefault(device_type, {})[status] = int(value)
+        return counts
@@ -0,0 +1,446 @@
+# DataManage/services/write_queue.py
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from .performance_monitor import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+
+# 写操作：接收写线程的游标（sqlite3.Row 行工厂），在组提交事务内执行，不得自行提交或回滚
+WriteOperation = Callable[[sqlite3.Cursor], Any]
+
+
+class WriteResult(NamedTuple):
+    """execute / executemany 的结果"""
+    rowcount: int
+    lastrowid: Optional[int]
+
+
+class _WriteItem:
+    __slots__ = ('operation', 'tables', 'future', 'enqueued_at')
+
+    def __init__(self, operation: WriteOperation, tables: Optional[Iterable[str]]):
+        self.operation = operation
+        self.tables = None if tables is None else set(tables)
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class _Lease:
+    """写入租约：写线程在批次之间暂停，持有者在自己的连接上独占写入直到释放"""
+    __slots__ = ('owner', 'depth', 'inline', 'state', 'lock', 'granted', 'released', 'enqueued_at')
+
+    def __init__(self, inline: bool = False):
+        self.owner = threading.get_ident()
+        self.depth = 1
+        self.inline = inline
+        self.state = 'waiting'           # waiting / granted / abandoned
+        self.lock = threading.Lock()
+        self.granted = threading.Event()
+        self.released = threading.Event()
+        self.enqueued_at = time.perf_counter()
+
+
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    单写线程写入队列 - 串行化经由本队列提交的写操作并分组提交
+
+    一个专用线程持有写连接，把短时间内到达的写操作合并到同一个
+    BEGIN IMMEDIATE 事务中提交（组提交），每个操作包在各自的SAVEPOINT里，
+    单个操作失败只回滚它自己。调用方拿到 Future，提交完成后才得到结果。
+    读取不经过队列，继续使用连接池中的WAL快照连接。
+
+    BEGIN IMMEDIATE 在事务开始时就取得写锁，避免多个延迟事务同时
+    从读锁升级为写锁时只能等待 busy_timeout 超时的情况。
+
+    ORM会话等在自己连接上写入的调用方通过写入租约（acquire_lease / exclusive）排队：
+    租约和普通写操作在同一个队列中按顺序处理，轮到租约时写线程提交当前批次后暂停，
+    持有者完成写事务并释放后才继续。这样所有写事务都由写线程逐个放行，
+    不会再因为两个连接同时写入而等待 busy_timeout 直至 "database is locked"。
+    """
+
+    def __init__(self, engine, bus=None, max_batch: int = 200, group_delay_ms: float = 2.0,
+                 lease_timeout: float = 30.0):
+        """
+        Args:
+            engine: 共享数据库引擎（写连接从其连接池借出并在停止前一直持有）
+            bus: 失效总线，提交后按操作声明的表发布通知
+            max_batch: 一次组提交最多包含的操作数
+            group_delay_ms: 收到第一个操作后等待后续操作加入同一批的时间
+            lease_timeout: 等待写入租约的最长时间（秒），超时后不经队列直接写入（退回SQLite写锁协调）
+        """
+        self.engine = engine
+        self.bus = bus
+        self.max_batch = max(1, max_batch)
+        self.group_delay = max(0.0, group_delay_ms) / 1000.0
+        self.lease_timeout = max(0.1, lease_timeout)
+
+        # 内存数据库只有一个共享连接，不能被写线程独占，直接在调用线程执行
+        self.inline = engine.url.database in (None, '', ':memory:')
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._inline_lock = threading.Lock()
+        # 线程 -> 该线程持有的写入租约（同一线程重复申请只增加计数）
+        self._leases: Dict[int, _Lease] = {}
+        self._lease_lock = threading.Lock()
+        # 以下两项只在写线程中使用
+        self._cursor: Optional[sqlite3.Cursor] = None
+        self._pending_tables: List[Optional[set]] = []
+
+        self._stats = {
+            'batches': 0,
+            'operations': 0,
+            'failed_operations': 0,
+            'failed_batches': 0,
+            'max_batch_size': 0,
+            'max_latency_ms': 0.0,
+            'total_latency_ms': 0.0,
+            'leases': 0,
+            'lease_timeouts': 0,
+            'max_lease_wait_ms': 0.0,
+            'max_lease_hold_ms': 0.0,
+        }
+
+    # ========== 生命周期 ==========
+
+    def start(self):
+        """启动写线程（幂等，首次提交时自动启动）"""
+        if self.inline:
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+            self._thread.start()
+            logger.info(f"数据库写入队列已启动: 每批最多 {self.max_batch} 个操作, "
+                        f"组提交等待 {self.group_delay * 1000:.1f} ms")
+
+    def stop(self, timeout: Optional[float] = None):
+        """处理完已排队的操作后停止写线程"""
+        with self._start_lock:
+            thread = self._thread
+            if thread and thread.is_alive():
+                self._queue.put(_STOP)
+                thread.join(timeout)
+            self._thread = None
+
+    def in_writer_thread(self) -> bool:
+        thread = self._thread
+        return thread is not None and threading.current_thread() is thread
+
+    # ========== 提交 ==========
+
+    def submit(self, operation: WriteOperation, tables: Optional[Iterable[str]] = ()) -> Future:
+        """
+        排队一个写操作
+
+        Args:
+            operation: 写操作，参数为游标，返回值作为Future的结果
+            tables: 操作写入的表，提交后发布失效通知；None表示范围未知（全部失效），空表示不发布
+
+        Returns:
+            提交完成（或操作失败）后完成的Future
+        """
+        item = _WriteItem(operation, tables)
+
+        if self.inline:
+            if self.holds_lease():
+                # 本线程已持有内联锁
+                self._execute_inline(item)
+            else:
+                with self._inline_lock:
+                    self._execute_inline(item)
+            return item.future
+
+        if self.holds_lease():
+            # 写线程正等待本线程释放租约，排队只会互相等待
+            raise RuntimeError("当前线程持有写入租约（ORM写事务未结束），不能再排队原生SQL写入")
+
+        if self.in_writer_thread():
+            # 写操作内部再次写入：已在事务中，直接执行，随当前批次提交
+            try:
+                item.future.set_result(operation(self._cursor))
+                self._pending_tables.append(item.tables)
+            except BaseException as e:
+                item.future.set_exception(e)
+            return item.future
+
+        self.start()
+        self._queue.put(item)
+        return item.future
+
+    def execute(self, sql: str, params: Sequence = (), tables: Optional[Iterable[str]] = ()) -> Future:
+        """排队一条写语句，结果为 WriteResult(rowcount, lastrowid)"""
+        def operation(cursor):
+            cursor.execute(sql, params)
+            return WriteResult(cursor.rowcount, cursor.lastrowid)
+        return self.submit(operation, tables)
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence],
+                    tables: Optional[Iterable[str]] = ()) -> Future:
+        """排队一条批量写语句，结果为 WriteResult(rowcount, lastrowid)"""
+        def operation(cursor):
+            cursor.executemany(sql, seq_of_params)
+            return WriteResult(cursor.rowcount, cursor.lastrowid)
+        return self.submit(operation, tables)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待此前排队的所有操作提交完成"""
+        if self.inline or self.in_writer_thread() or self.holds_lease():
+            return True
+        marker = self.submit(lambda cursor: None)
+        try:
+            marker.result(timeout)
+            return True
+        except Exception:
+            return False
+
+    # ========== 写入租约 ==========
+
+    def holds_lease(self) -> bool:
+        """当前线程是否持有写入租约"""
+        with self._lease_lock:
+            return threading.get_ident() in self._leases
+
+    def acquire_lease(self) -> Optional[_Lease]:
+        """
+        排队申请写入租约：轮到时写线程暂停，调用方可在自己的连接上写入并提交
+
+        同一线程重复申请返回同一个租约（计数加一），每次申请都要对应一次 release_lease。
+
+        Returns:
+            租约；在写线程中调用或等待超时时返回None（调用方照常写入，由SQLite写锁协调）
+        """
+        if self.in_writer_thread():
+            return None
+        ident = threading.get_ident()
+        with self._lease_lock:
+            held = self._leases.get(ident)
+            if held is not None:
+                held.depth += 1
+                return held
+
+        start = time.perf_counter()
+        if self.inline:
+            if not self._inline_lock.acquire(timeout=self.lease_timeout):
+                self._stats['lease_timeouts'] += 1
+                logger.warning(f"等待写入租约超过 {self.lease_timeout:.0f} 秒，直接写入")
+                return None
+            lease = _Lease(inline=True)
+            lease.state = 'granted'
+        else:
+            lease = _Lease()
+            self.start()
+            self._queue.put(lease)
+            lease.granted.wait(self.lease_timeout)
+            with lease.lock:
+                if lease.state != 'granted':
+                    lease.state = 'abandoned'
+            if lease.state == 'abandoned':
+                self._stats['lease_timeouts'] += 1
+                logger.warning(f"等待写入租约超过 {self.lease_timeout:.0f} 秒，直接写入")
+                return None
+
+        wait_ms = (time.perf_counter() - start) * 1000.0
+        self._stats['leases'] += 1
+        self._stats['max_lease_wait_ms'] = max(self._stats['max_lease_wait_ms'], wait_ms)
+        with self._lease_lock:
+            self._leases[ident] = lease
+        return lease
+
+    def release_lease(self, lease: Optional[_Lease]):
+        """释放写入租约（可在任意线程调用；None 忽略）"""
+        if lease is None:
+            return
+        with self._lease_lock:
+            lease.depth -= 1
+            if lease.depth > 0:
+                return
+            if self._leases.get(lease.owner) is lease:
+                del self._leases[lease.owner]
+        if lease.inline:
+            self._inline_lock.release()
+        else:
+            lease.released.set()
+
+    @contextmanager
+    def exclusive(self):
+        """在写入租约内执行（engine.begin() 等不经队列的写事务使用）"""
+        lease = self.acquire_lease()
+        try:
+            yield
+        finally:
+            self.release_lease(lease)
+
+    def _serve_lease(self, lease: _Lease):
+        """写线程：放行租约并等待持有者释放（此时写连接不在事务中）"""
+        with lease.lock:
+            if lease.state == 'abandoned':
+                return
+            lease.state = 'granted'
+        granted_at = time.perf_counter()
+        lease.granted.set()
+        while not lease.released.wait(self.lease_timeout):
+            logger.warning(f"写入租约已持有 {time.perf_counter() - granted_at:.0f} 秒，写线程仍在等待释放")
+        hold_ms = (time.perf_counter() - granted_at) * 1000.0
+        self._stats['max_lease_hold_ms'] = max(self._stats['max_lease_hold_ms'], hold_ms)
+
+    # ========== 写线程 ==========
+
+    def _run(self):
+        raw = self.engine.raw_connection()
+        connection = raw.driver_connection
+        isolation_level = connection.isolation_level
+        # 自动提交模式下手动管理 BEGIN / SAVEPOINT / COMMIT
+        connection.isolation_level = None
+        self._cursor = connection.cursor()
+        self._cursor.row_factory = sqlite3.Row
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                if isinstance(item, _Lease):
+                    self._serve_lease(item)
+                    continue
+
+                batch = [item]
+                lease = None
+                deadline = time.perf_counter() + self.group_delay
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    if isinstance(item, _Lease):
+                        # 租约之前到达的操作先提交，保持队列顺序
+                        lease = item
+                        break
+                    batch.append(item)
+
+                self._commit_batch(connection, batch)
+                if lease is not None:
+                    self._serve_lease(lease)
+        finally:
+            self._cursor.close()
+            connection.isolation_level = isolation_level
+            raw.close()
+            logger.info("数据库写入队列已停止")
+
+    def _commit_batch(self, connection, batch: List[_WriteItem]):
+        cursor = self._cursor
+        items = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not items:
+            return
+
+        start = time.perf_counter()
+        outcomes = []
+        self._pending_tables = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for item in items:
+                cursor.execute("SAVEPOINT write_op")
+                try:
+                    result = item.operation(cursor)
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO write_op")
+                    cursor.execute("RELEASE write_op")
+                    logger.error(f"写操作失败（只回滚该操作）: {e}")
+                    outcomes.append((item, None, e))
+                else:
+                    cursor.execute("RELEASE write_op")
+                    outcomes.append((item, result, None))
+            cursor.execute("COMMIT")
+        except Exception as e:
+            if connection.in_transaction:
+                try:
+                    cursor.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            self._stats['failed_batches'] += 1
+            logger.error(f"组提交失败（{len(items)} 个操作已回滚）: {e}")
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        performance_monitor.record('write', 'group_commit', start, finished - start, {'operations': len(items)})
+
+        # 提交完成后再通知调用方和缓存
+        tables = set()
+        unknown_scope = False
+        for item, result, error in outcomes:
+            latency_ms = (finished - item.enqueued_at) * 1000.0
+            self._stats['total_latency_ms'] += latency_ms
+            self._stats['max_latency_ms'] = max(self._stats['max_latency_ms'], latency_ms)
+            if error is None:
+                if item.tables is None:
+                    unknown_scope = True
+                else:
+                    tables |= item.tables
+                item.future.set_result(result)
+            else:
+                self._stats['failed_operations'] += 1
+                item.future.set_exception(error)
+        for nested in self._pending_tables:
+            if nested is None:
+                unknown_scope = True
+            else:
+                tables |= nested
+
+        self._stats['batches'] += 1
+        self._stats['operations'] += len(items)
+        self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(items))
+
+        if self.bus is not None and (tables or unknown_scope):
+            self.bus.publish(None if unknown_scope else tables)
+
+    def _execute_inline(self, item: _WriteItem):
+        """内存数据库：在调用线程中以单个事务执行"""
+        raw = self.engine.raw_connection()
+        cursor = raw.driver_connection.cursor()
+        cursor.row_factory = sqlite3.Row
+        try:
+            result = item.operation(cursor)
+            raw.commit()
+        except Exception as e:
+            raw.rollback()
+            item.future.set_exception(e)
+            return
+        finally:
+            cursor.close()
+            raw.close()
+        item.future.set_result(result)
+        if self.bus is not None and (item.tables is None or item.tables):
+            self.bus.publish(item.tables)
+
+    # ========== 状态 ==========
+
+    def get_stats(self) -> Dict[str, Any]:
+        """写入队列统计（批次数、平均批大小、排队到提交的延迟）"""
+        stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        stats['mean_batch_size'] = round(stats['operations'] / stats['batches'], 2) if stats['batches'] else 0.0
+        stats['mean_latency_ms'] = (round(stats['total_latency_ms'] / stats['operations'], 3)
+                                    if stats['operations'] else 0.0)
+        return stats
@@ -27,12 +27,16 @@ ApplicationWindow {
     property bool showEdgeLabels: true
     property bool showNodeDetails: true
     property string layoutMode: "force"  // "force", "circle", "grid", "tree"
+    property int maxDevices: 0           // 每类设备最多显示数量，0 表示力导向显示全部、预设布局使用默认数量
     property real zoomLevel: 1.0
     property var selectedNode: null
     property var hoveredNode: null
 
     // 🔥 新增：实时节点位置跟踪
     property var nodePositions: ({})  // 实时节点位置映射
+    property var liveLayout: ({})     // 力导向布局推送的坐标（优先于图谱预设坐标）
+    property var layoutCanvas: null   // 力导向布局的画布尺寸（节点多时大于窗口）
+    property bool applyingLiveLayout: false
 
     // 信号定义
     signal windowClosed()
@@ -61,6 +65,8 @@ ApplicationWindow {
 
         function onKnowledgeGraphDataReady(data) {
             console.log("知识图谱数据就绪, 节点数:", data.nodes ? data.nodes.length : 0)
+            liveLayout = ({})
+            layoutCanvas = data.canvas || null
             graphData = data
             if (data && data.nodes) {
                 // 🔥 初始化节点位置映射
@@ -69,6 +75,14 @@ ApplicationWindow {
             }
         }
 
+        function onKnowledgeGraphPatched(patch) {
+            applyGraphPatch(patch)
+        }
+
+        function onLayoutStreamed(frame) {
+            applyLayoutFrame(frame)
+        }
+
         function onRecommendationsGenerated(recs) {
             console.log("推荐生成完成:", recs.length, "条")
             recommendations = recs || []
@@ -333,8 +347,8 @@ ApplicationWindow {
                                 // 图谱内容
                                 Item {
                                     id: graphContent
-                                    width: graphContainer.width
-                                    height: graphContainer.height
+                                    width: Math.max(graphContainer.width, layoutCanvas ? layoutCanvas.width : 0)
+                                    height: Math.max(graphContainer.height, layoutCanvas ? layoutCanvas.height : 0)
                                     scale: zoomLevel
                                     transformOrigin: Item.TopLeft
 
@@ -425,8 +439,9 @@ ApplicationWindow {
                                         Rectangle {
                                             id: nodeRect
                                             property var nodeData: modelData
-                                            property var nodePos: graphData && graphData.layout && graphData.layout[nodeData.id] ?
-                                                                 graphData.layout[nodeData.id] : { x: 100, y: 100 }
+                                            property var nodePos: liveLayout[nodeData.id] ? liveLayout[nodeData.id] :
+                                                                 (graphData && graphData.layout && graphData.layout[nodeData.id] ?
+                                                                  graphData.layout[nodeData.id] : { x: 100, y: 100 })
                                             property bool isSelected: selectedNode && selectedNode.id === nodeData.id
                                             property bool isHovered: hoveredNode && hoveredNode.id === nodeData.id
 
@@ -448,7 +463,8 @@ ApplicationWindow {
                                             onYChanged: updateNodePosition()
 
                                             function updateNodePosition() {
-                                                if (nodeData && nodeData.id) {
+                                                // 力导向布局推送时由 applyLayoutFrame 一次性更新位置映射
+                                                if (nodeData && nodeData.id && !applyingLiveLayout) {
                                                     var newPositions = Object.assign({}, nodePositions)
                                                     newPositions[nodeData.id] = {
                                                         x: x + width/2,
@@ -1099,6 +1115,88 @@ ApplicationWindow {
         console.log("初始化节点位置映射，共", Object.keys(positions).length, "个节点")
     }
 
+    // 🔥 应用增量补丁：只替换变化的节点和边，已有节点保持当前位置（含拖动后的位置）
+    function applyGraphPatch(patch) {
+        if (!graphData || graphData.version !== patch.fromVersion || graphData.stepId !== patch.stepId) {
+            // 本地图谱与补丁基准不一致，请求完整图谱
+            knowledgeGraphController.requestFullGraph()
+            return
+        }
+        if (patch.fromVersion === patch.version) return
+
+        var removedNodes = {}
+        for (var i = 0; i < patch.removedNodes.length; i++) removedNodes[patch.removedNodes[i]] = true
+        var changedNodes = {}
+        for (i = 0; i < patch.changedNodes.length; i++) changedNodes[patch.changedNodes[i].id] = patch.changedNodes[i]
+        var removedEdges = {}
+        for (i = 0; i < patch.removedEdges.length; i++) removedEdges[patch.removedEdges[i]] = true
+        var changedEdges = {}
+        for (i = 0; i < patch.changedEdges.length; i++) changedEdges[patch.changedEdges[i].id] = patch.changedEdges[i]
+
+        var nodes = []
+        var layout = {}
+        var positions = {}
+        for (i = 0; i < graphData.nodes.length; i++) {
+            var node = graphData.nodes[i]
+            if (removedNodes[node.id]) continue
+            nodes.push(changedNodes[node.id] || node)
+            var pos = nodePositions[node.id] || graphData.layout[node.id]
+            if (pos) {
+                layout[node.id] = { x: pos.x, y: pos.y }
+                positions[node.id] = { x: pos.x, y: pos.y }
+            }
+        }
+        for (i = 0; i < patch.addedNodes.length; i++) {
+            var added = patch.addedNodes[i]
+            nodes.push(added)
+            if (patch.layout[added.id]) {
+                layout[added.id] = patch.layout[added.id]
+                positions[added.id] = { x: patch.layout[added.id].x, y: patch.layout[added.id].y }
+            }
+        }
+
+        var edges = []
+        for (i = 0; i < graphData.edges.length; i++) {
+            var edge = graphData.edges[i]
+            if (removedEdges[edge.id]) continue
+            edges.push(changedEdges[edge.id] || edge)
+        }
+        edges = edges.concat(patch.addedEdges)
+
+        liveLayout = ({})
+        console.log("知识图谱增量更新: 版本", patch.fromVersion, "->", patch.version,
+                    "节点 +" + patch.addedNodes.length, "-" + patch.removedNodes.length, "~" + patch.changedNodes.length)
+        graphData = {
+            nodes: nodes,
+            edges: edges,
+            layout: layout,
+            stepId: patch.stepId,
+            version: patch.version,
+            timestamp: patch.timestamp
+        }
+        nodePositions = positions
+        updateGraphView(graphData)
+    }
+
+    // 🔥 应用力导向布局推送的坐标：只接受当前图谱版本的帧，节点位置映射整体替换一次
+    function applyLayoutFrame(frame) {
+        if (!graphData || graphData.version !== frame.version || graphData.stepId !== frame.stepId) return
+
+        applyingLiveLayout = true
+        layoutCanvas = frame.canvas
+        liveLayout = frame.positions
+        applyingLiveLayout = false
+
+        var positions = {}
+        for (var nodeId in frame.positions) {
+            positions[nodeId] = { x: frame.positions[nodeId].x, y: frame.positions[nodeId].y }
+        }
+        nodePositions = positions
+        if (frame.final) {
+            console.log("力导向布局完成, 节点数:", Object.keys(positions).length)
+        }
+    }
+
     // 🔥 新增：更新节点位置的专门函数
     function updateNodePositions(newPositions) {
         nodePositions = newPositions
@@ -1108,6 +1206,7 @@ ApplicationWindow {
     function refreshGraphData() {
         console.log("刷新知识图谱数据")
         if (knowledgeGraphController && currentStepId !== "") {
+            knowledgeGraphController.setLayoutOptions(layoutMode, maxDevices)
             knowledgeGraphController.generateKnowledgeGraph(currentStepId, currentStepData, selectionConstraints)
             knowledgeGraphController.generateRecommendations(currentStepId, selectionConstraints)
         }
@@ -1196,6 +1295,7 @@ ApplicationWindow {
     function refreshGraphLayout() {
         console.log("刷新图谱布局:", layoutMode)
         if (knowledgeGraphController && currentStepId !== "") {
+            knowledgeGraphController.setLayoutOptions(layoutMode, maxDevices)
             knowledgeGraphController.generateKnowledgeGraph(currentStepId, currentStepData, selectionConstraints)
         }
     }
@@ -25,9 +25,17 @@ Rectangle {
     property string selectedLiftMethod: stepData.lift_method ? stepData.lift_method.selectedMethod : "esp"
     property var selectedPump: null
     property int selectedStages: 1
+    property real recommendedFrequency: 60  // 级数×频率优化给出的运行频率 (Hz)
     property var availablePumps: []
     property bool loading: false
 
+    // 产量滑块：目标产量 (bbl/d，0表示使用预测产量) 及覆盖该产量的泵ID（区间索引查询）
+    property real targetRate: 0
+    property var rateCoverage: null
+
+    // 管柱组合优选给出的最优方案（泵、级数、频率、电机、保护器、分离器）
+    property var espString: null
+
     // 第二阶段新增属性
     property int viewMode: 0  // 0: 基础选择, 1: 增强曲线, 2: 多工况对比, 3: 性能预测
     property var currentComparisonData: null
@@ -177,6 +185,30 @@ Rectangle {
 
             Item { Layout.fillWidth: true }
 
+            // 目标产量滑块：拖动时按区间索引实时筛选覆盖该产量的泵
+            Text {
+                text: (isChineseMode ? "目标产量: " : "Target Rate: ") +
+                      (targetRate > 0 ? formatFlowRate(targetRate) : (isChineseMode ? "预测值" : "Predicted"))
+                font.pixelSize: 12
+                color: Material.secondaryTextColor
+            }
+
+            Slider {
+                id: rateSlider
+                Layout.preferredWidth: 180
+                from: 0
+                to: {
+                    var maxFlow = 0
+                    for (var i = 0; i < availablePumps.length; i++) {
+                        maxFlow = Math.max(maxFlow, availablePumps[i].maxFlow || 0)
+                    }
+                    // 泵排量为 m³/d，滑块为 bbl/d
+                    return maxFlow > 0 ? maxFlow / 0.158987 : 10000
+                }
+                value: 0
+                onMoved: updateRateCoverage(value)
+            }
+
             // 筛选条件
             ComboBox {
                 id: manufacturerFilter
@@ -193,6 +225,23 @@ Rectangle {
                 displayText: isChineseMode ? "系列筛选" : currentText
                 onCurrentIndexChanged: filterPumps()
             }
+
+            // 管柱组合优选：泵×级数×频率×电机×保护器×分离器全局搜索
+            Button {
+                text: isChineseMode ? "🧩 组合优选" : "🧩 String Optimize"
+                font.pixelSize: 12
+                enabled: !loading && selectedLiftMethod === "esp"
+                onClicked: runEspConfigurator()
+            }
+        }
+
+        Text {
+            Layout.fillWidth: true
+            visible: espString !== null
+            text: espString ? (isChineseMode ? "组合方案: " : "String: ") + describeEspString(espString) : ""
+            font.pixelSize: 12
+            color: Material.secondaryTextColor
+            elide: Text.ElideRight
         }
 
         // 🔥 保持老版本的要求参数显示逻辑
@@ -653,7 +702,7 @@ Rectangle {
                                                 updateStepData()
 
                                                 if (typeof pumpCurvesController !== 'undefined' && pumpCurvesController && selectedPump) {
-                                                    pumpCurvesController.updatePumpConfiguration(selectedStages, 60)
+                                                    pumpCurvesController.updatePumpConfiguration(selectedStages, recommendedFrequency)
                                                 }
                                             }
                                         }
@@ -1000,6 +1049,21 @@ Rectangle {
         return []
     }
 
+    // 目标产量变化：查询工况范围覆盖该产量的泵
+    function updateRateCoverage(rateBbl) {
+        targetRate = rateBbl
+        if (rateBbl <= 0 || !controller || !controller.getPumpsCoveringRate) {
+            rateCoverage = null
+            return
+        }
+        var ids = controller.getPumpsCoveringRate(selectedLiftMethod, rateBbl * 0.158987, "operating")
+        var coverage = {}
+        for (var i = 0; i < ids.length; i++) {
+            coverage[ids[i]] = true
+        }
+        rateCoverage = coverage
+    }
+
     // 🔥 修复getFilteredPumps函数 - 移除内部的loadPumpsForMethod调用
     function getFilteredPumps() {
         // ❌ 移除这行 - 不要在筛选函数中重新加载数据
@@ -1033,6 +1097,14 @@ Rectangle {
             })
         }
 
+        // 产量滑块：只保留工况范围覆盖目标产量的泵
+        if (rateCoverage) {
+            var coverage = rateCoverage
+            filtered = filtered.filter(function(pump) {
+                return coverage[pump.id] === true
+            })
+        }
+
         // 🔥 基于Step2预测结果的约束筛选
         var requiredProduction = 0
         var requiredHead = 0
@@ -1053,6 +1125,30 @@ Rectangle {
             requiredHead = constraints.pumpDepth || constraints.totalHead || 0
         }
 
+        if (targetRate > 0) {
+            requiredProduction = targetRate
+        }
+
+        // 🔥 优先使用后台全目录筛选排序（与知识图谱共用评分，附评分明细）
+        if (requiredProduction > 0 && controller && controller.screenPumps) {
+            var ranked = controller.screenPumps({
+                liftMethod: stepData.lift_method ? stepData.lift_method.selectedMethod : "",
+                requiredFlow: requiredProduction * 0.158987,
+                requiredHead: requiredHead * 0.3048,    // ft -> m
+                casingId: constraints.maxOD ? constraints.maxOD * 25.4 : 0,
+                topK: 50
+            })
+            if (ranked && ranked.length > 0) {
+                var allowed = {}
+                filtered.forEach(function(pump) { allowed[pump.id] = true })
+                ranked = ranked.filter(function(pump) { return allowed[pump.id] })
+                if (ranked.length > 0) {
+                    console.log(`筛选结果(全目录排序): ${originalLength} -> ${ranked.length}`)
+                    return ranked
+                }
+            }
+        }
+
         if (requiredProduction > 0) {
             console.log("产量约束筛选:", requiredProduction, "bbl/d")
             requiredProduction = requiredProduction * 0.158987
@@ -1095,6 +1191,7 @@ Rectangle {
     // 🔥 保持老版本的calculatePumpMatchScore逻辑
     function calculatePumpMatchScore(pump) {
         if (!pump) return 50
+        if (pump.matchScore !== undefined) return pump.matchScore
 
         var score = 100
         console.log("计算泵匹配度:", pump.model)
@@ -1162,7 +1259,8 @@ Rectangle {
             shaftDiameter: selectedPump.shaftDiameter,
             specifications: (isChineseMode ? "型号: " : "Model: ") + selectedPump.model +
                             ", " + selectedStages + (isChineseMode ? " 级" : " stages") +
-                            ", " + totalHead + " ft @ " + selectedPump.efficiency + "%"
+                            ", " + totalHead + " ft @ " + selectedPump.efficiency + "%",
+            espString: currentEspString()
         }
 
         console.log("=== Step4 发射数据更新信号 ===")
@@ -1187,10 +1285,89 @@ Rectangle {
             stages: selectedStages,
             totalHead: selectedPump ? selectedStages * selectedPump.headPerStage : 0,
             totalPower: selectedPump ? selectedStages * selectedPump.powerPerStage : 0,
-            efficiency: selectedPump ? selectedPump.efficiency : 0
+            efficiency: selectedPump ? selectedPump.efficiency : 0,
+            espString: currentEspString()
         }
     }
 
+    // 🔥 管柱组合优选：选中最优方案的泵并带出级数和频率
+    function runEspConfigurator() {
+        if (!controller || !controller.configureEspString) return
+
+        var requiredRate = targetRate > 0 ? targetRate
+                         : (stepData.prediction && stepData.prediction.finalValues
+                            ? stepData.prediction.finalValues.production || 0 : 0)
+        var requiredHeadFt = getRequiredTotalHead()
+        if (requiredRate <= 0 || requiredHeadFt <= 0) {
+            console.warn("缺少需求产量或扬程，无法进行管柱组合优选")
+            return
+        }
+
+        // 生产参数温度为°F，气液比为百分数（与项目批量选型一致）
+        var bhtF = stepData.parameters ? parseFloat(stepData.parameters.bht) : NaN
+        var gasPercent = stepData.prediction && stepData.prediction.finalValues
+                       ? stepData.prediction.finalValues.gasRate || 0 : 0
+        var requiredFlow = requiredRate * 0.158987
+
+        loading = true
+        var result = controller.configureEspString({
+            requiredFlow: requiredFlow,
+            requiredHead: requiredHeadFt * 0.3048,
+            bht: isNaN(bhtF) ? 0 : (bhtF - 32) * 5 / 9,
+            casingId: constraints.maxOD ? constraints.maxOD * 25.4 : 0,
+            gasRate: requiredFlow * gasPercent / 100,
+            liftMethod: selectedLiftMethod,
+            maxResults: 20
+        })
+        loading = false
+
+        if (!result || !result.solutions || result.solutions.length === 0) {
+            espString = null
+            console.warn("没有满足约束的管柱组合")
+            return
+        }
+
+        var best = result.solutions[0]
+        espString = best
+        selectedPump = best.pump
+        for (var i = 0; i < availablePumps.length; i++) {
+            if (availablePumps[i].id === best.pump.id) {
+                selectedPump = availablePumps[i]
+                break
+            }
+        }
+        selectedStages = best.stages
+        recommendedFrequency = best.frequency
+        if (stagesSlider) {
+            stagesSlider.value = selectedStages
+        }
+        console.log("管柱组合优选:", describeEspString(best), "共", result.solutions.length, "个非支配方案")
+        updateStepData()
+    }
+
+    // 当前所选泵对应的组合方案（手动改选其他泵后不再带出）
+    function currentEspString() {
+        if (!espString || !selectedPump || espString.pump.id !== selectedPump.id) return null
+        return {
+            stages: espString.stages,
+            frequency: espString.frequency,
+            motor: espString.motor,
+            protector: espString.protector,
+            separator: espString.separator,
+            capex: espString.capex,
+            energyKw: espString.energyKw
+        }
+    }
+
+    function describeEspString(solution) {
+        var parts = [solution.pump.model + " × " + solution.stages + (isChineseMode ? "级" : " stg") +
+                     " @ " + solution.frequency + " Hz"]
+        if (solution.motor) parts.push((isChineseMode ? "电机 " : "Motor ") + solution.motor.model)
+        if (solution.protector) parts.push((isChineseMode ? "保护器 " : "Protector ") + solution.protector.model)
+        if (solution.separator) parts.push((isChineseMode ? "分离器 " : "Separator ") + solution.separator.model)
+        return parts.join(", ") + ", " + solution.energyKw + " kW"
+    }
+
     function openPerformanceAnalysisPage() {
         if (!selectedPump) {
             console.warn("未选择泵，无法打开性能分析页面")
@@ -1198,7 +1375,7 @@ Rectangle {
         }
 
         // 发送openPerformanceAnalysis信号
-        openPerformanceAnalysis(selectedPump, selectedStages, 60)
+        openPerformanceAnalysis(selectedPump, selectedStages, recommendedFrequency)
     }
     // 🔥 修复自动计算级数函数中的单位处理
     function autoCalculateStages() {
@@ -1216,6 +1393,30 @@ Rectangle {
             return
         }
 
+        // 🔥 优先使用级数×频率优化：按相似定律换算性能曲线，取满足产量和扬程的最小功率配置
+        var requiredRate = targetRate > 0 ? targetRate
+                         : (stepData.prediction && stepData.prediction.finalValues
+                            ? stepData.prediction.finalValues.production || 0 : 0)
+        if (requiredRate > 0 && typeof selectedPump.id === "number"
+                && controller && controller.optimizeStagesAndFrequency) {
+            var optimized = controller.optimizeStagesAndFrequency({
+                pumpIds: [selectedPump.id],
+                requiredFlow: requiredRate * 0.158987,
+                requiredHead: requiredHeadFt * 0.3048
+            })
+            if (optimized && optimized.length > 0) {
+                recommendedFrequency = optimized[0].frequency
+                selectedStages = optimized[0].stages
+                console.log("最小功率配置:", selectedStages, "级 @", recommendedFrequency, "Hz,",
+                            optimized[0].powerKw, "kW")
+                if (stagesSlider) {
+                    stagesSlider.value = selectedStages
+                }
+                return
+            }
+        }
+        recommendedFrequency = 60
+
         // 计算所需级数（泵的headPerStage总是以ft为单位）
         var tempPumpHead = selectedPump.headPerStage / 0.3084
         var calculatedStages = Math.ceil(requiredHeadFt / tempPumpHead)
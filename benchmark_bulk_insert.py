@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量写入性能基准
+对比逐行ORM写入与Core批量写入（井轨迹、泵曲线、增强参数）的吞吐量（行/秒）
+
+用法:
+    python benchmark_bulk_insert.py [行数 ...]     # 默认 1000 10000 100000
+"""
+
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+
+from DataManage.config.database_config import DatabaseConfig
+from DataManage.services.database_service import DatabaseService
+from DataManage.models.well_trajectory import WellTrajectory
+
+
+def make_trajectories(n):
+    return [
+        {
+            'tvd': i * 0.98, 'md': float(i), 'dls': 0.5,
+            'inclination': 10.0, 'azimuth': 45.0,
+            'north_south': i * 0.1, 'east_west': i * 0.1
+        }
+        for i in range(n)
+    ]
+
+
+def make_curve(n):
+    return {
+        'flow': [float(i) for i in range(n)],
+        'head': [1000.0 - i * 1e-3 for i in range(n)],
+        'power': [50.0 + i * 1e-4 for i in range(n)],
+        'efficiency': [70.0 * math.exp(-((i / n - 0.6) / 0.25) ** 2) for i in range(n)],
+        'standard_frequency': 60.0,
+        'data_source': 'benchmark'
+    }
+
+
+def make_enhanced(n):
+    return [
+        {'flow_point': float(i), 'npsh_required': 3.0, 'temperature_rise': 1.5,
+         'vibration_level': 2.0, 'wear_rate': 0.1, 'axial_thrust': 900.0}
+        for i in range(n)
+    ]
+
+
+def orm_trajectories(db, well_id, trajectories):
+    """基线：逐行创建ORM对象（改造前的写法）"""
+    session = db.get_session()
+    try:
+        session.query(WellTrajectory).filter_by(well_id=well_id).delete()
+        for idx, traj in enumerate(trajectories):
+            session.add(WellTrajectory(well_id=well_id, sequence_number=idx + 1, **traj))
+        session.commit()
+    finally:
+        db.close_session(session)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    logging.disable(logging.INFO)
+
+    workdir = tempfile.mkdtemp(prefix='bulk_bench_')
+    db = DatabaseService(DatabaseConfig(
+        db_path=os.path.join(workdir, 'bench.db'),
+        backup_enabled=False,
+        log_level='WARNING'
+    ))
+
+    project_id = db.create_project({'project_name': 'bulk_benchmark', 'user_name': 'bench'})
+    well_id = db.create_well({'project_id': project_id, 'well_name': 'BENCH-1'})
+
+    print(f"{'行数':>8} | {'轨迹(ORM)':>12} | {'轨迹(批量)':>12} | {'泵曲线(批量)':>12} | {'增强参数(批量)':>14}  (行/秒)")
+    print('-' * 78)
+
+    for n in sizes:
+        trajectories = make_trajectories(n)
+
+        orm_time = timed(orm_trajectories, db, well_id, trajectories)
+        bulk_time = timed(db.save_well_trajectories, well_id, trajectories)
+        curve_time = timed(db.save_pump_curves, f'BENCH_PUMP_{n}', make_curve(n))
+        enhanced_time = timed(db.save_enhanced_parameters, f'BENCH_PUMP_{n}', make_enhanced(n))
+
+        print(f"{n:>8} | {n / orm_time:>12,.0f} | {n / bulk_time:>12,.0f} | "
+              f"{n / curve_time:>12,.0f} | {n / enhanced_time:>14,.0f}")
+
+    print(f"\n基准数据库: {workdir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+知识图谱力导向布局检查
+用知识图谱中常见的图结构（需求/约束中心连接全部设备、随机稀疏图、树）执行
+GraphLayoutService 布局，按控制器的画布尺寸规则检查：
+  - 贴在画布边框上的节点（布局被裁剪/堆积）
+  - 与最近邻距离小于阈值的重叠节点
+  - 冷启动 / 热启动耗时
+任一项超出阈值即失败（退出码1）
+
+用法:
+    python check_graph_layout.py [节点数] [-v]     # 默认 3000
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from DataManage.services.graph_layout_service import GraphLayoutService, neighbor_pairs
+
+NODE_SPACING = 60.0        # 与 KnowledgeGraphController 的力导向画布间距一致
+BORDER_DISTANCE = 0.5      # 距画布边框不超过该距离（像素）视为贴边
+OVERLAP_DISTANCE = 5.0     # 与最近邻距离小于该值（像素）视为重叠
+MAX_OVERLAP_RATIO = 0.01   # 允许的重叠节点比例
+MAX_COLD_SECONDS = 1.0
+MAX_WARM_SECONDS = 0.5
+
+
+def build_graphs(node_count: int):
+    """[(名称, 节点ID, 边)]"""
+    rng = np.random.default_rng(42)
+    hubs = ['flow_requirement', 'head_requirement', 'pump_requirements', 'size_constraint', 'power_constraint']
+    pumps = [f'pump_{i}' for i in range(node_count - len(hubs))]
+    ids = [f'n{i}' for i in range(node_count)]
+    pairs = rng.integers(0, node_count, (node_count * 3 // 2, 2))
+    return [
+        ('需求中心+设备', hubs + pumps, [(hub, pump, 0.6) for hub in hubs for pump in pumps]),
+        ('随机稀疏图', ids, [(f'n{a}', f'n{b}', 1.0) for a, b in pairs.tolist() if a != b]),
+        ('三叉树', ids, [(f'n{i}', f'n{(i - 1) // 3}', 1.0) for i in range(1, node_count)]),
+    ]
+
+
+def measure(name, node_ids, edges, verbose: bool):
+    """布局一个图并返回检查结果"""
+    engine = GraphLayoutService()
+    settings = engine.canvas_settings(len(node_ids), NODE_SPACING)
+
+    start = time.perf_counter()
+    layout = engine.layout(name, node_ids, edges, settings=settings)
+    cold = time.perf_counter() - start
+
+    # 热启动：新增一个连接到已有节点的节点
+    start = time.perf_counter()
+    engine.layout(name, node_ids + ['new_node'], edges + [('new_node', node_ids[0], 1.0)], settings=settings)
+    warm = time.perf_counter() - start
+
+    positions = np.array([(layout[node_id]['x'], layout[node_id]['y']) for node_id in node_ids])
+    border = int(((positions[:, 0] <= BORDER_DISTANCE) | (positions[:, 0] >= settings.width - BORDER_DISTANCE) |
+                  (positions[:, 1] <= BORDER_DISTANCE) | (positions[:, 1] >= settings.height - BORDER_DISTANCE)).sum())
+    outside = int(((positions < 0) | (positions > [settings.width, settings.height])).any(axis=1).sum())
+
+    first, second = neighbor_pairs(positions, OVERLAP_DISTANCE)
+    distance = np.linalg.norm(positions[first] - positions[second], axis=1)
+    close = distance < OVERLAP_DISTANCE
+    overlapped = len(np.unique(np.concatenate([first[close], second[close]])))
+
+    result = {
+        'name': name, 'nodes': len(node_ids), 'edges': len(edges), 'cold': cold, 'warm': warm,
+        'border': border, 'outside': outside, 'overlapped': overlapped,
+        'canvas': (settings.width, settings.height),
+    }
+    if verbose:
+        extent = np.ptp(positions, axis=0)
+        print(f"  [{name}] 画布 {settings.width:.0f}×{settings.height:.0f}, 布局范围 {extent[0]:.0f}×{extent[1]:.0f}")
+    return result
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
+    verbose = '-v' in sys.argv
+    node_count = int(args[0]) if args else 3000
+
+    failures = []
+    print(f"检查力导向布局: {node_count} 个节点, 间距 {NODE_SPACING:.0f}px")
+    for name, node_ids, edges in build_graphs(node_count):
+        r = measure(name, node_ids, edges, verbose)
+        print(f"  {r['name']}: {r['nodes']}节点 {r['edges']}边, 冷启动 {r['cold'] * 1000:.0f}ms, "
+              f"热启动 {r['warm'] * 1000:.0f}ms, 贴边 {r['border']}, 越界 {r['outside']}, 重叠 {r['overlapped']}")
+        if r['border'] or r['outside']:
+            failures.append(f"{name}: {r['border']} 个节点贴边, {r['outside']} 个节点越界")
+        if r['overlapped'] > MAX_OVERLAP_RATIO * r['nodes']:
+            failures.append(f"{name}: {r['overlapped']} 个节点与最近邻距离小于 {OVERLAP_DISTANCE}px")
+        if r['cold'] > MAX_COLD_SECONDS:
+            failures.append(f"{name}: 冷启动 {r['cold']:.2f}s 超过 {MAX_COLD_SECONDS}s")
+        if r['warm'] > MAX_WARM_SECONDS:
+            failures.append(f"{name}: 热启动 {r['warm']:.2f}s 超过 {MAX_WARM_SECONDS}s")
+
+    if failures:
+        print(f"发现 {len(failures)} 个问题:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+    print("通过: 无贴边/越界节点，重叠与耗时在阈值内")
+
+
+if __name__ == "__main__":
+    main()
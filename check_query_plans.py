@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热点查询计划检查
+在填充了测试数据的临时数据库上执行 DatabaseService 的热点查询，
+用 EXPLAIN QUERY PLAN 检查，行数超过阈值的表上出现全表扫描(SCAN)即失败（退出码1）
+
+用法:
+    python check_query_plans.py [最小行数阈值] [-v]     # 默认 1000
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from DataManage.config.database_config import DatabaseConfig
+from DataManage.services.database_service import DatabaseService, WellModel
+from DataManage.services.query_plan_audit import QueryPlanAuditor
+from DataManage.models.well_trajectory import WellTrajectory
+from DataManage.models.casing import Casing, WellCalculationResult
+from DataManage.models.production_parameters import ProductionParameters, ProductionPrediction, PredictionRun
+
+DEVICE_COUNT = 4000
+WELL_COUNT = 200
+OTHER_WELL_COUNT = 2000   # 其他项目的井，使按项目过滤具有选择性
+POINTS_PER_WELL = 50
+PARAM_VERSIONS = 10
+
+# LIKE 模糊查询回退路径（关键词短于trigram长度）本身就是扫描
+ALLOWED_SCANS = {
+    'search_devices(短关键词)': ['devices'],
+}
+
+
+def seed(db):
+    """填充测试数据"""
+    rng = random.Random(42)
+    types = ['pump', 'motor', 'protector', 'separator']
+    rows = []
+    for i in range(DEVICE_COUNT):
+        device_type = types[i % 4]
+        data = {
+            'device_type': device_type,
+            'model': f'MDL-{device_type}-{i}',
+            'manufacturer': rng.choice(['Baker', 'Schlumberger', 'Halliburton']),
+            'serial_number': f'SN{i:06d}',
+            'status': rng.choice(['active', 'active', 'inactive', 'maintenance']),
+        }
+        if device_type == 'pump':
+            data['lift_method'] = rng.choice(['esp', 'pcp', 'jet'])
+            data['pump_details'] = {'single_stage_head': 8.0}
+        elif device_type == 'motor':
+            data['motor_details'] = {
+                'motor_type': 'induction',
+                'frequency_params': [{'frequency': 50, 'power': 100.0}, {'frequency': 60, 'power': 120.0}]
+            }
+        rows.append({'row': i + 2, 'data': data})
+    db.bulk_import_devices(rows)
+
+    project_id = db.create_project({'project_name': 'plan_check', 'user_name': 'check'})
+    other_project_id = db.create_project({'project_name': 'plan_check_other', 'user_name': 'check'})
+    base_time = datetime(2024, 1, 1)
+    with db.engine.begin() as conn:
+        conn.execute(insert(WellModel), [
+            {'project_id': other_project_id, 'well_name': f'O-{i}', 'is_deleted': False,
+             'created_at': base_time + timedelta(hours=i)}
+            for i in range(OTHER_WELL_COUNT)
+        ])
+        conn.execute(insert(WellModel), [
+            {'project_id': project_id, 'well_name': f'W-{i}', 'is_deleted': False,
+             'created_at': base_time + timedelta(hours=i)}
+            for i in range(WELL_COUNT)
+        ])
+        well_ids = [row[0] for row in conn.exec_driver_sql(
+            "SELECT id FROM wells_new WHERE project_id = ?", (project_id,))]
+
+        conn.execute(insert(WellTrajectory), [
+            {'well_id': well_id, 'sequence_number': n, 'tvd': n * 10.0, 'md': n * 10.0, 'is_deleted': False}
+            for well_id in well_ids for n in range(POINTS_PER_WELL)
+        ])
+        conn.execute(insert(Casing), [
+            {'well_id': well_id, 'casing_type': 'production', 'top_depth': n * 100.0, 'is_deleted': False}
+            for well_id in well_ids for n in range(5)
+        ])
+        conn.execute(insert(WellCalculationResult), [
+            {'well_id': well_id, 'calculation_date': base_time + timedelta(days=n)}
+            for well_id in well_ids for n in range(5)
+        ])
+        conn.execute(insert(ProductionParameters), [
+            {'well_id': well_id, 'is_active': n == PARAM_VERSIONS - 1,
+             'created_at': base_time + timedelta(days=n)}
+            for well_id in well_ids for n in range(PARAM_VERSIONS)
+        ])
+        param_ids = [row[0] for row in conn.exec_driver_sql("SELECT id FROM production_parameters")]
+        conn.execute(insert(ProductionPrediction), [
+            {'parameters_id': param_id, 'created_at': base_time + timedelta(hours=n)}
+            for param_id in param_ids for n in range(2)
+        ])
+        conn.execute(insert(PredictionRun).from_select(
+            ['prediction_id', 'parameters_id', 'created_at'],
+            ProductionPrediction.__table__.select().with_only_columns(
+                ProductionPrediction.id, ProductionPrediction.parameters_id, ProductionPrediction.created_at
+            )
+        ))
+
+    db.migrate_indexes()
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return project_id, well_ids, param_ids
+
+
+def run_hot_queries(db, auditor, project_id, well_ids, param_ids):
+    """执行热点查询（每个标签对应一个服务方法调用）"""
+    well_id = well_ids[len(well_ids) // 2]
+    params_id = param_ids[len(param_ids) // 2]
+
+    hot_queries = [
+        ('get_devices', lambda: db.get_devices()),
+        ('get_devices(类型)', lambda: db.get_devices(device_type='pump')),
+        ('get_devices(类型+状态)', lambda: db.get_devices(device_type='motor', status='active')),
+        ('get_devices(状态)', lambda: db.get_devices(status='maintenance')),
+        ('get_device_statistics', lambda: db.get_device_statistics()),
+        ('get_devices_by_lift_method', lambda: db.get_devices_by_lift_method('pump', 'esp')),
+        ('get_devices_by_model', lambda: db.get_devices_by_model('MDL-pump-8')),
+        ('get_device_by_id', lambda: db.get_device_by_id(DEVICE_COUNT // 2)),
+        ('search_devices', lambda: db.search_devices('MDL-motor-12', limit=50)),
+        ('search_devices(短关键词)', lambda: db.search_devices('12', limit=50)),
+        ('get_wells_by_project', lambda: db.get_wells_by_project(project_id)),
+        ('search_wells', lambda: db.search_wells(project_id, 'W-12', limit=50)),
+        ('get_well_trajectories', lambda: db.get_well_trajectories(well_id)),
+        ('get_casings_by_well', lambda: db.get_casings_by_well(well_id)),
+        ('get_latest_calculation_result', lambda: db.get_latest_calculation_result(well_id)),
+        ('get_calculation_history', lambda: db.get_calculation_history(well_id)),
+        ('get_production_parameters', lambda: db.get_production_parameters(well_id)),
+        ('get_production_parameters(全部版本)', lambda: db.get_production_parameters(well_id, active_only=False)),
+        ('get_production_parameters_history', lambda: db.get_production_parameters_history(well_id)),
+        ('get_latest_prediction', lambda: db.get_latest_prediction(params_id)),
+        ('get_prediction_history', lambda: db.get_prediction_history(params_id)),
+        ('get_wells_with_production_params', lambda: db.get_wells_with_production_params(project_id)),
+        ('get_pump_curves', lambda: db.get_pump_curves('FLEXPump_400')),
+    ]
+
+    for label, query in hot_queries:
+        with auditor.capture(label):
+            query()
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
+    verbose = '-v' in sys.argv
+    min_rows = int(args[0]) if args else 1000
+    logging.disable(logging.WARNING)
+
+    workdir = tempfile.mkdtemp(prefix='query_plan_')
+    db = DatabaseService(DatabaseConfig(
+        db_path=os.path.join(workdir, 'plan.db'),
+        backup_enabled=False,
+        log_level='WARNING'
+    ))
+
+    project_id, well_ids, param_ids = seed(db)
+
+    auditor = QueryPlanAuditor(db.engine, min_rows=min_rows, allowed=ALLOWED_SCANS)
+    run_hot_queries(db, auditor, project_id, well_ids, param_ids)
+
+    if verbose:
+        print(auditor.report())
+        print()
+
+    violations = auditor.audit()
+    labels = sorted({label for label, _, _ in auditor.statements})
+    print(f"检查 {len(labels)} 个热点查询, {len(auditor.statements)} 条语句, 阈值 {min_rows} 行")
+
+    if violations:
+        print(f"发现 {len(violations)} 处全表扫描:")
+        for v in violations:
+            print(f"  [{v['label']}] {v['detail']} ({v['table']}: {v['rows']} 行)")
+            print(f"      {v['sql'][:200]}")
+        sys.exit(1)
+
+    print("通过: 未发现大表全表扫描")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预测结果去重压缩（一次性工具）
+为去重改造前保存的预测结果补算内容哈希，合并同一生产参数下输入、模型版本和结果
+（含IPR曲线）完全相同的结果行：运行记录改指向保留的最早一行，其余行删除，
+最后做一次增量VACUUM回收空间（auto_vacuum=NONE 的旧库先转换为 INCREMENTAL）。
+
+改造前的结果没有记录深度等额外输入和模型版本，只与同样是旧数据的结果合并。
+试运行以只读方式打开数据库，不初始化数据库服务（不做列迁移、补建运行记录等写入）。
+
+用法:
+    python compact_predictions.py [数据库路径] [--dry-run]     # 默认使用 DB_PATH 配置
+"""
+
+import logging
+import os
+import sys
+from collections import defaultdict
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, inspect, select, text, type_coerce
+from sqlalchemy.types import NullType
+from sqlalchemy.orm import undefer_group
+
+from DataManage.config.database_config import get_config_from_env
+from DataManage.services.database_service import DatabaseService
+from DataManage.models.packed_json import PAYLOAD_GROUP, PackedJSON, decode_payload, payload_hash
+from DataManage.models.production_parameters import ProductionParameters, ProductionPrediction
+
+BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def open_readonly(db_path):
+    """以只读方式打开数据库文件（试运行和修改前的统计都不经过数据库服务）"""
+    return create_engine(f"sqlite:///file:{os.path.abspath(db_path)}?mode=ro&uri=true")
+
+
+def count_rows(engine):
+    """返回 (预测结果行数, 运行记录条数, 缺少运行记录的结果行数)；旧库可能还没有运行记录表"""
+    with engine.connect() as conn:
+        predictions = conn.execute(text("SELECT COUNT(*) FROM production_predictions")).scalar()
+        if not inspect(conn).has_table('prediction_runs'):
+            return predictions, 0, predictions
+        runs = conn.execute(text("SELECT COUNT(*) FROM prediction_runs")).scalar()
+        missing = conn.execute(text(
+            "SELECT COUNT(*) FROM production_predictions p "
+            "WHERE NOT EXISTS (SELECT 1 FROM prediction_runs r WHERE r.prediction_id = p.id)"
+        )).scalar()
+    return predictions, runs, missing
+
+
+def backfill_runs(db):
+    """没有运行记录的结果补建一条运行记录（时间取结果的保存时间）"""
+    with db.engine.begin() as conn:
+        missing = conn.execute(text(
+            "SELECT COUNT(*) FROM production_predictions p "
+            "WHERE NOT EXISTS (SELECT 1 FROM prediction_runs r WHERE r.prediction_id = p.id)"
+        )).scalar()
+        if missing:
+            conn.execute(text(
+                "INSERT INTO prediction_runs (prediction_id, parameters_id, created_at) "
+                "SELECT id, parameters_id, created_at FROM production_predictions p "
+                "WHERE NOT EXISTS (SELECT 1 FROM prediction_runs r WHERE r.prediction_id = p.id) ORDER BY id"
+            ))
+    return missing
+
+
+def hash_legacy_rows(db):
+    """为 content_hash 为空的旧结果补算输入哈希和内容哈希，返回 {id: 去重键}"""
+    keys = {}
+    session = db.get_session()
+    try:
+        ids = [row[0] for row in session.query(ProductionPrediction.id).filter(
+            ProductionPrediction.content_hash.is_(None)
+        ).order_by(ProductionPrediction.id)]
+
+        params_hash = {}
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = session.query(ProductionPrediction).options(
+                undefer_group(PAYLOAD_GROUP)
+            ).filter(ProductionPrediction.id.in_(ids[start:start + BATCH_SIZE])).all()
+
+            for prediction in batch:
+                if prediction.parameters_id not in params_hash:
+                    params = session.get(ProductionParameters, prediction.parameters_id)
+                    params_hash[prediction.parameters_id] = payload_hash(
+                        db._prediction_inputs(params) if params else {}, {}
+                    )
+                content = {
+                    column.key: getattr(prediction, column.key)
+                    for column in ProductionPrediction.__table__.columns
+                }
+                prediction.input_hash = params_hash[prediction.parameters_id]
+                prediction.content_hash = payload_hash(db._prediction_content(content))
+                keys[prediction.id] = (prediction.parameters_id, prediction.input_hash,
+                                       prediction.model_version, prediction.content_hash)
+
+            session.commit()
+            session.expunge_all()
+    finally:
+        db.close_session(session)
+    return keys
+
+
+def _select_existing(conn, table):
+    """只查询数据库中已存在的列（旧库尚未做列迁移），缺少的列按None处理"""
+    existing = {column['name'] for column in inspect(conn).get_columns(table.name)}
+    # 取原始值，载荷列逐行解码（损坏的行跳过而不是中止整个试运行）
+    columns = [type_coerce(column, NullType()).label(column.key)
+               for column in table.columns if column.name in existing]
+    missing = {column.key: None for column in table.columns if column.name not in existing}
+    return columns, missing
+
+
+def legacy_keys_readonly(engine):
+    """试运行：在只读连接上计算旧结果的去重键（不写回哈希），返回 ({id: 去重键}, 无法解析的行数)"""
+    keys = {}
+    unreadable = 0
+    with engine.connect() as conn:
+        prediction_columns, prediction_missing = _select_existing(conn, ProductionPrediction.__table__)
+        params_columns, params_missing = _select_existing(conn, ProductionParameters.__table__)
+        id_column = ProductionPrediction.__table__.c.id
+        query = select(id_column)
+        if 'content_hash' not in prediction_missing:
+            query = query.where(ProductionPrediction.__table__.c.content_hash.is_(None))
+        ids = conn.execute(query.order_by(id_column)).scalars().all()
+
+        params_hash = {}
+        for start in range(0, len(ids), BATCH_SIZE):
+            rows = conn.execute(select(*prediction_columns).where(id_column.in_(ids[start:start + BATCH_SIZE])))
+            for row in rows.mappings():
+                content = dict(prediction_missing, **row)
+                try:
+                    for column in ProductionPrediction.__table__.columns:
+                        if isinstance(column.type, PackedJSON):
+                            content[column.key] = decode_payload(content[column.key])
+                except (TypeError, ValueError) as e:
+                    logger.debug(f"预测结果 {content['id']} 载荷无法解析，跳过: {e}")
+                    unreadable += 1
+                    continue
+                parameters_id = content['parameters_id']
+                if parameters_id not in params_hash:
+                    params = conn.execute(select(*params_columns).where(
+                        ProductionParameters.__table__.c.id == parameters_id)).mappings().first()
+                    params_hash[parameters_id] = payload_hash(
+                        DatabaseService._prediction_inputs(SimpleNamespace(**params_missing, **params))
+                        if params else {}, {}
+                    )
+                keys[content['id']] = (parameters_id, params_hash[parameters_id], content['model_version'],
+                                       payload_hash(DatabaseService._prediction_content(content)))
+    return keys, unreadable
+
+
+def find_duplicates(db):
+    """按去重键分组，返回 {保留ID: [重复ID, ...]}"""
+    groups = defaultdict(list)
+    session = db.get_session()
+    try:
+        rows = session.query(
+            ProductionPrediction.id, ProductionPrediction.parameters_id, ProductionPrediction.input_hash,
+            ProductionPrediction.model_version, ProductionPrediction.content_hash
+        ).filter(ProductionPrediction.content_hash.isnot(None)).order_by(ProductionPrediction.id)
+        for prediction_id, *key in rows:
+            groups[tuple(key)].append(prediction_id)
+    finally:
+        db.close_session(session)
+    return {ids[0]: ids[1:] for ids in groups.values() if len(ids) > 1}
+
+
+def payload_bytes(engine, ids):
+    if not ids:
+        return 0
+    total = 0
+    with engine.connect() as conn:
+        for start in range(0, len(ids), BATCH_SIZE):
+            total += conn.execute(
+                text("SELECT COALESCE(SUM(LENGTH(ipr_curve_data)), 0) FROM production_predictions "
+                     "WHERE id IN (SELECT value FROM json_each(:ids))"),
+                {'ids': '[' + ','.join(str(i) for i in ids[start:start + BATCH_SIZE]) + ']'}
+            ).scalar()
+    return total
+
+
+def merge_duplicates(db, duplicates):
+    """运行记录改指向保留行后删除重复行（单个事务）"""
+    with db.engine.begin() as conn:
+        for keep_id, duplicate_ids in duplicates.items():
+            for start in range(0, len(duplicate_ids), BATCH_SIZE):
+                chunk = '[' + ','.join(str(i) for i in duplicate_ids[start:start + BATCH_SIZE]) + ']'
+                conn.execute(text(
+                    "UPDATE prediction_runs SET prediction_id = :keep "
+                    "WHERE prediction_id IN (SELECT value FROM json_each(:ids))"
+                ), {'keep': keep_id, 'ids': chunk})
+                conn.execute(text(
+                    "DELETE FROM production_predictions WHERE id IN (SELECT value FROM json_each(:ids))"
+                ), {'ids': chunk})
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
+    dry_run = '--dry-run' in sys.argv
+    logging.basicConfig(level=logging.WARNING)
+
+    config = get_config_from_env()
+    if args:
+        config.db_path = args[0]
+    if not os.path.exists(config.db_path):
+        print(f"数据库不存在: {config.db_path}")
+        sys.exit(1)
+    config.backup_enabled = False
+    config.maintenance_enabled = False
+
+    # 修改前的统计在只读连接上完成：初始化服务时会为旧结果补建运行记录
+    readonly = open_readonly(config.db_path)
+    before, runs, backfilled = count_rows(readonly)
+
+    if dry_run:
+        # 试运行不初始化服务、不写入哈希，直接在内存中分组
+        hashed, unreadable = legacy_keys_readonly(readonly)
+        groups = defaultdict(list)
+        for prediction_id, key in sorted(hashed.items()):
+            groups[key].append(prediction_id)
+        duplicates = {ids[0]: ids[1:] for ids in groups.values() if len(ids) > 1}
+    else:
+        readonly.dispose()
+        # 初始化服务会完成列迁移并为旧结果补建运行记录
+        db = DatabaseService(config)
+        backfill_runs(db)
+        hashed = hash_legacy_rows(db)
+        duplicates = find_duplicates(db)
+
+    duplicate_ids = [i for ids in duplicates.values() for i in ids]
+    saved_bytes = payload_bytes(readonly if dry_run else db.engine, duplicate_ids)
+
+    print(f"数据库: {config.db_path}")
+    print(f"预测结果 {before} 行, 运行记录 {runs} 条, 补建运行记录 {backfilled} 条, 补算哈希 {len(hashed)} 行")
+    print(f"可合并 {len(duplicate_ids)} 行重复结果（{len(duplicates)} 组），IPR曲线 {saved_bytes / 1024:.1f} KB")
+
+    if dry_run:
+        readonly.dispose()
+        if unreadable:
+            print(f"跳过 {unreadable} 行无法解析的结果")
+        print("试运行，未修改数据库")
+        return
+    if not duplicate_ids:
+        return
+
+    merge_duplicates(db, duplicates)
+    with db.engine.connect() as conn:
+        after = conn.execute(text("SELECT COUNT(*) FROM production_predictions")).scalar()
+    print(f"合并完成: 预测结果 {before} -> {after} 行")
+
+    report = db.maintenance_service.incremental_vacuum(wait_for_idle=False)
+    if report.get('converted'):
+        print("数据库已转换为 auto_vacuum=INCREMENTAL（完整VACUUM）")
+    print(f"增量VACUUM: 释放 {report.get('pages_freed', 0)} 页")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 ﻿# This Python file uses the following encoding: utf-8
+import multiprocessing
 import sys
 from pathlib import Path
 from PySide6.QtGui import QGuiApplication
@@ -20,10 +21,12 @@ from Controller.PumpCurvesController import PumpCurvesController
 from Controller.ContinuousLearningController import ContinuousLearningController
 from Controller.KnowledgeGraphController import KnowledgeGraphController
 from Controller.DashboardController import DashboardController
+from Controller.PerformanceMonitorController import PerformanceMonitorController
 
 
 # 导入数据库服务
 from DataManage.services.database_service import DatabaseService
+from DataManage.services.async_database_service import AsyncDatabaseService
 
 from Controller.DeviceController import DeviceController                                                            
 from Controller.DeviceRecommendationController import DeviceRecommendationController
@@ -119,6 +122,7 @@ class Application(QObject):
 
         # 初始化数据库服务
         self.db_service = DatabaseService()
+        self.app.aboutToQuit.connect(self.shutdown_services)
 
         # 初始化控制器
         self.login_controller = LoginController()
@@ -137,6 +141,7 @@ class Application(QObject):
         self.unit_system_controller = UnitSystemController()
         self.knowledge_graph_controller = KnowledgeGraphController()
         self.dashboard_controller = DashboardController()
+        self.performance_controller = PerformanceMonitorController()
         
 
         # 存储用户信息
@@ -187,6 +192,8 @@ class Application(QObject):
         
         # 🔥 修复：注册 dashboard_controller
         self.engine.rootContext().setContextProperty("dashboardController", self.dashboard_controller)
+        # 性能监控（SQL/槽函数耗时指标、慢查询日志）
+        self.engine.rootContext().setContextProperty("performanceController", self.performance_controller)
         # 🔥 新增：设置Qt Quick 3D支持标志
         self.engine.rootContext().setContextProperty("quick3DAvailable", QUICK3D_AVAILABLE)
         
@@ -242,6 +249,16 @@ class Application(QObject):
         """运行应用程序主循环"""
         return self.app.exec()
 
+    def shutdown_services(self):
+        """退出前停止备份/维护线程，关闭后台线程池和组合选型进程池，最后排空写入队列"""
+        self.db_service.backup_service.stop(timeout=5)
+        self.db_service.maintenance_service.stop(timeout=5)
+        # 通知批量选型停止派发新的井，避免退出后进程池仍在运行
+        self.device_recommendation_controller.cancelBatchSelection()
+        AsyncDatabaseService(self.db_service).shutdown(wait=False)
+        self.db_service.esp_configurator.shutdown()
+        self.db_service.write_queue.stop(timeout=5)
+
     @Slot(str, str)
     def on_login_success(self, project_name, user_name):
         """登录成功处理函数"""
@@ -486,6 +503,8 @@ class Application(QObject):
 
 
 if __name__ == "__main__":
+    # 组合选型使用进程池，打包后的可执行文件需要先处理子进程启动
+    multiprocessing.freeze_support()
     app = Application()
     sys.exit(app.run())
     # 将控制器注册到QML引擎